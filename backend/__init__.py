@@ -2,6 +2,7 @@ from flask import Flask
 from flask_cors import CORS
 from flasgger import Swagger
 from backend.routes.routes import register_routes
+import os
 from .database import init_db
 
 def create_app():
@@ -50,8 +51,10 @@ def create_app():
     
     Swagger(app, config=swagger_config, template=swagger_template)
     
-    # Inicializar o banco de dados
-    init_db()
+    # O schema é migrado no deploy (python -m backend.database.migracoes);
+    # DB_MIGRAR_NA_INICIALIZACAO=True mantém a migração no boot em desenvolvimento
+    if os.getenv('DB_MIGRAR_NA_INICIALIZACAO', 'False').lower() == 'true':
+        init_db()
     
     # Registrar as rotas
     register_routes(app)
@@ -1,21 +1,21 @@
 import os
-import mysql.connector
 from dotenv import load_dotenv
 from mysql.connector import Error
+from backend.database.pool import obter_pool
+from backend.database.replicas import obter_roteador
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
-def get_db_connection():
-    """Cria e retorna uma conexão com o banco de dados MySQL."""
+def get_db_connection(somente_leitura=False):
+    """
+    Retorna uma conexão do pool do MySQL; `close()` a devolve ao pool.
+    Com `somente_leitura=True` a conexão pode vir de uma réplica (DB_REPLICAS).
+    """
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='71208794',
-            database='base_emails_marketing'
-        )
-        return connection
+        if somente_leitura:
+            return obter_roteador().obter()
+        return obter_pool().obter()
     except Error as e:
         print(f"Erro ao conectar ao banco de dados: {e}")
         raise
@@ -32,6 +32,10 @@ class Config:
 
     # Configurações da aplicação
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev')
+    # Chave dos tokens de tracking; sem ela, SECRET_KEY
+    TRACKING_SECRET = os.getenv('TRACKING_SECRET', '')
+    # Dias em que um token de tracking é aceito depois de gerado; 0 aceita sempre
+    TRACKING_VALIDADE_DIAS = int(os.getenv('TRACKING_VALIDADE_DIAS', 365))
     DEBUG = os.getenv('FLASK_ENV', 'development') == 'development'
 
     # Configurações de email
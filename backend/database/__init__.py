@@ -1,48 +1,32 @@
-import os
-import mysql.connector
 from mysql.connector import Error
+from .pool import obter_pool, conexao_db, cursor_db, estatisticas_pool
+from .buffer import BufferEscrita
+from .replicas import obter_roteador, conexao_leitura, estatisticas_replicas
+from .streaming import consultar_em_fluxo, iterar_linhas, LinhasEmFluxo
+from .preparadas import executar_preparada, consultar_preparada, estatisticas_preparadas
+from .instrumentacao import estatisticas_consultas
 
 def init_db():
-    """Inicializa o banco de dados com o schema definido."""
+    """
+    Aplica as migrações pendentes do schema. Em produção as migrações rodam
+    no deploy (`python -m backend.database.migracoes`), não a cada boot.
+    """
+    # Importado aqui para que `python -m backend.database.migracoes` não carregue o módulo duas vezes
+    from .migracoes import aplicar_migracoes
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv('DB_HOST', 'localhost'),
-            user=os.getenv('DB_USER', 'root'),
-            password=os.getenv('DB_PASSWORD', '71208794')
-        )
-        
-        if connection.is_connected():
-            cursor = connection.cursor()
-            
-            schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
-            with open(schema_path, 'r') as file:
-                sql_commands = file.read()
-                
-            for command in sql_commands.split(';'):
-                if command.strip():
-                    cursor.execute(command + ';')
-            
-            connection.commit()
-            print("Banco de dados inicializado com sucesso!")
-            
+        aplicar_migracoes()
     except Error as e:
         print(f"Erro ao inicializar o banco de dados: {e}")
-        
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
 
-def get_db_connection():
-    """Retorna uma conexão com o banco de dados."""
+def get_db_connection(somente_leitura=False):
+    """
+    Retorna uma conexão do pool; `close()` a devolve ao pool. Com
+    `somente_leitura=True` a conexão pode vir de uma réplica (DB_REPLICAS).
+    """
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv('DB_HOST', 'localhost'),
-            user=os.getenv('DB_USER', 'root'),
-            password=os.getenv('DB_PASSWORD', '71208794'),
-            database=os.getenv('DB_NAME', 'base_emails_marketing')
-        )
-        return connection
+        if somente_leitura:
+            return obter_roteador().obter()
+        return obter_pool().obter()
     except Error as e:
         print(f"Erro ao conectar ao banco de dados: {e}")
         return None 
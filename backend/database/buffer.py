@@ -0,0 +1,88 @@
+import os
+import threading
+
+from .pool import conexao_db
+
+
+class BufferEscrita:
+    """
+    Acumula linhas destinadas a uma tabela e as grava em lotes.
+
+    Cada lote é enviado com um único `executemany` (que o mysql-connector
+    reescreve como um INSERT de várias linhas) e confirmado com um único
+    commit. Usado como context manager, grava o que restar ao sair do bloco:
+
+        with BufferEscrita('envios', ['contato_id', 'status']) as envios:
+            envios.adicionar(contato_id, 'enviado')
+    """
+
+    def __init__(self, tabela, colunas, tamanho_lote=None, connection=None):
+        self.tabela = tabela
+        self.colunas = list(colunas)
+        self.tamanho_lote = tamanho_lote or int(os.getenv('DB_LOTE_ESCRITA', 500))
+        self.total_gravado = 0
+        self._connection = connection
+        self._linhas = []
+        self._lock = threading.Lock()
+        self._sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            tabela, ', '.join(self.colunas), ', '.join(['%s'] * len(self.colunas))
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # As linhas acumuladas descrevem envios que já aconteceram, então
+        # são gravadas mesmo quando o bloco termina com exceção
+        self.flush()
+
+    def __len__(self):
+        return len(self._linhas)
+
+    def adicionar(self, *valores):
+        """Acrescenta uma linha; grava o lote automaticamente quando ele enche."""
+        if len(valores) != len(self.colunas):
+            raise ValueError(
+                f"Esperados {len(self.colunas)} valores para {self.tabela}, recebidos {len(valores)}"
+            )
+        with self._lock:
+            self._linhas.append(valores)
+            cheio = len(self._linhas) >= self.tamanho_lote
+        if cheio:
+            self.flush()
+
+    def flush(self):
+        """Grava as linhas pendentes, um commit por lote. Retorna quantas linhas foram gravadas."""
+        with self._lock:
+            linhas, self._linhas = self._linhas, []
+        if not linhas:
+            return 0
+
+        antes = self.total_gravado
+        try:
+            if self._connection is not None:
+                self._gravar(self._connection, linhas)
+            else:
+                with conexao_db() as connection:
+                    self._gravar(connection, linhas)
+        except Exception:
+            # Os lotes sem commit voltam para a frente do buffer, antes das
+            # linhas acrescentadas enquanto gravava, e o próximo flush os repete
+            with self._lock:
+                self._linhas[:0] = linhas[self.total_gravado - antes:]
+            raise
+        return len(linhas)
+
+    def _gravar(self, connection, linhas):
+        cursor = connection.cursor()
+        try:
+            for inicio in range(0, len(linhas), self.tamanho_lote):
+                lote = linhas[inicio:inicio + self.tamanho_lote]
+                cursor.executemany(self._sql, lote)
+                connection.commit()
+                self.total_gravado += len(lote)
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
@@ -0,0 +1,72 @@
+"""
+Registro das consultas SQL críticas.
+
+As rotas e serviços registram as consultas quentes junto com parâmetros de
+exemplo; a suíte `testes/test_planos_consulta.py` roda EXPLAIN em cada uma
+sobre um banco populado e falha quando uma consulta quente passa a fazer
+varredura completa ou filesort acima do limite de linhas.
+
+    QUERY_RESUMO = registrar_consulta('metricas.resumo', '''
+        SELECT ... WHERE data_evento >= %s AND data_evento < %s
+    ''', exemplo=lambda: intervalo_datas(*dias_atras(7)))
+"""
+import importlib
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# Módulos que registram consultas ao serem importados
+MODULOS_CONSULTAS = [
+    'backend.services.agendamento_service',
+    'backend.repositorios.contatos',
+    'backend.repositorios.envios',
+    'backend.repositorios.eventos',
+]
+
+Consulta = namedtuple('Consulta', ['nome', 'sql', 'exemplo', 'quente', 'permitir'])
+
+_consultas = {}
+
+
+def registrar_consulta(nome, sql, exemplo=(), quente=True, permitir=()):
+    """
+    Registra uma consulta e devolve o próprio SQL, para uso direto no módulo.
+
+    `exemplo` são os parâmetros usados no EXPLAIN (tupla ou função que a
+    retorna). Consultas com `quente=False` são apenas relatadas pela suíte.
+    `permitir` lista avisos aceitos para a consulta, como 'filesort' em
+    ordenações feitas sobre poucos grupos já agregados.
+    """
+    _consultas[nome] = Consulta(nome, sql, exemplo, quente, tuple(permitir))
+    return sql
+
+
+def consultas_registradas():
+    """Importa os módulos conhecidos e retorna as consultas registradas, por nome."""
+    for modulo in MODULOS_CONSULTAS:
+        importlib.import_module(modulo)
+    return [_consultas[nome] for nome in sorted(_consultas)]
+
+
+def parametros_exemplo(consulta):
+    return consulta.exemplo() if callable(consulta.exemplo) else tuple(consulta.exemplo)
+
+
+def intervalo_datas(inicio, fim):
+    """
+    Converte um período de datas inclusivo ('AAAA-MM-DD') no intervalo
+    semiaberto [inicio, fim + 1 dia), para filtrar colunas DATETIME com
+    `coluna >= %s AND coluna < %s` sem aplicar funções sobre a coluna.
+    """
+    if isinstance(inicio, str):
+        inicio = datetime.strptime(inicio, '%Y-%m-%d')
+    if isinstance(fim, str):
+        fim = datetime.strptime(fim, '%Y-%m-%d')
+    inicio = datetime(inicio.year, inicio.month, inicio.day)
+    fim = datetime(fim.year, fim.month, fim.day) + timedelta(days=1)
+    return inicio, fim
+
+
+def dias_atras(dias):
+    """Período (inicio, fim) que cobre os últimos `dias` dias até hoje."""
+    fim = datetime.now()
+    return fim - timedelta(days=dias), fim
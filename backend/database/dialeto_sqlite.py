@@ -0,0 +1,229 @@
+"""
+Adaptador para rodar a camada de dados sobre SQLite.
+
+Com DB_BACKEND=sqlite o pool abre conexões SQLite (arquivo em DB_SQLITE_PATH
+ou `:memory:`) que imitam a interface do mysql-connector usada pelo projeto:
+`cursor(dictionary=True)`, `%s` como marcador, `lastrowid`, `fetchmany`,
+`in_transaction`, `ping()`. O SQL escrito para o MySQL é traduzido na hora:
+
+- `%s` vira `?`;
+- `INT AUTO_INCREMENT PRIMARY KEY` vira `INTEGER PRIMARY KEY AUTOINCREMENT`;
+- colunas JSON e ENUM viram TEXT (as funções JSON do SQLite continuam disponíveis)
+  e `ON UPDATE CURRENT_TIMESTAMP` é removido;
+- `INSERT IGNORE` vira `INSERT OR IGNORE`;
+- `ON DUPLICATE KEY UPDATE c = VALUES(c)` vira `ON CONFLICT DO UPDATE SET c = excluded.c`;
+- `ALTER TABLE t ADD INDEX n (...)` vira `CREATE INDEX IF NOT EXISTS n ON t (...)`;
+- NOW(), CONCAT(), HOUR(), GET_LOCK() e RELEASE_LOCK() são registradas como funções.
+
+Serve para testes e benchmarks locais; consultas com sintaxe exclusiva do
+MySQL (ex.: GROUP_CONCAT com SEPARATOR, DATE_FORMAT) continuam exigindo MySQL.
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+
+
+def _fora_de_aspas(sql, funcao):
+    """Aplica `funcao` apenas aos trechos do SQL fora de literais entre aspas."""
+    partes = re.split(r"('(?:[^'\\]|\\.|'')*')", sql)
+    return ''.join(parte if i % 2 else funcao(parte) for i, parte in enumerate(partes))
+
+
+_TRADUCOES = [
+    (re.compile(r'\bINT(?:EGER)?\s+(?:NOT\s+NULL\s+)?AUTO_INCREMENT\s+PRIMARY\s+KEY', re.I),
+     'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'\bAUTO_INCREMENT\b', re.I), ''),
+    (re.compile(r'\bJSON\b', re.I), 'TEXT'),
+    (re.compile(r'\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP', re.I), ''),
+    (re.compile(r'\bINSERT\s+IGNORE\b', re.I), 'INSERT OR IGNORE'),
+    (re.compile(r'%s'), '?'),
+]
+
+_ENUM = re.compile(r"\bENUM\s*\((?:\s*'(?:[^']|'')*'\s*,?)*\)", re.I)
+_ON_DUPLICATE = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.I)
+_VALUES_COLUNA = re.compile(r'\bVALUES\s*\(\s*(\w+)\s*\)', re.I)
+
+_ADD_INDEX = re.compile(
+    r'^\s*ALTER\s+TABLE\s+(\w+)\s+ADD\s+(UNIQUE\s+)?INDEX\s+(\w+)\s*\(([^)]*)\)[^;]*$', re.I | re.S
+)
+
+
+def traduzir_sql(sql):
+    """Traduz um comando escrito para o MySQL para o dialeto do SQLite."""
+    indice = _ADD_INDEX.match(sql)
+    if indice:
+        tabela, unico, nome, colunas = indice.groups()
+        return f"CREATE {'UNIQUE ' if unico else ''}INDEX IF NOT EXISTS {nome} ON {tabela} ({colunas})"
+
+    # Os valores do ENUM são literais entre aspas, então a troca é feita antes de separá-los
+    sql = _ENUM.sub('TEXT', sql)
+
+    def traduzir(trecho):
+        for padrao, substituto in _TRADUCOES:
+            trecho = padrao.sub(substituto, trecho)
+        return trecho
+
+    partes = _ON_DUPLICATE.split(sql, maxsplit=1)
+    if len(partes) == 1:
+        return _fora_de_aspas(sql, traduzir)
+
+    # Em ON DUPLICATE KEY UPDATE, VALUES(coluna) é o valor que seria inserido
+    insercao, atualizacao = partes
+    atualizacao = _fora_de_aspas(atualizacao, lambda trecho: _VALUES_COLUNA.sub(r'excluded.\1', trecho))
+    return (_fora_de_aspas(insercao, traduzir) + 'ON CONFLICT DO UPDATE SET'
+            + _fora_de_aspas(atualizacao, traduzir))
+
+
+def _agora():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _concat(*valores):
+    if any(valor is None for valor in valores):
+        return None
+    return ''.join(str(valor) for valor in valores)
+
+
+def _hora(valor):
+    if valor is None:
+        return None
+    return datetime.fromisoformat(str(valor)).hour
+
+
+def _converter_data_hora(valor):
+    return datetime.fromisoformat(valor.decode())
+
+
+sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(sep=' '))
+sqlite3.register_adapter(date, lambda valor: valor.isoformat())
+sqlite3.register_converter('DATETIME', _converter_data_hora)
+sqlite3.register_converter('TIMESTAMP', _converter_data_hora)
+
+
+class CursorSQLite:
+    """Cursor com a interface do mysql-connector sobre um cursor sqlite3."""
+
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._cursor = connection._conn.cursor()
+        self._dictionary = dictionary
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def column_names(self):
+        return tuple(coluna[0] for coluna in self._cursor.description or ())
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(traduzir_sql(sql), tuple(params or ()))
+        return self
+
+    def executemany(self, sql, sequencia):
+        self._cursor.executemany(traduzir_sql(sql), [tuple(params) for params in sequencia])
+        return self
+
+    def _linha(self, linha):
+        if linha is None or not self._dictionary:
+            return linha
+        return dict(zip(self.column_names, linha))
+
+    def fetchone(self):
+        return self._linha(self._cursor.fetchone())
+
+    def fetchmany(self, tamanho=1):
+        return [self._linha(linha) for linha in self._cursor.fetchmany(tamanho)]
+
+    def fetchall(self):
+        return [self._linha(linha) for linha in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._cursor.close()
+
+
+class ConexaoSQLite:
+    """Conexão SQLite com a interface do mysql-connector usada pelo projeto."""
+
+    dialeto = 'sqlite'
+
+    def __init__(self, caminho):
+        uri = caminho.startswith('file:')
+        self._conn = sqlite3.connect(
+            caminho, uri=uri, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES
+        )
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        if not uri or 'mode=memory' not in caminho:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.create_function('NOW', 0, _agora)
+        self._conn.create_function('CONCAT', -1, _concat)
+        self._conn.create_function('HOUR', 1, _hora)
+        # O SQLite já serializa as escritas; os locks nomeados do MySQL sempre são concedidos
+        self._conn.create_function('GET_LOCK', 2, lambda nome, timeout: 1)
+        self._conn.create_function('RELEASE_LOCK', 1, lambda nome: 1)
+
+    def cursor(self, dictionary=False, buffered=None, prepared=None):
+        return CursorSQLite(self, dictionary=dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def is_connected(self):
+        return True
+
+    def ping(self, reconnect=False):
+        self._conn.execute("SELECT 1")
+
+    def close(self):
+        self._conn.close()
+
+
+_ancoras = {}
+_ancoras_lock = threading.Lock()
+
+
+def caminho_sqlite():
+    """
+    Caminho do banco SQLite (DB_SQLITE_PATH). `:memory:` vira um banco em
+    memória compartilhado entre as conexões do processo.
+    """
+    caminho = os.getenv('DB_SQLITE_PATH', ':memory:')
+    if caminho == ':memory:':
+        return 'file:base_emails_marketing?mode=memory&cache=shared'
+    return caminho
+
+
+def conectar_sqlite():
+    """Abre uma conexão com o banco SQLite configurado."""
+    caminho = caminho_sqlite()
+    if 'mode=memory' in caminho:
+        # O banco em memória deixa de existir quando a última conexão fecha;
+        # uma conexão âncora o mantém vivo enquanto o processo existir
+        with _ancoras_lock:
+            if caminho not in _ancoras:
+                _ancoras[caminho] = ConexaoSQLite(caminho)
+    return ConexaoSQLite(caminho)
+
+
+def usa_sqlite():
+    return os.getenv('DB_BACKEND', 'mysql').lower() == 'sqlite'
@@ -0,0 +1,129 @@
+"""
+Tempo e volume de cada consulta nomeada.
+
+Os repositórios (backend/repositorios) executam todo SQL através destas
+funções, identificando a consulta por um nome estável ('envios.existe',
+'segmentos.listar'...). Para cada nome são acumulados chamadas, erros, tempo
+total e máximo e linhas retornadas ou afetadas; `estatisticas_consultas()`
+lista as consultas que mais consomem tempo e aparece em GET /api/status/.
+Execuções acima de DB_CONSULTA_LENTA_MS são impressas no log.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .preparadas import executar_preparada
+
+
+class _Medicao:
+    def __init__(self):
+        self.linhas = 0
+
+
+_estatisticas = {}
+_lock = threading.Lock()
+
+
+def _registrar(nome, segundos, linhas, erro):
+    with _lock:
+        estatistica = _estatisticas.get(nome)
+        if estatistica is None:
+            estatistica = _estatisticas[nome] = {
+                'chamadas': 0, 'erros': 0, 'tempo_total': 0.0, 'tempo_max': 0.0, 'linhas': 0
+            }
+        estatistica['chamadas'] += 1
+        estatistica['erros'] += erro
+        estatistica['tempo_total'] += segundos
+        estatistica['tempo_max'] = max(estatistica['tempo_max'], segundos)
+        estatistica['linhas'] += linhas
+
+    limite_ms = float(os.getenv('DB_CONSULTA_LENTA_MS', 500))
+    if limite_ms >= 0 and segundos * 1000 > limite_ms:
+        print(f"Consulta lenta {nome}: {segundos * 1000:.1f} ms, {linhas} linha(s)")
+
+
+@contextmanager
+def medir_consulta(nome):
+    """
+    Mede o bloco como uma execução da consulta `nome`. O bloco informa
+    quantas linhas leu ou alterou em `medicao.linhas`.
+    """
+    medicao = _Medicao()
+    inicio = time.perf_counter()
+    erro = False
+    try:
+        yield medicao
+    except Exception:
+        erro = True
+        raise
+    finally:
+        _registrar(nome, time.perf_counter() - inicio, max(medicao.linhas, 0), erro)
+
+
+def executar(cursor, nome, sql, params=()):
+    """Executa um comando (INSERT/UPDATE/DELETE) e retorna o cursor."""
+    with medir_consulta(nome) as medicao:
+        cursor.execute(sql, params)
+        medicao.linhas = cursor.rowcount
+    return cursor
+
+
+def buscar_um(cursor, nome, sql, params=()):
+    """Executa uma consulta e retorna a primeira linha, ou None."""
+    with medir_consulta(nome) as medicao:
+        cursor.execute(sql, params)
+        linhas = cursor.fetchall()
+        medicao.linhas = len(linhas)
+    return linhas[0] if linhas else None
+
+
+def buscar_todos(cursor, nome, sql, params=()):
+    """Executa uma consulta e retorna todas as linhas."""
+    with medir_consulta(nome) as medicao:
+        cursor.execute(sql, params)
+        linhas = cursor.fetchall()
+        medicao.linhas = len(linhas)
+    return linhas
+
+
+def executar_preparado(connection, nome, sql, params=()):
+    """Executa `sql` como instrução preparada (ver preparadas.py) e retorna o cursor."""
+    with medir_consulta(nome) as medicao:
+        cursor = executar_preparada(connection, sql, params)
+        medicao.linhas = cursor.rowcount
+    return cursor
+
+
+def buscar_preparado(connection, nome, sql, params=()):
+    """Executa uma consulta preparada e retorna todas as linhas (tuplas)."""
+    with medir_consulta(nome) as medicao:
+        linhas = executar_preparada(connection, sql, params).fetchall()
+        medicao.linhas = len(linhas)
+    return linhas
+
+
+def estatisticas_consultas(limite=20):
+    """As `limite` consultas com maior tempo total, com médias e máximos em ms."""
+    with _lock:
+        copia = {nome: dict(estatistica) for nome, estatistica in _estatisticas.items()}
+
+    resultado = []
+    for nome, estatistica in sorted(copia.items(), key=lambda item: item[1]['tempo_total'], reverse=True):
+        chamadas = estatistica['chamadas']
+        resultado.append({
+            'nome': nome,
+            'chamadas': chamadas,
+            'erros': estatistica['erros'],
+            'tempo_total_ms': round(estatistica['tempo_total'] * 1000, 3),
+            'tempo_medio_ms': round(estatistica['tempo_total'] / chamadas * 1000, 3),
+            'tempo_max_ms': round(estatistica['tempo_max'] * 1000, 3),
+            'linhas': estatistica['linhas'],
+            'linhas_por_chamada': round(estatistica['linhas'] / chamadas, 1),
+        })
+    return resultado[:limite]
+
+
+def zerar_estatisticas_consultas():
+    with _lock:
+        _estatisticas.clear()
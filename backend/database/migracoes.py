@@ -0,0 +1,394 @@
+"""
+Migrações versionadas do schema.
+
+Cada migração tem um número de versão crescente e é aplicada uma única vez;
+as versões aplicadas ficam registradas na tabela `schema_version`. O runner
+deve ser executado no deploy, antes de subir a aplicação:
+
+    python -m backend.database.migracoes            # aplica as pendentes
+    python -m backend.database.migracoes --status   # lista aplicadas e pendentes
+    python -m backend.database.migracoes --sql      # só imprime o DDL dos índices
+
+Os índices são criados com DDL online do InnoDB (`ALGORITHM=INPLACE,
+LOCK=NONE`), que não bloqueia leituras nem escritas na tabela. Para tabelas
+muito grandes, o DDL impresso por `--sql` pode ser aplicado com
+pt-online-schema-change ou gh-ost; ao rodar o runner depois, os índices já
+existentes são apenas registrados.
+"""
+import argparse
+import os
+import sys
+
+import mysql.connector
+from mysql.connector import Error
+
+from .dialeto_sqlite import conectar_sqlite, usa_sqlite
+from .pool import _parametros_conexao
+
+# Nome do lock de sessão que impede dois deploys de migrarem ao mesmo tempo
+LOCK_MIGRACOES = 'base_emails_marketing.migracoes'
+
+
+# Índices das consultas mais frequentes: (tabela, nome do índice, colunas)
+INDICES_CONSULTAS = [
+    ('envios', 'idx_envios_created_at', ['created_at']),
+    ('envios', 'idx_envios_contato', ['contato_id']),
+    ('eventos_tracking', 'idx_eventos_data_tipo', ['data_evento', 'tipo_evento']),
+    ('metricas_envio', 'idx_metricas_envio_status', ['envio_id', 'status']),
+    ('contatos_segmentos', 'idx_contatos_segmentos_segmento', ['segmento_id', 'contato_id']),
+]
+
+# Índices dos filtros por status + data (envios enviados no período, agendamentos vencidos)
+INDICES_STATUS_DATA = [
+    ('envios', 'idx_envios_status_data', ['status', 'data_envio']),
+    ('agendamentos', 'idx_agendamentos_status_data', ['status', 'data_envio']),
+]
+
+
+def ddl_indice(tabela, nome, colunas):
+    """Monta o ALTER TABLE que cria o índice sem bloquear a tabela."""
+    return (
+        f"ALTER TABLE {tabela} ADD INDEX {nome} ({', '.join(colunas)}), "
+        f"ALGORITHM=INPLACE, LOCK=NONE"
+    )
+
+
+def _colunas_tabela(cursor, tabela):
+    if usa_sqlite():
+        cursor.execute(f"PRAGMA table_info({tabela})")
+        return {linha[1] for linha in cursor.fetchall()}
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (tabela,))
+    return {linha[0] for linha in cursor.fetchall()}
+
+
+def _indice_existe(cursor, tabela, nome):
+    if usa_sqlite():
+        cursor.execute(f"PRAGMA index_list({tabela})")
+        return any(linha[1] == nome for linha in cursor.fetchall())
+    cursor.execute("""
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        LIMIT 1
+    """, (tabela, nome))
+    return cursor.fetchone() is not None
+
+
+def criar_indice(cursor, tabela, nome, colunas):
+    """
+    Cria o índice se ele ainda não existir. Tabelas ou colunas ausentes
+    (instalações com schema antigo) são ignoradas com um aviso.
+    """
+    existentes = _colunas_tabela(cursor, tabela)
+    if not existentes:
+        print(f"  - {nome}: tabela {tabela} não existe, ignorado")
+        return
+    faltando = [c for c in colunas if c not in existentes]
+    if faltando:
+        print(f"  - {nome}: coluna(s) {', '.join(faltando)} ausente(s) em {tabela}, ignorado")
+        return
+    if _indice_existe(cursor, tabela, nome):
+        print(f"  - {nome}: já existe")
+        return
+
+    cursor.execute(ddl_indice(tabela, nome, colunas))
+    print(f"  - {nome}: criado em {tabela}({', '.join(colunas)})")
+
+
+def _schema_inicial(cursor):
+    """Tabelas do schema base (backend/database/schema.sql)."""
+    schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
+    with open(schema_path, 'r') as file:
+        sql_commands = file.read()
+
+    for command in sql_commands.split(';'):
+        command = command.strip()
+        # O banco é criado e selecionado pelo próprio runner (DB_NAME)
+        if not command or command.upper().startswith(('CREATE DATABASE', 'USE ')):
+            continue
+        cursor.execute(command)
+
+
+def _indices_consultas(cursor):
+    """Índices secundários dos filtros de envios, tracking, métricas e segmentos."""
+    for tabela, nome, colunas in INDICES_CONSULTAS:
+        criar_indice(cursor, tabela, nome, colunas)
+
+
+def _tabelas_envios(cursor):
+    """
+    Tabelas de envios, métricas e tracking usadas pelas rotas e tarefas, que o
+    schema inicial não criava. Instalações feitas pelos scripts antigos já as
+    possuem e ficam como estão. Os índices da migração 2 que foram ignorados
+    por falta das tabelas são criados aqui.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS envios (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            campanha_id INT,
+            email_id INT,
+            contato_id INT,
+            template_id INT,
+            segmento_id INT,
+            agendamento_id INT,
+            status VARCHAR(50) DEFAULT 'pendente',
+            erro TEXT,
+            data_envio DATETIME,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS metricas_envio (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            envio_id INT NOT NULL,
+            contato_id INT,
+            status VARCHAR(50) NOT NULL,
+            data_evento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            detalhes JSON,
+            FOREIGN KEY (envio_id) REFERENCES envios(id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS eventos_tracking (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            envio_id INT NOT NULL,
+            tipo_evento VARCHAR(50) NOT NULL,
+            dados_adicionais JSON,
+            data_evento DATETIME NOT NULL,
+            FOREIGN KEY (envio_id) REFERENCES envios(id)
+        )
+    """)
+    for tabela, nome, colunas in INDICES_CONSULTAS + INDICES_STATUS_DATA:
+        criar_indice(cursor, tabela, nome, colunas)
+
+
+def _colunas_integracoes(cursor):
+    """
+    Nome e status nas integrações e tipo livre (smtp, api, webhook...). O
+    código de envio e o serviço de integrações já usavam essas colunas, que o
+    schema inicial não tinha.
+    """
+    colunas = _colunas_tabela(cursor, 'integracoes')
+    if 'nome' not in colunas:
+        cursor.execute("ALTER TABLE integracoes ADD COLUMN nome VARCHAR(255)")
+    if 'status' not in colunas:
+        cursor.execute("ALTER TABLE integracoes ADD COLUMN status VARCHAR(20) NOT NULL DEFAULT 'ativo'")
+    if not usa_sqlite():
+        # No SQLite o ENUM já é TEXT
+        cursor.execute("ALTER TABLE integracoes MODIFY tipo VARCHAR(50) NOT NULL")
+
+
+def _mensagem_id_envios(cursor):
+    """Id da mensagem devolvido pelo provedor para cada destinatário de um envio em lote."""
+    if 'mensagem_id' not in _colunas_tabela(cursor, 'envios'):
+        cursor.execute("ALTER TABLE envios ADD COLUMN mensagem_id VARCHAR(255)")
+
+
+def _jobs_envio(cursor):
+    """
+    Jobs de disparo de campanhas em segundo plano, com o progresso gravado a
+    cada lote. `ultimo_contato_id` é o ponto de onde o próximo lote continua.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs_envio (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            envio_id INT,
+            template_id INT NOT NULL,
+            segmento_id INT NOT NULL,
+            assunto VARCHAR(255) NOT NULL,
+            dados_padrao JSON,
+            status VARCHAR(20) NOT NULL DEFAULT 'na_fila',
+            total INT NOT NULL DEFAULT 0,
+            enviados INT NOT NULL DEFAULT 0,
+            falhas INT NOT NULL DEFAULT 0,
+            ultimo_contato_id INT NOT NULL DEFAULT 0,
+            erro TEXT,
+            iniciado_em DATETIME,
+            concluido_em DATETIME,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (envio_id) REFERENCES envios(id)
+        )
+    """)
+
+
+def _jobs_destinatarios(cursor):
+    """
+    Destinatários de cada job de campanha, um por contato (chave primária
+    job_id + contato_id). A linha é reservada antes de o email ir ao
+    transporte, então um lote repetido após queda do worker ou nova tentativa
+    da tarefa não envia de novo a quem já foi reservado.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs_destinatarios (
+            job_id INT NOT NULL,
+            contato_id INT NOT NULL,
+            reserva CHAR(16) NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'reservado',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (job_id, contato_id),
+            FOREIGN KEY (job_id) REFERENCES jobs_envio(id)
+        )
+    """)
+
+
+def _audiencias(cursor):
+    """
+    Audiência com vários segmentos ({'incluir': [...], 'excluir': [...]}) em
+    campanhas, agendamentos e jobs de envio. Vazia, vale só o segmento_id.
+    """
+    for tabela in ('campanhas', 'agendamentos', 'jobs_envio'):
+        if 'audiencia' not in _colunas_tabela(cursor, tabela):
+            cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN audiencia JSON")
+
+
+def _incertos_jobs(cursor):
+    """
+    Destinatários de lotes interrompidos depois da reserva, sem saber se o
+    email saiu: contados à parte no job, em vez de ficarem 'reservado'.
+    """
+    if 'incertos' not in _colunas_tabela(cursor, 'jobs_envio'):
+        cursor.execute("ALTER TABLE jobs_envio ADD COLUMN incertos INT NOT NULL DEFAULT 0")
+
+
+# Lista ordenada de migrações: (versão, descrição, função que recebe o cursor).
+# Migrações já aplicadas nunca devem ser alteradas; mudanças novas entram no fim.
+MIGRACOES = [
+    (1, 'schema inicial', _schema_inicial),
+    (2, 'indices das consultas de envios, tracking, metricas e segmentos', _indices_consultas),
+    (3, 'tabelas de envios, metricas e tracking; indices de status e data', _tabelas_envios),
+    (4, 'nome, status e tipo livre nas integracoes', _colunas_integracoes),
+    (5, 'id da mensagem no provedor em envios', _mensagem_id_envios),
+    (6, 'jobs de disparo de campanhas', _jobs_envio),
+    (7, 'destinatarios reservados por job de campanha', _jobs_destinatarios),
+    (8, 'audiencia com varios segmentos em campanhas, agendamentos e jobs', _audiencias),
+    (9, 'destinatarios de resultado incerto nos jobs de campanha', _incertos_jobs),
+]
+
+
+def _conectar_servidor():
+    if usa_sqlite():
+        return conectar_sqlite()
+    parametros = _parametros_conexao()
+    parametros.pop('database')
+    return mysql.connector.connect(**parametros)
+
+
+def _preparar(cursor):
+    if not usa_sqlite():
+        database = _parametros_conexao()['database']
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+        cursor.execute(f"USE `{database}`")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            versao INT PRIMARY KEY,
+            descricao VARCHAR(255) NOT NULL,
+            aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def versoes_aplicadas(cursor):
+    cursor.execute("SELECT versao FROM schema_version")
+    return {linha[0] for linha in cursor.fetchall()}
+
+
+def aplicar_migracoes(alvo=None):
+    """
+    Aplica, em ordem, as migrações pendentes até a versão `alvo` (ou todas).
+    Retorna a lista de versões aplicadas nesta execução.
+    """
+    connection = _conectar_servidor()
+    cursor = connection.cursor()
+    aplicadas_agora = []
+    try:
+        _preparar(cursor)
+
+        cursor.execute("SELECT GET_LOCK(%s, 60)", (LOCK_MIGRACOES,))
+        if cursor.fetchone()[0] != 1:
+            raise Error("Outra execução de migrações está em andamento")
+
+        try:
+            aplicadas = versoes_aplicadas(cursor)
+            for versao, descricao, migrar in MIGRACOES:
+                if versao in aplicadas or (alvo is not None and versao > alvo):
+                    continue
+                print(f"Aplicando migração {versao}: {descricao}")
+                migrar(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_version (versao, descricao) VALUES (%s, %s)",
+                    (versao, descricao)
+                )
+                connection.commit()
+                aplicadas_agora.append(versao)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_MIGRACOES,))
+            cursor.fetchone()
+
+        if aplicadas_agora:
+            print(f"Migrações aplicadas: {', '.join(map(str, aplicadas_agora))}")
+        else:
+            print("Schema já está atualizado")
+        return aplicadas_agora
+
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def status_migracoes():
+    """Retorna [(versão, descrição, aplicada)] para todas as migrações conhecidas."""
+    connection = _conectar_servidor()
+    cursor = connection.cursor()
+    try:
+        _preparar(cursor)
+        aplicadas = versoes_aplicadas(cursor)
+        return [(versao, descricao, versao in aplicadas) for versao, descricao, _ in MIGRACOES]
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def imprimir_ddl_indices():
+    """Imprime o DDL dos índices, no formato direto e no de pt-online-schema-change."""
+    indices = INDICES_CONSULTAS + INDICES_STATUS_DATA
+    for tabela, nome, colunas in indices:
+        print(f"{ddl_indice(tabela, nome, colunas)};")
+    print()
+    print("-- pt-online-schema-change:")
+    for tabela, nome, colunas in indices:
+        print(f"-- pt-online-schema-change --alter \"ADD INDEX {nome} ({', '.join(colunas)})\" "
+              f"D=$DB_NAME,t={tabela} --execute")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrações versionadas do banco de dados")
+    parser.add_argument('--status', action='store_true', help="lista as migrações aplicadas e pendentes")
+    parser.add_argument('--sql', action='store_true',
+                        help="imprime o DDL dos índices para aplicação externa (pt-osc/gh-ost)")
+    parser.add_argument('--ate', type=int, help="aplica as migrações somente até esta versão")
+    args = parser.parse_args(argv)
+
+    if args.sql:
+        imprimir_ddl_indices()
+        return 0
+
+    try:
+        if args.status:
+            for versao, descricao, aplicada in status_migracoes():
+                print(f"{versao:>4}  {'aplicada' if aplicada else 'pendente':<9} {descricao}")
+        else:
+            aplicar_migracoes(args.ate)
+        return 0
+    except Error as e:
+        print(f"Erro ao aplicar migrações: {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+    sys.exit(main())
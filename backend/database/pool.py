@@ -0,0 +1,302 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import Error
+
+from .dialeto_sqlite import conectar_sqlite, usa_sqlite
+
+
+class PoolEsgotadoError(Error):
+    """Lançado quando nenhuma conexão fica livre dentro do tempo limite do pool."""
+
+
+def _parametros_conexao():
+    """Retorna os parâmetros de conexão com o MySQL a partir das variáveis de ambiente."""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', 3306)),
+        'user': os.getenv('DB_USER', 'root'),
+        'password': os.getenv('DB_PASSWORD', '71208794'),
+        'database': os.getenv('DB_NAME', 'base_emails_marketing'),
+    }
+
+
+def _conectar_mysql():
+    return mysql.connector.connect(**_parametros_conexao())
+
+
+def _mysql_vivo(connection):
+    try:
+        connection.ping(reconnect=False)
+        return True
+    except Exception:
+        return False
+
+
+class ConexaoPool:
+    """
+    Conexão emprestada do pool. Repassa tudo para a conexão real e,
+    ao ser fechada, devolve a conexão ao pool em vez de encerrá-la.
+    """
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, nome):
+        if self._connection is None:
+            raise Error("Conexão já devolvida ao pool")
+        return getattr(self._connection, nome)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def conexao_real(self):
+        """Retorna a conexão física emprestada."""
+        if self._connection is None:
+            raise Error("Conexão já devolvida ao pool")
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.devolver(connection)
+
+    def descartar(self):
+        """Encerra a conexão em vez de devolvê-la, para quando ela ficou em estado inválido."""
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.descartar(connection)
+
+    def __del__(self):
+        # Garante a devolução mesmo quando o chamador esquece de fechar
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class PoolConexoes:
+    """
+    Pool de conexões com tamanho fixo, espera limitada por uma conexão livre,
+    verificação de saúde (pre-ping) e estatísticas de tempo de espera.
+    """
+
+    def __init__(self, fabrica=_conectar_mysql, verificar=_mysql_vivo, tamanho=10,
+                 timeout=30, pre_ping=True, intervalo_ping=5, nome='primario'):
+        self.nome = nome
+        self.tamanho = tamanho
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.intervalo_ping = intervalo_ping
+        self._fabrica = fabrica
+        self._verificar = verificar
+        self._iniciar()
+
+    def _iniciar(self):
+        self._pid = os.getpid()
+        self._livres = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(self.tamanho)
+        self._lock = threading.Lock()
+        self._criadas = 0
+        self._em_uso = 0
+        self._emprestimos = 0
+        self._timeouts = 0
+        self._descartadas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self._esperas = deque(maxlen=1000)
+
+    def _verificar_processo(self):
+        # Após um fork (Celery prefork, gunicorn) as conexões herdadas não podem ser reutilizadas
+        if self._pid != os.getpid():
+            self._iniciar()
+
+    def obter(self):
+        """Empresta uma conexão do pool, aguardando até `timeout` segundos por uma vaga."""
+        self._verificar_processo()
+
+        inicio = time.perf_counter()
+        if not self._vagas.acquire(timeout=self.timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise PoolEsgotadoError(
+                f"Nenhuma conexão livre no pool '{self.nome}' após {self.timeout}s"
+            )
+        espera = time.perf_counter() - inicio
+
+        try:
+            connection = self._retirar_livre()
+            if connection is None:
+                connection = self._fabrica()
+                with self._lock:
+                    self._criadas += 1
+        except Exception:
+            self._vagas.release()
+            raise
+
+        with self._lock:
+            self._em_uso += 1
+            self._emprestimos += 1
+            self._espera_total += espera
+            self._espera_max = max(self._espera_max, espera)
+            self._esperas.append(espera)
+
+        return ConexaoPool(self, connection)
+
+    def _retirar_livre(self):
+        while True:
+            try:
+                connection, devolvida_em = self._livres.get_nowait()
+            except queue.Empty:
+                return None
+
+            ociosa = time.monotonic() - devolvida_em
+            if not self.pre_ping or ociosa < self.intervalo_ping or self._verificar(connection):
+                return connection
+
+            self._descartar(connection)
+
+    def _descartar(self, connection):
+        with self._lock:
+            self._criadas -= 1
+            self._descartadas += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def devolver(self, connection):
+        """Recebe de volta uma conexão emprestada, desfazendo transações não confirmadas."""
+        if self._pid != os.getpid():
+            return
+
+        with self._lock:
+            self._em_uso -= 1
+
+        try:
+            if getattr(connection, 'in_transaction', False):
+                connection.rollback()
+            self._livres.put((connection, time.monotonic()))
+        except Exception:
+            self._descartar(connection)
+        finally:
+            self._vagas.release()
+
+    def descartar(self, connection):
+        """Encerra uma conexão emprestada sem devolvê-la, liberando a vaga no pool."""
+        if self._pid != os.getpid():
+            return
+
+        with self._lock:
+            self._em_uso -= 1
+        try:
+            self._descartar(connection)
+        finally:
+            self._vagas.release()
+
+    def estatisticas(self):
+        """Retorna o estado do pool e as estatísticas de espera por conexão (em ms)."""
+        with self._lock:
+            esperas = sorted(self._esperas)
+            emprestimos = self._emprestimos
+
+            def percentil(p):
+                if not esperas:
+                    return 0.0
+                return round(esperas[min(len(esperas) - 1, int(len(esperas) * p))] * 1000, 3)
+
+            return {
+                'nome': self.nome,
+                'tamanho': self.tamanho,
+                'criadas': self._criadas,
+                'em_uso': self._em_uso,
+                'livres': self._livres.qsize(),
+                'emprestimos': emprestimos,
+                'timeouts': self._timeouts,
+                'descartadas': self._descartadas,
+                'espera_media_ms': round(self._espera_total / emprestimos * 1000, 3) if emprestimos else 0.0,
+                'espera_max_ms': round(self._espera_max * 1000, 3),
+                'espera_p95_ms': percentil(0.95),
+                'espera_p99_ms': percentil(0.99),
+            }
+
+    def fechar(self):
+        """Encerra todas as conexões livres do pool."""
+        while True:
+            try:
+                connection, _ = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(connection)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obter_pool():
+    """
+    Retorna o pool de conexões do processo, criando-o na primeira chamada.
+    Com DB_BACKEND=sqlite as conexões são abertas pelo adaptador SQLite.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexoes(
+                    fabrica=conectar_sqlite if usa_sqlite() else _conectar_mysql,
+                    tamanho=int(os.getenv('DB_POOL_SIZE', 10)),
+                    timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+                    pre_ping=os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true',
+                    intervalo_ping=float(os.getenv('DB_POOL_PING_INTERVALO', 5)),
+                )
+    return _pool
+
+
+def estatisticas_pool():
+    """Retorna as estatísticas do pool de conexões do processo."""
+    return obter_pool().estatisticas()
+
+
+@contextmanager
+def conexao_db():
+    """
+    Empresta uma conexão do pool durante o bloco `with` e a devolve ao final.
+
+        with conexao_db() as connection:
+            ...
+    """
+    connection = obter_pool().obter()
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+@contextmanager
+def cursor_db(dictionary=False, commit=False):
+    """
+    Abre um cursor sobre uma conexão do pool. Com `commit=True` a transação é
+    confirmada ao final do bloco, ou desfeita se ocorrer uma exceção.
+    """
+    with conexao_db() as connection:
+        cursor = connection.cursor(dictionary=dictionary)
+        try:
+            yield cursor
+            if commit:
+                connection.commit()
+        except Exception:
+            if commit:
+                connection.rollback()
+            raise
+        finally:
+            cursor.close()
@@ -0,0 +1,111 @@
+"""
+Instruções preparadas no servidor para as consultas mais frequentes.
+
+Um cursor preparado do mysql-connector (`cursor(prepared=True)`) mantém uma
+única instrução preparada: executar outro SQL no mesmo cursor descarta a
+anterior. Por isso cada conexão guarda um cursor preparado por SQL, e as
+execuções seguintes enviam apenas os parâmetros, sem nova análise do texto.
+O cache vive enquanto a conexão física existir; as conexões do pool são
+reaproveitadas, então o preparo acontece uma vez por conexão e por consulta.
+
+    executar_preparada(connection, repo_eventos.SQL_INSERIR, (envio_id, 'abertura', dados))
+    linhas = consultar_preparada(connection, "SELECT id FROM envios WHERE id = %s", (envio_id,))
+
+No SQLite os cursores comuns são reaproveitados; o próprio sqlite3 mantém o
+cache de instruções compiladas.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from .pool import ConexaoPool
+
+
+class CachePreparadas:
+    """Cursores preparados de uma conexão, por SQL, com descarte do menos usado."""
+
+    def __init__(self, connection, maximo):
+        self._connection = connection
+        self.maximo = maximo
+        self._cursores = OrderedDict()
+
+    def obter(self, sql):
+        cursor = self._cursores.get(sql)
+        if cursor is not None:
+            self._cursores.move_to_end(sql)
+            _contar('reusos')
+            return cursor
+
+        cursor = self._connection.cursor(prepared=True)
+        self._cursores[sql] = cursor
+        _contar('preparos')
+        if len(self._cursores) > self.maximo:
+            _, antigo = self._cursores.popitem(last=False)
+            self._fechar(antigo)
+        return cursor
+
+    def remover(self, sql):
+        cursor = self._cursores.pop(sql, None)
+        if cursor is not None:
+            self._fechar(cursor)
+
+    def _fechar(self, cursor):
+        # Fechar o cursor libera a instrução no servidor (COM_STMT_CLOSE)
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+    def __len__(self):
+        return len(self._cursores)
+
+
+_lock = threading.Lock()
+_contadores = {'preparos': 0, 'reusos': 0, 'falhas': 0}
+
+
+def _contar(nome):
+    with _lock:
+        _contadores[nome] += 1
+
+
+def cache_preparadas(connection):
+    """Retorna o cache de instruções preparadas da conexão física por trás de `connection`."""
+    if isinstance(connection, ConexaoPool):
+        connection = connection.conexao_real()
+    # Guardado na própria conexão: é descartado junto com ela
+    cache = getattr(connection, '_cache_preparadas', None)
+    if cache is None:
+        cache = CachePreparadas(connection, int(os.getenv('DB_PREPARADAS_MAX', 32)))
+        connection._cache_preparadas = cache
+    return cache
+
+
+def executar_preparada(connection, sql, params=()):
+    """
+    Executa `sql` como instrução preparada na conexão e retorna o cursor
+    (para `lastrowid`/`rowcount`). Se a execução falhar, a instrução sai do
+    cache e o erro é repassado.
+    """
+    cache = cache_preparadas(connection)
+    cursor = cache.obter(sql)
+    try:
+        cursor.execute(sql, tuple(params))
+    except Exception:
+        _contar('falhas')
+        cache.remover(sql)
+        raise
+    return cursor
+
+
+def consultar_preparada(connection, sql, params=()):
+    """Executa uma consulta preparada e retorna todas as linhas (tuplas)."""
+    cursor = executar_preparada(connection, sql, params)
+    # O resultado precisa ser lido por completo antes do próximo comando na conexão
+    return cursor.fetchall()
+
+
+def estatisticas_preparadas():
+    """Quantas instruções foram preparadas e quantas execuções reaproveitaram um preparo."""
+    with _lock:
+        return dict(_contadores)
@@ -0,0 +1,92 @@
+import os
+
+from .pool import obter_pool
+from .replicas import obter_roteador
+
+
+def iterar_linhas(cursor, tamanho_lote=None):
+    """Gera as linhas de um cursor lendo `tamanho_lote` por vez com fetchmany."""
+    tamanho_lote = tamanho_lote or int(os.getenv('DB_LOTE_LEITURA', 1000))
+    while True:
+        linhas = cursor.fetchmany(tamanho_lote)
+        if not linhas:
+            break
+        yield from linhas
+
+
+class LinhasEmFluxo:
+    """
+    Resultado de uma consulta lido sob demanda de um cursor sem buffer.
+
+    O MySQL envia as linhas à medida que o cliente as consome, então a
+    memória usada não depende do tamanho do resultado. Enquanto o resultado
+    não é lido até o fim a conexão fica ocupada; por isso cada fluxo usa uma
+    conexão própria do pool, devolvida ao final da leitura. Se a leitura for
+    interrompida, a conexão é descartada em vez de voltar ao pool com linhas
+    pendentes.
+    """
+
+    def __init__(self, connection, cursor, tamanho_lote=None):
+        self._connection = connection
+        self._cursor = cursor
+        self._tamanho_lote = tamanho_lote
+
+    def __iter__(self):
+        if self._cursor is None:
+            return
+        yield from iterar_linhas(self._cursor, self._tamanho_lote)
+        self._encerrar(concluido=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._encerrar(concluido=False)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def _encerrar(self, concluido):
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        cursor, self._cursor = self._cursor, None
+        if concluido:
+            cursor.close()
+            connection.close()
+        else:
+            connection.descartar()
+
+
+def consultar_em_fluxo(query, params=(), dictionary=True, tamanho_lote=None, somente_leitura=False):
+    """
+    Executa a consulta numa conexão dedicada e devolve um LinhasEmFluxo.
+
+    Erros na execução são lançados imediatamente; a leitura das linhas só
+    acontece ao iterar o resultado. Com `somente_leitura=True` a consulta
+    pode ser atendida por uma réplica:
+
+        for linha in consultar_em_fluxo("SELECT ...", params):
+            ...
+    """
+    connection = obter_roteador().obter() if somente_leitura else obter_pool().obter()
+    try:
+        cursor = connection.cursor(dictionary=dictionary, buffered=False)
+        if getattr(connection, 'dialeto', 'mysql') == 'mysql':
+            # Evita que o servidor aborte o envio quando o consumidor (ex.: um
+            # download HTTP) demora a ler as linhas
+            cursor.execute(
+                "SET SESSION net_write_timeout = %s",
+                (int(os.getenv('DB_STREAM_NET_WRITE_TIMEOUT', 600)),)
+            )
+        cursor.execute(query, params)
+    except Exception:
+        connection.descartar()
+        raise
+    return LinhasEmFluxo(connection, cursor, tamanho_lote)
@@ -0,0 +1,18 @@
+"""
+Acesso a dados por agregado: contatos, segmentos, templates, envios,
+eventos de tracking, integrações e jobs de envio.
+
+Os serviços, as tarefas e as rotas de segmentos, integrações, tracking e
+métricas, além da leitura e remoção de contatos e templates, chamam as
+funções do repositório correspondente, que nomeiam e medem cada consulta
+(backend/database/instrumentacao.py). As demais rotas de contatos,
+templates, emails, campanhas e envios ainda escrevem o próprio SQL; ao
+passarem para cá, usam o mesmo padrão:
+
+    from backend.repositorios import segmentos as repo_segmentos
+
+    segmento = repo_segmentos.buscar(segmento_id)
+
+Toda função aceita `connection=` para participar de uma transação do
+chamador, que então faz o commit; sem ela, usa uma conexão própria do pool.
+"""
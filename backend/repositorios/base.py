@@ -0,0 +1,36 @@
+from contextlib import contextmanager
+
+from backend.database.pool import obter_pool
+from backend.database.replicas import obter_roteador
+
+
+@contextmanager
+def abrir_conexao(connection=None, somente_leitura=False, commit=False):
+    """
+    Usa `connection` quando fornecida (a transação é do chamador); senão
+    empresta uma conexão do pool, ou de uma réplica com `somente_leitura`,
+    e com `commit=True` confirma a transação ao final do bloco.
+    """
+    if connection is not None:
+        yield connection
+        return
+
+    connection = obter_roteador().obter() if somente_leitura else obter_pool().obter()
+    try:
+        yield connection
+        if commit:
+            connection.commit()
+    finally:
+        # Uma transação não confirmada é desfeita pelo pool na devolução
+        connection.close()
+
+
+@contextmanager
+def abrir_cursor(connection=None, dictionary=True, somente_leitura=False, commit=False):
+    """Cursor sobre a conexão de `abrir_conexao`, fechado ao final do bloco."""
+    with abrir_conexao(connection, somente_leitura, commit) as conexao:
+        cursor = conexao.cursor(dictionary=dictionary)
+        try:
+            yield cursor
+        finally:
+            cursor.close()
@@ -0,0 +1,139 @@
+"""Contatos e o filtro de contatos pelos critérios de um segmento."""
+from backend.database.consultas import registrar_consulta
+from backend.database.instrumentacao import buscar_todos, buscar_um, executar
+from .base import abrir_cursor
+
+# Critérios comparados por igualdade e por trecho ('%valor%'). A collation
+# das colunas já ignora maiúsculas/minúsculas.
+CRITERIOS_EXATOS = ['id', 'status']
+CRITERIOS_PARCIAIS = ['email', 'nome', 'cargo', 'empresa', 'telefone', 'grupo']
+
+# Forma típica do filtro por critérios. Buscas por trecho ('%valor%') não
+# usam índice; a consulta é relatada pela suíte de planos, mas não barrada.
+registrar_consulta('contatos.por_criterios', """
+    SELECT * FROM contatos c WHERE c.status = %s AND c.nome LIKE %s
+""", exemplo=('ativo', '%silva%'), quente=False)
+
+# Páginas por id de contato, seguindo o índice (segmento_id, contato_id)
+QUERY_ATIVOS_DO_SEGMENTO = registrar_consulta('contatos.ativos_do_segmento', """
+    SELECT c.* FROM contatos_segmentos cs
+    JOIN contatos c ON c.id = cs.contato_id
+    WHERE cs.segmento_id = %s AND cs.contato_id > %s AND c.status = 'ativo'
+    ORDER BY cs.contato_id
+    LIMIT %s
+""", exemplo=(1, 0, 500))
+
+QUERY_CONTAR_ATIVOS_DO_SEGMENTO = registrar_consulta('contatos.contar_ativos_do_segmento', """
+    SELECT COUNT(*) as total FROM contatos_segmentos cs
+    JOIN contatos c ON c.id = cs.contato_id
+    WHERE cs.segmento_id = %s AND c.status = 'ativo'
+""", exemplo=(1,))
+
+
+def _filtro_audiencia(total_incluidos, total_excluidos):
+    """
+    Condições dos contatos ativos de uma audiência com id maior que um dado
+    id: associados a algum dos segmentos incluídos e a nenhum dos excluídos.
+    O IN sobre contatos_segmentos é uma semijunção, então um contato em
+    vários segmentos incluídos aparece uma vez. Parâmetros: ids incluídos,
+    id de partida, ids excluídos.
+    """
+    filtro = f"""
+    WHERE c.id IN (
+        SELECT cs.contato_id FROM contatos_segmentos cs
+        WHERE cs.segmento_id IN ({', '.join(['%s'] * total_incluidos)}) AND cs.contato_id > %s
+    ) AND c.status = 'ativo'"""
+    if total_excluidos:
+        filtro += f"""
+    AND NOT EXISTS (
+        SELECT 1 FROM contatos_segmentos cx
+        WHERE cx.segmento_id IN ({', '.join(['%s'] * total_excluidos)}) AND cx.contato_id = c.id
+    )"""
+    return filtro
+
+
+registrar_consulta('contatos.ativos_da_audiencia', """
+    SELECT c.* FROM contatos c""" + _filtro_audiencia(2, 1) + """
+    ORDER BY c.id
+    LIMIT %s
+""", exemplo=(1, 2, 0, 3, 500))
+
+
+def condicoes_criterios(criterios, alias='c'):
+    """
+    Converte os critérios de um segmento ({'status': 'ativo', 'tags': [...]})
+    em condições SQL sobre a tabela de contatos `alias`. Campos desconhecidos
+    são ignorados. Retorna (condicoes, params).
+    """
+    condicoes = []
+    params = []
+    for campo, valor in (criterios or {}).items():
+        if campo in CRITERIOS_EXATOS:
+            condicoes.append(f'{alias}.{campo} = %s')
+            params.append(valor)
+        elif campo in CRITERIOS_PARCIAIS:
+            condicoes.append(f'{alias}.{campo} LIKE %s')
+            params.append(f'%{valor}%')
+        elif campo == 'tags':
+            for tag in (valor if isinstance(valor, list) else [valor]):
+                condicoes.append(f'{alias}.tags LIKE %s')
+                params.append(f'%{tag}%')
+    return condicoes, params
+
+
+def buscar(contato_id, connection=None):
+    with abrir_cursor(connection) as cursor:
+        return buscar_um(cursor, 'contatos.buscar', "SELECT * FROM contatos WHERE id = %s", (contato_id,))
+
+
+def remover(contato_id, connection=None):
+    """Remove o contato e retorna quantas linhas foram apagadas (0 se não existia)."""
+    with abrir_cursor(connection, commit=True) as cursor:
+        return executar(cursor, 'contatos.remover', "DELETE FROM contatos WHERE id = %s", (contato_id,)).rowcount
+
+
+def ativos_do_segmento(segmento_id, apos_id=0, limite=500, connection=None):
+    """Até `limite` contatos ativos do segmento com id maior que `apos_id`, em ordem de id."""
+    with abrir_cursor(connection) as cursor:
+        return buscar_todos(
+            cursor, 'contatos.ativos_do_segmento', QUERY_ATIVOS_DO_SEGMENTO, (segmento_id, apos_id, limite)
+        )
+
+
+def contar_ativos_do_segmento(segmento_id, connection=None):
+    with abrir_cursor(connection) as cursor:
+        return buscar_um(
+            cursor, 'contatos.contar_ativos_do_segmento', QUERY_CONTAR_ATIVOS_DO_SEGMENTO, (segmento_id,)
+        )['total']
+
+
+def _audiencia_simples(audiencia):
+    return len(audiencia['incluir']) == 1 and not audiencia['excluir']
+
+
+def _params_audiencia(audiencia, apos_id):
+    return list(audiencia['incluir']) + [apos_id] + list(audiencia['excluir'])
+
+
+def ativos_da_audiencia(audiencia, apos_id=0, limite=500, connection=None):
+    """
+    Até `limite` contatos ativos da audiência ({'incluir': [...], 'excluir':
+    [...]}) com id maior que `apos_id`, em ordem de id e sem repetição.
+    """
+    if _audiencia_simples(audiencia):
+        return ativos_do_segmento(audiencia['incluir'][0], apos_id, limite, connection)
+    query = ('SELECT c.* FROM contatos c' + _filtro_audiencia(len(audiencia['incluir']), len(audiencia['excluir']))
+             + ' ORDER BY c.id LIMIT %s')
+    with abrir_cursor(connection) as cursor:
+        return buscar_todos(
+            cursor, 'contatos.ativos_da_audiencia', query, _params_audiencia(audiencia, apos_id) + [limite]
+        )
+
+
+def contar_ativos_da_audiencia(audiencia, connection=None):
+    if _audiencia_simples(audiencia):
+        return contar_ativos_do_segmento(audiencia['incluir'][0], connection)
+    query = ('SELECT COUNT(*) as total FROM contatos c'
+             + _filtro_audiencia(len(audiencia['incluir']), len(audiencia['excluir'])))
+    with abrir_cursor(connection) as cursor:
+        return buscar_um(cursor, 'contatos.contar_ativos_da_audiencia', query, _params_audiencia(audiencia, 0))['total']
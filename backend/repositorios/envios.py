@@ -0,0 +1,162 @@
+"""Envios e suas métricas de entrega (tabelas envios e metricas_envio)."""
+import json
+
+from backend.database.consultas import registrar_consulta, dias_atras
+from backend.database.instrumentacao import (
+    buscar_preparado, buscar_todos, buscar_um, executar, executar_preparado, medir_consulta
+)
+from backend.database.streaming import consultar_em_fluxo
+from .base import abrir_conexao, abrir_cursor
+
+# Executadas a cada abertura, clique, envio e métrica, como instruções preparadas
+SQL_EXISTE = registrar_consulta('envios.existe', "SELECT id FROM envios WHERE id = %s", exemplo=(1,))
+SQL_INSERIR = """
+    INSERT INTO envios (contato_id, template_id, segmento_id, status, erro, data_envio)
+    VALUES (%s, %s, %s, %s, %s, NOW())
+"""
+SQL_INSERIR_METRICA = "INSERT INTO metricas_envio (envio_id, contato_id, status, detalhes) VALUES (%s, %s, %s, %s)"
+
+QUERY_METRICAS_PERIODO = registrar_consulta('envios.metricas_periodo', """
+    SELECT
+        COUNT(DISTINCT e.id) as total_envios,
+        COUNT(DISTINCT CASE WHEN e.status = 'enviado' THEN e.id END) as envios_sucesso,
+        COUNT(DISTINCT CASE WHEN e.status = 'erro' THEN e.id END) as envios_erro,
+        COUNT(DISTINCT CASE WHEN m.status = 'entregue' THEN m.envio_id END) as total_entregues,
+        COUNT(DISTINCT CASE WHEN m.status = 'aberto' THEN m.envio_id END) as total_abertos,
+        COUNT(DISTINCT CASE WHEN m.status = 'clicado' THEN m.envio_id END) as total_clicados,
+        COUNT(DISTINCT CASE WHEN m.status = 'respondido' THEN m.envio_id END) as total_respondidos
+    FROM envios e
+    LEFT JOIN metricas_envio m ON e.id = m.envio_id
+    WHERE e.created_at BETWEEN %s AND %s
+""", exemplo=lambda: dias_atras(7))
+
+QUERY_METRICAS_SEGMENTOS = registrar_consulta('envios.metricas_segmentos', """
+    SELECT
+        s.id as segmento_id,
+        s.nome as segmento_nome,
+        COUNT(DISTINCT e.id) as total_envios,
+        COUNT(DISTINCT CASE WHEN e.status = 'enviado' THEN e.id END) as envios_sucesso,
+        COUNT(DISTINCT e.contato_id) as total_contatos,
+        COUNT(DISTINCT CASE WHEN m.status = 'entregue' THEN m.envio_id END) as entregues,
+        COUNT(DISTINCT CASE WHEN m.status = 'aberto' THEN m.envio_id END) as abertos,
+        COUNT(DISTINCT CASE WHEN m.status = 'clicado' THEN m.envio_id END) as clicados,
+        COUNT(DISTINCT CASE WHEN m.status = 'respondido' THEN m.envio_id END) as respondidos
+    FROM segmentos s
+    JOIN envios e ON s.id = e.segmento_id
+    LEFT JOIN metricas_envio m ON e.id = m.envio_id
+    WHERE e.created_at >= %s
+    GROUP BY s.id, s.nome
+""", exemplo=lambda: dias_atras(30)[:1])
+
+QUERY_METRICAS_CONTATO = registrar_consulta('envios.metricas_contato', """
+    SELECT
+        c.nome, c.email,
+        COUNT(DISTINCT e.id) as total_recebidos,
+        COUNT(DISTINCT CASE WHEN m.status = 'aberto' THEN m.envio_id END) as total_abertos,
+        COUNT(DISTINCT CASE WHEN m.status = 'clicado' THEN m.envio_id END) as total_clicados,
+        COUNT(DISTINCT CASE WHEN m.status = 'respondido' THEN m.envio_id END) as total_respondidos
+    FROM contatos c
+    LEFT JOIN envios e ON c.id = e.contato_id
+    LEFT JOIN metricas_envio m ON e.id = m.envio_id
+    WHERE c.id = %s
+    GROUP BY c.id, c.nome, c.email
+""", exemplo=(1,))
+
+QUERY_HISTORICO_CONTATO = registrar_consulta('envios.historico_contato', """
+    SELECT
+        e.id as envio_id,
+        e.created_at as data_envio,
+        t.nome as template,
+        s.nome as segmento,
+        m.status,
+        m.data_evento,
+        m.detalhes
+    FROM envios e
+    LEFT JOIN templates t ON e.template_id = t.id
+    LEFT JOIN segmentos s ON e.segmento_id = s.id
+    LEFT JOIN metricas_envio m ON e.id = m.envio_id
+    WHERE e.contato_id = %s
+    ORDER BY e.created_at DESC, m.data_evento DESC
+""", exemplo=(1,))
+
+QUERY_RELATORIO = registrar_consulta('envios.relatorio', """
+    SELECT 
+        e.created_at as data_envio,
+        c.nome as contato,
+        c.email,
+        t.nome as template,
+        s.nome as segmento,
+        e.status as status_envio,
+        GROUP_CONCAT(
+            CONCAT(m.status, ':', DATE_FORMAT(m.data_evento, '%Y-%m-%d %T'))
+            ORDER BY m.data_evento
+            SEPARATOR '|'
+        ) as eventos
+    FROM envios e
+    JOIN contatos c ON e.contato_id = c.id
+    JOIN templates t ON e.template_id = t.id
+    JOIN segmentos s ON e.segmento_id = s.id
+    LEFT JOIN metricas_envio m ON e.id = m.envio_id
+    WHERE e.created_at BETWEEN %s AND %s
+    GROUP BY e.id, e.created_at, c.nome, c.email, t.nome, s.nome, e.status
+    ORDER BY e.created_at DESC
+""", exemplo=lambda: dias_atras(7))
+
+
+def existe(envio_id, connection=None):
+    with abrir_conexao(connection) as conexao:
+        return bool(buscar_preparado(conexao, 'envios.existe', SQL_EXISTE, (envio_id,)))
+
+
+def inserir(contato_id, template_id, segmento_id, status='enviado', erro=None, connection=None):
+    """Registra um envio com data_envio = agora e retorna o id."""
+    with abrir_conexao(connection, commit=True) as conexao:
+        cursor = executar_preparado(
+            conexao, 'envios.inserir', SQL_INSERIR, (contato_id, template_id, segmento_id, status, erro)
+        )
+        return cursor.lastrowid
+
+
+def atualizar_status(envio_id, status, connection=None):
+    with abrir_cursor(connection, commit=True) as cursor:
+        executar(cursor, 'envios.atualizar_status', "UPDATE envios SET status = %s WHERE id = %s", (status, envio_id))
+
+
+def inserir_metrica(envio_id, contato_id, status, detalhes=None, connection=None):
+    with abrir_conexao(connection, commit=True) as conexao:
+        executar_preparado(
+            conexao, 'envios.inserir_metrica', SQL_INSERIR_METRICA,
+            (envio_id, contato_id, status, json.dumps(detalhes) if detalhes else None)
+        )
+
+
+def metricas_periodo(inicio, fim, connection=None):
+    with abrir_cursor(connection, somente_leitura=True) as cursor:
+        return buscar_um(cursor, 'envios.metricas_periodo', QUERY_METRICAS_PERIODO, (inicio, fim))
+
+
+def metricas_segmentos(desde, segmento_id=None, connection=None):
+    """Envios e eventos por segmento desde `desde`; só do segmento `segmento_id` quando informado."""
+    sql, params = QUERY_METRICAS_SEGMENTOS, [desde]
+    if segmento_id is not None:
+        sql = sql.replace("WHERE e.created_at >= %s", "WHERE e.created_at >= %s AND s.id = %s")
+        params.append(segmento_id)
+    with abrir_cursor(connection, somente_leitura=True) as cursor:
+        return buscar_todos(cursor, 'envios.metricas_segmentos', sql, params)
+
+
+def metricas_contato(contato_id, connection=None):
+    with abrir_cursor(connection, somente_leitura=True) as cursor:
+        return buscar_um(cursor, 'envios.metricas_contato', QUERY_METRICAS_CONTATO, (contato_id,))
+
+
+def historico_contato(contato_id, connection=None):
+    """Envios do contato, mais recentes primeiro, com uma linha por métrica registrada."""
+    with abrir_cursor(connection, somente_leitura=True) as cursor:
+        return buscar_todos(cursor, 'envios.historico_contato', QUERY_HISTORICO_CONTATO, (contato_id,))
+
+
+def relatorio_em_fluxo(inicio, fim):
+    """Envios do período com seus eventos, lidos em lotes de uma réplica (LinhasEmFluxo)."""
+    with medir_consulta('envios.relatorio'):
+        return consultar_em_fluxo(QUERY_RELATORIO, (inicio, fim), somente_leitura=True)
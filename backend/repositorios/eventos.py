@@ -0,0 +1,70 @@
+"""Eventos de tracking (aberturas e cliques) registrados por envio."""
+import json
+
+from backend.database.consultas import registrar_consulta, intervalo_datas, dias_atras
+from backend.database.instrumentacao import buscar_todos, buscar_um, executar_preparado
+from .base import abrir_conexao, abrir_cursor
+
+# Executada a cada pixel e clique, como instrução preparada
+SQL_INSERIR = """
+    INSERT INTO eventos_tracking
+    (envio_id, tipo_evento, dados_adicionais, data_evento)
+    VALUES (%s, %s, %s, NOW())
+"""
+
+QUERY_RESUMO = registrar_consulta('eventos.resumo', """
+    SELECT
+        COUNT(DISTINCT CASE WHEN tipo_evento = 'abertura' THEN envio_id END) as total_aberturas,
+        COUNT(DISTINCT CASE WHEN tipo_evento = 'clique' THEN envio_id END) as total_cliques,
+        COUNT(DISTINCT envio_id) as total_eventos,
+        (SELECT COUNT(*) FROM envios WHERE status = 'enviado' AND data_envio >= %s AND data_envio < %s) as total_envios
+    FROM eventos_tracking
+    WHERE data_evento >= %s AND data_evento < %s
+""", exemplo=lambda: intervalo_datas(*dias_atras(7)) * 2)
+
+# A ordenação é feita sobre no máximo 24 grupos já agregados
+QUERY_POR_HORA = registrar_consulta('eventos.por_hora', """
+    SELECT
+        HOUR(data_evento) as hora,
+        COUNT(*) as total
+    FROM eventos_tracking
+    WHERE data_evento >= %s AND data_evento < %s
+    GROUP BY HOUR(data_evento)
+    ORDER BY hora
+""", exemplo=lambda: intervalo_datas(*dias_atras(7)), permitir=('filesort',))
+
+QUERY_TOTAIS = """
+    SELECT
+        COUNT(*) as total_eventos,
+        SUM(CASE WHEN tipo_evento = 'abertura' THEN 1 ELSE 0 END) as aberturas,
+        SUM(CASE WHEN tipo_evento = 'clique' THEN 1 ELSE 0 END) as cliques,
+        SUM(CASE WHEN tipo_evento = 'resposta' THEN 1 ELSE 0 END) as respostas,
+        MIN(data_evento) as inicio,
+        MAX(data_evento) as fim
+    FROM eventos_tracking
+"""
+
+
+def inserir(envio_id, tipo_evento, dados_adicionais=None, connection=None):
+    with abrir_conexao(connection, commit=True) as conexao:
+        executar_preparado(
+            conexao, 'eventos.inserir', SQL_INSERIR,
+            (envio_id, tipo_evento, json.dumps(dados_adicionais) if dados_adicionais else None)
+        )
+
+
+def resumo(inicio, fim, connection=None):
+    """Aberturas, cliques e envios no período semiaberto [inicio, fim)."""
+    with abrir_cursor(connection, somente_leitura=True) as cursor:
+        return buscar_um(cursor, 'eventos.resumo', QUERY_RESUMO, (inicio, fim, inicio, fim))
+
+
+def por_hora(inicio, fim, connection=None):
+    with abrir_cursor(connection, somente_leitura=True) as cursor:
+        return buscar_todos(cursor, 'eventos.por_hora', QUERY_POR_HORA, (inicio, fim))
+
+
+def totais(connection=None):
+    """Contagem de eventos por tipo e o período coberto, sobre toda a tabela."""
+    with abrir_cursor(connection, somente_leitura=True) as cursor:
+        return buscar_um(cursor, 'eventos.totais', QUERY_TOTAIS)
@@ -0,0 +1,111 @@
+"""
+Integrações de envio (SMTP, API, webhook).
+
+A configuração fica na coluna JSON `configuracao` e é devolvida já
+convertida em dict. Integrações com status 'ativo' são usadas no envio.
+"""
+import json
+
+from backend.database.instrumentacao import buscar_todos, buscar_um, executar
+from .base import abrir_cursor
+
+CAMPOS_ATUALIZAVEIS = ['nome', 'tipo', 'configuracao', 'status']
+
+QUERY_POR_TIPO = "SELECT * FROM integracoes WHERE tipo = %s ORDER BY id LIMIT 1"
+
+
+def _converter(integracao):
+    if integracao and isinstance(integracao.get('configuracao'), (str, bytes)):
+        integracao['configuracao'] = json.loads(integracao['configuracao'])
+    return integracao
+
+
+def _valor(campo, valor):
+    return json.dumps(valor) if campo == 'configuracao' else valor
+
+
+def listar(tipo=None, status=None, connection=None):
+    """Integrações mais recentes primeiro, opcionalmente filtradas por tipo e status."""
+    query = "SELECT * FROM integracoes"
+    condicoes, params = [], []
+    if tipo:
+        condicoes.append("tipo = %s")
+        params.append(tipo)
+    if status:
+        condicoes.append("status = %s")
+        params.append(status)
+    if condicoes:
+        query += " WHERE " + " AND ".join(condicoes)
+    query += " ORDER BY created_at DESC"
+
+    with abrir_cursor(connection) as cursor:
+        return [_converter(integracao) for integracao in buscar_todos(cursor, 'integracoes.listar', query, params)]
+
+
+def buscar(integracao_id, connection=None):
+    with abrir_cursor(connection) as cursor:
+        return _converter(buscar_um(
+            cursor, 'integracoes.buscar', "SELECT * FROM integracoes WHERE id = %s", (integracao_id,)
+        ))
+
+
+def buscar_por_tipo(tipo, connection=None):
+    """A integração mais antiga do tipo, ou None."""
+    with abrir_cursor(connection) as cursor:
+        return _converter(buscar_um(cursor, 'integracoes.buscar_por_tipo', QUERY_POR_TIPO, (tipo,)))
+
+
+def criar(tipo, configuracao, nome=None, status='ativo', connection=None):
+    """Cria a integração e retorna o id."""
+    with abrir_cursor(connection, commit=True) as cursor:
+        executar(
+            cursor, 'integracoes.criar',
+            "INSERT INTO integracoes (nome, tipo, configuracao, status) VALUES (%s, %s, %s, %s)",
+            (nome, tipo, json.dumps(configuracao), status)
+        )
+        return cursor.lastrowid
+
+
+def atualizar(integracao_id, dados, connection=None):
+    """
+    Atualiza os campos de CAMPOS_ATUALIZAVEIS presentes em `dados` (valores
+    None são ignorados). Retorna True se a integração existia e foi alterada.
+    """
+    campos = [campo for campo in CAMPOS_ATUALIZAVEIS if dados.get(campo) is not None]
+    if not campos:
+        return False
+    with abrir_cursor(connection, commit=True) as cursor:
+        executar(
+            cursor, 'integracoes.atualizar',
+            f"UPDATE integracoes SET {', '.join(f'{campo} = %s' for campo in campos)} WHERE id = %s",
+            [_valor(campo, dados[campo]) for campo in campos] + [integracao_id]
+        )
+        return cursor.rowcount > 0
+
+
+def salvar_por_tipo(tipo, configuracao, connection=None):
+    """
+    Grava a configuração da integração do tipo, criando-a se ainda não
+    existir. Retorna o id da integração.
+    """
+    with abrir_cursor(connection, commit=True) as cursor:
+        existente = buscar_um(cursor, 'integracoes.buscar_por_tipo', QUERY_POR_TIPO, (tipo,))
+        if existente:
+            executar(
+                cursor, 'integracoes.atualizar',
+                "UPDATE integracoes SET configuracao = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                (json.dumps(configuracao), existente['id'])
+            )
+            return existente['id']
+        executar(
+            cursor, 'integracoes.criar',
+            "INSERT INTO integracoes (tipo, configuracao) VALUES (%s, %s)",
+            (tipo, json.dumps(configuracao))
+        )
+        return cursor.lastrowid
+
+
+def remover(integracao_id, connection=None):
+    """Remove a integração e retorna quantas linhas foram apagadas (0 se não existia)."""
+    with abrir_cursor(connection, commit=True) as cursor:
+        return executar(cursor, 'integracoes.remover', "DELETE FROM integracoes WHERE id = %s", (integracao_id,)).rowcount
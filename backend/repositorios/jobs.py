@@ -0,0 +1,155 @@
+"""
+Jobs de disparo de campanhas (tabela jobs_envio) e seus destinatários
+(tabela jobs_destinatarios).
+
+Status: 'na_fila' -> 'processando' -> 'concluido', 'cancelado' ou 'erro'.
+As transições para um status final só valem a partir de um status ativo,
+então um job cancelado não volta a ser marcado como concluído pela tarefa.
+
+Cada destinatário é reservado (status 'reservado') antes de ir ao
+transporte e recebe 'enviado' ou 'falha' junto do progresso do lote. A
+chave primária (job_id, contato_id) garante uma única reserva por contato.
+Os que ficaram 'reservado' num lote interrompido passam a 'incerto' quando
+o lote é repetido ou o job falha, e entram na contagem `incertos` do job.
+"""
+import json
+import secrets
+
+from backend.database.instrumentacao import buscar_todos, buscar_um, executar, medir_consulta
+from .base import abrir_cursor
+
+STATUS_ATIVOS = ('na_fila', 'processando')
+STATUS_FINAIS = ('concluido', 'cancelado', 'erro')
+
+_SO_ATIVOS = "status IN ('na_fila', 'processando')"
+
+
+def _converter(job):
+    for campo in ('dados_padrao', 'audiencia'):
+        if job and isinstance(job.get(campo), (str, bytes)):
+            job[campo] = json.loads(job[campo])
+    return job
+
+
+def criar(envio_id, template_id, segmento_id, assunto, dados_padrao=None, total=0, audiencia=None,
+          connection=None):
+    """Registra o job na fila e retorna o id."""
+    with abrir_cursor(connection, commit=True) as cursor:
+        executar(
+            cursor, 'jobs.criar',
+            """
+            INSERT INTO jobs_envio (envio_id, template_id, segmento_id, assunto, dados_padrao, total, audiencia)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """,
+            (envio_id, template_id, segmento_id, assunto,
+             json.dumps(dados_padrao) if dados_padrao else None, total,
+             json.dumps(audiencia) if audiencia else None)
+        )
+        return cursor.lastrowid
+
+
+def buscar(job_id, connection=None):
+    with abrir_cursor(connection) as cursor:
+        return _converter(buscar_um(cursor, 'jobs.buscar', "SELECT * FROM jobs_envio WHERE id = %s", (job_id,)))
+
+
+def iniciar(job_id, connection=None):
+    """Passa o job da fila para 'processando'. Retorna False se ele não estava na fila."""
+    with abrir_cursor(connection, commit=True) as cursor:
+        return executar(
+            cursor, 'jobs.iniciar',
+            "UPDATE jobs_envio SET status = 'processando', iniciado_em = NOW() WHERE id = %s AND status = 'na_fila'",
+            (job_id,)
+        ).rowcount > 0
+
+
+def registrar_progresso(job_id, enviados, falhas, ultimo_contato_id, connection=None):
+    """Soma os resultados de um lote e avança o ponto de continuação."""
+    with abrir_cursor(connection, commit=True) as cursor:
+        executar(
+            cursor, 'jobs.registrar_progresso',
+            """
+            UPDATE jobs_envio
+            SET enviados = enviados + %s, falhas = falhas + %s, ultimo_contato_id = %s
+            WHERE id = %s
+            """,
+            (enviados, falhas, ultimo_contato_id, job_id)
+        )
+
+
+def reservar_destinatarios(job_id, contato_ids, connection=None):
+    """
+    Reserva os contatos do lote para o job e retorna o conjunto dos que
+    foram reservados nesta chamada. Contatos já reservados antes (lote
+    repetido após uma queda, ou outro worker com o mesmo job) ficam de fora.
+    """
+    if not contato_ids:
+        return set()
+    reserva = secrets.token_hex(8)
+    with abrir_cursor(connection, commit=True) as cursor:
+        with medir_consulta('jobs.reservar_destinatarios') as medicao:
+            cursor.executemany(
+                "INSERT IGNORE INTO jobs_destinatarios (job_id, contato_id, reserva) VALUES (%s, %s, %s)",
+                [(job_id, contato_id, reserva) for contato_id in contato_ids]
+            )
+            medicao.linhas = cursor.rowcount
+        reservados = buscar_todos(
+            cursor, 'jobs.destinatarios_reservados',
+            """
+            SELECT contato_id FROM jobs_destinatarios
+            WHERE job_id = %s AND contato_id BETWEEN %s AND %s AND reserva = %s
+            """,
+            (job_id, min(contato_ids), max(contato_ids), reserva)
+        )
+        return {linha['contato_id'] for linha in reservados}
+
+
+def registrar_destinatarios(job_id, resultados, connection=None):
+    """Grava o status ('enviado' ou 'falha') de cada (contato_id, status) em `resultados`."""
+    if not resultados:
+        return
+    with abrir_cursor(connection, commit=True) as cursor:
+        with medir_consulta('jobs.registrar_destinatarios') as medicao:
+            cursor.executemany(
+                "UPDATE jobs_destinatarios SET status = %s WHERE job_id = %s AND contato_id = %s",
+                [(status, job_id, contato_id) for contato_id, status in resultados]
+            )
+            medicao.linhas = cursor.rowcount
+
+
+def marcar_incertos(job_id, contato_ids=None, connection=None):
+    """
+    Marca como 'incerto' os destinatários de `contato_ids` (sem eles, todos
+    os do job) que ainda estão 'reservado': a execução que os reservou caiu
+    sem gravar o resultado, e o email pode ter saído ou não. Soma-os em
+    `incertos` do job e retorna quantos foram marcados.
+    """
+    if contato_ids is not None and not contato_ids:
+        return 0
+    query = "UPDATE jobs_destinatarios SET status = 'incerto' WHERE job_id = %s AND status = 'reservado'"
+    params = [job_id]
+    if contato_ids is not None:
+        query += f" AND contato_id IN ({', '.join(['%s'] * len(contato_ids))})"
+        params += list(contato_ids)
+    with abrir_cursor(connection, commit=True) as cursor:
+        marcados = executar(cursor, 'jobs.marcar_incertos', query, params).rowcount
+        if marcados:
+            executar(
+                cursor, 'jobs.somar_incertos',
+                "UPDATE jobs_envio SET incertos = incertos + %s WHERE id = %s",
+                (marcados, job_id)
+            )
+        return marcados
+
+
+def finalizar(job_id, status, erro=None, connection=None):
+    """
+    Leva um job ativo ao status final `status`. Retorna False se o job não
+    existe ou já estava finalizado (ex.: cancelado durante um lote).
+    """
+    with abrir_cursor(connection, commit=True) as cursor:
+        return executar(
+            cursor, 'jobs.finalizar',
+            f"UPDATE jobs_envio SET status = %s, erro = %s, concluido_em = NOW() WHERE id = %s AND {_SO_ATIVOS}",
+            (status, erro, job_id)
+        ).rowcount > 0
@@ -0,0 +1,98 @@
+"""Segmentos de contatos e a associação contatos_segmentos."""
+import json
+
+from backend.database.instrumentacao import buscar_todos, buscar_um, executar
+from .base import abrir_cursor
+from .contatos import condicoes_criterios
+
+CAMPOS_ATUALIZAVEIS = ['nome', 'descricao', 'criterios']
+
+QUERY_LISTAR_COM_TOTAIS = """
+    SELECT s.*, COUNT(cs.contato_id) as total_contatos
+    FROM segmentos s
+    LEFT JOIN contatos_segmentos cs ON s.id = cs.segmento_id
+    GROUP BY s.id
+    ORDER BY s.created_at DESC
+"""
+
+
+def _valor(campo, valor):
+    return json.dumps(valor) if campo == 'criterios' and valor is not None else valor
+
+
+def listar(connection=None):
+    """Segmentos mais recentes primeiro, com o total de contatos associados."""
+    with abrir_cursor(connection, somente_leitura=True) as cursor:
+        return buscar_todos(cursor, 'segmentos.listar', QUERY_LISTAR_COM_TOTAIS)
+
+
+def buscar(segmento_id, connection=None):
+    with abrir_cursor(connection) as cursor:
+        return buscar_um(cursor, 'segmentos.buscar', "SELECT * FROM segmentos WHERE id = %s", (segmento_id,))
+
+
+def existe(segmento_id, connection=None):
+    with abrir_cursor(connection) as cursor:
+        return buscar_um(cursor, 'segmentos.existe', "SELECT id FROM segmentos WHERE id = %s", (segmento_id,)) is not None
+
+
+def existentes(segmento_ids, connection=None):
+    """Conjunto dos ids de `segmento_ids` que existem."""
+    segmento_ids = list(segmento_ids)
+    if not segmento_ids:
+        return set()
+    with abrir_cursor(connection) as cursor:
+        linhas = buscar_todos(
+            cursor, 'segmentos.existentes',
+            f"SELECT id FROM segmentos WHERE id IN ({', '.join(['%s'] * len(segmento_ids))})", segmento_ids
+        )
+    return {linha['id'] for linha in linhas}
+
+
+def criar(nome, descricao=None, criterios=None, connection=None):
+    """Cria o segmento e retorna o id."""
+    with abrir_cursor(connection, commit=True) as cursor:
+        executar(
+            cursor, 'segmentos.criar',
+            "INSERT INTO segmentos (nome, descricao, criterios) VALUES (%s, %s, %s)",
+            (nome, descricao, _valor('criterios', criterios))
+        )
+        return cursor.lastrowid
+
+
+def atualizar(segmento_id, dados, connection=None):
+    """
+    Atualiza os campos de CAMPOS_ATUALIZAVEIS presentes em `dados`. Retorna
+    False se nenhum campo foi informado.
+    """
+    campos = [campo for campo in CAMPOS_ATUALIZAVEIS if campo in dados]
+    if not campos:
+        return False
+    with abrir_cursor(connection, commit=True) as cursor:
+        executar(
+            cursor, 'segmentos.atualizar',
+            f"UPDATE segmentos SET {', '.join(f'{campo} = %s' for campo in campos)} WHERE id = %s",
+            [_valor(campo, dados[campo]) for campo in campos] + [segmento_id]
+        )
+    return True
+
+
+def remover(segmento_id, connection=None):
+    """Remove o segmento e suas associações numa transação. Retorna as linhas apagadas de segmentos."""
+    with abrir_cursor(connection, commit=True) as cursor:
+        executar(cursor, 'segmentos.remover_associacoes',
+                 "DELETE FROM contatos_segmentos WHERE segmento_id = %s", (segmento_id,))
+        return executar(cursor, 'segmentos.remover', "DELETE FROM segmentos WHERE id = %s", (segmento_id,)).rowcount
+
+
+def associar_por_criterios(segmento_id, criterios, connection=None):
+    """
+    Associa ao segmento, num único INSERT ... SELECT, os contatos que atendem
+    aos critérios. Retorna quantos contatos foram associados.
+    """
+    condicoes, params = condicoes_criterios(criterios)
+    query = "INSERT IGNORE INTO contatos_segmentos (contato_id, segmento_id) SELECT c.id, %s FROM contatos c"
+    if condicoes:
+        query += " WHERE " + " AND ".join(condicoes)
+    with abrir_cursor(connection, commit=True) as cursor:
+        return executar(cursor, 'segmentos.associar_por_criterios', query, [segmento_id] + params).rowcount
@@ -0,0 +1,19 @@
+"""Templates de email."""
+from backend.database.instrumentacao import buscar_um, executar
+from .base import abrir_cursor
+
+
+def buscar(template_id, connection=None):
+    with abrir_cursor(connection) as cursor:
+        return buscar_um(cursor, 'templates.buscar', "SELECT * FROM templates WHERE id = %s", (template_id,))
+
+
+def existe(template_id, connection=None):
+    with abrir_cursor(connection) as cursor:
+        return buscar_um(cursor, 'templates.existe', "SELECT id FROM templates WHERE id = %s", (template_id,)) is not None
+
+
+def remover(template_id, connection=None):
+    """Remove o template e retorna quantas linhas foram apagadas (0 se não existia)."""
+    with abrir_cursor(connection, commit=True) as cursor:
+        return executar(cursor, 'templates.remover', "DELETE FROM templates WHERE id = %s", (template_id,)).rowcount
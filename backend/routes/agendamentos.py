@@ -1,5 +1,9 @@
 from flask import Blueprint, request, jsonify
 from backend.config import get_db_connection
+from backend.routes.paginacao import (
+    PARAMETROS_PAGINACAO, PaginacaoInvalida, colunas, consultar_pagina, resposta_paginada, primeira_pagina
+)
+from backend.services.audiencias import AudienciaInvalida, ler_audiencia, segmentos_inexistentes
 from flasgger import swag_from
 import json
 from datetime import datetime
@@ -10,7 +14,8 @@ agendamentos_bp = Blueprint('agendamentos', __name__)
 @swag_from({
     "tags": ["Agendamentos"],
     "summary": "Listar agendamentos",
-    "description": "Retorna todos os agendamentos cadastrados no sistema.",
+    "description": "Retorna os agendamentos cadastrados no sistema por data de envio, paginados por cursor.",
+    "parameters": PARAMETROS_PAGINACAO,
     "responses": {
         200: {
             "description": "Lista de agendamentos",
@@ -35,18 +40,26 @@ agendamentos_bp = Blueprint('agendamentos', __name__)
     }
 })
 def listar_agendamentos():
-    """Lista todos os agendamentos registrados no banco de dados."""
+    """Lista os agendamentos registrados no banco de dados, pela data de envio."""
     try:
-        connection = get_db_connection()
+        connection = get_db_connection(somente_leitura=True)
         cursor = connection.cursor(dictionary=True)
 
-        cursor.execute("SELECT * FROM agendamentos ORDER BY data_envio ASC")
-        agendamentos = cursor.fetchall()
+        agendamentos, proximo = consultar_pagina(
+            cursor,
+            'agendamentos a',
+            colunas('a', 'id', 'template_id', 'segmento_id', 'audiencia', 'assunto', 'data_envio',
+                    'dados_padrao', 'status', 'created_at', 'updated_at'),
+            ordem='data_envio',
+            padrao='a.*'
+        )
 
-        if not agendamentos:
+        if not agendamentos and primeira_pagina():
             return jsonify({"message": "Nenhum agendamento encontrado."}), 404
 
-        return jsonify(agendamentos)
+        return resposta_paginada(agendamentos, proximo)
+    except PaginacaoInvalida as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Erro ao listar agendamentos: {str(e)}"}), 500
     finally:
@@ -70,11 +83,19 @@ def listar_agendamentos():
                 "properties": {
                     "template_id": {"type": "integer", "example": 1},
                     "segmento_id": {"type": "integer", "example": 1},
+                    "audiencia": {
+                        "type": "object",
+                        "description": "Alternativa a segmento_id: união dos segmentos em 'incluir' menos os em 'excluir'",
+                        "properties": {
+                            "incluir": {"type": "array", "items": {"type": "integer"}, "example": [1, 2]},
+                            "excluir": {"type": "array", "items": {"type": "integer"}, "example": [3]}
+                        }
+                    },
                     "assunto": {"type": "string", "example": "Newsletter Mensal"},
                     "data_envio": {"type": "string", "format": "date-time", "example": "2024-03-20T10:00:00"},
                     "dados_padrao": {"type": "object", "example": {"nome": "Cliente"}}
                 },
-                "required": ["template_id", "segmento_id", "assunto", "data_envio"]
+                "required": ["template_id", "assunto", "data_envio"]
             }
         }
     ],
@@ -90,6 +111,7 @@ def listar_agendamentos():
             }
         },
         400: {"description": "Dados inválidos"},
+        404: {"description": "Segmento da audiência não encontrado"},
         500: {"description": "Erro interno"}
     }
 })
@@ -98,10 +120,22 @@ def criar_agendamento():
     try:
         data = request.get_json()
         
-        required_fields = ['template_id', 'segmento_id', 'assunto', 'data_envio']
+        required_fields = ['template_id', 'assunto', 'data_envio']
         for field in required_fields:
             if field not in data:
                 return jsonify({"error": f"Campo '{field}' é obrigatório"}), 400
+        
+        # Um segmento ou uma audiência de vários segmentos
+        try:
+            segmento_id, audiencia = ler_audiencia(data)
+        except AudienciaInvalida as e:
+            return jsonify({"error": str(e)}), 400
+        if segmento_id is None:
+            return jsonify({"error": "Campo 'segmento_id' ou 'audiencia' é obrigatório"}), 400
+        if audiencia:
+            inexistentes = segmentos_inexistentes(segmento_id, audiencia)
+            if inexistentes:
+                return jsonify({"error": "Segmento não encontrado", "segmentos": inexistentes}), 404
                 
         try:
             data_envio = datetime.fromisoformat(data['data_envio'].replace('Z', '+00:00'))
@@ -118,11 +152,12 @@ def criar_agendamento():
         cursor = connection.cursor()
         
         cursor.execute("""
-            INSERT INTO agendamentos (template_id, segmento_id, assunto, data_envio, dados_padrao)
-            VALUES (%s, %s, %s, %s, %s)
+            INSERT INTO agendamentos (template_id, segmento_id, audiencia, assunto, data_envio, dados_padrao)
+            VALUES (%s, %s, %s, %s, %s, %s)
         """, (
             data['template_id'],
-            data['segmento_id'],
+            segmento_id,
+            json.dumps(audiencia) if audiencia else None,
             data['assunto'],
             data_envio,
             json.dumps(dados_padrao)
@@ -166,6 +201,14 @@ def criar_agendamento():
                 "properties": {
                     "template_id": {"type": "integer"},
                     "segmento_id": {"type": "integer"},
+                    "audiencia": {
+                        "type": "object",
+                        "description": "Alternativa a segmento_id: união dos segmentos em 'incluir' menos os em 'excluir'",
+                        "properties": {
+                            "incluir": {"type": "array", "items": {"type": "integer"}},
+                            "excluir": {"type": "array", "items": {"type": "integer"}}
+                        }
+                    },
                     "assunto": {"type": "string"},
                     "data_envio": {"type": "string", "format": "date-time"},
                     "dados_padrao": {"type": "object"},
@@ -204,9 +247,22 @@ def atualizar_agendamento(id):
             update_fields.append("template_id = %s")
             params.append(data['template_id'])
         
-        if 'segmento_id' in data:
-            update_fields.append("segmento_id = %s")
-            params.append(data['segmento_id'])
+        # Um segmento sozinho substitui a audiência; uma audiência nula volta ao segmento_id
+        if data.get('audiencia') is not None:
+            try:
+                segmento_id, audiencia = ler_audiencia(data)
+            except AudienciaInvalida as e:
+                return jsonify({"error": str(e)}), 400
+            inexistentes = segmentos_inexistentes(segmento_id, audiencia)
+            if inexistentes:
+                return jsonify({"error": "Segmento não encontrado", "segmentos": inexistentes}), 404
+            update_fields += ["segmento_id = %s", "audiencia = %s"]
+            params += [segmento_id, json.dumps(audiencia)]
+        elif 'segmento_id' in data or 'audiencia' in data:
+            if 'segmento_id' in data:
+                update_fields.append("segmento_id = %s")
+                params.append(data['segmento_id'])
+            update_fields.append("audiencia = NULL")
         
         if 'assunto' in data:
             update_fields.append("assunto = %s")
@@ -1,5 +1,9 @@
 from flask import Blueprint, request, jsonify
 from backend.config import get_db_connection
+from backend.routes.paginacao import (
+    PARAMETROS_PAGINACAO, PaginacaoInvalida, colunas, consultar_pagina, resposta_paginada, primeira_pagina
+)
+from backend.services.audiencias import AudienciaInvalida, ler_audiencia, segmentos_inexistentes
 from flasgger import swag_from
 import json
 
@@ -9,7 +13,8 @@ campanhas_bp = Blueprint('campanhas', __name__)
 @swag_from({
     "tags": ["Campanhas"],
     "summary": "Listar campanhas",
-    "description": "Retorna todas as campanhas cadastradas no sistema.",
+    "description": "Retorna as campanhas cadastradas no sistema, paginadas por cursor.",
+    "parameters": PARAMETROS_PAGINACAO,
     "responses": {
         200: {
             "description": "Lista de campanhas",
@@ -23,6 +28,7 @@ campanhas_bp = Blueprint('campanhas', __name__)
                         "descricao": {"type": "string"},
                         "template_id": {"type": "integer"},
                         "segmento_id": {"type": "integer"},
+                        "audiencia": {"type": "object"},
                         "status": {"type": "string"},
                         "created_at": {"type": "string"},
                         "updated_at": {"type": "string"}
@@ -33,20 +39,30 @@ campanhas_bp = Blueprint('campanhas', __name__)
     }
 })
 def listar_campanhas():
-    """Lista todas as campanhas registradas no banco de dados."""
-    connection = get_db_connection()
+    """Lista as campanhas registradas no banco de dados, da mais recente à mais antiga."""
+    connection = get_db_connection(somente_leitura=True)
     cursor = connection.cursor(dictionary=True)
 
-    cursor.execute("SELECT * FROM campanhas ORDER BY created_at DESC")
-    campanhas = cursor.fetchall()
-
-    cursor.close()
-    connection.close()
+    try:
+        campanhas, proximo = consultar_pagina(
+            cursor,
+            'campanhas c',
+            colunas('c', 'id', 'titulo', 'descricao', 'mensagem', 'template_id', 'segmento_id', 'audiencia',
+                    'data_envio', 'status', 'created_at', 'updated_at'),
+            ordem='created_at',
+            decrescente=True,
+            padrao='c.*'
+        )
+    except PaginacaoInvalida as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        cursor.close()
+        connection.close()
 
-    if not campanhas:
+    if not campanhas and primeira_pagina():
         return jsonify({"message": "Nenhuma campanha encontrada."}), 404
 
-    return jsonify(campanhas), 200
+    return resposta_paginada(campanhas, proximo)
 
 @campanhas_bp.route('/', methods=['POST'])
 @swag_from({
@@ -64,7 +80,15 @@ def listar_campanhas():
                     "titulo": {"type": "string", "example": "Campanha Newsletter"},
                     "descricao": {"type": "string", "example": "Campanha para newsletter mensal"},
                     "template_id": {"type": "integer", "example": 1},
-                    "segmento_id": {"type": "integer", "example": 1}
+                    "segmento_id": {"type": "integer", "example": 1},
+                    "audiencia": {
+                        "type": "object",
+                        "description": "Alternativa a segmento_id: união dos segmentos em 'incluir' menos os em 'excluir'",
+                        "properties": {
+                            "incluir": {"type": "array", "items": {"type": "integer"}, "example": [1, 2]},
+                            "excluir": {"type": "array", "items": {"type": "integer"}, "example": [3]}
+                        }
+                    }
                 },
                 "required": ["titulo", "template_id"]
             }
@@ -102,10 +126,15 @@ def criar_campanha():
         if not cursor.fetchone():
             return jsonify({"error": "Template não encontrado"}), 404
 
-        if 'segmento_id' in dados and dados['segmento_id'] is not None:
-            cursor.execute("SELECT id FROM segmentos WHERE id = %s", (dados['segmento_id'],))
-            if not cursor.fetchone():
-                return jsonify({"error": "Segmento não encontrado"}), 404
+        # Um segmento ou uma audiência de vários segmentos
+        try:
+            segmento_id, audiencia = ler_audiencia(dados)
+        except AudienciaInvalida as e:
+            return jsonify({"error": str(e)}), 400
+        if segmento_id is not None:
+            inexistentes = segmentos_inexistentes(segmento_id, audiencia)
+            if inexistentes:
+                return jsonify({"error": "Segmento não encontrado", "segmentos": inexistentes}), 404
 
         campos = ['titulo', 'template_id']
         valores = [dados['titulo'], dados['template_id']]
@@ -116,9 +145,14 @@ def criar_campanha():
             valores.append(dados['descricao'])
             placeholders.append('%s')
             
-        if 'segmento_id' in dados and dados['segmento_id'] is not None:
+        if segmento_id is not None:
             campos.append('segmento_id')
-            valores.append(dados['segmento_id'])
+            valores.append(segmento_id)
+            placeholders.append('%s')
+
+        if audiencia:
+            campos.append('audiencia')
+            valores.append(json.dumps(audiencia))
             placeholders.append('%s')
         
         query = f"""
@@ -168,6 +202,14 @@ def criar_campanha():
                     "descricao": {"type": "string"},
                     "template_id": {"type": "integer"},
                     "segmento_id": {"type": "integer"},
+                    "audiencia": {
+                        "type": "object",
+                        "description": "Alternativa a segmento_id: união dos segmentos em 'incluir' menos os em 'excluir'",
+                        "properties": {
+                            "incluir": {"type": "array", "items": {"type": "integer"}},
+                            "excluir": {"type": "array", "items": {"type": "integer"}}
+                        }
+                    },
                     "status": {"type": "string"}
                 }
             }
@@ -212,13 +254,26 @@ def atualizar_campanha(id):
             campos.append("template_id = %s")
             valores.append(dados['template_id'])
             
-        if 'segmento_id' in dados:
-            if dados['segmento_id'] is not None:
-                cursor.execute("SELECT id FROM segmentos WHERE id = %s", (dados['segmento_id'],))
-                if not cursor.fetchone():
-                    return jsonify({"error": "Segmento não encontrado"}), 404
-            campos.append("segmento_id = %s")
-            valores.append(dados['segmento_id'])
+        # Um segmento sozinho substitui a audiência; uma audiência nula volta ao segmento_id
+        if dados.get('audiencia') is not None:
+            try:
+                segmento_id, audiencia = ler_audiencia(dados)
+            except AudienciaInvalida as e:
+                return jsonify({"error": str(e)}), 400
+            inexistentes = segmentos_inexistentes(segmento_id, audiencia)
+            if inexistentes:
+                return jsonify({"error": "Segmento não encontrado", "segmentos": inexistentes}), 404
+            campos += ["segmento_id = %s", "audiencia = %s"]
+            valores += [segmento_id, json.dumps(audiencia)]
+        elif 'segmento_id' in dados or 'audiencia' in dados:
+            if 'segmento_id' in dados:
+                if dados['segmento_id'] is not None:
+                    cursor.execute("SELECT id FROM segmentos WHERE id = %s", (dados['segmento_id'],))
+                    if not cursor.fetchone():
+                        return jsonify({"error": "Segmento não encontrado"}), 404
+                campos.append("segmento_id = %s")
+                valores.append(dados['segmento_id'])
+            campos.append("audiencia = NULL")
             
         if 'status' in dados:
             campos.append("status = %s")
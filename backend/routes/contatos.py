@@ -1,20 +1,23 @@
 from flask import Blueprint, request, jsonify
 from backend.config import get_db_connection
+from backend.repositorios import contatos as repo_contatos
+from backend.routes.paginacao import CAMPOS_CONTATO, PaginacaoInvalida, consultar_pagina, resposta_paginada
 import json
 
 contatos_bp = Blueprint('contatos', __name__)
 
 @contatos_bp.route('/', methods=['GET'])
 def listar_contatos():
-    """Lista todos os contatos."""
+    """Lista os contatos em ordem de id, paginados por cursor (limit/after/fields)."""
     try:
-        connection = get_db_connection()
+        connection = get_db_connection(somente_leitura=True)
         cursor = connection.cursor(dictionary=True)
         
-        cursor.execute("SELECT * FROM contatos")
-        contatos = cursor.fetchall()
+        contatos, proximo = consultar_pagina(cursor, 'contatos c', CAMPOS_CONTATO, padrao='c.*')
         
-        return jsonify(contatos)
+        return resposta_paginada(contatos, proximo)
+    except PaginacaoInvalida as e:
+        return jsonify({"erro": str(e)}), 400
     except Exception as e:
         return jsonify({"erro": str(e)}), 500
     finally:
@@ -65,23 +68,14 @@ def criar_contato():
 def obter_contato(contato_id):
     """Obtém um contato específico."""
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        cursor.execute("SELECT * FROM contatos WHERE id = %s", (contato_id,))
-        contato = cursor.fetchone()
-        
-        if not contato:
-            return jsonify({"erro": "Contato não encontrado"}), 404
-            
-        return jsonify(contato)
+        contato = repo_contatos.buscar(contato_id)
     except Exception as e:
         return jsonify({"erro": str(e)}), 500
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
+
+    if not contato:
+        return jsonify({"erro": "Contato não encontrado"}), 404
+
+    return jsonify(contato)
 
 @contatos_bp.route('/<int:contato_id>', methods=['PUT'])
 def atualizar_contato(contato_id):
@@ -127,20 +121,9 @@ def atualizar_contato(contato_id):
 def remover_contato(contato_id):
     """Remove um contato."""
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        
-        cursor.execute("DELETE FROM contatos WHERE id = %s", (contato_id,))
-        connection.commit()
-        
-        if cursor.rowcount == 0:
+        if not repo_contatos.remover(contato_id):
             return jsonify({"erro": "Contato não encontrado"}), 404
-            
+
         return jsonify({"mensagem": "Contato removido com sucesso"})
     except Exception as e:
         return jsonify({"erro": str(e)}), 500
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close() 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, url_for
 from backend.config import get_db_connection
 from flasgger import swag_from
 import re
@@ -9,7 +9,15 @@ from datetime import datetime
 import json
 import os
 from dotenv import load_dotenv
-from backend.services.email_service import send_email
+from backend.repositorios import contatos as repo_contatos, jobs as repo_jobs, templates as repo_templates
+from backend.services.audiencias import (
+    AudienciaInvalida, audiencia_de, ler_audiencia, segmentos_inexistentes
+)
+from backend.services import disparo_service
+from backend.tasks import enviar_campanha_task
+from backend.routes.paginacao import (
+    PARAMETROS_PAGINACAO, CAMPOS_CONTATO, PaginacaoInvalida, consultar_pagina, resposta_paginada, primeira_pagina
+)
 import traceback
 
 load_dotenv()
@@ -25,7 +33,8 @@ def email_valido(email):
 @swag_from({
     "tags": ["Emails"],
     "summary": "Listar contatos",
-    "description": "Retorna todos os contatos cadastrados no sistema.",
+    "description": "Retorna os contatos cadastrados no sistema, paginados por cursor.",
+    "parameters": PARAMETROS_PAGINACAO,
     "responses": {
         200: {
             "description": "Lista de contatos",
@@ -47,20 +56,29 @@ def email_valido(email):
     }
 })
 def listar_emails():
-    """Lista todos os contatos registrados no banco de dados."""
-    connection = get_db_connection()
+    """Lista os contatos registrados no banco de dados, do mais recente ao mais antigo."""
+    connection = get_db_connection(somente_leitura=True)
     cursor = connection.cursor(dictionary=True)
 
-    cursor.execute("SELECT * FROM contatos ORDER BY created_at DESC")
-    contatos = cursor.fetchall()
-
-    cursor.close()
-    connection.close()
+    try:
+        contatos, proximo = consultar_pagina(
+            cursor,
+            'contatos c',
+            CAMPOS_CONTATO,
+            ordem='created_at',
+            decrescente=True,
+            padrao='c.*'
+        )
+    except PaginacaoInvalida as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        cursor.close()
+        connection.close()
 
-    if not contatos:
+    if not contatos and primeira_pagina():
         return jsonify({"message": "Nenhum contato encontrado."}), 404
 
-    return jsonify(contatos), 200
+    return resposta_paginada(contatos, proximo)
 
 @emails_bp.route('/', methods=['POST'])
 @swag_from({
@@ -297,7 +315,10 @@ def remover_email(id):
 @swag_from({
     "tags": ["E-mails"],
     "summary": "Enviar email",
-    "description": "Envia um email para um contato ou segmento específico.",
+    "description": "Enfileira o envio de um template para os contatos ativos de um segmento, ou de uma "
+                   "audiência: a união dos segmentos em 'incluir' menos os contatos dos segmentos em "
+                   "'excluir', cada contato uma vez. O envio é feito em segundo plano, em lotes; "
+                   "acompanhe pelo job retornado.",
     "parameters": [
         {
             "name": "body",
@@ -308,15 +329,34 @@ def remover_email(id):
                 "properties": {
                     "template_id": {"type": "integer", "example": 1},
                     "segmento_id": {"type": "integer", "example": 1},
+                    "audiencia": {
+                        "type": "object",
+                        "description": "Alternativa a segmento_id",
+                        "properties": {
+                            "incluir": {"type": "array", "items": {"type": "integer"}, "example": [1, 2]},
+                            "excluir": {"type": "array", "items": {"type": "integer"}, "example": [3]}
+                        }
+                    },
                     "assunto": {"type": "string", "example": "Newsletter"},
                     "dados_padrao": {"type": "object"}
                 },
-                "required": ["template_id", "segmento_id", "assunto"]
+                "required": ["template_id", "assunto"]
             }
         }
     ],
     "responses": {
-        200: {"description": "Email enviado com sucesso"},
+        202: {
+            "description": "Envio enfileirado",
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "job_id": {"type": "integer", "example": 1},
+                    "envio_id": {"type": "integer", "example": 10},
+                    "total": {"type": "integer", "example": 2500},
+                    "progresso": {"type": "string", "example": "/api/emails/jobs/1"}
+                }
+            }
+        },
         400: {"description": "Dados inválidos"},
         404: {"description": "Template ou segmento não encontrado"}
     }
@@ -324,88 +364,117 @@ def remover_email(id):
 def enviar_email():
     dados = request.json
 
-    if not dados or 'template_id' not in dados or 'segmento_id' not in dados or 'assunto' not in dados:
-        return jsonify({"error": "Template ID, segmento ID e assunto são obrigatórios"}), 400
-            
+    if not dados or 'template_id' not in dados or 'assunto' not in dados:
+        return jsonify({"error": "Template ID, segmento ID (ou audiência) e assunto são obrigatórios"}), 400
+    if dados.get('dados_padrao') is not None and not isinstance(dados['dados_padrao'], dict):
+        return jsonify({"error": "dados_padrao deve ser um objeto"}), 400
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        # Buscar template
-        cursor.execute("SELECT * FROM templates WHERE id = %s", (dados['template_id'],))
-        template = cursor.fetchone()
-        if not template:
+        segmento_id, audiencia = ler_audiencia(dados)
+    except AudienciaInvalida as e:
+        return jsonify({"error": str(e)}), 400
+    if segmento_id is None:
+        return jsonify({"error": "Template ID, segmento ID (ou audiência) e assunto são obrigatórios"}), 400
+
+    try:
+        if not repo_templates.existe(dados['template_id']):
             return jsonify({"error": "Template não encontrado"}), 404
-            
-        # Buscar contatos do segmento
-        cursor.execute("""
-            SELECT c.* FROM contatos c
-            JOIN contatos_segmentos cs ON c.id = cs.contato_id
-            WHERE cs.segmento_id = %s AND c.status = 'ativo'
-        """, (dados['segmento_id'],))
-        contatos = cursor.fetchall()
-        
-        if not contatos:
+        if audiencia:
+            inexistentes = segmentos_inexistentes(segmento_id, audiencia)
+            if inexistentes:
+                return jsonify({"error": "Segmento não encontrado", "segmentos": inexistentes}), 404
+
+        total = repo_contatos.contar_ativos_da_audiencia(
+            audiencia_de({'audiencia': audiencia, 'segmento_id': segmento_id})
+        )
+        if not total:
             return jsonify({"error": "Nenhum contato ativo encontrado no segmento"}), 404
-            
-        # Criar registro de envio
-        cursor.execute("""
-            INSERT INTO envios (template_id, segmento_id, status)
-            VALUES (%s, %s, 'em_progresso')
-        """, (dados['template_id'], dados['segmento_id']))
-        envio_id = cursor.lastrowid
-        connection.commit()
-        
-        # Preparar conteúdo do email
-        conteudo = template['html_content']
-        if dados.get('dados_padrao'):
-            for chave, valor in dados['dados_padrao'].items():
-                conteudo = conteudo.replace(f"{{{chave}}}", str(valor))
-                
-        # Enviar para cada contato
-        contatos_enviados = []
-        for contato in contatos:
-            # Personalizar conteúdo
-            conteudo_personalizado = conteudo
-            conteudo_personalizado = conteudo_personalizado.replace("{nome}", contato['nome'])
-            if contato.get('cargo'):
-                conteudo_personalizado = conteudo_personalizado.replace("{cargo}", contato['cargo'])
-            if contato.get('empresa'):
-                conteudo_personalizado = conteudo_personalizado.replace("{empresa}", contato['empresa'])
-                
-            # Enviar email
-            sucesso = send_email(
-                to_email=contato['email'],
-                subject=dados['assunto'],
-                html_content=conteudo_personalizado,
-                envio_id=envio_id,
-                contato_id=contato['id']
-            )
-            
-            if sucesso:
-                contatos_enviados.append({
-                    'nome': contato['nome'],
-                    'email': contato['email']
-                })
-                
-        # Atualizar status do envio
-        status = 'concluido' if len(contatos_enviados) > 0 else 'erro'
-        cursor.execute("""
-            UPDATE envios SET status = %s WHERE id = %s
-        """, (status, envio_id))
-        connection.commit()
-        
-        return jsonify({
-            "message": f"Emails enviados com sucesso para {len(contatos_enviados)} contatos",
-            "contatos": contatos_enviados
-        }), 200
-        
+
+        job_id = disparo_service.criar_job(
+            dados['template_id'], segmento_id, dados['assunto'], dados.get('dados_padrao'), total, audiencia
+        )
     except Exception as e:
-        print(f"Erro ao enviar email: {str(e)}")
+        print(f"Erro ao criar envio: {str(e)}")
         traceback.print_exc()
         return jsonify({"error": f"Erro ao enviar email: {str(e)}"}), 500
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
\ No newline at end of file
+
+    try:
+        enviar_campanha_task.delay(job_id)
+    except Exception as e:
+        print(f"Erro ao enfileirar o job de envio {job_id}: {str(e)}")
+        disparo_service.falhar_job(job_id, f"Fila indisponível: {str(e)}")
+        return jsonify({"error": "Fila de envio indisponível", "job_id": job_id}), 503
+
+    job = repo_jobs.buscar(job_id)
+    return jsonify({
+        "message": f"Envio para {total} contatos enfileirado",
+        "job_id": job_id,
+        "envio_id": job['envio_id'],
+        "total": total,
+        "progresso": url_for('emails.progresso_job', job_id=job_id)
+    }), 202
+
+@emails_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@swag_from({
+    "tags": ["E-mails"],
+    "summary": "Progresso de um envio",
+    "description": "Contagens de enviados, falhas, incertos (lotes interrompidos sem resultado gravado) e pendentes, percentual concluído e vazão (emails por segundo) do job.",
+    "parameters": [
+        {"name": "job_id", "in": "path", "type": "integer", "required": True}
+    ],
+    "responses": {
+        200: {
+            "description": "Progresso do job",
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "job_id": {"type": "integer"},
+                    "status": {"type": "string", "enum": ["na_fila", "processando", "concluido", "cancelado", "erro"]},
+                    "total": {"type": "integer"},
+                    "enviados": {"type": "integer"},
+                    "falhas": {"type": "integer"},
+                    "incertos": {"type": "integer"},
+                    "pendentes": {"type": "integer"},
+                    "percentual": {"type": "number"},
+                    "emails_por_segundo": {"type": "number"},
+                    "estimativa_restante_s": {"type": "number"}
+                }
+            }
+        },
+        404: {"description": "Job não encontrado"}
+    }
+})
+def progresso_job(job_id):
+    try:
+        job = repo_jobs.buscar(job_id)
+        if not job:
+            return jsonify({"error": "Job não encontrado"}), 404
+        return jsonify(disparo_service.progresso(job)), 200
+    except Exception as e:
+        return jsonify({"error": f"Erro ao consultar o job: {str(e)}"}), 500
+
+@emails_bp.route('/jobs/<int:job_id>/cancelar', methods=['POST'])
+@swag_from({
+    "tags": ["E-mails"],
+    "summary": "Cancelar um envio",
+    "description": "Interrompe o job antes do próximo lote. Os emails dos lotes já enviados não são desfeitos.",
+    "parameters": [
+        {"name": "job_id", "in": "path", "type": "integer", "required": True}
+    ],
+    "responses": {
+        200: {"description": "Job cancelado"},
+        404: {"description": "Job não encontrado"},
+        409: {"description": "O job já havia terminado"}
+    }
+})
+def cancelar_job(job_id):
+    try:
+        job = repo_jobs.buscar(job_id)
+        if not job:
+            return jsonify({"error": "Job não encontrado"}), 404
+        if job['status'] in repo_jobs.STATUS_FINAIS:
+            return jsonify({"error": f"O job já está {job['status']}", "status": job['status']}), 409
+
+        job = disparo_service.cancelar_job(job_id)
+        return jsonify(disparo_service.progresso(job)), 200
+    except Exception as e:
+        return jsonify({"error": f"Erro ao cancelar o job: {str(e)}"}), 500
@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify
 from backend.config import get_db_connection
+from backend.routes.paginacao import (
+    PARAMETROS_PAGINACAO, PaginacaoInvalida, consultar_pagina, resposta_paginada, primeira_pagina
+)
 from flasgger import swag_from
 import logging
 
@@ -10,7 +13,8 @@ logging.basicConfig(level=logging.INFO)
 @swag_from({
     "tags": ["Envios"],
     "summary": "Listar todos os envios de e-mails",
-    "description": "Lista todos os envios registrados, com detalhes de campanha e destinatário.",
+    "description": "Lista os envios registrados, com detalhes de campanha e destinatário, paginados por cursor.",
+    "parameters": PARAMETROS_PAGINACAO,
     "responses": {
         200: {
             "description": "Lista de envios encontrados",
@@ -37,35 +41,40 @@ logging.basicConfig(level=logging.INFO)
     }
 })
 def listar_envios():
-    """Lista todos os envios de e-mails registrados."""
-    connection = get_db_connection()
-    cursor = connection.cursor()
-
-    cursor.execute("""
-        SELECT e.id, e.campanha_id, c.titulo, e.email_id, em.email, e.status, e.data_envio
-        FROM envios e
-        JOIN campanhas c ON e.campanha_id = c.id
-        JOIN emails em ON e.email_id = em.id
-    """)
-    envios = cursor.fetchall()
+    """Lista os envios de e-mails registrados, em ordem de id."""
+    connection = get_db_connection(somente_leitura=True)
+    cursor = connection.cursor(dictionary=True)
 
-    cursor.close()
-    connection.close()
+    try:
+        envios, proximo = consultar_pagina(
+            cursor,
+            """envios e
+            JOIN campanhas c ON e.campanha_id = c.id
+            JOIN emails em ON e.email_id = em.id""",
+            {
+                "id": "e.id",
+                "campanha_id": "e.campanha_id",
+                "campanha_titulo": "c.titulo",
+                "email_id": "e.email_id",
+                "email": "em.email",
+                "status": "e.status",
+                "data_envio": "e.data_envio"
+            }
+        )
+    except PaginacaoInvalida as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        cursor.close()
+        connection.close()
 
-    if not envios:
+    if not envios and primeira_pagina():
         return jsonify({"message": "Nenhum envio registrado."}), 404
 
-    return jsonify([
-        {
-            "id": e[0],
-            "campanha_id": e[1],
-            "campanha_titulo": e[2],
-            "email_id": e[3],
-            "email": e[4],
-            "status": e[5],
-            "data_envio": str(e[6])
-        } for e in envios
-    ]), 200
+    for envio in envios:
+        if 'data_envio' in envio:
+            envio['data_envio'] = str(envio['data_envio'])
+
+    return resposta_paginada(envios, proximo)
 
 @envios_bp.route('/', methods=['POST'])
 @swag_from({
@@ -0,0 +1,59 @@
+import csv
+import io
+
+from flask import Response, current_app, stream_with_context
+
+# Linhas acumuladas antes de cada escrita na resposta
+LINHAS_POR_BLOCO = 500
+
+
+def _blocos_csv(cabecalho, linhas):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(cabecalho)
+    try:
+        for numero, linha in enumerate(linhas, 1):
+            writer.writerow(linha)
+            if numero % LINHAS_POR_BLOCO == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    finally:
+        # Fecha o fluxo do banco também quando o cliente interrompe o download
+        if hasattr(linhas, 'close'):
+            linhas.close()
+
+
+def resposta_csv(cabecalho, linhas, nome_arquivo):
+    """Responde com um CSV gerado à medida que as linhas são lidas."""
+    return Response(
+        stream_with_context(_blocos_csv(cabecalho, linhas)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={nome_arquivo}'}
+    )
+
+
+def _blocos_json(linhas):
+    dumps = current_app.json.dumps
+    partes = ['[']
+    try:
+        for numero, linha in enumerate(linhas):
+            partes.append((',' if numero else '') + dumps(linha))
+            if len(partes) >= LINHAS_POR_BLOCO:
+                yield ''.join(partes)
+                partes = []
+        partes.append(']')
+        yield ''.join(partes)
+    finally:
+        if hasattr(linhas, 'close'):
+            linhas.close()
+
+
+def resposta_json_lista(linhas, status=200):
+    """Responde com uma lista JSON serializada item a item."""
+    return Response(
+        stream_with_context(_blocos_json(linhas)),
+        status=status,
+        mimetype='application/json'
+    )
@@ -7,7 +7,7 @@ from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.pdfgen import canvas
-from backend.config import get_db_connection
+from backend.database.streaming import consultar_em_fluxo
 from flasgger import swag_from
 from datetime import datetime, timedelta
 
@@ -210,9 +210,6 @@ def gerar_pdf(resultados):
 })
 def exportar_relatorio():
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
         # Processar parâmetros
         formato = request.args.get('formato', 'csv').lower()
         if formato not in ['csv', 'pdf']:
@@ -258,11 +255,12 @@ def exportar_relatorio():
             ORDER BY e.created_at DESC
         """
         
-        cursor.execute(query, params)
-        resultados = cursor.fetchall()
+        # Linhas lidas do banco em lotes, sem carregar o resultado inteiro
+        resultados = consultar_em_fluxo(query, params, somente_leitura=True)
         
         if formato == 'pdf':
-            pdf_path = gerar_pdf(resultados)
+            # O PDF é montado inteiro em memória pelo reportlab e percorre os dados mais de uma vez
+            pdf_path = gerar_pdf(list(resultados))
             return send_file(
                 pdf_path,
                 mimetype='application/pdf',
@@ -328,5 +326,5 @@ def exportar_relatorio():
         return jsonify({'error': str(e)}), 500
     
     finally:
-        cursor.close()
-        connection.close()
+        if 'resultados' in locals():
+            resultados.close()
@@ -1,10 +1,14 @@
 from flask import Blueprint, request, jsonify
-from backend.database import get_db_connection
+from backend.database import get_db_connection, consultar_em_fluxo
+from backend.routes.exportacao import resposta_json_lista
 from backend.services.email_service import get_smtp_config, update_smtp_config
 import json
 from flasgger import swag_from
 import requests
+from backend.services import integracoes_service
 from backend.services.integracoes_service import atualizar_integracao, buscar_integracao, deletar_integracao, testar_integracao
+from backend.repositorios import integracoes as repo_integracoes
+from backend.services.cache_integracoes import invalidar_integracoes
 
 integracoes_bp = Blueprint('integracoes', __name__)
 
@@ -37,13 +41,7 @@ integracoes_bp = Blueprint('integracoes', __name__)
 def listar_integracoes():
     """Lista todas as integrações configuradas."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM integracoes ORDER BY created_at DESC")
-        integracoes = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(integracoes)
+        return jsonify(repo_integracoes.listar())
     except Exception as e:
         return jsonify({"error": f"Erro ao listar integrações: {str(e)}"}), 500
 
@@ -100,32 +98,9 @@ def criar_integracao():
             if 'url' not in data['configuracao']:
                 return jsonify({"error": "Campo 'url' é obrigatório para integração Webhook"}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Verifica se já existe uma integração do mesmo tipo
-        cursor.execute("SELECT id FROM integracoes WHERE tipo = %s", (data['tipo'],))
-        existing = cursor.fetchone()
-        
-        if existing:
-            # Atualiza a integração existente
-            cursor.execute("""
-                UPDATE integracoes 
-                SET configuracao = %s, updated_at = CURRENT_TIMESTAMP 
-                WHERE tipo = %s
-            """, (json.dumps(data['configuracao']), data['tipo']))
-            integracao_id = existing[0]
-        else:
-            # Cria nova integração
-            cursor.execute("""
-                INSERT INTO integracoes (tipo, configuracao) 
-                VALUES (%s, %s)
-            """, (data['tipo'], json.dumps(data['configuracao'])))
-            integracao_id = cursor.lastrowid
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        # Atualiza a integração do mesmo tipo, ou cria uma nova
+        integracao_id = repo_integracoes.salvar_por_tipo(data['tipo'], data['configuracao'])
+        invalidar_integracoes()
         
         return jsonify({
             "id": integracao_id,
@@ -158,12 +133,7 @@ def criar_integracao():
 def obter_integracao(id):
     """Obtém os detalhes de uma integração específica."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM integracoes WHERE id = %s", (id,))
-        integracao = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        integracao = repo_integracoes.buscar(id)
         
         if not integracao:
             return jsonify({"error": "Integração não encontrada"}), 404
@@ -194,15 +164,9 @@ def obter_integracao(id):
 def remover_integracao(id):
     """Remove uma integração específica."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM integracoes WHERE id = %s", (id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        if cursor.rowcount == 0:
+        if not repo_integracoes.remover(id):
             return jsonify({"error": "Integração não encontrada"}), 404
+        invalidar_integracoes()
             
         return '', 204
     except Exception as e:
@@ -238,7 +202,7 @@ def listar():
     tipo = request.args.get('tipo')
     status = request.args.get('status')
     
-    integracoes = listar_integracoes(tipo, status)
+    integracoes = integracoes_service.listar_integracoes(tipo, status)
     if integracoes is not None:
         return jsonify(integracoes), 200
     else:
@@ -292,7 +256,7 @@ def buscar(id):
                 "properties": {
                     "nome": {"type": "string"},
                     "tipo": {"type": "string", "enum": ["smtp", "api", "webhook"]},
-                    "configuracoes": {"type": "object"},
+                    "configuracao": {"type": "object"},
                     "status": {"type": "string", "enum": ["ativo", "inativo"]}
                 }
             }
@@ -329,11 +293,12 @@ def atualizar(id):
         id,
         nome=dados.get('nome'),
         tipo=dados.get('tipo'),
-        configuracoes=dados.get('configuracoes'),
+        configuracao=dados.get('configuracao', dados.get('configuracoes')),
         status=dados.get('status')
     )
     
     if sucesso:
+        invalidar_integracoes()
         return jsonify({"message": "Integração atualizada com sucesso"}), 200
     else:
         return jsonify({"error": "Erro ao atualizar integração"}), 500
@@ -364,6 +329,7 @@ def deletar(id):
         
     # Deletar integração
     if deletar_integracao(id):
+        invalidar_integracoes()
         return jsonify({"message": "Integração removida com sucesso"}), 200
     else:
         return jsonify({"error": "Erro ao remover integração"}), 500
@@ -517,27 +483,20 @@ def exportar_dados(tipo):
         data_inicio = request.args.get('data_inicio')
         data_fim = request.args.get('data_fim')
         
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
         if tipo == 'crm':
-            dados = exportar_dados_crm(cursor, data_inicio, data_fim)
+            dados = exportar_dados_crm(data_inicio, data_fim)
         elif tipo == 'automacao':
-            dados = exportar_dados_automacao(cursor, data_inicio, data_fim)
+            dados = exportar_dados_automacao(data_inicio, data_fim)
         elif tipo == 'analytics':
-            dados = exportar_dados_analytics(cursor, data_inicio, data_fim)
+            dados = exportar_dados_analytics(data_inicio, data_fim)
         else:
             return jsonify({"error": "Tipo de exportação inválido"}), 400
             
-        return jsonify(dados), 200
+        # A lista é serializada à medida que as linhas chegam do banco
+        return resposta_json_lista(dados, 200)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
 
 def processar_dados_crm(dados, cursor):
     """Processa dados recebidos do CRM"""
@@ -594,7 +553,7 @@ def processar_dados_analytics(dados, cursor):
             json.dumps(dados['dados'].get('detalhes'))
         ))
 
-def exportar_dados_crm(cursor, data_inicio=None, data_fim=None):
+def exportar_dados_crm(data_inicio=None, data_fim=None):
     """Exporta dados para CRM"""
     query = """
         SELECT 
@@ -623,10 +582,9 @@ def exportar_dados_crm(cursor, data_inicio=None, data_fim=None):
         
     query += " GROUP BY e.id, e.email, e.nome, e.data_cadastro"
     
-    cursor.execute(query, params)
-    return cursor.fetchall()
+    return consultar_em_fluxo(query, params, somente_leitura=True)
 
-def exportar_dados_automacao(cursor, data_inicio=None, data_fim=None):
+def exportar_dados_automacao(data_inicio=None, data_fim=None):
     """Exporta dados para sistema de automação"""
     query = """
         SELECT 
@@ -655,10 +613,9 @@ def exportar_dados_automacao(cursor, data_inicio=None, data_fim=None):
         
     query += " GROUP BY c.id, c.titulo, c.data_envio, c.status"
     
-    cursor.execute(query, params)
-    return cursor.fetchall()
+    return consultar_em_fluxo(query, params, somente_leitura=True)
 
-def exportar_dados_analytics(cursor, data_inicio=None, data_fim=None):
+def exportar_dados_analytics(data_inicio=None, data_fim=None):
     """Exporta dados para sistema de analytics"""
     query = """
         SELECT 
@@ -682,5 +639,4 @@ def exportar_dados_analytics(cursor, data_inicio=None, data_fim=None):
         
     query += " GROUP BY DATE(i.data_interacao), i.tipo"
     
-    cursor.execute(query, params)
-    return cursor.fetchall() 
\ No newline at end of file
+    return consultar_em_fluxo(query, params, somente_leitura=True) 
\ No newline at end of file
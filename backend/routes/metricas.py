@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify, send_file
 from backend.config import get_db_connection
+from backend.database.consultas import intervalo_datas
+from backend.repositorios import contatos as repo_contatos, envios as repo_envios, eventos as repo_eventos
+from backend.services.metricas_service import obter_metricas_segmentos
 from flasgger import swag_from
 import json
 import csv
@@ -46,7 +49,7 @@ metricas_bp = Blueprint('metricas', __name__)
 })
 def metricas_envios():
     try:
-        connection = get_db_connection()
+        connection = get_db_connection(somente_leitura=True)
         cursor = connection.cursor(dictionary=True)
         
         # Obter parâmetros da query
@@ -145,7 +148,7 @@ def metricas_envios():
 })
 def taxa_abertura():
     try:
-        connection = get_db_connection()
+        connection = get_db_connection(somente_leitura=True)
         cursor = connection.cursor(dictionary=True)
         
         # Obter parâmetros da query
@@ -216,52 +219,18 @@ def taxa_abertura():
     }
 })
 def metricas_segmentos():
+    # Processar período
+    periodo = request.args.get('periodo', '30d')
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        # Processar período
-        periodo = request.args.get('periodo', '30d')
         dias = int(periodo.replace('d', ''))
-        data_inicio = datetime.now() - timedelta(days=dias)
-        
-        query = """
-            SELECT 
-                s.id as segmento_id,
-                s.nome as segmento_nome,
-                COUNT(DISTINCT e.id) as total_envios,
-                COUNT(DISTINCT m.contato_id) as total_contatos,
-                SUM(CASE WHEN m.status = 'entregue' THEN 1 ELSE 0 END) as entregues,
-                SUM(CASE WHEN m.status = 'aberto' THEN 1 ELSE 0 END) as abertos,
-                SUM(CASE WHEN m.status = 'clicado' THEN 1 ELSE 0 END) as clicados,
-                SUM(CASE WHEN m.status = 'respondido' THEN 1 ELSE 0 END) as respondidos
-            FROM segmentos s
-            LEFT JOIN envios e ON s.id = e.segmento_id
-            LEFT JOIN metricas_envio m ON e.id = m.envio_id
-            WHERE e.created_at >= %s
-            GROUP BY s.id, s.nome
-        """
-        
-        cursor.execute(query, (data_inicio,))
-        resultados = cursor.fetchall()
-        
-        # Calcular taxas
-        for resultado in resultados:
-            total = resultado['total_contatos'] or 1
-            resultado['taxa_entrega'] = round((resultado['entregues'] / total) * 100, 2)
-            resultado['taxa_abertura'] = round((resultado['abertos'] / total) * 100, 2)
-            resultado['taxa_clique'] = round((resultado['clicados'] / total) * 100, 2)
-            resultado['taxa_resposta'] = round((resultado['respondidos'] / total) * 100, 2)
-        
-        return jsonify(resultados), 200
-        
-    except Exception as e:
-        return jsonify({"error": f"Erro ao gerar métricas por segmento: {str(e)}"}), 500
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
+    except ValueError:
+        return jsonify({"error": "Período deve estar no formato '30d'"}), 400
+        
+    resultados = obter_metricas_segmentos(dias)
+    if resultados is None:
+        return jsonify({"error": "Erro ao gerar métricas por segmento"}), 500
+    
+    return jsonify(resultados), 200
 
 @metricas_bp.route('/contatos/<int:contato_id>', methods=['GET'])
 @swag_from({
@@ -284,46 +253,28 @@ def metricas_segmentos():
 })
 def metricas_contato(contato_id):
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
         # Verificar se contato existe
-        cursor.execute("SELECT * FROM contatos WHERE id = %s", (contato_id,))
-        contato = cursor.fetchone()
+        contato = repo_contatos.buscar(contato_id)
         
         if not contato:
             return jsonify({"error": "Contato não encontrado"}), 404
             
         # Buscar métricas do contato
-        query = """
-            SELECT 
-                e.id as envio_id,
-                e.created_at as data_envio,
-                m.status,
-                m.data_evento,
-                t.nome as template_nome,
-                s.nome as segmento_nome
-            FROM envios e
-            LEFT JOIN metricas_envio m ON e.id = m.envio_id
-            LEFT JOIN templates t ON e.template_id = t.id
-            LEFT JOIN segmentos s ON e.segmento_id = s.id
-            WHERE m.contato_id = %s
-            ORDER BY e.created_at DESC
-        """
-        
-        cursor.execute(query, (contato_id,))
-        historico = cursor.fetchall()
+        historico = repo_envios.historico_contato(contato_id)
         
         # Processar datas
         for evento in historico:
             evento['data_envio'] = evento['data_envio'].isoformat()
-            evento['data_evento'] = evento['data_evento'].isoformat()
+            evento['data_evento'] = evento['data_evento'].isoformat() if evento['data_evento'] else None
+            evento['template_nome'] = evento.pop('template')
+            evento['segmento_nome'] = evento.pop('segmento')
+            evento.pop('detalhes')
         
         # Calcular estatísticas
-        total_envios = len(historico)
-        aberturas = sum(1 for e in historico if e['status'] == 'aberto')
-        cliques = sum(1 for e in historico if e['status'] == 'clicado')
-        respostas = sum(1 for e in historico if e['status'] == 'respondido')
+        total_envios = len({e['envio_id'] for e in historico})
+        aberturas = len({e['envio_id'] for e in historico if e['status'] == 'aberto'})
+        cliques = len({e['envio_id'] for e in historico if e['status'] == 'clicado'})
+        respostas = len({e['envio_id'] for e in historico if e['status'] == 'respondido'})
         
         metricas = {
             "contato": contato,
@@ -340,17 +291,12 @@ def metricas_contato(contato_id):
         
     except Exception as e:
         return jsonify({"error": f"Erro ao buscar métricas do contato: {str(e)}"}), 500
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
 
 @metricas_bp.route('/', methods=['GET'])
 def obter_metricas():
     """Obtém métricas gerais do sistema."""
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(somente_leitura=True)
         cursor = conn.cursor(dictionary=True)
         
         # Total de contatos
@@ -435,9 +381,6 @@ def obter_metricas():
 def metricas_tracking():
     """Retorna métricas de tracking de emails."""
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
         # Obter período da consulta (padrão: últimos 30 dias)
         data_inicio = request.args.get('inicio')
         data_fim = request.args.get('fim')
@@ -447,19 +390,14 @@ def metricas_tracking():
         if not data_fim:
             data_fim = datetime.now().strftime('%Y-%m-%d')
             
+        # Período semiaberto sobre as colunas DATETIME, para usar os índices de data
+        try:
+            inicio, fim = intervalo_datas(data_inicio, data_fim)
+        except ValueError:
+            return jsonify({"erro": "Datas devem estar no formato AAAA-MM-DD"}), 400
+            
         # Consultar métricas de tracking
-        query = """
-            SELECT 
-                COUNT(DISTINCT CASE WHEN tipo_evento = 'abertura' THEN envio_id END) as total_aberturas,
-                COUNT(DISTINCT CASE WHEN tipo_evento = 'clique' THEN envio_id END) as total_cliques,
-                COUNT(DISTINCT envio_id) as total_eventos,
-                (SELECT COUNT(*) FROM envios WHERE status = 'enviado' AND DATE(data_envio) BETWEEN %s AND %s) as total_envios
-            FROM eventos_tracking
-            WHERE DATE(data_evento) BETWEEN %s AND %s
-        """
-        
-        cursor.execute(query, (data_inicio, data_fim, data_inicio, data_fim))
-        metricas = cursor.fetchone()
+        metricas = repo_eventos.resumo(inicio, fim)
         
         # Calcular taxas
         total_envios = metricas['total_envios'] or 1  # Evitar divisão por zero
@@ -467,18 +405,7 @@ def metricas_tracking():
         taxa_clique = (metricas['total_cliques'] / total_envios) * 100
         
         # Buscar eventos por hora do dia
-        query_horarios = """
-            SELECT 
-                HOUR(data_evento) as hora,
-                COUNT(*) as total
-            FROM eventos_tracking
-            WHERE DATE(data_evento) BETWEEN %s AND %s
-            GROUP BY HOUR(data_evento)
-            ORDER BY hora
-        """
-        
-        cursor.execute(query_horarios, (data_inicio, data_fim))
-        eventos_por_hora = cursor.fetchall()
+        eventos_por_hora = repo_eventos.por_hora(inicio, fim)
         
         return jsonify({
             "periodo": {
@@ -497,11 +424,6 @@ def metricas_tracking():
         
     except Exception as e:
         return jsonify({"erro": str(e)}), 500
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close() 
 
 @metricas_bp.route('/tracking/', methods=['GET'])
 @swag_from({
@@ -537,41 +459,19 @@ def metricas_tracking():
 })
 def metricas_tracking_detalhado():
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        
-        # Obter total de eventos e contagem por tipo
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_eventos,
-                SUM(CASE WHEN tipo_evento = 'abertura' THEN 1 ELSE 0 END) as aberturas,
-                SUM(CASE WHEN tipo_evento = 'clique' THEN 1 ELSE 0 END) as cliques,
-                SUM(CASE WHEN tipo_evento = 'resposta' THEN 1 ELSE 0 END) as respostas
-            FROM eventos_tracking
-        """)
-        
-        result = cursor.fetchone()
-        
-        # Obter período
-        cursor.execute("""
-            SELECT 
-                MIN(data_evento) as inicio,
-                MAX(data_evento) as fim
-            FROM eventos_tracking
-        """)
-        
-        periodo = cursor.fetchone()
+        # Total de eventos, contagem por tipo e período coberto
+        totais = repo_eventos.totais()
         
         metricas = {
-            "total_eventos": result[0],
+            "total_eventos": totais['total_eventos'],
             "eventos_por_tipo": {
-                "abertura": result[1] or 0,
-                "clique": result[2] or 0,
-                "resposta": result[3] or 0
+                "abertura": totais['aberturas'] or 0,
+                "clique": totais['cliques'] or 0,
+                "resposta": totais['respostas'] or 0
             },
             "periodo": {
-                "inicio": periodo[0].isoformat() if periodo[0] else None,
-                "fim": periodo[1].isoformat() if periodo[1] else None
+                "inicio": totais['inicio'].isoformat() if totais['inicio'] else None,
+                "fim": totais['fim'].isoformat() if totais['fim'] else None
             }
         }
         
@@ -580,8 +480,3 @@ def metricas_tracking_detalhado():
     except Exception as e:
         print(f"Erro ao obter métricas de tracking: {str(e)}")
         return jsonify({"error": "Erro ao obter métricas"}), 500
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
\ No newline at end of file
@@ -0,0 +1,170 @@
+import base64
+import json
+from datetime import date, datetime
+from urllib.parse import urlencode
+
+from flask import request, jsonify
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+# Parâmetros de query aceitos pelas listagens paginadas (documentação Swagger)
+PARAMETROS_PAGINACAO = [
+    {
+        "name": "limit",
+        "in": "query",
+        "type": "integer",
+        "required": False,
+        "description": f"Quantidade máxima de registros por página (padrão {LIMITE_PADRAO}, máximo {LIMITE_MAXIMO})"
+    },
+    {
+        "name": "after",
+        "in": "query",
+        "type": "string",
+        "required": False,
+        "description": "Cursor da próxima página, retornado no cabeçalho Link/X-Proximo-Cursor"
+    },
+    {
+        "name": "fields",
+        "in": "query",
+        "type": "string",
+        "required": False,
+        "description": "Campos a retornar, separados por vírgula (ex.: id,email,nome)"
+    }
+]
+
+
+class PaginacaoInvalida(ValueError):
+    """Parâmetros de paginação inválidos na requisição."""
+
+
+def colunas(alias, *nomes):
+    """Monta o mapa campo -> expressão SQL para colunas de uma mesma tabela."""
+    return {nome: f"{alias}.{nome}" if alias else nome for nome in nomes}
+
+
+# Campos de contato aceitos em fields= pelas listagens de contatos (alias 'c')
+CAMPOS_CONTATO = colunas('c', 'id', 'email', 'nome', 'cargo', 'empresa', 'telefone',
+                         'grupo', 'tags', 'status', 'created_at', 'updated_at')
+
+
+def codificar_cursor(valor_ordem, ultimo_id):
+    """Gera o cursor opaco da próxima página a partir da última linha retornada."""
+    if isinstance(valor_ordem, (datetime, date)):
+        valor_ordem = valor_ordem.isoformat(sep=' ') if isinstance(valor_ordem, datetime) else valor_ordem.isoformat()
+    dados = json.dumps([valor_ordem, ultimo_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Extrai (valor de ordenação, id) de um cursor gerado por codificar_cursor."""
+    try:
+        dados = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valor_ordem, ultimo_id = json.loads(dados)
+        return valor_ordem, int(ultimo_id)
+    except Exception:
+        raise PaginacaoInvalida("Cursor 'after' inválido")
+
+
+def ler_paginacao(campos):
+    """Lê e valida os parâmetros limit, after e fields da requisição atual."""
+    try:
+        limite = int(request.args.get('limit', LIMITE_PADRAO))
+    except ValueError:
+        raise PaginacaoInvalida("Parâmetro 'limit' deve ser um número inteiro")
+    if limite < 1 or limite > LIMITE_MAXIMO:
+        raise PaginacaoInvalida(f"Parâmetro 'limit' deve estar entre 1 e {LIMITE_MAXIMO}")
+
+    after = request.args.get('after')
+    posicao = decodificar_cursor(after) if after else None
+
+    selecionados = None
+    if request.args.get('fields'):
+        selecionados = [c.strip() for c in request.args['fields'].split(',') if c.strip()]
+        invalidos = [c for c in selecionados if c not in campos]
+        if invalidos:
+            raise PaginacaoInvalida(
+                f"Campos inválidos: {', '.join(invalidos)}. Disponíveis: {', '.join(campos)}"
+            )
+
+    return limite, posicao, selecionados
+
+
+def consultar_pagina(cursor, origem, campos, ordem='id', decrescente=False,
+                     condicoes=None, params=(), padrao=None):
+    """
+    Executa uma listagem paginada por cursor (keyset) sobre `origem`.
+
+    `campos` mapeia os nomes aceitos em `fields=` para expressões SQL e deve
+    conter `id`, usado como desempate da ordenação. Sem `fields=` a consulta
+    seleciona `padrao` (ex.: 'c.*') ou todos os campos do mapa. O cursor deve
+    ser de dicionário. Retorna (linhas, cursor_proxima_pagina ou None).
+    """
+    limite, posicao, selecionados = ler_paginacao(campos)
+
+    if selecionados:
+        nomes = list(dict.fromkeys(selecionados + [ordem, 'id']))
+        select = ', '.join(f"{campos[nome]} AS {nome}" for nome in nomes)
+    elif padrao:
+        select = padrao
+    else:
+        select = ', '.join(f"{expressao} AS {nome}" for nome, expressao in campos.items())
+
+    condicoes = list(condicoes or [])
+    params = list(params)
+    operador = '<' if decrescente else '>'
+    if posicao:
+        valor_ordem, ultimo_id = posicao
+        if ordem == 'id':
+            condicoes.append(f"{campos['id']} {operador} %s")
+            params.append(ultimo_id)
+        else:
+            condicoes.append(
+                f"({campos[ordem]} {operador} %s OR ({campos[ordem]} = %s AND {campos['id']} {operador} %s))"
+            )
+            params.extend([valor_ordem, valor_ordem, ultimo_id])
+
+    direcao = 'DESC' if decrescente else 'ASC'
+    query = f"SELECT {select} FROM {origem}"
+    if condicoes:
+        query += " WHERE " + " AND ".join(condicoes)
+    if ordem == 'id':
+        query += f" ORDER BY {campos['id']} {direcao}"
+    else:
+        query += f" ORDER BY {campos[ordem]} {direcao}, {campos['id']} {direcao}"
+    query += " LIMIT %s"
+    params.append(limite + 1)
+
+    cursor.execute(query, params)
+    linhas = cursor.fetchall()
+
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultima = linhas[-1]
+        proximo = codificar_cursor(ultima[ordem], ultima['id'])
+
+    if selecionados:
+        linhas = [{nome: linha[nome] for nome in selecionados} for linha in linhas]
+
+    return linhas, proximo
+
+
+def resposta_paginada(linhas, proximo, status=200):
+    """
+    Responde com a lista de registros; o cursor da próxima página vai nos
+    cabeçalhos Link (rel="next") e X-Proximo-Cursor.
+    """
+    resposta = jsonify(linhas)
+    resposta.status_code = status
+    if proximo:
+        args = request.args.to_dict()
+        args['after'] = proximo
+        resposta.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+        resposta.headers['X-Proximo-Cursor'] = proximo
+    return resposta
+
+
+def primeira_pagina():
+    """Indica se a requisição atual pede a primeira página da listagem."""
+    return not request.args.get('after')
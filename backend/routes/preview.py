@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, render_template_string
 from backend.config import get_db_connection
+from backend.services.renderizador import compilado_do_template, compilar
 from flasgger import swag_from
 import json
 
@@ -71,9 +72,9 @@ def preview_template(template_id):
         if not template:
             return jsonify({'error': 'Template não encontrado'}), 404
             
-        # Extrai todas as variáveis do template usando regex
-        import re
-        variaveis = re.findall(r'\{\{\s*(\w+)\s*\}\}', template['html_content'])
+        # Template compilado (em cache até ser alterado) e as variáveis que ele usa
+        compilado = compilado_do_template(template)
+        variaveis = compilado.variaveis
         
         # Gera dados de teste padrão para variáveis não fornecidas
         dados_completos = {
@@ -85,15 +86,12 @@ def preview_template(template_id):
         }
         dados_completos.update(dados_teste)
         
-        # Renderiza o template com os dados
-        html_content = template['html_content']
-        for var in variaveis:
-            valor = dados_completos.get(var, f'[{var}]')
-            html_content = html_content.replace(f'{{{{ {var} }}}}', str(valor))
+        # Renderiza o template com os dados; variáveis sem valor aparecem como [variavel]
+        html_content = compilado.renderizar(dados_completos, {var: f'[{var}]' for var in variaveis})
         
         return jsonify({
             'preview_html': html_content,
-            'variaveis_utilizadas': list(set(variaveis))
+            'variaveis_utilizadas': variaveis
         }), 200
         
     except Exception as e:
@@ -159,9 +157,9 @@ def preview_html():
     dados_teste = dados.get('dados_teste', {})
     
     try:
-        # Extrai todas as variáveis do template usando regex
-        import re
-        variaveis = re.findall(r'\{\{\s*(\w+)\s*\}\}', html_content)
+        # Compila o HTML e extrai as variáveis que ele usa
+        compilado = compilar(html_content)
+        variaveis = compilado.variaveis
         
         # Gera dados de teste padrão para variáveis não fornecidas
         dados_completos = {
@@ -173,14 +171,12 @@ def preview_html():
         }
         dados_completos.update(dados_teste)
         
-        # Renderiza o template com os dados
-        for var in variaveis:
-            valor = dados_completos.get(var, f'[{var}]')
-            html_content = html_content.replace(f'{{{{ {var} }}}}', str(valor))
+        # Renderiza o template com os dados; variáveis sem valor aparecem como [variavel]
+        html_content = compilado.renderizar(dados_completos, {var: f'[{var}]' for var in variaveis})
         
         return jsonify({
             'preview_html': html_content,
-            'variaveis_utilizadas': list(set(variaveis))
+            'variaveis_utilizadas': variaveis
         }), 200
         
     except Exception as e:
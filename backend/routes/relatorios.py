@@ -1,10 +1,8 @@
-from flask import Blueprint, request, jsonify, send_file
-from backend.config import get_db_connection
+from flask import Blueprint, request, jsonify
+from backend.database.streaming import consultar_em_fluxo
+from backend.routes.exportacao import resposta_csv
 from flasgger import swag_from
-from datetime import datetime, timedelta
-import csv
-import io
-import json
+from datetime import datetime
 
 relatorios_bp = Blueprint('relatorios', __name__)
 
@@ -38,9 +36,6 @@ relatorios_bp = Blueprint('relatorios', __name__)
 })
 def exportar_relatorio():
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
         # Processar parâmetros
         data_inicio = request.args.get('data_inicio')
         data_fim = request.args.get('data_fim')
@@ -78,29 +73,33 @@ def exportar_relatorio():
         query += " GROUP BY e.id, e.created_at, t.nome, s.nome, e.status"
         query += " ORDER BY e.created_at DESC"
         
-        cursor.execute(query, params)
-        resultados = cursor.fetchall()
-        
-        # Preparar dados CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
+        # As linhas são lidas do banco e escritas na resposta aos poucos
+        resultados = consultar_em_fluxo(query, params, somente_leitura=True)
         
-        # Cabeçalho
-        writer.writerow([
-            'Data Envio',
-            'Template',
-            'Segmento',
-            'Status Envio',
-            'Total Contatos',
-            'Entregues',
-            'Abertos',
-            'Clicados',
-            'Respondidos'
-        ])
+    except Exception as e:
+        return jsonify({"error": f"Erro ao gerar relatório: {str(e)}"}), 500
         
-        # Dados
+    cabecalho = [
+        'Data Envio',
+        'Template',
+        'Segmento',
+        'Status Envio',
+        'Total Contatos',
+        'Entregues',
+        'Abertos',
+        'Clicados',
+        'Respondidos'
+    ]
+    return resposta_csv(
+        cabecalho,
+        _linhas_csv(resultados),
+        f'relatorio_envios_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    )
+
+def _linhas_csv(resultados):
+    with resultados:
         for r in resultados:
-            writer.writerow([
+            yield [
                 r['data_envio'].strftime('%Y-%m-%d %H:%M:%S'),
                 r['template'],
                 r['segmento'],
@@ -110,21 +109,4 @@ def exportar_relatorio():
                 r['abertos'],
                 r['clicados'],
                 r['respondidos']
-            ])
-        
-        # Preparar resposta
-        output.seek(0)
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'relatorio_envios_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        )
-        
-    except Exception as e:
-        return jsonify({"error": f"Erro ao gerar relatório: {str(e)}"}), 500
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
+            ]
@@ -10,6 +10,7 @@ from backend.routes.tracking import tracking_bp
 from backend.routes.exportar_arq import exportar_bp
 from backend.routes.campanhas import campanhas_bp
 from backend.routes.envios import envios_bp
+from backend.routes.status import status_bp
 import logging
 import sys
 
@@ -81,6 +82,10 @@ def register_routes(app: Flask):
     app.register_blueprint(envios_bp, url_prefix='/api/envios')
     logger.debug("envios_bp registrado")
     
+    # Registrar blueprint de status
+    app.register_blueprint(status_bp, url_prefix='/api/status')
+    logger.debug("status_bp registrado")
+    
     # Listar todas as rotas registradas
     logger.debug("Rotas registradas:")
     for rule in app.url_map.iter_rules():
@@ -1,5 +1,10 @@
 from flask import Blueprint, request, jsonify
 from backend.config import get_db_connection
+from backend.routes.paginacao import (
+    PARAMETROS_PAGINACAO, CAMPOS_CONTATO, PaginacaoInvalida, consultar_pagina, resposta_paginada
+)
+from backend.repositorios import segmentos as repo_segmentos
+from backend.repositorios.contatos import condicoes_criterios
 from flasgger import swag_from
 import json
 
@@ -52,65 +57,30 @@ def criar_segmento():
         
     try:
         connection = get_db_connection()
-        cursor = connection.cursor()
         
-        # Insere o segmento
-        cursor.execute(
-            'INSERT INTO segmentos (nome, criterios, usuario_id) VALUES (%s, %s, %s)',
-            (dados['nome'], json.dumps(dados['criterios']), dados.get('usuario_id', 1))
-        )
-        
-        segmento_id = cursor.lastrowid
-        
-        # Busca contatos que atendem aos critérios
-        query = 'SELECT id FROM contatos WHERE 1=1'
-        params = []
-        
-        # Adiciona cada critério à query
-        for campo, valor in dados['criterios'].items():
-            if campo in ['id', 'email', 'nome', 'cargo', 'empresa', 'telefone', 'grupo', 'status']:
-                query += f' AND {campo} = %s'
-                params.append(valor)
-            elif campo == 'tags':
-                if isinstance(valor, list):
-                    # Se for uma lista de tags, procura por todas
-                    for tag in valor:
-                        query += ' AND tags LIKE %s'
-                        params.append(f'%{tag}%')
-                else:
-                    # Se for uma única tag
-                    query += ' AND tags LIKE %s'
-                    params.append(f'%{valor}%')
-        
-        cursor.execute(query, params)
-        contatos = cursor.fetchall()
-        
-        # Adiciona contatos ao segmento
-        for contato in contatos:
-            cursor.execute(
-                'INSERT INTO contatos_segmentos (contato_id, segmento_id) VALUES (%s, %s)',
-                (contato[0], segmento_id)
-            )
+        # Insere o segmento e associa, num único INSERT ... SELECT, os contatos que atendem aos critérios
+        segmento_id = repo_segmentos.criar(dados['nome'], criterios=dados['criterios'], connection=connection)
+        total_contatos = repo_segmentos.associar_por_criterios(segmento_id, dados['criterios'], connection)
         
         connection.commit()
         
         return jsonify({
             'message': 'Segmento criado com sucesso',
             'id': segmento_id,
-            'total_contatos': len(contatos)
+            'total_contatos': total_contatos
         }), 201
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
-        cursor.close()
-        connection.close()
+        if 'connection' in locals():
+            connection.close()
 
 @segmentacao_bp.route('/segmentos/<int:segmento_id>/contatos', methods=['GET'])
 @swag_from({
     "tags": ["Segmentação"],
     "summary": "Listar contatos do segmento",
-    "description": "Lista todos os contatos que se enquadram nas condições do segmento.",
+    "description": "Lista os contatos que se enquadram nas condições do segmento, paginados por cursor.",
     "parameters": [
         {
             "name": "segmento_id",
@@ -119,7 +89,7 @@ def criar_segmento():
             "type": "integer",
             "description": "ID do segmento"
         }
-    ],
+    ] + PARAMETROS_PAGINACAO,
     "responses": {
         200: {
             "description": "Lista de contatos do segmento",
@@ -148,48 +118,32 @@ def criar_segmento():
 })
 def listar_contatos_segmento(segmento_id):
     try:
-        connection = get_db_connection()
+        connection = get_db_connection(somente_leitura=True)
         cursor = connection.cursor(dictionary=True)
         
         # Busca o segmento
-        cursor.execute('SELECT * FROM segmentos WHERE id = %s', (segmento_id,))
-        segmento = cursor.fetchone()
+        segmento = repo_segmentos.buscar(segmento_id, connection)
         
         if not segmento:
             return jsonify({'error': 'Segmento não encontrado'}), 404
             
         # Constrói a query baseada nos critérios
-        criterios = json.loads(segmento['criterios'])
+        criterios = json.loads(segmento['criterios']) if segmento['criterios'] else {}
+        condicoes, params = condicoes_criterios(criterios)
         
-        query = 'SELECT * FROM contatos WHERE 1=1'
-        params = []
-        
-        # Adiciona cada critério à query
-        for campo, valor in criterios.items():
-            if campo in ['id', 'email', 'nome', 'cargo', 'empresa', 'telefone', 'grupo', 'status']:
-                query += f' AND {campo} = %s'
-                params.append(valor)
-            elif campo == 'tags':
-                if isinstance(valor, list):
-                    # Se for uma lista de tags, procura por todas
-                    for tag in valor:
-                        query += ' AND tags LIKE %s'
-                        params.append(f'%{tag}%')
-                else:
-                    # Se for uma única tag
-                    query += ' AND tags LIKE %s'
-                    params.append(f'%{valor}%')
-        
-        cursor.execute(query, params)
-        contatos = cursor.fetchall()
+        contatos, proximo = consultar_pagina(
+            cursor, 'contatos c', CAMPOS_CONTATO, condicoes=condicoes, params=params, padrao='c.*'
+        )
         
         # Converte as tags de JSON string para lista
         for contato in contatos:
-            if contato['tags']:
+            if contato.get('tags'):
                 contato['tags'] = json.loads(contato['tags'])
         
-        return jsonify(contatos), 200
+        return resposta_paginada(contatos, proximo)
         
+    except PaginacaoInvalida as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -212,7 +166,6 @@ def listar_contatos_segmento(segmento_id):
                         "id": {"type": "integer"},
                         "nome": {"type": "string"},
                         "criterios": {"type": "object"},
-                        "usuario_id": {"type": "integer"},
                         "created_at": {"type": "string", "format": "date-time"}
                     }
                 }
@@ -223,19 +176,9 @@ def listar_contatos_segmento(segmento_id):
 })
 def listar_segmentos():
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        cursor.execute('SELECT * FROM segmentos ORDER BY created_at DESC')
-        segmentos = cursor.fetchall()
-        
-        return jsonify(segmentos), 200
-        
+        return jsonify(repo_segmentos.listar()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        connection.close()
 
 @segmentacao_bp.route('/segmentos/criterios', methods=['GET'])
 @swag_from({
@@ -333,43 +276,18 @@ def atualizar_segmento(segmento_id):
         return jsonify({'error': 'Dados não fornecidos'}), 400
         
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        
         # Verifica se o segmento existe
-        cursor.execute('SELECT id FROM segmentos WHERE id = %s', (segmento_id,))
-        if not cursor.fetchone():
+        if not repo_segmentos.existe(segmento_id):
             return jsonify({'error': 'Segmento não encontrado'}), 404
             
-        # Atualiza o segmento
-        update_fields = []
-        values = []
-        
-        if 'nome' in dados:
-            update_fields.append('nome = %s')
-            values.append(dados['nome'])
-            
-        if 'criterios' in dados:
-            update_fields.append('criterios = %s')
-            values.append(json.dumps(dados['criterios']))
-            
-        if not update_fields:
+        campos = {campo: dados[campo] for campo in ('nome', 'criterios') if campo in dados}
+        if not repo_segmentos.atualizar(segmento_id, campos):
             return jsonify({'error': 'Nenhum campo para atualizar'}), 400
-            
-        values.append(segmento_id)
-        
-        query = f"UPDATE segmentos SET {', '.join(update_fields)} WHERE id = %s"
-        cursor.execute(query, values)
-        
-        connection.commit()
         
         return jsonify({'message': 'Segmento atualizado com sucesso'}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        connection.close()
 
 @segmentacao_bp.route('/segmentos/<int:segmento_id>', methods=['DELETE'])
 @swag_from({
@@ -401,22 +319,11 @@ def atualizar_segmento(segmento_id):
 })
 def remover_segmento(segmento_id):
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        
-        # Verifica se o segmento existe
-        cursor.execute('SELECT id FROM segmentos WHERE id = %s', (segmento_id,))
-        if not cursor.fetchone():
+        # Remove as associações com contatos e o segmento
+        if not repo_segmentos.remover(segmento_id):
             return jsonify({'error': 'Segmento não encontrado'}), 404
-            
-        # Remove o segmento
-        cursor.execute('DELETE FROM segmentos WHERE id = %s', (segmento_id,))
-        connection.commit()
         
         return jsonify({'message': 'Segmento removido com sucesso'}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        connection.close() 
\ No newline at end of file
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from backend.config import get_db_connection
+from backend.routes.paginacao import (
+    PARAMETROS_PAGINACAO, CAMPOS_CONTATO, PaginacaoInvalida, consultar_pagina, resposta_paginada, primeira_pagina
+)
+from backend.repositorios import segmentos as repo_segmentos
 from flasgger import swag_from
-import json
 
 segmentos_bp = Blueprint('segmentos', __name__)
 
@@ -31,19 +34,10 @@ segmentos_bp = Blueprint('segmentos', __name__)
 })
 def listar_segmentos():
     """Lista todos os segmentos registrados no banco de dados."""
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-
-    cursor.execute("""
-        SELECT s.*, COUNT(cs.contato_id) as total_contatos
-        FROM segmentos s
-        LEFT JOIN contatos_segmentos cs ON s.id = cs.segmento_id
-        GROUP BY s.id
-    """)
-    segmentos = cursor.fetchall()
-
-    cursor.close()
-    connection.close()
+    try:
+        segmentos = repo_segmentos.listar()
+    except Exception as e:
+        return jsonify({"error": f"Erro ao listar segmentos: {str(e)}"}), 500
 
     if not segmentos:
         return jsonify({"message": "Nenhum segmento encontrado."}), 404
@@ -97,34 +91,7 @@ def criar_segmento():
         }), 400
     
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        
-        # Preparar campos
-        campos = ['nome']
-        valores = [dados['nome']]
-        placeholders = ['%s']
-        
-        # Adicionar campos opcionais
-        if 'descricao' in dados and dados['descricao'] is not None:
-            campos.append('descricao')
-            valores.append(dados['descricao'])
-            placeholders.append('%s')
-            
-        if 'criterios' in dados and dados['criterios'] is not None:
-            campos.append('criterios')
-            valores.append(json.dumps(dados['criterios']))
-            placeholders.append('%s')
-        
-        # Construir query
-        query = f"""
-            INSERT INTO segmentos ({', '.join(campos)})
-            VALUES ({', '.join(placeholders)})
-        """
-        
-        cursor.execute(query, valores)
-        segmento_id = cursor.lastrowid
-        connection.commit()
+        segmento_id = repo_segmentos.criar(dados['nome'], dados.get('descricao'), dados.get('criterios'))
         
         return jsonify({
             "id": segmento_id,
@@ -133,12 +100,6 @@ def criar_segmento():
         
     except Exception as e:
         return jsonify({"error": f"Erro ao criar segmento: {str(e)}"}), 500
-        
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
 
 @segmentos_bp.route('/<int:id>', methods=['PUT'])
 @swag_from({
@@ -181,56 +142,17 @@ def atualizar_segmento(id):
         return jsonify({"error": "Nenhum dado fornecido para atualização"}), 400
     
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        
         # Verificar se o segmento existe
-        cursor.execute("SELECT id FROM segmentos WHERE id = %s", (id,))
-        if not cursor.fetchone():
+        if not repo_segmentos.existe(id):
             return jsonify({"error": "Segmento não encontrado"}), 404
         
-        # Preparar campos para atualização
-        campos = []
-        valores = []
-        
-        if 'nome' in dados:
-            campos.append("nome = %s")
-            valores.append(dados['nome'])
-            
-        if 'descricao' in dados:
-            campos.append("descricao = %s")
-            valores.append(dados['descricao'])
-            
-        if 'criterios' in dados:
-            campos.append("criterios = %s")
-            valores.append(json.dumps(dados['criterios']))
-        
-        if not campos:
+        if not repo_segmentos.atualizar(id, dados):
             return jsonify({"error": "Nenhum campo para atualizar"}), 400
         
-        # Adicionar ID aos valores
-        valores.append(id)
-        
-        # Construir query
-        query = f"""
-            UPDATE segmentos 
-            SET {', '.join(campos)}
-            WHERE id = %s
-        """
-        
-        cursor.execute(query, valores)
-        connection.commit()
-        
         return jsonify({"message": "Segmento atualizado com sucesso"}), 200
         
     except Exception as e:
         return jsonify({"error": f"Erro ao atualizar segmento: {str(e)}"}), 500
-        
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
 
 @segmentos_bp.route('/<int:id>', methods=['DELETE'])
 @swag_from({
@@ -255,37 +177,20 @@ def atualizar_segmento(id):
 def remover_segmento(id):
     """Remove um segmento do sistema."""
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        
-        # Verificar se o segmento existe
-        cursor.execute("SELECT id FROM segmentos WHERE id = %s", (id,))
-        if not cursor.fetchone():
+        # Remove as associações com contatos e o segmento
+        if not repo_segmentos.remover(id):
             return jsonify({"error": "Segmento não encontrado"}), 404
         
-        # Remover associações com contatos
-        cursor.execute("DELETE FROM contatos_segmentos WHERE segmento_id = %s", (id,))
-        
-        # Remover o segmento
-        cursor.execute("DELETE FROM segmentos WHERE id = %s", (id,))
-        connection.commit()
-        
         return jsonify({"message": "Segmento removido com sucesso"}), 200
         
     except Exception as e:
         return jsonify({"error": f"Erro ao remover segmento: {str(e)}"}), 500
-        
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
 
 @segmentos_bp.route('/<int:id>/contatos', methods=['GET'])
 @swag_from({
     "tags": ["Segmentos"],
     "summary": "Listar contatos do segmento",
-    "description": "Retorna todos os contatos associados a um segmento.",
+    "description": "Retorna os contatos associados a um segmento, paginados por cursor.",
     "parameters": [
         {
             "name": "id",
@@ -294,7 +199,7 @@ def remover_segmento(id):
             "required": True,
             "description": "ID do segmento"
         }
-    ],
+    ] + PARAMETROS_PAGINACAO,
     "responses": {
         200: {
             "description": "Lista de contatos do segmento",
@@ -319,30 +224,31 @@ def remover_segmento(id):
     }
 })
 def listar_contatos_segmento(id):
-    """Lista todos os contatos associados a um segmento."""
-    connection = get_db_connection()
+    """Lista os contatos associados a um segmento, em ordem de id."""
+    connection = get_db_connection(somente_leitura=True)
     cursor = connection.cursor(dictionary=True)
 
-    # Verificar se o segmento existe
-    cursor.execute("SELECT id FROM segmentos WHERE id = %s", (id,))
-    if not cursor.fetchone():
+    try:
+        # Verificar se o segmento existe
+        if not repo_segmentos.existe(id, connection):
+            return jsonify({"error": "Segmento não encontrado"}), 404
+
+        # Buscar contatos do segmento
+        contatos, proximo = consultar_pagina(
+            cursor,
+            "contatos c JOIN contatos_segmentos cs ON c.id = cs.contato_id",
+            CAMPOS_CONTATO,
+            condicoes=["cs.segmento_id = %s"],
+            params=(id,),
+            padrao='c.*'
+        )
+    except PaginacaoInvalida as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
         cursor.close()
         connection.close()
-        return jsonify({"error": "Segmento não encontrado"}), 404
-
-    # Buscar contatos do segmento
-    cursor.execute("""
-        SELECT c.* 
-        FROM contatos c
-        JOIN contatos_segmentos cs ON c.id = cs.contato_id
-        WHERE cs.segmento_id = %s
-    """, (id,))
-    contatos = cursor.fetchall()
-
-    cursor.close()
-    connection.close()
 
-    if not contatos:
+    if not contatos and primeira_pagina():
         return jsonify({"message": "Nenhum contato encontrado neste segmento."}), 404
 
-    return jsonify(contatos), 200 
\ No newline at end of file
+    return resposta_paginada(contatos, proximo) 
\ No newline at end of file
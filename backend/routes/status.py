@@ -1,5 +1,14 @@
 from flask import Blueprint, jsonify
 from backend.config import get_db_connection
+from backend.database import estatisticas_pool, estatisticas_replicas, estatisticas_preparadas, estatisticas_consultas
+from backend.services.smtp_pool import estatisticas_smtp
+from backend.services.api_transporte import estatisticas_api
+from backend.services.cache_integracoes import estatisticas_cache_integracoes
+from backend.services.motor_envio import estatisticas_motores
+from backend.services.controle_dominios import estatisticas_dominios
+from backend.services.limite_provedor import estatisticas_limites
+from backend.services.saude_integracoes import estatisticas_saude
+from backend.services.renderizador import estatisticas_templates
 from flasgger import swag_from
 
 status_bp = Blueprint('status', __name__)
@@ -16,7 +25,19 @@ status_bp = Blueprint('status', __name__)
                 "type": "object",
                 "properties": {
                     "smtp": {"type": "string", "enum": ["configured", "not_configured"]},
-                    "webhook": {"type": "string", "enum": ["configured", "not_configured"]}
+                    "webhook": {"type": "string", "enum": ["configured", "not_configured"]},
+                    "pool_db": {"type": "object"},
+                    "replicas_db": {"type": "object"},
+                    "preparadas_db": {"type": "object"},
+                    "consultas_db": {"type": "array", "items": {"type": "object"}},
+                    "smtp_pool": {"type": "array", "items": {"type": "object"}},
+                    "api_transporte": {"type": "array", "items": {"type": "object"}},
+                    "cache_integracoes": {"type": "object"},
+                    "motores_envio": {"type": "array", "items": {"type": "object"}},
+                    "dominios_envio": {"type": "array", "items": {"type": "object"}},
+                    "limites_provedor": {"type": "array", "items": {"type": "object"}},
+                    "saude_integracoes": {"type": "array", "items": {"type": "object"}},
+                    "templates_compilados": {"type": "object"}
                 }
             }
         }
@@ -48,6 +69,31 @@ def verificar_status():
         cursor.close()
         connection.close()
 
+        # Estatísticas do pool de conexões (uso e tempo de espera)
+        status['pool_db'] = estatisticas_pool()
+        # Roteamento de leituras: atraso e uso de cada réplica e quedas para o primário
+        status['replicas_db'] = estatisticas_replicas()
+        # Instruções preparadas: preparos no servidor e execuções que os reaproveitaram
+        status['preparadas_db'] = estatisticas_preparadas()
+        # Consultas nomeadas dos repositórios que mais somam tempo
+        status['consultas_db'] = estatisticas_consultas()
+        # Sessões SMTP por integração: conexões abertas, reusos e reconexões
+        status['smtp_pool'] = estatisticas_smtp()
+        # Sessões HTTP das integrações por API: requisições, conexões reaproveitadas e Retry-After
+        status['api_transporte'] = estatisticas_api()
+        # Integrações ativas em cache: acertos, leituras do banco e invalidações locais e via Redis
+        status['cache_integracoes'] = estatisticas_cache_integracoes()
+        # Envios concorrentes por integração: limite, em andamento e pico
+        status['motores_envio'] = estatisticas_motores()
+        # Domínios de destino com mais envios: em andamento, adiamentos e pausa restante
+        status['dominios_envio'] = estatisticas_dominios()
+        # Limites por integração: fichas pedidas ao Redis, esperas e cota diária esgotada
+        status['limites_provedor'] = estatisticas_limites()
+        # Disjuntor de cada integração (fechado, aberto, meio_aberto), nota, taxa de erros e latência
+        status['saude_integracoes'] = estatisticas_saude()
+        # Templates compilados em cache: acertos e compilações
+        status['templates_compilados'] = estatisticas_templates()
+
         return jsonify(status), 200
 
     except Exception as e:
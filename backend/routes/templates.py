@@ -1,5 +1,9 @@
 from flask import Blueprint, jsonify, request
 from backend.config import get_db_connection
+from backend.repositorios import templates as repo_templates
+from backend.routes.paginacao import (
+    PARAMETROS_PAGINACAO, PaginacaoInvalida, colunas, consultar_pagina, resposta_paginada, primeira_pagina
+)
 from flasgger import swag_from
 import json
 
@@ -9,7 +13,8 @@ templates_bp = Blueprint('templates', __name__)
 @swag_from({
     "tags": ["Templates"],
     "summary": "Listar templates",
-    "description": "Retorna todos os templates cadastrados no sistema.",
+    "description": "Retorna os templates cadastrados no sistema, paginados por cursor. Use fields= para omitir o HTML.",
+    "parameters": PARAMETROS_PAGINACAO,
     "responses": {
         200: {
             "description": "Lista de templates",
@@ -32,20 +37,29 @@ templates_bp = Blueprint('templates', __name__)
     }
 })
 def listar_templates():
-    """Lista todos os templates registrados no banco de dados."""
-    connection = get_db_connection()
+    """Lista os templates registrados no banco de dados, do mais recente ao mais antigo."""
+    connection = get_db_connection(somente_leitura=True)
     cursor = connection.cursor(dictionary=True)
 
-    cursor.execute("SELECT * FROM templates ORDER BY created_at DESC")
-    templates = cursor.fetchall()
-
-    cursor.close()
-    connection.close()
+    try:
+        templates, proximo = consultar_pagina(
+            cursor,
+            'templates t',
+            colunas('t', 'id', 'nome', 'descricao', 'html_content', 'css_content', 'created_at', 'updated_at'),
+            ordem='created_at',
+            decrescente=True,
+            padrao='t.*'
+        )
+    except PaginacaoInvalida as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        cursor.close()
+        connection.close()
 
-    if not templates:
+    if not templates and primeira_pagina():
         return jsonify({"message": "Nenhum template encontrado."}), 404
 
-    return jsonify(templates), 200
+    return resposta_paginada(templates, proximo)
 
 @templates_bp.route('/', methods=['POST'])
 @swag_from({
@@ -211,6 +225,9 @@ def atualizar_template(id):
         if not campos:
             return jsonify({"error": "Nenhum campo para atualizar"}), 400
         
+        # updated_at identifica a versão do template compilado em cache
+        campos.append("updated_at = CURRENT_TIMESTAMP")
+        
         # Adicionar ID aos valores
         valores.append(id)
         
@@ -258,25 +275,10 @@ def atualizar_template(id):
 def remover_template(id):
     """Remove um template do sistema."""
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        
-        # Verificar se o template existe
-        cursor.execute("SELECT id FROM templates WHERE id = %s", (id,))
-        if not cursor.fetchone():
+        if not repo_templates.remover(id):
             return jsonify({"error": "Template não encontrado"}), 404
-        
-        # Remover o template
-        cursor.execute("DELETE FROM templates WHERE id = %s", (id,))
-        connection.commit()
-        
+
         return jsonify({"message": "Template removido com sucesso"}), 200
-        
+
     except Exception as e:
         return jsonify({"error": f"Erro ao remover template: {str(e)}"}), 500
-        
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
@@ -1,64 +1,29 @@
 from flask import Blueprint, request, jsonify, send_file, Response, redirect
-from backend.config import get_db_connection
+from backend.database import conexao_db
+from backend.repositorios import envios as repo_envios
 from flasgger import swag_from
-import json
-from datetime import datetime
-import base64
-import hashlib
-import hmac
-import os
 from backend.tasks import registrar_evento_tracking_sync
+from backend.utils import validar_token_tracking, validar_url
 
 tracking_bp = Blueprint('tracking', __name__)
 
-def verificar_envio_existe(envio_id):
-    """Verifica se um envio existe no banco de dados"""
+# Pixel transparente 1x1
+PIXEL_GIF = b'GIF87a\x01\x00\x01\x00\x80\x01\x00\x00\x00\x00ccc,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+
+def verificar_envio_existe(envio_id, connection=None):
+    """
+    Verifica se um envio existe no banco de dados.
+    Reutiliza `connection` quando fornecida, senão empresta uma do pool.
+    """
     try:
         print(f"Verificando envio com ID: {envio_id}")
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        query = "SELECT id FROM envios WHERE id = %s"
-        print(f"Executando query: {query} com parâmetro: {envio_id}")
-        cursor.execute(query, (envio_id,))
-        resultado = cursor.fetchone()
+        resultado = repo_envios.existe(envio_id, connection)
         print(f"Resultado da consulta: {resultado}")
-        cursor.close()
-        connection.close()
-        return resultado is not None
+        return resultado
     except Exception as e:
         print(f"Erro ao verificar envio: {str(e)}")
         return False
 
-def gerar_token_tracking(envio_id, email_id, tipo):
-    """Gera um token seguro para tracking"""
-    chave = os.environ.get('SECRET_KEY', 'chave-secreta-padrao')
-    dados = f"{envio_id}:{email_id}:{tipo}:{datetime.now().strftime('%Y%m%d')}"
-    assinatura = hmac.new(chave.encode(), dados.encode(), hashlib.sha256).hexdigest()
-    token = base64.urlsafe_b64encode(f"{dados}:{assinatura}".encode()).decode()
-    return token
-
-def validar_token_tracking(token):
-    """Valida e extrai informações do token de tracking"""
-    try:
-        chave = os.environ.get('SECRET_KEY', 'chave-secreta-padrao')
-        dados_token = base64.urlsafe_b64decode(token.encode()).decode()
-        dados, assinatura = dados_token.rsplit(':', 1)
-        
-        # Verificar assinatura
-        assinatura_esperada = hmac.new(chave.encode(), dados.encode(), hashlib.sha256).hexdigest()
-        if not hmac.compare_digest(assinatura, assinatura_esperada):
-            return None
-            
-        envio_id, email_id, tipo, data = dados.split(':')
-        return {
-            'envio_id': int(envio_id),
-            'email_id': int(email_id),
-            'tipo': tipo,
-            'data': data
-        }
-    except Exception:
-        return None
-
 @tracking_bp.route('/pixel/<int:envio_id>')
 @swag_from({
     "tags": ["Tracking"],
@@ -81,19 +46,22 @@ def validar_token_tracking(token):
 def pixel_tracking(envio_id):
     try:
         print(f"Recebida requisição para tracking de pixel com envio_id: {envio_id}")
-        # Verificar se o envio existe
-        if not verificar_envio_existe(envio_id):
-            print("Envio não encontrado")
-            return Response(status=404)
-            
-        print("Envio encontrado, registrando evento de tracking")
-        # Registrar evento de tracking
-        success = registrar_evento_tracking_sync(
-            envio_id=envio_id,
-            tipo_evento='abertura',
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent')
-        )
+        # Verificação e registro usam a mesma conexão do pool
+        with conexao_db() as connection:
+            # Verificar se o envio existe
+            if not verificar_envio_existe(envio_id, connection):
+                print("Envio não encontrado")
+                return Response(status=404)
+
+            print("Envio encontrado, registrando evento de tracking")
+            # Registrar evento de tracking
+            success = registrar_evento_tracking_sync(
+                envio_id=envio_id,
+                tipo_evento='abertura',
+                ip_address=request.remote_addr,
+                user_agent=request.headers.get('User-Agent'),
+                connection=connection
+            )
         
         if not success:
             print("Erro ao registrar evento de tracking")
@@ -101,8 +69,7 @@ def pixel_tracking(envio_id):
         
         print("Evento registrado com sucesso, retornando pixel")
         # Retornar pixel transparente 1x1
-        pixel_gif = b'GIF87a\x01\x00\x01\x00\x80\x01\x00\x00\x00\x00ccc,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
-        return Response(pixel_gif, mimetype='image/gif')
+        return Response(PIXEL_GIF, mimetype='image/gif')
         
     except Exception as e:
         print(f"Erro no tracking de pixel: {str(e)}")
@@ -136,25 +103,119 @@ def pixel_tracking(envio_id):
 })
 def click_tracking(envio_id, url):
     try:
-        # Verificar se o envio existe
-        if not verificar_envio_existe(envio_id):
-            return Response(status=404)
-            
-        # Registrar evento de tracking
+        with conexao_db() as connection:
+            # Verificar se o envio existe
+            if not verificar_envio_existe(envio_id, connection):
+                return Response(status=404)
+
+            # Registrar evento de tracking
+            success = registrar_evento_tracking_sync(
+                envio_id=envio_id,
+                tipo_evento='clique',
+                ip_address=request.remote_addr,
+                user_agent=request.headers.get('User-Agent'),
+                url=url,
+                connection=connection
+            )
+        
+        if not success:
+            return Response(status=500)
+        
+        # Redirecionar para URL original
+        return redirect(url)
+        
+    except Exception as e:
+        print(f"Erro no tracking de clique: {str(e)}")
+        return Response(status=500)
+
+@tracking_bp.route('/pixel/<token>')
+@swag_from({
+    "tags": ["Tracking"],
+    "summary": "Registra abertura de email usando o token do pixel",
+    "description": "Endpoint do pixel inserido nos emails enviados; o token identifica envio e contato",
+    "parameters": [
+        {
+            "name": "token",
+            "in": "path",
+            "type": "string",
+            "required": True,
+            "description": "Token de tracking de abertura"
+        }
+    ],
+    "responses": {
+        200: {"description": "Pixel de tracking"},
+        404: {"description": "Token inválido"}
+    }
+})
+def pixel_token(token):
+    dados = validar_token_tracking(token)
+    if not dados or dados['tipo'] != 'abertura':
+        return Response(status=404)
+    try:
         success = registrar_evento_tracking_sync(
-            envio_id=envio_id,
+            envio_id=dados['envio_id'],
+            tipo_evento='abertura',
+            ip_address=request.remote_addr,
+            user_agent=request.headers.get('User-Agent'),
+            contato_id=dados['contato_id']
+        )
+        if not success:
+            return Response(status=500)
+        return Response(PIXEL_GIF, mimetype='image/gif')
+    except Exception as e:
+        print(f"Erro no tracking de pixel: {str(e)}")
+        return Response(status=500)
+
+@tracking_bp.route('/click/<token>')
+@swag_from({
+    "tags": ["Tracking"],
+    "summary": "Registra clique em link usando o token do link",
+    "description": "Endpoint dos links reescritos nos emails enviados; redireciona para o parâmetro url, se a assinatura h conferir",
+    "parameters": [
+        {
+            "name": "token",
+            "in": "path",
+            "type": "string",
+            "required": True,
+            "description": "Token de tracking de clique"
+        },
+        {
+            "name": "url",
+            "in": "query",
+            "type": "string",
+            "required": True,
+            "description": "URL original do link"
+        },
+        {
+            "name": "h",
+            "in": "query",
+            "type": "string",
+            "required": True,
+            "description": "Assinatura da URL, gerada junto com o link"
+        }
+    ],
+    "responses": {
+        302: {"description": "Redirecionamento para URL original"},
+        404: {"description": "Token inválido ou expirado, ou URL sem assinatura válida"}
+    }
+})
+def click_token(token):
+    dados = validar_token_tracking(token)
+    url = request.args.get('url')
+    if not dados or dados['tipo'] != 'clique' or not validar_url(url, request.args.get('h')):
+        return Response(status=404)
+    try:
+        success = registrar_evento_tracking_sync(
+            envio_id=dados['envio_id'],
             tipo_evento='clique',
             ip_address=request.remote_addr,
             user_agent=request.headers.get('User-Agent'),
-            url=url
+            url=url,
+            contato_id=dados['contato_id']
         )
-        
         if not success:
             return Response(status=500)
-        
-        # Redirecionar para URL original
         return redirect(url)
-        
     except Exception as e:
         print(f"Erro no tracking de clique: {str(e)}")
         return Response(status=500)
@@ -188,7 +249,8 @@ def tracking_resposta(token):
             envio_id=dados['envio_id'],
             tipo_evento='resposta',
             ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent')
+            user_agent=request.headers.get('User-Agent'),
+            contato_id=dados['contato_id']
         )
         
         if not success:
@@ -1,10 +1,44 @@
 from backend.config import get_db_connection
-from backend.services.email_service import send_email
+from backend.services.email_service import LoteEnvio
+from backend.database import BufferEscrita
+from backend.database.consultas import registrar_consulta
+from backend.repositorios import contatos as repo_contatos
+from backend.services.audiencias import audiencia_de
+from backend.services.renderizador import campos_do_contato, template_compilado
 import json
 from datetime import datetime
 import time
 import traceback
 
+QUERY_AGENDAMENTOS_PENDENTES = registrar_consulta('agendamentos.pendentes', """
+    SELECT 
+        a.*,
+        t.html_content as template_html,
+        t.updated_at as template_updated_at
+    FROM agendamentos a
+    JOIN templates t ON a.template_id = t.id
+    JOIN segmentos s ON a.segmento_id = s.id
+    WHERE a.status = 'agendado'
+    AND a.data_envio <= NOW()
+""")
+
+# Contatos lidos por consulta de página
+TAMANHO_PAGINA = 500
+
+def contatos_em_paginas(audiencia, tamanho=TAMANHO_PAGINA):
+    """
+    Contatos ativos da audiência em ordem de id, uma página por consulta.
+    Nenhuma leitura fica aberta durante o envio, que pode passar minutos
+    esperando os limites e adiamentos por domínio do LoteEnvio.
+    """
+    apos_id = 0
+    while True:
+        pagina = repo_contatos.ativos_da_audiencia(audiencia, apos_id, tamanho)
+        yield from pagina
+        if len(pagina) < tamanho:
+            return
+        apos_id = pagina[-1]['id']
+
 def processar_agendamentos():
     """
     Processa os agendamentos pendentes, enviando os emails agendados
@@ -17,19 +51,7 @@ def processar_agendamentos():
         cursor = connection.cursor(dictionary=True)
         
         # Buscar agendamentos pendentes
-        query = """
-            SELECT 
-                a.*,
-                t.html_content as template_html,
-                s.criterios as segmento_criterios
-            FROM agendamentos a
-            JOIN templates t ON a.template_id = t.id
-            JOIN segmentos s ON a.segmento_id = s.id
-            WHERE a.status = 'agendado'
-            AND a.data_envio <= NOW()
-        """
-        
-        cursor.execute(query)
+        cursor.execute(QUERY_AGENDAMENTOS_PENDENTES)
         agendamentos = cursor.fetchall()
         
         print(f"Encontrados {len(agendamentos)} agendamentos para processar")
@@ -38,66 +60,43 @@ def processar_agendamentos():
             print(f"\nProcessando agendamento {agendamento['id']}")
             
             try:
-                # Buscar contatos do segmento
-                criterios = json.loads(agendamento['segmento_criterios'])
-                query = 'SELECT * FROM contatos WHERE 1=1'
-                params = []
-                
-                for campo, valor in criterios.items():
-                    if campo in ['id', 'status']:
-                        query += f' AND {campo} = %s'
-                        params.append(valor)
-                    elif campo in ['email', 'nome', 'cargo', 'empresa', 'telefone', 'grupo']:
-                        query += f' AND LOWER({campo}) LIKE LOWER(%s)'
-                        params.append(f'%{valor}%')
-                    elif campo == 'tags':
-                        if isinstance(valor, list):
-                            for tag in valor:
-                                query += ' AND tags LIKE %s'
-                                params.append(f'%{tag}%')
-                        else:
-                            query += ' AND tags LIKE %s'
-                            params.append(f'%{valor}%')
-                
-                cursor.execute(query, params)
-                contatos = cursor.fetchall()
-                
-                print(f"Encontrados {len(contatos)} contatos para envio")
+                # Os contatos são lidos em páginas por id, sem carregar o
+                # segmento inteiro em memória. Só com segmento_id a audiência
+                # é esse segmento sozinho: a união e as exclusões são
+                # resolvidas numa só consulta, cada contato uma vez
+                contatos = contatos_em_paginas(audiencia_de(agendamento))
                 
                 # Enviar emails
                 dados_padrao = json.loads(agendamento['dados_padrao']) if agendamento['dados_padrao'] else {}
-                emails_enviados = []
+                # Template compilado uma vez, em cache enquanto não for alterado
+                template = template_compilado(
+                    agendamento['template_id'], agendamento['template_updated_at'], agendamento['template_html']
+                )
+                total_contatos = 0
+                emails_enviados = 0
+                
+                # Os registros de envio são gravados em lote, um commit por lote,
+                # com o resultado de cada destinatário
+                envios = BufferEscrita('envios', ['contato_id', 'template_id', 'segmento_id', 'status', 'erro', 'mensagem_id'])
+                
+                def registrar_envio(contato, sucesso, detalhe):
+                    nonlocal emails_enviados
+                    emails_enviados += sucesso
+                    envios.adicionar(
+                        contato['id'], agendamento['template_id'], agendamento['segmento_id'],
+                        'enviado' if sucesso else 'erro',
+                        None if sucesso else detalhe,
+                        detalhe if sucesso else None
+                    )
                 
-                for contato in contatos:
-                    # Combinar dados padrão com dados do contato
-                    dados_template = dados_padrao.copy()
-                    dados_template.update({
-                        'nome': contato['nome'],
-                        'email': contato['email'],
-                        'cargo': contato['cargo'],
-                        'empresa': contato['empresa']
-                    })
-                    
-                    # Substituir campos dinâmicos
-                    mensagem = agendamento['template_html']
-                    for campo, valor in dados_template.items():
-                        if valor is not None:
-                            mensagem = mensagem.replace(f"{{{{ {campo} }}}}", str(valor))
-                    
-                    # Enviar email
-                    if send_email(contato['email'], agendamento['assunto'], mensagem):
-                        emails_enviados.append(contato)
-                        # Registrar envio
-                        cursor.execute(
-                            "INSERT INTO envios (contato_id, template_id, segmento_id, status) VALUES (%s, %s, %s, 'enviado')",
-                            (contato['id'], agendamento['template_id'], agendamento['segmento_id'])
-                        )
-                    else:
-                        # Registrar falha
-                        cursor.execute(
-                            "INSERT INTO envios (contato_id, template_id, segmento_id, status) VALUES (%s, %s, %s, 'erro')",
-                            (contato['id'], agendamento['template_id'], agendamento['segmento_id'])
-                        )
+                # Com uma integração de envio em lote, vários contatos seguem por chamada
+                with envios, LoteEnvio(agendamento['assunto'], registrar_envio) as lote:
+                    for contato in contatos:
+                        total_contatos += 1
+                        # Dados do contato, com os dados padrão nos campos que faltarem
+                        mensagem = template.renderizar(campos_do_contato(contato), dados_padrao)
+                        
+                        lote.adicionar(contato['email'], mensagem, dados=contato)
                 
                 # Atualizar status do agendamento
                 cursor.execute(
@@ -107,7 +106,7 @@ def processar_agendamentos():
                 connection.commit()
                 
                 print(f"Agendamento {agendamento['id']} processado com sucesso")
-                print(f"Emails enviados: {len(emails_enviados)} de {len(contatos)}")
+                print(f"Emails enviados: {emails_enviados} de {total_contatos}")
                 
             except Exception as e:
                 print(f"Erro ao processar agendamento {agendamento['id']}: {str(e)}")
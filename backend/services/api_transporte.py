@@ -0,0 +1,302 @@
+"""
+Transporte HTTP das integrações de envio por API.
+
+Cada integração tem uma `requests.Session` com conexões keep-alive, então
+o handshake TCP/TLS com o provedor acontece uma vez por conexão do pool e
+não a cada mensagem. O corpo da requisição é montado como dict por
+provedor:
+
+- brevo: formato de /v3/smtp/email (sender, to, subject, htmlContent),
+  autenticado pelo cabeçalho api-key;
+- bearer: {'to', 'subject', 'html'} com Authorization: Bearer.
+
+Com "lote": N na configuração, provedores que aceitam vários destinatários
+por chamada (Brevo, via messageVersions) recebem até N destinatários
+personalizados por requisição (`enviar_lote`).
+
+O provedor vem de config['provedor'] ou, sem ele, da URL. Um
+`payload_template` antigo (JSON com quatro %s: email, nome, assunto e HTML)
+continua aceito: é interpretado uma única vez e preenchido como dict, sem
+escapar o HTML. Respostas 429/503 são repetidas após o Retry-After.
+"""
+import copy
+import json
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CODIGOS_REPETIR = (429, 503)
+
+
+def provedor(config):
+    if config.get('provedor'):
+        return config['provedor']
+    return 'brevo' if 'brevo.com' in config.get('url', '') else 'bearer'
+
+
+def cabecalhos(config):
+    """Cabeçalhos fixos da integração, com a autenticação no formato do provedor."""
+    headers = {'Accept': 'application/json'}
+    headers.update(config.get('headers', {}))
+    if config.get('api_key'):
+        if provedor(config) == 'brevo':
+            headers['api-key'] = config['api_key']
+        else:
+            headers['Authorization'] = f"Bearer {config['api_key']}"
+    return headers
+
+
+def nome_destinatario(to_email):
+    return to_email.split('@')[0].title()
+
+
+def payload_brevo(config, to_email, subject, html_content):
+    remetente = config.get('sender') or {'email': os.getenv('MAIL_DEFAULT_SENDER')}
+    return {
+        'sender': remetente,
+        'to': [{'email': to_email, 'name': nome_destinatario(to_email)}],
+        'subject': subject,
+        'htmlContent': html_content,
+    }
+
+
+def payload_bearer(config, to_email, subject, html_content):
+    return {'to': to_email, 'subject': subject, 'html': html_content}
+
+
+MONTADORES_PAYLOAD = {
+    'brevo': payload_brevo,
+    'bearer': payload_bearer,
+}
+
+
+def payload_lote_brevo(config, subject, itens):
+    """
+    Um envio com uma versão da mensagem por destinatário. `itens` é uma
+    lista de (to_email, html_content); o htmlContent da raiz é obrigatório
+    e cada versão o substitui pelo conteúdo personalizado.
+    """
+    payload = payload_brevo(config, itens[0][0], subject, itens[0][1])
+    del payload['to']
+    payload['messageVersions'] = [
+        {'to': [{'email': to_email, 'name': nome_destinatario(to_email)}], 'htmlContent': html_content}
+        for to_email, html_content in itens
+    ]
+    return payload
+
+
+def resultados_lote_brevo(response, quantidade):
+    """Ids das mensagens na ordem das versões enviadas (None se o provedor não informou)."""
+    ids = response.json().get('messageIds') or []
+    return [ids[i] if i < len(ids) else None for i in range(quantidade)]
+
+
+# Provedores com envio em lote: (montador do payload, leitura dos resultados, máximo por chamada)
+MONTADORES_LOTE = {
+    'brevo': (payload_lote_brevo, resultados_lote_brevo, 1000),
+}
+
+# Marcadores que ocupam os %s do payload_template durante a interpretação
+_MARCADORES = ('\x00email\x00', '\x00nome\x00', '\x00assunto\x00', '\x00html\x00')
+
+
+def compilar_payload_template(template):
+    """
+    Interpreta um payload_template uma vez e retorna uma função
+    (to_email, subject, html_content) -> dict que o preenche.
+    """
+    modelo = json.loads(template % tuple(json.dumps(m)[1:-1] for m in _MARCADORES))
+
+    def preencher(valor, valores):
+        if isinstance(valor, dict):
+            return {chave: preencher(item, valores) for chave, item in valor.items()}
+        if isinstance(valor, list):
+            return [preencher(item, valores) for item in valor]
+        if isinstance(valor, str) and '\x00' in valor:
+            if valor in valores:
+                return valores[valor]
+            for marcador, texto in valores.items():
+                valor = valor.replace(marcador, texto)
+        return valor
+
+    def montar(to_email, subject, html_content):
+        valores = dict(zip(_MARCADORES, (to_email, nome_destinatario(to_email), subject, html_content)))
+        return preencher(copy.deepcopy(modelo), valores)
+
+    return montar
+
+
+def _segundos_retry_after(valor):
+    """Retry-After em segundos, aceitando segundos ou data HTTP; None se ausente ou inválido."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TransporteAPI:
+    """Sessão HTTP keep-alive e montagem de payload de uma integração por API."""
+
+    def __init__(self, config, tamanho=10, timeout=10, tentativas=3, retry_after_max=30):
+        self.config = config
+        self.url = config['url']
+        self.provedor = provedor(config)
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.retry_after_max = retry_after_max
+
+        if 'payload_template' in config:
+            self._montar = compilar_payload_template(config['payload_template'])
+        else:
+            montador = MONTADORES_PAYLOAD.get(self.provedor, payload_bearer)
+            self._montar = lambda to_email, subject, html: montador(config, to_email, subject, html)
+
+        lote = MONTADORES_LOTE.get(self.provedor)
+        self.tamanho_lote = min(int(config.get('lote') or 1), lote[2]) if lote else 1
+
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=tamanho)
+        self.sessao = requests.Session()
+        self.sessao.mount('https://', self._adapter)
+        self.sessao.mount('http://', self._adapter)
+        self.sessao.headers.update(cabecalhos(config))
+
+        self._lock = threading.Lock()
+        self._requisicoes = 0
+        self._repeticoes = 0
+        self._espera_retry_after = 0.0
+        self._erros = 0
+        self._lotes = 0
+        self._destinatarios_lote = 0
+
+    def payload(self, to_email, subject, html_content):
+        return self._montar(to_email, subject, html_content)
+
+    def _post(self, payload):
+        """
+        POST com o payload em JSON. 429/503 são repetidos após o Retry-After
+        (ou 1s, 2s, 4s... sem ele) até `tentativas` vezes; esperas acima de
+        `retry_after_max` não são feitas e o erro é propagado.
+        """
+        for tentativa in range(1, self.tentativas + 1):
+            response = self.sessao.post(self.url, json=payload, timeout=self.timeout)
+            with self._lock:
+                self._requisicoes += 1
+
+            if response.status_code in CODIGOS_REPETIR and tentativa < self.tentativas:
+                espera = _segundos_retry_after(response.headers.get('Retry-After'))
+                if espera is None:
+                    espera = 2 ** (tentativa - 1)
+                if espera <= self.retry_after_max:
+                    print(f"API {self.url} respondeu {response.status_code}; nova tentativa em {espera:.1f}s")
+                    with self._lock:
+                        self._repeticoes += 1
+                        self._espera_retry_after += espera
+                    time.sleep(espera)
+                    continue
+
+            if response.status_code >= 400:
+                with self._lock:
+                    self._erros += 1
+            response.raise_for_status()
+            return response
+
+    def enviar(self, to_email, subject, html_content):
+        """Envia a mensagem a um destinatário e retorna a resposta."""
+        return self._post(self.payload(to_email, subject, html_content))
+
+    def aceita_lote(self):
+        return self.tamanho_lote > 1
+
+    def enviar_lote(self, subject, itens):
+        """
+        Envia a mesma mensagem, personalizada, aos destinatários de `itens`
+        (lista de (to_email, html_content)), em chamadas de até
+        `tamanho_lote` destinatários. Retorna o id da mensagem de cada
+        destinatário, na ordem de `itens`. Uma chamada recusada propaga o erro.
+        """
+        if not self.aceita_lote():
+            raise ValueError(f"A integração {self.url} não aceita envio em lote")
+        montar, resultados, _ = MONTADORES_LOTE[self.provedor]
+
+        ids = []
+        for inicio in range(0, len(itens), self.tamanho_lote):
+            parte = itens[inicio:inicio + self.tamanho_lote]
+            response = self._post(montar(self.config, subject, parte))
+            ids.extend(resultados(response, len(parte)))
+            with self._lock:
+                self._lotes += 1
+                self._destinatarios_lote += len(parte)
+        return ids
+
+    def _conexoes_abertas(self):
+        """Conexões TCP abertas pelo urllib3 até agora, somando os pools por host."""
+        pools = self._adapter.poolmanager.pools
+        return sum(pools[chave].num_connections for chave in list(pools.keys()))
+
+    def estatisticas(self):
+        try:
+            conexoes = self._conexoes_abertas()
+        except Exception:
+            conexoes = None
+        with self._lock:
+            requisicoes = self._requisicoes
+            return {
+                'url': self.url,
+                'provedor': self.provedor,
+                'requisicoes': requisicoes,
+                'conexoes': conexoes,
+                'reusos': requisicoes - conexoes if conexoes is not None else None,
+                'repeticoes': self._repeticoes,
+                'espera_retry_after_s': round(self._espera_retry_after, 3),
+                'erros': self._erros,
+                'lotes': self._lotes,
+                'destinatarios_em_lote': self._destinatarios_lote,
+            }
+
+    def fechar(self):
+        self.sessao.close()
+
+
+_transportes = {}
+_transportes_lock = threading.Lock()
+
+
+def _chave(config):
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+def obter_transporte_api(config):
+    """
+    Retorna o transporte da integração descrita por `config`, criando-o no
+    primeiro envio, com conexões para ao menos "concorrencia" requisições
+    simultâneas. Qualquer mudança na configuração cria um transporte novo.
+    """
+    chave = _chave(config)
+    transporte = _transportes.get(chave)
+    if transporte is None:
+        with _transportes_lock:
+            transporte = _transportes.get(chave)
+            if transporte is None:
+                transporte = _transportes[chave] = TransporteAPI(
+                    dict(config),
+                    tamanho=max(int(os.getenv('API_POOL_TAMANHO', 10)), int(config.get('concorrencia') or 0)),
+                    timeout=float(os.getenv('API_TIMEOUT', 10)),
+                    tentativas=int(os.getenv('API_TENTATIVAS', 3)),
+                    retry_after_max=float(os.getenv('API_RETRY_AFTER_MAX', 30)),
+                )
+    return transporte
+
+
+def estatisticas_api():
+    """Estatísticas de cada transporte HTTP do processo."""
+    return [transporte.estatisticas() for transporte in list(_transportes.values())]
@@ -0,0 +1,68 @@
+"""
+Audiências de envio formadas por vários segmentos.
+
+Uma audiência é {'incluir': [ids], 'excluir': [ids]}: os contatos ativos
+associados a algum segmento incluído e a nenhum excluído, cada um uma vez
+só, mesmo que esteja em vários segmentos incluídos. A exclusão prevalece.
+
+Campanhas, agendamentos e jobs de envio guardam a audiência na coluna JSON
+`audiencia`, ao lado do `segmento_id`, que passa a ser o primeiro segmento
+incluído (é ele que vai para os registros de envio). Sem audiência vale o
+`segmento_id` sozinho, como antes.
+
+A resolução é feita no banco, sobre contatos_segmentos, numa consulta em
+ordem de id de contato (repositorios/contatos.ativos_da_audiencia).
+"""
+import json
+
+from backend.repositorios import segmentos as repo_segmentos
+
+
+class AudienciaInvalida(ValueError):
+    """Audiência mal formada no corpo da requisição."""
+
+
+def _ids(valor, campo):
+    if valor is None:
+        return []
+    if not isinstance(valor, list) or not all(isinstance(item, int) and not isinstance(item, bool) for item in valor):
+        raise AudienciaInvalida(f"audiencia.{campo} deve ser uma lista de ids de segmento")
+    return sorted(set(valor))
+
+
+def normalizar(audiencia):
+    """Audiência com ids únicos e ordenados; levanta AudienciaInvalida se mal formada."""
+    if not isinstance(audiencia, dict):
+        raise AudienciaInvalida("audiencia deve ser um objeto com 'incluir' e, opcionalmente, 'excluir'")
+    incluir = _ids(audiencia.get('incluir'), 'incluir')
+    if not incluir:
+        raise AudienciaInvalida("audiencia.incluir deve ter ao menos um segmento")
+    return {'incluir': incluir, 'excluir': _ids(audiencia.get('excluir'), 'excluir')}
+
+
+def ler_audiencia(dados):
+    """
+    Audiência informada no corpo de uma requisição: `audiencia` ou, na falta
+    dela, `segmento_id`. Retorna (segmento_id, audiencia), com audiencia None
+    quando só o segmento foi informado, ou (None, None) se nenhum dos dois veio.
+    """
+    if dados.get('audiencia') is not None:
+        audiencia = normalizar(dados['audiencia'])
+        return audiencia['incluir'][0], audiencia
+    return dados.get('segmento_id'), None
+
+
+def segmentos_inexistentes(segmento_id, audiencia):
+    """Ids de segmento citados que não existem."""
+    ids = set(audiencia['incluir'] + audiencia['excluir']) if audiencia else {segmento_id}
+    return sorted(ids - repo_segmentos.existentes(ids))
+
+
+def audiencia_de(registro):
+    """Audiência de uma campanha, agendamento ou job (coluna `audiencia` ou só `segmento_id`)."""
+    audiencia = registro.get('audiencia')
+    if isinstance(audiencia, (str, bytes)):
+        audiencia = json.loads(audiencia)
+    if audiencia:
+        return normalizar(audiencia)
+    return {'incluir': [registro['segmento_id']], 'excluir': []}
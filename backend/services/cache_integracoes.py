@@ -0,0 +1,128 @@
+"""
+Cache em processo das integrações ativas usadas no envio.
+
+send_email consultava o banco a cada destinatário para descobrir as
+integrações ativas. A lista passa a ficar em memória por até
+INTEGRACOES_CACHE_TTL segundos (0 desliga o cache). As rotas de
+integrações chamam `invalidar_integracoes()` após cada alteração, o que
+limpa o cache local e publica a invalidação no canal Redis
+CANAL_INVALIDACAO; cada processo (gunicorn, workers Celery) mantém uma
+thread inscrita no canal que limpa o próprio cache. Sem Redis acessível
+as alterações feitas em outros processos valem após o TTL.
+"""
+import os
+import threading
+import time
+
+from backend.config import Config
+from backend.services.integracoes_service import listar_integracoes
+
+CANAL_INVALIDACAO = 'integracoes:invalidar'
+
+_lock = threading.Lock()
+_integracoes = None
+_carregadas_em = 0.0
+# Incrementada a cada invalidação: uma leitura do banco iniciada antes dela não é guardada
+_geracao = 0
+_estatisticas = {'acertos': 0, 'carregamentos': 0, 'invalidacoes': 0, 'invalidacoes_remotas': 0}
+_ouvinte_pid = None
+_redis = None
+
+
+def _ttl():
+    return float(os.getenv('INTEGRACOES_CACHE_TTL', 30))
+
+
+def _pubsub_ativo():
+    return os.getenv('INTEGRACOES_CACHE_REDIS', 'True').lower() == 'true'
+
+
+def _cliente_redis():
+    global _redis
+    if _redis is None:
+        import redis
+        _redis = redis.Redis.from_url(Config.REDIS_URL, socket_connect_timeout=2)
+    return _redis
+
+
+def integracoes_ativas():
+    """
+    Integrações com status 'ativo', da mais recente para a mais antiga, ou
+    None se a consulta falhar. A lista é compartilhada: não a altere.
+    """
+    global _integracoes, _carregadas_em
+    _iniciar_ouvinte()
+
+    ttl = _ttl()
+    with _lock:
+        if _integracoes is not None and time.monotonic() - _carregadas_em < ttl:
+            _estatisticas['acertos'] += 1
+            return _integracoes
+        geracao = _geracao
+
+    integracoes = listar_integracoes(status='ativo')
+    if integracoes is None:
+        return None
+
+    with _lock:
+        _estatisticas['carregamentos'] += 1
+        if ttl > 0 and geracao == _geracao:
+            _integracoes = integracoes
+            _carregadas_em = time.monotonic()
+    return integracoes
+
+
+def _limpar(remota=False):
+    global _integracoes, _geracao
+    with _lock:
+        _integracoes = None
+        _geracao += 1
+        _estatisticas['invalidacoes_remotas' if remota else 'invalidacoes'] += 1
+
+
+def invalidar_integracoes():
+    """Descarta as integrações em cache neste processo e avisa os demais pelo Redis."""
+    _limpar()
+    if not _pubsub_ativo():
+        return
+    try:
+        _cliente_redis().publish(CANAL_INVALIDACAO, os.getpid())
+    except Exception as e:
+        print(f"Erro ao publicar invalidação das integrações: {str(e)}")
+
+
+def _iniciar_ouvinte():
+    global _ouvinte_pid
+    # Após um fork a thread do processo pai não existe no filho
+    if _ouvinte_pid == os.getpid() or not _pubsub_ativo():
+        return
+    with _lock:
+        if _ouvinte_pid == os.getpid():
+            return
+        _ouvinte_pid = os.getpid()
+    threading.Thread(target=_ouvir, name='invalidacao-integracoes', daemon=True).start()
+
+
+def _ouvir():
+    falhou = False
+    while True:
+        try:
+            pubsub = _cliente_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CANAL_INVALIDACAO)
+            # Invalidações publicadas enquanto estávamos desconectados se perderam
+            if falhou:
+                _limpar(remota=True)
+                print("Invalidação de integrações via Redis restabelecida")
+            falhou = False
+            for _ in pubsub.listen():
+                _limpar(remota=True)
+        except Exception as e:
+            if not falhou:
+                print(f"Invalidação de integrações via Redis indisponível, valendo o TTL: {str(e)}")
+            falhou = True
+            time.sleep(float(os.getenv('INTEGRACOES_CACHE_REDIS_ESPERA', 30)))
+
+
+def estatisticas_cache_integracoes():
+    with _lock:
+        return dict(_estatisticas, ttl=_ttl(), em_cache=_integracoes is not None)
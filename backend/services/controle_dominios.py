@@ -0,0 +1,156 @@
+"""
+Limites de envio por domínio do destinatário.
+
+Provedores como Gmail e Outlook respondem 421/450 ("tente mais tarde")
+quando recebem mensagens demais de um remetente em pouco tempo. O controle
+de cada domínio limita, por processo, os envios simultâneos
+(DOMINIO_CONCORRENCIA) e a taxa (DOMINIO_POR_SEGUNDO, 0 = sem limite);
+DOMINIOS_LIMITES ajusta domínios específicos:
+
+    DOMINIOS_LIMITES={"gmail.com": {"concorrencia": 3, "por_segundo": 10}}
+
+Um adiamento (resposta SMTP 4xx) pausa o domínio por DOMINIO_ADIAMENTO_BASE
+segundos, dobrando a cada adiamento seguido até DOMINIO_ADIAMENTO_MAX; o
+primeiro envio aceito encerra o recuo. Os demais domínios seguem enviando.
+"""
+import json
+import os
+import smtplib
+import threading
+import time
+
+# Espera curta antes de conferir de novo um domínio sem vaga de concorrência
+ESPERA_VAGA = 0.02
+
+
+class EnvioAdiado(Exception):
+    """O servidor recusou temporariamente a mensagem (4xx); ela pode ser reenviada depois."""
+
+    def __init__(self, codigo, mensagem):
+        super().__init__(f"{codigo} {mensagem}")
+        self.codigo = codigo
+
+
+def dominio(email):
+    return email.rsplit('@', 1)[-1].strip().lower()
+
+
+def adiamento_smtp(erro):
+    """EnvioAdiado correspondente a uma recusa temporária do SMTP, ou None."""
+    if isinstance(erro, smtplib.SMTPRecipientsRefused):
+        respostas = list(erro.recipients.values())
+        if respostas and all(400 <= codigo < 500 for codigo, _ in respostas):
+            codigo, mensagem = respostas[0]
+            return EnvioAdiado(codigo, mensagem.decode(errors='replace') if isinstance(mensagem, bytes) else mensagem)
+    elif isinstance(erro, smtplib.SMTPResponseException) and 400 <= erro.smtp_code < 500:
+        mensagem = erro.smtp_error
+        return EnvioAdiado(erro.smtp_code, mensagem.decode(errors='replace') if isinstance(mensagem, bytes) else mensagem)
+    return None
+
+
+def _limites_configurados():
+    try:
+        return json.loads(os.getenv('DOMINIOS_LIMITES') or '{}')
+    except ValueError as e:
+        print(f"DOMINIOS_LIMITES inválido, usando os limites padrão: {str(e)}")
+        return {}
+
+
+class _Dominio:
+    def __init__(self, nome, concorrencia, por_segundo):
+        self.nome = nome
+        self.concorrencia = concorrencia
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self.em_andamento = 0
+        self.proximo_envio = 0.0
+        self.pausado_ate = 0.0
+        self.adiamentos_seguidos = 0
+        self.enviados = 0
+        self.adiamentos = 0
+
+
+class ControleDominios:
+    """Concorrência, taxa e recuo após adiamentos de cada domínio, compartilhados pelo processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dominios = {}
+
+    def _estado(self, nome):
+        estado = self._dominios.get(nome)
+        if estado is None:
+            limites = _limites_configurados().get(nome, {})
+            estado = self._dominios[nome] = _Dominio(
+                nome,
+                max(1, int(limites.get('concorrencia') or os.getenv('DOMINIO_CONCORRENCIA', 5))),
+                float(limites.get('por_segundo') or os.getenv('DOMINIO_POR_SEGUNDO', 0)),
+            )
+        return estado
+
+    def reservar(self, nome):
+        """
+        Reserva um envio para o domínio. Retorna 0 se reservou, ou quantos
+        segundos esperar antes de tentar de novo.
+        """
+        agora = time.monotonic()
+        with self._lock:
+            estado = self._estado(nome)
+            if estado.pausado_ate > agora:
+                return estado.pausado_ate - agora
+            if estado.em_andamento >= estado.concorrencia:
+                return ESPERA_VAGA
+            if estado.proximo_envio > agora:
+                return estado.proximo_envio - agora
+            estado.em_andamento += 1
+            estado.proximo_envio = agora + estado.intervalo
+            return 0.0
+
+    def liberar(self, nome, adiado=False):
+        """Encerra um envio reservado; um adiamento pausa o domínio com recuo exponencial."""
+        with self._lock:
+            estado = self._estado(nome)
+            estado.em_andamento -= 1
+            if not adiado:
+                estado.enviados += 1
+                estado.adiamentos_seguidos = 0
+                return
+            estado.adiamentos += 1
+            estado.adiamentos_seguidos += 1
+            recuo = min(
+                float(os.getenv('DOMINIO_ADIAMENTO_BASE', 5)) * 2 ** (estado.adiamentos_seguidos - 1),
+                float(os.getenv('DOMINIO_ADIAMENTO_MAX', 300))
+            )
+            estado.pausado_ate = max(estado.pausado_ate, time.monotonic() + recuo)
+            print(f"Domínio {nome} adiou o envio; pausado por {recuo:.0f}s")
+
+    def estatisticas(self, limite=20):
+        """Os `limite` domínios com mais envios, com o tempo restante de pausa."""
+        agora = time.monotonic()
+        with self._lock:
+            estados = sorted(self._dominios.values(), key=lambda e: e.enviados + e.adiamentos, reverse=True)
+            return [
+                {
+                    'dominio': estado.nome,
+                    'concorrencia': estado.concorrencia,
+                    'em_andamento': estado.em_andamento,
+                    'enviados': estado.enviados,
+                    'adiamentos': estado.adiamentos,
+                    'pausado_s': round(max(estado.pausado_ate - agora, 0.0), 1),
+                }
+                for estado in estados[:limite]
+            ]
+
+    def zerar(self):
+        with self._lock:
+            self._dominios.clear()
+
+
+_controle = ControleDominios()
+
+
+def obter_controle_dominios():
+    return _controle
+
+
+def estatisticas_dominios():
+    return _controle.estatisticas()
@@ -0,0 +1,181 @@
+"""
+Disparo de campanhas em segundo plano.
+
+POST /api/emails/enviar enviava, dentro da requisição, para todos os
+contatos do segmento. Agora a rota registra um job (tabela jobs_envio),
+enfileira a tarefa `enviar_campanha_task` e responde 202. A tarefa envia
+um lote de até CAMPANHA_LOTE contatos do segmento (ou da audiência de
+vários segmentos), em ordem de id, grava o progresso e se reenfileira para
+o lote seguinte, de modo que nenhuma execução prende um worker por muito
+tempo e o job continua de onde parou (`ultimo_contato_id`).
+
+Como a tarefa é confirmada só ao terminar (task_acks_late) e repetida em
+caso de erro, o mesmo lote pode ser processado de novo. Antes de ir ao
+transporte cada contato do lote é reservado em jobs_destinatarios, com
+chave única por job e contato, e só os reservados nesta execução são
+enviados; o status de cada um e o progresso do job são gravados na mesma
+transação ao fim do lote. Contatos reservados num lote interrompido não
+são reenviados: quando o lote é repetido (ou o job falha de vez) eles
+passam a 'incerto' e entram em `incertos` no progresso, já que o email
+pode ter saído ou não, e as contagens continuam fechando com o total.
+
+Cancelar marca o job como 'cancelado'; a tarefa para antes do próximo lote.
+"""
+import os
+from datetime import datetime
+
+from backend.repositorios import (
+    contatos as repo_contatos, envios as repo_envios, jobs as repo_jobs, templates as repo_templates
+)
+from backend.repositorios.base import abrir_conexao
+from backend.services.audiencias import audiencia_de
+from backend.services.email_service import LoteEnvio, criar_buffer_metricas
+from backend.services.renderizador import campos_do_contato, compilado_do_template
+
+
+def tamanho_lote():
+    return int(os.getenv('CAMPANHA_LOTE', 500))
+
+
+def criar_job(template_id, segmento_id, assunto, dados_padrao=None, total=0, audiencia=None):
+    """
+    Registra o envio da campanha (status 'em_progresso') e o job que vai
+    executá-lo, numa transação. Com `audiencia` o job envia para a união
+    dos segmentos incluídos menos os excluídos (services/audiencias.py).
+    Retorna o id do job.
+    """
+    with abrir_conexao(commit=True) as connection:
+        envio_id = repo_envios.inserir(
+            None, template_id, segmento_id, status='em_progresso', connection=connection
+        )
+        return repo_jobs.criar(
+            envio_id, template_id, segmento_id, assunto, dados_padrao, total, audiencia, connection=connection
+        )
+
+
+def _encerrar(job, status, erro=None):
+    """Finaliza o job e o envio da campanha, se o job ainda estava ativo."""
+    if repo_jobs.finalizar(job['id'], status, erro):
+        repo_envios.atualizar_status(job['envio_id'], status)
+        return True
+    return False
+
+
+def processar_lote(job_id, tamanho=None):
+    """
+    Envia o próximo lote de contatos do job e grava o progresso. Retorna
+    True enquanto houver contatos a enviar; False quando o job terminou,
+    foi cancelado ou não existe.
+    """
+    tamanho = tamanho or tamanho_lote()
+    job = repo_jobs.buscar(job_id)
+    if not job or job['status'] in repo_jobs.STATUS_FINAIS:
+        return False
+    # Cancelado entre a leitura e o início
+    if job['status'] == 'na_fila' and not repo_jobs.iniciar(job_id):
+        return False
+
+    template = repo_templates.buscar(job['template_id'])
+    if not template:
+        _encerrar(job, 'erro', 'Template não encontrado')
+        return False
+
+    contatos = repo_contatos.ativos_da_audiencia(audiencia_de(job), job['ultimo_contato_id'], tamanho)
+    if contatos:
+        reservados = repo_jobs.reservar_destinatarios(job_id, [contato['id'] for contato in contatos])
+        # Compilado uma vez por template, já com os pontos de tracking localizados;
+        # os campos do contato têm precedência sobre dados_padrao
+        compilado = compilado_do_template(template, os.environ.get('BASE_URL', 'http://localhost:5000'))
+        resultado = {'enviados': 0, 'falhas': 0}
+        destinatarios = []
+
+        def registrar_envio(contato, sucesso, detalhe):
+            resultado['enviados' if sucesso else 'falhas'] += 1
+            destinatarios.append((contato['id'], 'enviado' if sucesso else 'falha'))
+
+        with criar_buffer_metricas() as metricas, \
+                LoteEnvio(job['assunto'], registrar_envio, metricas, com_tracking=False) as lote:
+            for contato in contatos:
+                if contato['id'] not in reservados:
+                    continue
+                lote.adicionar(
+                    contato['email'],
+                    compilado.renderizar(campos_do_contato(contato), job['dados_padrao'],
+                                         job['envio_id'], contato['id']),
+                    envio_id=job['envio_id'],
+                    contato_id=contato['id'],
+                    dados=contato
+                )
+
+        # Os já reservados por uma execução anterior que caiu antes de gravar o lote
+        ja_reservados = [contato['id'] for contato in contatos if contato['id'] not in reservados]
+        with abrir_conexao(commit=True) as connection:
+            repo_jobs.registrar_destinatarios(job_id, destinatarios, connection=connection)
+            repo_jobs.marcar_incertos(job_id, ja_reservados, connection=connection)
+            repo_jobs.registrar_progresso(job_id, resultado['enviados'], resultado['falhas'], contatos[-1]['id'],
+                                          connection=connection)
+        if len(contatos) == tamanho:
+            return True
+
+    job = repo_jobs.buscar(job_id)
+    # Com resultados incertos algum email pode ter saído: o job não é dado como erro
+    concluido = job['enviados'] > 0 or job['incertos'] > 0
+    _encerrar(job, 'concluido' if concluido else 'erro', None if concluido else 'Nenhum email enviado')
+    return False
+
+
+def cancelar_job(job_id):
+    """
+    Cancela um job na fila ou em andamento. Retorna o job atualizado, ou
+    None se ele não existe; um job já finalizado é devolvido sem alteração.
+    """
+    job = repo_jobs.buscar(job_id)
+    if not job:
+        return None
+    _encerrar(job, 'cancelado')
+    return repo_jobs.buscar(job_id)
+
+
+def falhar_job(job_id, erro):
+    job = repo_jobs.buscar(job_id)
+    if job and _encerrar(job, 'erro', erro):
+        # O lote em que o job caiu não será repetido
+        repo_jobs.marcar_incertos(job_id)
+
+
+def progresso(job):
+    """
+    Contagens, percentual e vazão (emails por segundo) de um job. `incertos`
+    são os destinatários de lotes interrompidos sem resultado gravado.
+    """
+    processados = job['enviados'] + job['falhas'] + job['incertos']
+    duracao = None
+    vazao = None
+    restante = None
+    if job['iniciado_em']:
+        fim = job['concluido_em'] or datetime.now()
+        duracao = max((fim - job['iniciado_em']).total_seconds(), 0.0)
+        if duracao > 0:
+            vazao = round(processados / duracao, 2)
+    pendentes = max(job['total'] - processados, 0) if job['status'] in repo_jobs.STATUS_ATIVOS else 0
+    if vazao and pendentes:
+        restante = round(pendentes / vazao, 1)
+
+    return {
+        'job_id': job['id'],
+        'envio_id': job['envio_id'],
+        'status': job['status'],
+        'total': job['total'],
+        'enviados': job['enviados'],
+        'falhas': job['falhas'],
+        'incertos': job['incertos'],
+        'pendentes': pendentes,
+        'percentual': round(100.0 * processados / job['total'], 1) if job['total'] else 0.0,
+        'emails_por_segundo': vazao,
+        'duracao_s': round(duracao, 1) if duracao is not None else None,
+        'estimativa_restante_s': restante,
+        'erro': job['erro'],
+        'criado_em': job['created_at'],
+        'iniciado_em': job['iniciado_em'],
+        'concluido_em': job['concluido_em'],
+    }
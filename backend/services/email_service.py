@@ -1,203 +1,445 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import requests
-import json
 import traceback
-from backend.services.integracoes_service import listar_integracoes
-from backend.config import get_db_connection
+import requests
+from backend.services.cache_integracoes import integracoes_ativas, invalidar_integracoes
 import os
 from dotenv import load_dotenv
-from urllib.parse import urlencode, quote_plus
-from backend.utils import gerar_token_tracking
-from backend.database import get_db_connection
-import re
+from backend.services.renderizador import compilar
+from backend.database import BufferEscrita
+from backend.repositorios import integracoes as repo_integracoes
+from backend.services.metricas_service import registrar_metrica
+from backend.services.smtp_pool import obter_pool_smtp
+from backend.services.mensagem_mime import modelo_mensagem
+from backend.services.api_transporte import obter_transporte_api
+from backend.services.motor_envio import obter_motor
+from backend.services.limite_provedor import CotaEsgotada, obter_limite
+from backend.services.saude_integracoes import obter_saude, ordenar_integracoes
+from backend.services.controle_dominios import (
+    ESPERA_VAGA, EnvioAdiado, adiamento_smtp, dominio, obter_controle_dominios
+)
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 
 load_dotenv()
 
-def registrar_metrica(envio_id, contato_id, status, detalhes=None):
-    """
-    Registra uma métrica de envio no banco de dados.
-    """
-    try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        
-        query = """
-            INSERT INTO metricas_envio (envio_id, contato_id, status, detalhes)
-            VALUES (%s, %s, %s, %s)
-        """
-        cursor.execute(query, (envio_id, contato_id, status, json.dumps(detalhes) if detalhes else None))
-        connection.commit()
-        
-        return True
-    except Exception as e:
-        print(f"Erro ao registrar métrica: {str(e)}")
-        traceback.print_exc()
-        return False
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
+def criar_buffer_metricas():
+    """Cria um buffer de escrita em lote para a tabela metricas_envio."""
+    return BufferEscrita('metricas_envio', ['envio_id', 'contato_id', 'status', 'detalhes'])
 
 def adicionar_tracking(html_content, envio_id, email_id, base_url):
     """
-    Adiciona elementos de tracking no conteúdo HTML do email usando regex.
+    Adiciona o pixel de abertura e o redirecionamento de cliques ao HTML.
+    Para muitos destinatários do mesmo template, prefira compilá-lo com
+    tracking uma vez (backend/services/renderizador.py).
     """
     try:
-        # Adicionar pixel de tracking antes do </body>
-        token_abertura = gerar_token_tracking(envio_id, email_id, 'abertura')
-        pixel = f'<img src="{base_url}/tracking/pixel/{token_abertura}" width="1" height="1" style="display:none;">'
-        html_content = re.sub(r'</body>', f'{pixel}</body>', html_content, flags=re.IGNORECASE)
-        
-        # Adicionar tracking em todos os links
-        def replace_link(match):
-            url_original = match.group(1)
-            token_clique = gerar_token_tracking(envio_id, email_id, 'clique')
-            params = urlencode({'url': url_original}, quote_via=quote_plus)
-            return f'href="{base_url}/tracking/click/{token_clique}?{params}"'
-            
-        html_content = re.sub(r'href="([^"]+)"', replace_link, html_content)
-            
-        return html_content
+        return compilar(html_content, base_url).renderizar({}, envio_id=envio_id, contato_id=email_id)
     except Exception as e:
         print(f"Erro ao adicionar tracking: {str(e)}")
         traceback.print_exc()
         return html_content
 
-def send_email(to_email, subject, html_content, envio_id=None, contato_id=None):
+def send_email(to_email, subject, html_content, envio_id=None, contato_id=None, buffer_metricas=None,
+               adiar=False, com_tracking=True, integracoes=None):
     """
-    Envia um email usando a primeira integração ativa disponível.
+    Envia um email pelas integrações ativas com o disjuntor fechado, em ordem
+    sorteada pela saúde de cada uma (backend/services/saude_integracoes.py),
+    passando para a seguinte quando uma falha. `integracoes` é uma ordem já
+    sorteada pelo chamador (LoteEnvio, que escolheu por ela o motor do envio),
+    usada sem novo sorteio.
+    Com `buffer_metricas` as métricas do envio são gravadas em lote pelo chamador.
+    Com `com_tracking=False` o HTML já vem com o tracking do contato.
+    Com `adiar=True` uma recusa temporária (SMTP 4xx) é propagada como
+    EnvioAdiado, sem métrica, para o chamador reenviar depois; sem ele conta
+    como falha da integração.
     """
     try:
-        # Buscar integrações ativas
-        integracoes = listar_integracoes(status='ativo')
-        if not integracoes:
-            print("Nenhuma integração ativa encontrada")
-            if envio_id and contato_id:
-                registrar_metrica(envio_id, contato_id, 'erro', {'erro': 'Nenhuma integração ativa'})
-            return False
+        if integracoes is None:
+            # Integrações ativas, do cache do processo
+            ativas = integracoes_ativas()
+            if not ativas:
+                print("Nenhuma integração ativa encontrada")
+                if envio_id and contato_id:
+                    registrar_metrica(envio_id, contato_id, 'erro', {'erro': 'Nenhuma integração ativa'}, buffer=buffer_metricas)
+                return False
+            integracoes = ordenar_integracoes(ativas)
             
         # Adicionar tracking se tiver envio_id e contato_id
-        if envio_id and contato_id:
+        if com_tracking and envio_id and contato_id:
             base_url = os.environ.get('BASE_URL', 'http://localhost:5000')
             html_content = adicionar_tracking(html_content, envio_id, contato_id, base_url)
             
-        # Tentar cada integração até conseguir enviar
+        # Tentar cada integração até conseguir enviar, pulando as de disjuntor aberto
         for integracao in integracoes:
             tipo = integracao['tipo']
-            config = integracao['configuracoes']
-            
+            config = integracao['configuracao']
+            if tipo not in ('smtp', 'api'):
+                print(f"Tipo de integração não suportado para envio: {tipo}")
+                continue
+            saude = obter_saude(integracao)
+            if not saude.permitir():
+                continue
+
+            inicio = None
             try:
+                # Espera a vez na taxa da integração, compartilhada pelos workers;
+                # com a cota do dia esgotada passa para a próxima integração
+                limite = obter_limite(integracao)
+                if limite:
+                    limite.adquirir()
+
+                inicio = time.perf_counter()
                 if tipo == 'smtp':
                     sucesso = send_via_smtp(to_email, subject, html_content, config)
-                elif tipo == 'api':
-                    sucesso = send_via_api(to_email, subject, html_content, config)
                 else:
-                    print(f"Tipo de integração não suportado para envio: {tipo}")
-                    continue
-                    
-                if sucesso and envio_id and contato_id:
-                    registrar_metrica(envio_id, contato_id, 'enviado')
-                return sucesso
+                    sucesso = send_via_api(to_email, subject, html_content, config)
+                saude.registrar(sucesso, time.perf_counter() - inicio)
+
+                if sucesso:
+                    if envio_id and contato_id:
+                        registrar_metrica(envio_id, contato_id, 'enviado', buffer=buffer_metricas)
+                    return True
                 
             except Exception as e:
-                print(f"Erro ao enviar email usando integração {integracao['nome']}: {str(e)}")
+                # Adiamentos e cota esgotada não dizem nada sobre a saúde do provedor
+                falhou = inicio is not None and not isinstance(e, EnvioAdiado)
+                saude.registrar(False if falhou else None,
+                                time.perf_counter() - inicio if falhou else None)
+                if adiar and isinstance(e, EnvioAdiado):
+                    raise
+                print(f"Erro ao enviar email usando integração {integracao.get('nome') or integracao['tipo']}: {str(e)}")
                 traceback.print_exc()
                 if envio_id and contato_id:
-                    registrar_metrica(envio_id, contato_id, 'erro', {'erro': str(e)})
+                    registrar_metrica(envio_id, contato_id, 'erro', {'erro': str(e)}, buffer=buffer_metricas)
                 continue
                 
         print("Nenhuma integração disponível conseguiu enviar o email")
         if envio_id and contato_id:
-            registrar_metrica(envio_id, contato_id, 'erro', {'erro': 'Nenhuma integração disponível'})
+            registrar_metrica(envio_id, contato_id, 'erro', {'erro': 'Nenhuma integração disponível'}, buffer=buffer_metricas)
         return False
         
     except Exception as e:
+        if adiar and isinstance(e, EnvioAdiado):
+            raise
         print(f"Erro ao enviar email: {str(e)}")
         traceback.print_exc()
         if envio_id and contato_id:
-            registrar_metrica(envio_id, contato_id, 'erro', {'erro': str(e)})
+            registrar_metrica(envio_id, contato_id, 'erro', {'erro': str(e)}, buffer=buffer_metricas)
         return False
 
+class LoteEnvio:
+    """
+    Acumula destinatários de uma mesma mensagem, cada um com seu HTML
+    personalizado, e os envia de uma vez quando a integração sorteada por
+    ordenar_integracoes é uma API com envio em lote ("lote": N na
+    configuração). Com outras integrações cada destinatário segue por
+    send_email; lotes recusados pelo disjuntor da integração também.
+
+    Os envios (um destinatário ou um lote por vez) rodam no motor da
+    integração que vai fazê-los (backend/services/motor_envio.py): cada
+    destinatário tem a ordem das integrações sorteada uma vez, e o motor da
+    primeira é o que limita o envio que send_email faz por ela. Ficam em
+    andamento até o dobro da concorrência somada das integrações.
+
+    Fora do envio em lote, os destinatários entram numa fila por domínio e
+    só saem dela dentro dos limites do domínio
+    (backend/services/controle_dominios.py). Um destinatário adiado pelo
+    servidor (SMTP 4xx) volta para a fila do seu domínio, que fica pausado
+    com recuo exponencial, e é tentado até DOMINIO_TENTATIVAS vezes antes de
+    contar como falha; os outros domínios seguem enviando. `adicionar` lê
+    adiante até ENVIO_FILA_MAX destinatários enfileirados.
+
+    O resultado de cada destinatário é entregue a
+    `ao_enviar(dados, sucesso, detalhe)`, em que `dados` é o que foi passado
+    em `adicionar` e `detalhe` é o id da mensagem no provedor (em lote) ou a
+    mensagem de erro. As chamadas acontecem na thread do chamador: no envio
+    em lote, na ordem de adição; por domínio, na ordem de conclusão. Com
+    `com_tracking=False` o HTML adicionado já traz o tracking de cada
+    destinatário (ex.: de um TemplateRastreado). Usado como context manager,
+    envia o que restar ao sair:
+
+        with LoteEnvio(assunto, registrar_envio) as lote:
+            for contato in contatos:
+                lote.adicionar(contato['email'], html, dados=contato)
+    """
+
+    def __init__(self, subject, ao_enviar, buffer_metricas=None, com_tracking=True):
+        self.subject = subject
+        self.com_tracking = com_tracking
+        self.ao_enviar = ao_enviar
+        self.buffer_metricas = buffer_metricas
+        self.enviados = 0
+        # Sem a lista (consulta falhou) os envios falham um a um, sem derrubar o chamador
+        self.integracoes = [integracao for integracao in integracoes_ativas() or []
+                            if integracao['tipo'] in ('smtp', 'api')]
+        integracoes = ordenar_integracoes(self.integracoes)
+        # Motor, limite e saúde do envio em lote são os da integração sorteada para ele
+        self.motor = obter_motor(integracoes[0]) if integracoes else None
+        self.transporte = self._transporte_em_lote(integracoes)
+        self.limite = obter_limite(integracoes[0]) if self.transporte else None
+        self.saude = obter_saude(integracoes[0]) if self.transporte else None
+        self.tamanho = self.transporte.tamanho_lote if self.transporte else 1
+        if self.transporte:
+            self.em_andamento_max = 2 * self.motor.concorrencia
+        else:
+            self.em_andamento_max = max(1, 2 * sum(obter_motor(integracao).concorrencia
+                                                   for integracao in self.integracoes))
+
+        # Envio em lote: itens do próximo lote e lotes despachados, em ordem
+        self._itens = []
+        self._pendentes = deque()
+        # Envio por domínio: fila de [item, tentativas] por domínio e envios em andamento
+        self.controle = obter_controle_dominios()
+        self.fila_max = int(os.getenv('ENVIO_FILA_MAX', 1000))
+        self.tentativas = int(os.getenv('DOMINIO_TENTATIVAS', 5))
+        self._filas = {}
+        self._enfileirados = 0
+        self._em_andamento = {}
+
+    def _transporte_em_lote(self, integracoes):
+        if not integracoes or integracoes[0]['tipo'] != 'api':
+            return None
+        try:
+            transporte = obter_transporte_api(integracoes[0]['configuracao'])
+        except Exception as e:
+            print(f"Erro ao preparar envio em lote: {str(e)}")
+            return None
+        return transporte if transporte.aceita_lote() else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Destinatários já personalizados são enviados mesmo se o bloco falhar
+        self.enviar()
+
+    def adicionar(self, to_email, html_content, envio_id=None, contato_id=None, dados=None):
+        """Acrescenta um destinatário; despacha o lote quando ele enche."""
+        item = (to_email, html_content, envio_id, contato_id, dados)
+        if self.transporte is None:
+            self._filas.setdefault(dominio(to_email), deque()).append([item, 0])
+            self._enfileirados += 1
+            self._bombear(lambda: self._enfileirados >= self.fila_max)
+            return
+
+        self._itens.append(item)
+        if len(self._itens) >= self.tamanho:
+            self._despachar()
+            if len(self._pendentes) >= self.em_andamento_max:
+                self._coletar(esperar_um=True)
+
+    def enviar(self):
+        """
+        Envia os destinatários pendentes e espera os envios em andamento.
+        Retorna quantos foram enviados com sucesso nesta chamada.
+        """
+        antes = self.enviados
+        if self.transporte is None:
+            self._bombear(lambda: self._enfileirados or self._em_andamento)
+        else:
+            self._despachar()
+            self._coletar(esperar_todos=True)
+        return self.enviados - antes
+
+    def _submeter(self, funcao, *args, motor=None):
+        motor = motor or self.motor
+        if motor is not None:
+            return motor.submeter(funcao, *args)
+        futuro = Future()
+        futuro.set_result(funcao(*args))
+        return futuro
+
+    def _entregar(self, dados, sucesso, detalhe):
+        self.enviados += sucesso
+        self.ao_enviar(dados, sucesso, detalhe)
+
+    def _despachar(self):
+        itens, self._itens = self._itens, []
+        if itens:
+            self._pendentes.append((self._submeter(self._enviar_lote, itens), itens))
+
+    def _coletar(self, esperar_um=False, esperar_todos=False):
+        """Entrega os resultados dos lotes concluídos, na ordem de despacho."""
+        while self._pendentes:
+            futuro, itens = self._pendentes[0]
+            if not (futuro.done() or esperar_todos or esperar_um):
+                break
+            try:
+                resultados = futuro.result()
+            except Exception as e:
+                print(f"Erro no envio de {len(itens)} destinatário(s): {str(e)}")
+                resultados = [(False, str(e))] * len(itens)
+            self._pendentes.popleft()
+            esperar_um = False
+            for (_, _, _, _, dados), (sucesso, detalhe) in zip(itens, resultados):
+                self._entregar(dados, sucesso, detalhe)
+
+    def _bombear(self, continuar):
+        """
+        Despacha o que os limites dos domínios permitem e entrega os envios
+        concluídos, repetindo enquanto `continuar()` for verdadeiro.
+        """
+        while True:
+            espera = self._agendar()
+            self._concluir(timeout=0)
+            if not continuar():
+                return
+            if self._em_andamento:
+                self._concluir(timeout=espera)
+            else:
+                time.sleep(espera if espera is not None else ESPERA_VAGA)
+
+    def _agendar(self):
+        """
+        Despacha da fila de cada domínio os destinatários que ele aceita
+        agora. Retorna a menor espera (s) dos domínios que ficaram com fila
+        por limite de domínio, ou None.
+        """
+        espera = None
+        for nome in list(self._filas):
+            fila = self._filas[nome]
+            while fila and len(self._em_andamento) < self.em_andamento_max:
+                aguardar = self.controle.reservar(nome)
+                if aguardar:
+                    espera = aguardar if espera is None else min(espera, aguardar)
+                    break
+                entrada = fila.popleft()
+                self._enfileirados -= 1
+                # A integração é sorteada aqui, uma vez: o envio roda no motor dela
+                ordem = ordenar_integracoes(self.integracoes)
+                motor = obter_motor(ordem[0]) if ordem else None
+                futuro = self._submeter(self._enviar_destinatario, entrada[0], ordem, motor=motor)
+                self._em_andamento[futuro] = (nome, entrada)
+            if not fila:
+                del self._filas[nome]
+        return espera
+
+    def _concluir(self, timeout):
+        """Entrega os envios por domínio concluídos em até `timeout` segundos; adiados voltam à fila."""
+        if not self._em_andamento:
+            return
+        concluidos, _ = wait(self._em_andamento, timeout=timeout, return_when=FIRST_COMPLETED)
+        for futuro in concluidos:
+            nome, entrada = self._em_andamento.pop(futuro)
+            item = entrada[0]
+            try:
+                sucesso, detalhe = futuro.result()
+            except Exception as e:
+                sucesso, detalhe = False, str(e)
+            self.controle.liberar(nome, adiado=sucesso is None)
+
+            if sucesso is None:
+                entrada[1] += 1
+                if entrada[1] < self.tentativas:
+                    # Volta ao início da fila do domínio, que ficou pausado
+                    self._filas.setdefault(nome, deque()).appendleft(entrada)
+                    self._enfileirados += 1
+                    continue
+                sucesso, detalhe = False, f"Adiado {entrada[1]} vezes: {detalhe}"
+                _, _, envio_id, contato_id, _ = item
+                if envio_id and contato_id:
+                    registrar_metrica(envio_id, contato_id, 'erro', {'erro': detalhe}, buffer=self.buffer_metricas)
+            self._entregar(item[4], sucesso, detalhe)
+
+    def _enviar_destinatario(self, item, integracoes):
+        """
+        Envia a um destinatário pelas `integracoes`, na ordem sorteada. Retorna
+        (sucesso, detalhe), com sucesso None se o envio foi adiado.
+        """
+        to_email, html_content, envio_id, contato_id, _ = item
+        try:
+            sucesso = send_email(to_email, self.subject, html_content, envio_id, contato_id,
+                                 self.buffer_metricas, adiar=True, com_tracking=self.com_tracking,
+                                 integracoes=integracoes)
+        except EnvioAdiado as e:
+            return None, str(e)
+        return sucesso, None if sucesso else 'Falha no envio'
+
+    def _enviar_lote(self, itens):
+        """Envia os itens numa chamada à API. Retorna (sucesso, detalhe) de cada item."""
+        base_url = os.environ.get('BASE_URL', 'http://localhost:5000')
+        mensagens = []
+        for to_email, html_content, envio_id, contato_id, _ in itens:
+            if self.com_tracking and envio_id and contato_id:
+                html_content = adicionar_tracking(html_content, envio_id, contato_id, base_url)
+            mensagens.append((to_email, html_content))
+
+        # Disjuntor aberto: cada destinatário segue por send_email, para as outras integrações
+        if not self.saude.permitir():
+            return self._enviar_um_a_um(itens)
+
+        inicio = time.perf_counter()
+        try:
+            # Uma ficha do limite da integração por destinatário do lote
+            if self.limite:
+                self.limite.adquirir(len(itens))
+            inicio = time.perf_counter()
+            ids = self.transporte.enviar_lote(self.subject, mensagens)
+        except CotaEsgotada as e:
+            self.saude.registrar(None)
+            print(f"{str(e)}; enviando um a um pelas outras integrações")
+            return self._enviar_um_a_um(itens)
+        except requests.Timeout as e:
+            self.saude.registrar(False, time.perf_counter() - inicio)
+            # O provedor pode ter aceitado o lote; reenviar poderia duplicar mensagens
+            print(f"Tempo esgotado no envio em lote de {len(itens)} destinatários: {str(e)}")
+            for _, _, envio_id, contato_id, _ in itens:
+                if envio_id and contato_id:
+                    registrar_metrica(envio_id, contato_id, 'erro', {'erro': str(e)}, buffer=self.buffer_metricas)
+            return [(False, str(e))] * len(itens)
+        except Exception as e:
+            self.saude.registrar(False, time.perf_counter() - inicio)
+            print(f"Erro no envio em lote, enviando um a um: {str(e)}")
+            return self._enviar_um_a_um(itens)
+        self.saude.registrar(True, time.perf_counter() - inicio)
+
+        for (_, _, envio_id, contato_id, _), mensagem_id in zip(itens, ids):
+            if envio_id and contato_id:
+                registrar_metrica(envio_id, contato_id, 'enviado', buffer=self.buffer_metricas)
+        print(f"Lote de {len(itens)} emails enviado via API")
+        return [(True, mensagem_id) for mensagem_id in ids]
+
+    def _enviar_um_a_um(self, itens):
+        resultados = []
+        for to_email, html_content, envio_id, contato_id, _ in itens:
+            sucesso = send_email(to_email, self.subject, html_content, envio_id, contato_id, self.buffer_metricas,
+                                 com_tracking=self.com_tracking)
+            resultados.append((sucesso, None if sucesso else 'Falha no envio'))
+        return resultados
+
 def send_via_smtp(to_email, subject, html_content, config):
     """
-    Envia email usando SMTP.
+    Envia email usando SMTP, reaproveitando as sessões do pool da integração.
+    A mensagem sai do modelo da campanha (remetente e assunto), que já tem
+    os cabeçalhos e as partes comuns codificados.
+    Recusas temporárias (4xx) são levantadas como EnvioAdiado.
     """
     try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = config['username']
-        msg['To'] = to_email
-        
-        # Adicionar conteúdo HTML
-        html_part = MIMEText(html_content, 'html')
-        msg.attach(html_part)
-        
-        # Conectar ao servidor SMTP
-        server = smtplib.SMTP(config['host'], config['port'])
-        server.starttls()
-        server.login(config['username'], config['password'])
+        remetente = config['username']
+        mensagem = modelo_mensagem(remetente, subject).montar(to_email, html_content)
         
-        # Enviar email
-        server.send_message(msg)
-        server.quit()
+        # Enviar por uma sessão já autenticada do pool da integração
+        obter_pool_smtp(config).enviar(mensagem, remetente, [to_email])
         
         print(f"Email enviado com sucesso via SMTP para {to_email}")
         return True
         
     except Exception as e:
+        adiamento = adiamento_smtp(e)
+        if adiamento:
+            # Recusa temporária do servidor de destino: quem chamou decide se reenvia
+            raise adiamento from e
         print(f"Erro ao enviar email via SMTP: {str(e)}")
         traceback.print_exc()
         return False
 
 def send_via_api(to_email, subject, html_content, config):
     """
-    Envia email usando API (ex: SendGrid, Mailgun, etc).
+    Envia email usando API (ex: Brevo, SendGrid, Mailgun), pela sessão
+    HTTP keep-alive da integração.
     """
     try:
-        headers = config.get('headers', {}).copy()
-        if config.get('api_key'):
-            # Ajustar formato do header de autorização
-            if 'brevo.com' in config.get('url', ''):
-                headers['api-key'] = config['api_key']
-            else:
-                headers['Authorization'] = f"Bearer {config['api_key']}"
-            
-        # Preparar payload conforme especificação da API
-        if 'payload_template' in config:
-            # Usar template específico da API
-            template = config['payload_template']
-            # Escapar caracteres especiais no conteúdo HTML
-            html_content = html_content.replace('"', '\\"').replace('\n', '\\n')
-            # Substituir variáveis no template
-            payload_str = template % (
-                to_email,
-                to_email.split('@')[0].title(),  # Nome do destinatário
-                subject,
-                html_content
-            )
-            # Converter string para JSON
-            payload = json.loads(payload_str)
-        else:
-            # Usar formato padrão
-            payload = {
-                'to': to_email,
-                'subject': subject,
-                'html': html_content
-            }
-            
-        # Enviar requisição
-        response = requests.post(
-            config['url'],
-            json=payload,
-            headers=headers,
-            timeout=10
-        )
-        
-        # Verificar resposta
-        response.raise_for_status()
+        obter_transporte_api(config).enviar(to_email, subject, html_content)
         
         print(f"Email enviado com sucesso via API para {to_email}")
         return True
@@ -210,17 +452,11 @@ def send_via_api(to_email, subject, html_content, config):
 def get_smtp_config():
     """Obtém a configuração SMTP do banco de dados."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM integracoes WHERE tipo = 'smtp' LIMIT 1")
-        integracao = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        
+        integracao = repo_integracoes.buscar_por_tipo('smtp')
         if not integracao:
             return None
             
-        config = json.loads(integracao['configuracao'])
+        config = integracao['configuracao']
         config['id'] = integracao['id']
         return config
     except Exception as e:
@@ -230,34 +466,9 @@ def get_smtp_config():
 def update_smtp_config(config_data):
     """Atualiza a configuração SMTP no banco de dados."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Verifica se já existe uma configuração
-        cursor.execute("SELECT id FROM integracoes WHERE tipo = 'smtp' LIMIT 1")
-        existing = cursor.fetchone()
-        
-        if existing:
-            # Atualiza a configuração existente
-            cursor.execute("""
-                UPDATE integracoes 
-                SET configuracao = %s, updated_at = CURRENT_TIMESTAMP
-                WHERE id = %s
-            """, (
-                json.dumps(config_data),
-                existing[0]
-            ))
-        else:
-            # Cria nova configuração
-            cursor.execute("""
-                INSERT INTO integracoes (tipo, configuracao)
-                VALUES ('smtp', %s)
-            """, (json.dumps(config_data),))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        repo_integracoes.salvar_por_tipo('smtp', config_data)
+        invalidar_integracoes()
         return True
     except Exception as e:
         print(f"Erro ao atualizar configuração SMTP: {str(e)}")
-        return False
\ No newline at end of file
+        return False
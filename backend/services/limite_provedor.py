@@ -0,0 +1,292 @@
+"""
+Limite de envios por integração, compartilhado por todos os workers.
+
+Cada processo decidia sozinho o ritmo das chamadas ao provedor, então mais
+workers significavam mais respostas 429. O limite de cada integração agora
+é um balde de fichas guardado no Redis (REDIS_URL): um script Lua
+reabastece o balde pelo relógio do próprio Redis e concede as fichas de
+forma atômica, de modo que todos os processos e nós dividem a mesma cota.
+Configuração da integração:
+
+    "limite_por_segundo": 14     taxa sustentada, com rajada de até 1 s de fichas
+    "limite_por_dia": 100000     cota do dia (UTC, pelo relógio do Redis)
+
+Para poupar idas ao Redis, cada processo pede LIMITE_FICHAS_LOTE fichas por
+vez (com o balde vazio, espera o lote inteiro) e as gasta localmente;
+fichas paradas há mais de 1 s são descartadas, para não virarem uma rajada
+acima da taxa, e devolvidas à cota do dia, que só conta os envios feitos.
+Sem Redis acessível (ou com LIMITE_REDIS=False) o balde fica em memória e o
+limite vale por processo. Com a cota do dia esgotada, `adquirir` levanta
+CotaEsgotada e send_email passa para a próxima integração ativa.
+"""
+import math
+import os
+import threading
+import time
+
+from backend.config import Config
+
+# Fichas concedidas localmente valem por este tempo (s)
+VALIDADE_FICHAS = 1.0
+
+# KEYS[1]: balde (hash fichas, atualizado_us); KEYS[2]: prefixo do contador diário
+# ARGV: taxa (fichas/s, 0 = sem limite), capacidade, fichas pedidas, cota diária (0 = sem cota)
+# Retorna {concedidas, espera_ms}; espera_ms = -1 quando a cota do dia acabou
+SCRIPT_ADQUIRIR = """
+-- TIME antes de escritas exige replicação por efeitos (padrão a partir do Redis 5)
+if redis.replicate_commands then redis.replicate_commands() end
+local agora = redis.call('TIME')
+local agora_us = tonumber(agora[1]) * 1000000 + tonumber(agora[2])
+local taxa = tonumber(ARGV[1])
+local capacidade = tonumber(ARGV[2])
+local concedidas = tonumber(ARGV[3])
+local cota = tonumber(ARGV[4])
+local chave_dia = KEYS[2] .. ':' .. math.floor(tonumber(agora[1]) / 86400)
+
+if cota > 0 then
+    local restantes = cota - tonumber(redis.call('GET', chave_dia) or '0')
+    if restantes <= 0 then
+        return {0, -1}
+    end
+    concedidas = math.min(concedidas, restantes)
+end
+
+local espera_ms = 0
+if taxa > 0 then
+    local balde = redis.call('HMGET', KEYS[1], 'fichas', 'atualizado_us')
+    local fichas = tonumber(balde[1]) or capacidade
+    local atualizado = tonumber(balde[2]) or agora_us
+    fichas = math.min(capacidade, fichas + (agora_us - atualizado) / 1000000 * taxa)
+    -- Com o balde vazio, a espera é pelo lote pedido inteiro: menos idas ao Redis
+    local alvo = math.min(concedidas, capacidade)
+    concedidas = math.min(concedidas, math.floor(fichas))
+    fichas = fichas - concedidas
+    if concedidas == 0 then
+        espera_ms = math.ceil((alvo - fichas) / taxa * 1000)
+    end
+    redis.call('HSET', KEYS[1], 'fichas', string.format('%.6f', fichas),
+               'atualizado_us', string.format('%.0f', agora_us))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacidade / taxa * 1000) + 1000)
+end
+
+if cota > 0 and concedidas > 0 then
+    redis.call('INCRBY', chave_dia, concedidas)
+    redis.call('EXPIRE', chave_dia, 172800)
+end
+return {concedidas, espera_ms}
+"""
+
+# Devolve à cota do dia (KEYS[1]: prefixo do contador diário) ARGV[1] fichas não usadas
+SCRIPT_DEVOLVER = """
+local chave_dia = KEYS[1] .. ':' .. math.floor(tonumber(redis.call('TIME')[1]) / 86400)
+local devolvidas = math.min(tonumber(ARGV[1]), tonumber(redis.call('GET', chave_dia) or '0'))
+if devolvidas > 0 then
+    redis.call('DECRBY', chave_dia, devolvidas)
+end
+return devolvidas
+"""
+
+
+class CotaEsgotada(Exception):
+    """A cota diária da integração acabou."""
+
+
+def _redis_ativo():
+    return os.getenv('LIMITE_REDIS', 'True').lower() == 'true'
+
+
+_redis = None
+_script = None
+_script_devolver = None
+_redis_indisponivel_ate = 0.0
+_redis_lock = threading.Lock()
+
+
+def _script_redis(devolver=False):
+    global _redis, _script, _script_devolver
+    if _script is None:
+        import redis
+        _redis = redis.Redis.from_url(Config.REDIS_URL, socket_connect_timeout=2, socket_timeout=2)
+        _script_devolver = _redis.register_script(SCRIPT_DEVOLVER)
+        _script = _redis.register_script(SCRIPT_ADQUIRIR)
+    return _script_devolver if devolver else _script
+
+
+class _BaldeLocal:
+    """O mesmo balde do script Lua, em memória, para quando o Redis não está acessível."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fichas = None
+        self._atualizado = 0.0
+        self._dia = None
+        self._usadas_dia = 0
+
+    def pedir(self, taxa, capacidade, pedidas, cota):
+        agora = time.time()
+        with self._lock:
+            dia = int(agora // 86400)
+            if dia != self._dia:
+                self._dia, self._usadas_dia = dia, 0
+            concedidas = pedidas
+            if cota:
+                if self._usadas_dia >= cota:
+                    return 0, -1
+                concedidas = min(concedidas, cota - self._usadas_dia)
+
+            espera_ms = 0
+            if taxa:
+                fichas = capacidade if self._fichas is None else self._fichas
+                fichas = min(capacidade, fichas + (agora - self._atualizado) * taxa)
+                alvo = min(concedidas, capacidade)
+                concedidas = min(concedidas, int(fichas))
+                self._fichas = fichas - concedidas
+                self._atualizado = agora
+                if not concedidas:
+                    espera_ms = math.ceil((alvo - self._fichas) / taxa * 1000)
+            self._usadas_dia += concedidas
+            return concedidas, espera_ms
+
+    def devolver(self, fichas):
+        with self._lock:
+            if self._dia == int(time.time() // 86400):
+                self._usadas_dia -= min(fichas, self._usadas_dia)
+
+
+class LimiteProvedor:
+    """Fichas de envio de uma integração, concedidas em lotes pelo Redis e gastas pelo processo."""
+
+    def __init__(self, chave, por_segundo=0, por_dia=0, lote=10):
+        self.chave = chave
+        self.por_segundo = por_segundo
+        self.por_dia = por_dia
+        self.capacidade = max(1, math.ceil(por_segundo)) if por_segundo else 0
+        self.lote = max(1, min(lote, self.capacidade or lote))
+        self._local = _BaldeLocal()
+        self._lock = threading.Lock()
+        self._fichas = 0
+        self._obtidas_em = 0.0
+        # De onde vieram as fichas guardadas ('redis' ou 'local'), para devolvê-las à mesma cota
+        self._origem = None
+        self._estatisticas = {
+            'pedidos_redis': 0, 'pedidos_locais': 0, 'fichas': 0, 'devolvidas': 0, 'esperas': 0, 'espera_s': 0.0,
+            'cota_esgotada': 0
+        }
+
+    def _contar(self, **incrementos):
+        with self._lock:
+            for nome, valor in incrementos.items():
+                self._estatisticas[nome] += valor
+
+    def _redis_falhou(self, erro):
+        global _redis_indisponivel_ate
+        with _redis_lock:
+            if time.monotonic() >= _redis_indisponivel_ate:
+                print(f"Limite de envio via Redis indisponível, limitando por processo: {str(erro)}")
+            _redis_indisponivel_ate = time.monotonic() + float(os.getenv('LIMITE_REDIS_ESPERA', 30))
+
+    def _pedir(self, quantidade):
+        """Pede fichas ao Redis (ou ao balde local). Retorna (concedidas, espera_ms, origem)."""
+        argumentos = [self.por_segundo, self.capacidade, quantidade, self.por_dia]
+        if _redis_ativo() and time.monotonic() >= _redis_indisponivel_ate:
+            try:
+                concedidas, espera_ms = _script_redis()(keys=[self.chave, f'{self.chave}:dia'], args=argumentos)
+                self._contar(pedidos_redis=1)
+                return int(concedidas), int(espera_ms), 'redis'
+            except Exception as e:
+                self._redis_falhou(e)
+        self._contar(pedidos_locais=1)
+        return (*self._local.pedir(*argumentos), 'local')
+
+    def _devolver(self, fichas, origem):
+        """Devolve à cota do dia as fichas descartadas sem uso."""
+        if not self.por_dia:
+            return
+        self._contar(devolvidas=fichas)
+        if origem == 'local':
+            self._local.devolver(fichas)
+            return
+        try:
+            _script_redis(devolver=True)(keys=[f'{self.chave}:dia'], args=[fichas])
+        except Exception as e:
+            self._redis_falhou(e)
+
+    def _usar_locais(self, quantidade):
+        vencidas = 0
+        with self._lock:
+            if self._fichas and time.monotonic() - self._obtidas_em > VALIDADE_FICHAS:
+                vencidas, self._fichas = self._fichas, 0
+            usadas = min(self._fichas, quantidade)
+            self._fichas -= usadas
+            origem = self._origem
+        if vencidas:
+            self._devolver(vencidas, origem)
+        return usadas
+
+    def adquirir(self, quantidade=1):
+        """
+        Espera até obter `quantidade` fichas (uma por destinatário). Levanta
+        CotaEsgotada se a cota do dia acabar antes.
+        """
+        faltam = quantidade - self._usar_locais(quantidade)
+        while faltam:
+            concedidas, espera_ms, origem = self._pedir(max(faltam, self.lote))
+            if espera_ms < 0:
+                self._contar(cota_esgotada=1)
+                raise CotaEsgotada(f"Cota diária de {self.por_dia} envios esgotada em {self.chave}")
+            if concedidas:
+                self._contar(fichas=concedidas)
+                usadas = min(concedidas, faltam)
+                faltam -= usadas
+                if concedidas > usadas:
+                    with self._lock:
+                        self._fichas += concedidas - usadas
+                        self._obtidas_em = time.monotonic()
+                        self._origem = origem
+                continue
+            self._contar(esperas=1, espera_s=espera_ms / 1000)
+            time.sleep(espera_ms / 1000)
+
+    def estatisticas(self):
+        with self._lock:
+            estatisticas = dict(self._estatisticas)
+        return dict(
+            estatisticas,
+            chave=self.chave,
+            por_segundo=self.por_segundo,
+            por_dia=self.por_dia,
+            espera_s=round(estatisticas['espera_s'], 3),
+        )
+
+
+_limites = {}
+_limites_lock = threading.Lock()
+
+
+def obter_limite(integracao):
+    """
+    Limite da integração, ou None se ela não configura limite_por_segundo
+    nem limite_por_dia.
+    """
+    config = integracao.get('configuracao') or {}
+    por_segundo = float(config.get('limite_por_segundo') or 0)
+    por_dia = int(config.get('limite_por_dia') or 0)
+    if not por_segundo and not por_dia:
+        return None
+
+    chave = (integracao.get('id'), por_segundo, por_dia)
+    limite = _limites.get(chave)
+    if limite is None:
+        with _limites_lock:
+            limite = _limites.get(chave)
+            if limite is None:
+                limite = _limites[chave] = LimiteProvedor(
+                    f"limite:integracao:{integracao.get('id')}", por_segundo, por_dia,
+                    lote=int(os.getenv('LIMITE_FICHAS_LOTE', 10))
+                )
+    return limite
+
+
+def estatisticas_limites():
+    """Fichas pedidas ao Redis e esperas de cada integração limitada no processo."""
+    return [limite.estatisticas() for limite in list(_limites.values())]
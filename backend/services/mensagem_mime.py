@@ -0,0 +1,114 @@
+"""
+Mensagens MIME montadas a partir de um modelo por campanha.
+
+send_via_smtp montava uma árvore MIMEMultipart/MIMEText por destinatário,
+que send_message serializava de novo. O modelo de uma campanha (mesmo
+remetente e assunto) guarda prontos, em bytes, os cabeçalhos comuns (From,
+Subject já codificado e dobrado, MIME-Version, Content-Type com o
+boundary) e os cabeçalhos das partes. Por destinatário só entram To,
+Message-ID, Date e os corpos personalizados, em base64 com linhas de 76
+caracteres e CRLF, como o MIMEText faz para utf-8.
+
+A parte text/plain, alternativa ao HTML para leitores sem HTML e filtros
+de spam, é derivada do HTML do destinatário (MENSAGEM_TEXTO_PLANO=False
+envia só o HTML, como antes).
+"""
+import html
+import itertools
+import os
+import re
+import secrets
+import time
+from base64 import b64encode
+from email import policy
+from email.utils import formatdate
+from functools import lru_cache
+
+LINHA_BASE64 = 76
+
+_SEM_TEXTO = re.compile(r'<(script|style|head|title)\b.*?</\1\s*>', re.I | re.S)
+_LINK = re.compile(r'<a\s[^>]*?href="([^"]+)"[^>]*>(.*?)</a\s*>', re.I | re.S)
+_QUEBRA = re.compile(r'<br\s*/?>|</(p|div|tr|table|h[1-6]|li|ul|ol)\s*>', re.I)
+_TAG = re.compile(r'<[^>]+>')
+_ESPACOS = re.compile(r'[ \t\r\f\v]+')
+_LINHAS_VAZIAS = re.compile(r'\n\s*\n\s*')
+
+
+def html_para_texto(html_content):
+    """Texto simples do HTML: sem tags, com quebras nos blocos e o endereço dos links entre parênteses."""
+    texto = _SEM_TEXTO.sub('', html_content)
+    texto = _LINK.sub(lambda link: f'{link.group(2)} ({link.group(1)})', texto)
+    texto = _QUEBRA.sub('\n', texto)
+    texto = html.unescape(_TAG.sub('', texto))
+    texto = _ESPACOS.sub(' ', texto)
+    return _LINHAS_VAZIAS.sub('\n\n', texto).strip()
+
+
+def _base64(texto):
+    """`texto` em utf-8 e base64, em linhas de 76 caracteres terminadas em CRLF."""
+    codificado = b64encode(texto.encode('utf-8'))
+    return b''.join(
+        codificado[inicio:inicio + LINHA_BASE64] + b'\r\n' for inicio in range(0, len(codificado), LINHA_BASE64)
+    )
+
+
+def _cabecalho(nome, valor, politica=policy.SMTP):
+    """Cabeçalho codificado (RFC 2047) e dobrado em 78 colunas, terminado em CRLF."""
+    return politica.fold_binary(*politica.header_store_parse(nome, valor))
+
+
+class ModeloMensagem:
+    """Cabeçalhos e partes comuns às mensagens de uma campanha."""
+
+    def __init__(self, remetente, assunto, texto_plano=True):
+        self.remetente = remetente
+        self.texto_plano = texto_plano
+        boundary = f'=_{secrets.token_hex(12)}'
+        self._dominio = remetente.rsplit('@', 1)[-1].strip('> ') or 'localhost'
+        self._prefixo_id = f'{int(time.time())}.{os.getpid()}.{secrets.token_hex(4)}'
+        self._sequencia = itertools.count(1)
+
+        self._cabecalhos = (
+            _cabecalho('From', remetente)
+            + _cabecalho('Subject', assunto)
+            + b'MIME-Version: 1.0\r\n'
+        )
+        parte = b'Content-Type: text/%s; charset="utf-8"\r\nContent-Transfer-Encoding: base64\r\n\r\n'
+        if texto_plano:
+            self._cabecalhos += f'Content-Type: multipart/alternative; boundary="{boundary}"\r\n'.encode()
+            self._inicio_texto = f'\r\n--{boundary}\r\n'.encode() + parte % b'plain'
+            self._inicio_html = f'--{boundary}\r\n'.encode() + parte % b'html'
+            self._fim = f'--{boundary}--\r\n'.encode()
+        else:
+            self._cabecalhos += parte[:-2] % b'html'
+            self._inicio_html = b'\r\n'
+            self._fim = b''
+
+    def _destinatario(self, to_email):
+        if to_email.isascii() and len(to_email) <= 70 and '\r' not in to_email and '\n' not in to_email:
+            return b'To: ' + to_email.encode() + b'\r\n'
+        # Endereço com caracteres fora do ASCII vai em utf-8 (o pool pede SMTPUTF8 ao servidor)
+        return _cabecalho('To', to_email, policy.SMTP if to_email.isascii() else policy.SMTPUTF8)
+
+    def montar(self, to_email, html_content):
+        """Bytes da mensagem para `to_email`, prontos para o DATA do SMTP."""
+        partes = [
+            self._cabecalhos,
+            self._destinatario(to_email),
+            f'Message-ID: <{self._prefixo_id}.{next(self._sequencia)}@{self._dominio}>\r\n'.encode(),
+            f'Date: {formatdate(localtime=True)}\r\n'.encode(),
+        ]
+        if self.texto_plano:
+            partes += [self._inicio_texto, _base64(html_para_texto(html_content))]
+        partes += [self._inicio_html, _base64(html_content), self._fim]
+        return b''.join(partes)
+
+
+@lru_cache(maxsize=64)
+def _modelo(remetente, assunto, texto_plano):
+    return ModeloMensagem(remetente, assunto, texto_plano)
+
+
+def modelo_mensagem(remetente, assunto):
+    """Modelo da campanha (remetente e assunto), criado na primeira mensagem e reaproveitado nas seguintes."""
+    return _modelo(remetente, assunto, os.getenv('MENSAGEM_TEXTO_PLANO', 'True').lower() == 'true')
@@ -0,0 +1,109 @@
+"""
+Envio concorrente por integração.
+
+Cada envio passa a maior parte do tempo esperando o servidor SMTP ou a API
+do provedor. O motor de uma integração mantém até `concorrencia` envios em
+andamento, em threads de um executor compartilhado pelo processo, de modo
+que várias campanhas no mesmo worker também respeitam o limite. Com o
+worker Celery em `-P gevent` o monkey patching do gevent transforma essas
+threads em greenlets, sem mudança no código.
+
+A concorrência vem de "concorrencia" na configuração da integração; sem
+ela, do tamanho do pool de sessões do tipo (SMTP_POOL_TAMANHO ou
+API_POOL_TAMANHO). Os pools de sessões crescem até a concorrência
+configurada, então cada envio em andamento tem a sua conexão.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def concorrencia(integracao):
+    """Envios simultâneos permitidos para a integração."""
+    configurada = (integracao.get('configuracao') or {}).get('concorrencia')
+    if configurada:
+        return max(1, int(configurada))
+    if integracao['tipo'] == 'smtp':
+        return int(os.getenv('SMTP_POOL_TAMANHO', 4))
+    return int(os.getenv('API_POOL_TAMANHO', 10))
+
+
+class MotorEnvio:
+    """Executor de envios de uma integração, limitado a `concorrencia` envios simultâneos."""
+
+    def __init__(self, nome, concorrencia):
+        self.nome = nome
+        self.concorrencia = concorrencia
+        self._executor = ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix=f'envio-{nome}')
+        self._lock = threading.Lock()
+        self._em_andamento = 0
+        self._pico = 0
+        self._tarefas = 0
+
+    def submeter(self, funcao, *args):
+        """Agenda `funcao(*args)` e retorna o Future com o resultado."""
+        return self._executor.submit(self._executar, funcao, args)
+
+    def _executar(self, funcao, args):
+        with self._lock:
+            self._em_andamento += 1
+            self._pico = max(self._pico, self._em_andamento)
+        try:
+            return funcao(*args)
+        finally:
+            with self._lock:
+                self._em_andamento -= 1
+                self._tarefas += 1
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'integracao': self.nome,
+                'concorrencia': self.concorrencia,
+                'em_andamento': self._em_andamento,
+                'pico': self._pico,
+                'tarefas': self._tarefas,
+            }
+
+    def fechar(self):
+        self._executor.shutdown(wait=False)
+
+
+_motores = {}
+_motores_lock = threading.Lock()
+_motores_pid = None
+
+
+def obter_motor(integracao):
+    """
+    Retorna o motor da integração, criando-o no primeiro envio. Mudar a
+    concorrência configurada cria um motor novo.
+    """
+    global _motores_pid
+    chave = (integracao.get('id'), integracao['tipo'], concorrencia(integracao))
+    with _motores_lock:
+        # As threads do executor não sobrevivem a um fork (workers do gunicorn e do Celery)
+        if _motores_pid != os.getpid():
+            _motores.clear()
+            _motores_pid = os.getpid()
+        motor = _motores.get(chave)
+        if motor is None:
+            nome = integracao.get('nome') or f"{integracao['tipo']}-{integracao.get('id')}"
+            motor = _motores[chave] = MotorEnvio(nome, chave[2])
+    return motor
+
+
+def fechar_motores():
+    """Encerra os motores do processo; os próximos envios criam motores novos."""
+    with _motores_lock:
+        motores = list(_motores.values())
+        _motores.clear()
+    for motor in motores:
+        motor.fechar()
+
+
+def estatisticas_motores():
+    """Estatísticas do motor de cada integração usada pelo processo."""
+    with _motores_lock:
+        motores = list(_motores.values())
+    return [motor.estatisticas() for motor in motores]
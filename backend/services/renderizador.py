@@ -0,0 +1,186 @@
+"""
+Personalização de templates compilados.
+
+Cada ponto do sistema personalizava o HTML com uma sequência de
+`str.replace` por campo e por contato, e com sintaxes diferentes:
+`{{ campo }}` nos agendamentos e na prévia, `{campo}` nas campanhas. O
+template agora é lido uma vez e compilado em trechos fixos e lacunas de
+variáveis, nas duas sintaxes; personalizar para um contato só preenche as
+lacunas e junta os trechos.
+
+Um campo sem valor (ausente ou None) mantém o texto original do marcador,
+como antes. Os compilados ficam em cache por (id, updated_at) do template,
+até TEMPLATES_CACHE_MAX templates; o HTML é conferido a cada acerto, porque
+updated_at tem resolução de segundos (e no SQLite não muda sozinho).
+
+Com `base_url` o compilado também injeta o tracking (TemplateRastreado):
+os links e o `</body>` são localizados uma vez por template, e cada
+contato só recebe os seus tokens, emendados entre trechos prontos.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import quote_plus, urlencode
+
+from backend.utils import assinar_url, gerar_token_tracking
+
+# {{ campo }} (com ou sem espaços) e {campo}
+MARCADOR = re.compile(r'\{\{\s*(\w+)\s*\}\}|\{(\w+)\}')
+
+# Links e fechamento do corpo, onde entram o redirecionamento de clique e o pixel de abertura
+PONTO_TRACKING = re.compile(r'href="([^"]+)"|(?i:</body>)')
+
+# Campos do contato disponíveis nos templates
+CAMPOS_CONTATO = ('nome', 'email', 'cargo', 'empresa')
+
+
+def campos_do_contato(contato):
+    return {campo: contato.get(campo) for campo in CAMPOS_CONTATO}
+
+
+class TemplateCompilado:
+    """HTML dividido em trechos fixos e lacunas de variáveis."""
+
+    def __init__(self, html_content):
+        self.fonte = html_content
+        self._partes = []
+        self._lacunas = []
+        posicao = 0
+        for marcador in MARCADOR.finditer(html_content):
+            self._partes.append(html_content[posicao:marcador.start()])
+            self._lacunas.append((len(self._partes), marcador.group(1) or marcador.group(2), marcador.group(0)))
+            self._partes.append(marcador.group(0))
+            posicao = marcador.end()
+        self._partes.append(html_content[posicao:])
+        self.variaveis = list(dict.fromkeys(campo for _, campo, _ in self._lacunas))
+
+    def renderizar(self, valores, padrao=None):
+        """
+        HTML com as variáveis de `valores` e, na falta delas, de `padrao`.
+        Os valores não são escapados.
+        """
+        if not self._lacunas:
+            return self.fonte
+        partes = self._partes.copy()
+        for indice, campo, original in self._lacunas:
+            valor = valores.get(campo)
+            if valor is None and padrao:
+                valor = padrao.get(campo)
+            if valor is not None:
+                partes[indice] = str(valor)
+        return ''.join(partes)
+
+
+class TemplateRastreado:
+    """
+    Template compilado com os links e o pixel de tracking já localizados.
+    O tracking vai para cada link `href="..."` (redirecionado por
+    /api/tracking/click) e antes de cada `</body>` (pixel de abertura).
+    """
+
+    def __init__(self, html_content, base_url):
+        self.fonte = html_content
+        self._prefixo_clique = f'href="{base_url}/api/tracking/click/'
+        self._prefixo_pixel = f'<img src="{base_url}/api/tracking/pixel/'
+        # (trecho compilado, link, sufixo do link fixo, fechamento do corpo) por ponto de tracking
+        self._pontos = []
+        posicao = 0
+        for ponto in PONTO_TRACKING.finditer(html_content):
+            trecho = TemplateCompilado(html_content[posicao:ponto.start()])
+            if ponto.group(1) is None:
+                self._pontos.append((trecho, None, None, ponto.group(0)))
+            else:
+                link = TemplateCompilado(ponto.group(1))
+                # URL sem variáveis: o parâmetro de redirecionamento é codificado e assinado uma vez só
+                sufixo = None if link.variaveis else f'?{_parametro_url(link.fonte)}"'
+                self._pontos.append((trecho, link, sufixo, None))
+            posicao = ponto.end()
+        self._final = TemplateCompilado(html_content[posicao:])
+        campos = []
+        for trecho, link, _, _ in self._pontos:
+            campos += trecho.variaveis + (link.variaveis if link else [])
+        self.variaveis = list(dict.fromkeys(campos + self._final.variaveis))
+
+    def renderizar(self, valores, padrao=None, envio_id=None, contato_id=None):
+        """
+        HTML personalizado, com o tracking do contato quando `envio_id` e
+        `contato_id` são informados; sem eles os links ficam como estão.
+        """
+        rastrear = bool(envio_id and contato_id)
+        token_abertura = token_clique = None
+        partes = []
+        for trecho, link, sufixo, fechamento in self._pontos:
+            partes.append(trecho.renderizar(valores, padrao))
+            if fechamento is not None:
+                if rastrear:
+                    if token_abertura is None:
+                        token_abertura = gerar_token_tracking(envio_id, contato_id, 'abertura')
+                    partes.append(f'{self._prefixo_pixel}{token_abertura}" width="1" height="1" style="display:none;">')
+                partes.append(fechamento)
+            elif not rastrear:
+                partes.append(f'href="{link.renderizar(valores, padrao)}"')
+            else:
+                if token_clique is None:
+                    token_clique = gerar_token_tracking(envio_id, contato_id, 'clique')
+                partes.append(self._prefixo_clique)
+                partes.append(token_clique)
+                partes.append(sufixo or f'?{_parametro_url(link.renderizar(valores, padrao))}"')
+        partes.append(self._final.renderizar(valores, padrao))
+        return ''.join(partes)
+
+
+def _parametro_url(url):
+    # A assinatura impede que o redirecionamento seja trocado por outro endereço
+    return urlencode({'url': url, 'h': assinar_url(url)}, quote_via=quote_plus)
+
+
+def compilar(html_content, base_url=None):
+    """Compila um HTML avulso, sem cache; com `base_url`, com tracking."""
+    if base_url is not None:
+        return TemplateRastreado(html_content or '', base_url)
+    return TemplateCompilado(html_content or '')
+
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_estatisticas = {'acertos': 0, 'compilacoes': 0}
+
+
+def template_compilado(template_id, updated_at, html_content, base_url=None):
+    """
+    Compilado do template (com tracking, se `base_url` for informada), do
+    cache quando o id, o updated_at e o HTML coincidem.
+    """
+    chave = (template_id, updated_at, base_url)
+    html_content = html_content or ''
+    with _lock:
+        compilado = _cache.get(chave)
+        if compilado is not None and compilado.fonte == html_content:
+            _cache.move_to_end(chave)
+            _estatisticas['acertos'] += 1
+            return compilado
+
+    compilado = compilar(html_content, base_url)
+    with _lock:
+        _estatisticas['compilacoes'] += 1
+        _cache[chave] = compilado
+        _cache.move_to_end(chave)
+        while len(_cache) > int(os.getenv('TEMPLATES_CACHE_MAX', 256)):
+            _cache.popitem(last=False)
+    return compilado
+
+
+def compilado_do_template(template, base_url=None):
+    """Compilado de uma linha da tabela templates."""
+    return template_compilado(template['id'], template.get('updated_at'), template['html_content'], base_url)
+
+
+def estatisticas_templates():
+    with _lock:
+        return dict(_estatisticas, em_cache=len(_cache))
+
+
+def limpar_templates():
+    with _lock:
+        _cache.clear()
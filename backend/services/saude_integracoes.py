@@ -0,0 +1,210 @@
+"""
+Saúde das integrações de envio e disjuntores (circuit breakers).
+
+send_email tentava as integrações sempre na mesma ordem, então com o
+primeiro provedor fora do ar cada mensagem esperava o erro (ou o timeout)
+dele antes de passar para o seguinte. Cada integração agora guarda, por
+processo, os últimos SAUDE_JANELA resultados de envio e a latência de
+cada um:
+
+- a nota de saúde é a taxa de acerto dividida por
+  (1 + latência média / SAUDE_LATENCIA_REF);
+- o disjuntor abre após CIRCUITO_FALHAS_SEGUIDAS falhas seguidas, ou com
+  a taxa de erros em SAUDE_TAXA_ERRO ou mais depois de SAUDE_MINIMO
+  resultados. Aberto, a integração é pulada por CIRCUITO_ESPERA segundos;
+  depois um único envio de teste decide se ela volta (sucesso) ou se o
+  disjuntor abre de novo (falha).
+
+`ordenar_integracoes` sorteia a ordem das integrações disponíveis com
+probabilidade proporcional a nota × "peso" da configuração (padrão 1), de
+modo que os provedores saudáveis dividem o tráfego; "peso": 0 deixa a
+integração só como reserva.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+
+FECHADO = 'fechado'
+ABERTO = 'aberto'
+MEIO_ABERTO = 'meio_aberto'
+
+# Peso mínimo de uma integração disponível, para ela ainda receber algum envio
+PESO_MINIMO = 0.01
+
+
+class SaudeIntegracao:
+    """Resultados recentes e disjuntor de uma integração."""
+
+    def __init__(self, nome, peso=1.0):
+        self.nome = nome
+        self.peso_configurado = peso
+        self.janela = int(os.getenv('SAUDE_JANELA', 50))
+        self.minimo = int(os.getenv('SAUDE_MINIMO', 10))
+        self.taxa_erro_max = float(os.getenv('SAUDE_TAXA_ERRO', 0.5))
+        self.latencia_referencia = float(os.getenv('SAUDE_LATENCIA_REF', 1.0))
+        self.falhas_seguidas_max = int(os.getenv('CIRCUITO_FALHAS_SEGUIDAS', 5))
+        self.espera = float(os.getenv('CIRCUITO_ESPERA', 30))
+        self._lock = threading.Lock()
+        self._resultados = deque(maxlen=self.janela)
+        self._estado = FECHADO
+        self._reabre_em = 0.0
+        self._em_teste = False
+        self._falhas_seguidas = 0
+        self._aberturas = 0
+        self._puladas = 0
+
+    def _atualizar_estado(self):
+        if self._estado == ABERTO and time.monotonic() >= self._reabre_em:
+            self._estado = MEIO_ABERTO
+            self._em_teste = False
+
+    def disponivel(self):
+        """Se a integração pode receber envios agora (sem reservar o envio de teste)."""
+        with self._lock:
+            self._atualizar_estado()
+            return self._estado == FECHADO or (self._estado == MEIO_ABERTO and not self._em_teste)
+
+    def permitir(self):
+        """
+        Autoriza um envio pela integração. Com o disjuntor meio aberto só o
+        primeiro pedido passa, como envio de teste; os demais são recusados
+        até o resultado dele chegar em `registrar`.
+        """
+        with self._lock:
+            self._atualizar_estado()
+            if self._estado == FECHADO:
+                return True
+            if self._estado == MEIO_ABERTO and not self._em_teste:
+                self._em_teste = True
+                return True
+            self._puladas += 1
+            return False
+
+    def registrar(self, sucesso, latencia=None):
+        """
+        Registra o resultado de um envio autorizado. `sucesso=None` (envio
+        adiado ou não tentado) só libera o envio de teste, sem contar.
+        """
+        with self._lock:
+            if sucesso is None:
+                self._em_teste = False
+                return
+            self._resultados.append((bool(sucesso), latencia))
+            self._falhas_seguidas = 0 if sucesso else self._falhas_seguidas + 1
+
+            if self._estado == MEIO_ABERTO:
+                self._em_teste = False
+                if sucesso:
+                    # Os erros de antes da abertura não contam mais
+                    self._estado = FECHADO
+                    self._resultados.clear()
+                    self._resultados.append((True, latencia))
+                    print(f"Integração {self.nome} voltou a enviar; disjuntor fechado")
+                else:
+                    self._abrir()
+            elif self._estado == FECHADO and self._deve_abrir():
+                self._abrir()
+
+    def _taxa_erros(self):
+        if not self._resultados:
+            return 0.0
+        return sum(1 for sucesso, _ in self._resultados if not sucesso) / len(self._resultados)
+
+    def _latencia_media(self):
+        latencias = [latencia for _, latencia in self._resultados if latencia is not None]
+        return sum(latencias) / len(latencias) if latencias else 0.0
+
+    def _deve_abrir(self):
+        return (self._falhas_seguidas >= self.falhas_seguidas_max
+                or (len(self._resultados) >= self.minimo and self._taxa_erros() >= self.taxa_erro_max))
+
+    def _abrir(self):
+        self._estado = ABERTO
+        self._reabre_em = time.monotonic() + self.espera
+        self._aberturas += 1
+        print(f"Integração {self.nome} com falhas; disjuntor aberto por {self.espera:g}s")
+
+    def _nota(self):
+        return (1.0 - self._taxa_erros()) / (1.0 + self._latencia_media() / self.latencia_referencia)
+
+    def nota(self):
+        """Nota de saúde entre 0 e 1: taxa de acerto penalizada pela latência média."""
+        with self._lock:
+            return self._nota()
+
+    def peso(self):
+        """Peso no sorteio da ordem de envio; 0 para integrações de reserva."""
+        if self.peso_configurado <= 0:
+            return 0.0
+        return max(self.nota() * self.peso_configurado, PESO_MINIMO)
+
+    def estatisticas(self):
+        with self._lock:
+            self._atualizar_estado()
+            return {
+                'integracao': self.nome,
+                'estado': self._estado,
+                'nota': round(self._nota(), 3),
+                'taxa_erros': round(self._taxa_erros(), 3),
+                'latencia_media_ms': round(self._latencia_media() * 1000, 1),
+                'resultados': len(self._resultados),
+                'falhas_seguidas': self._falhas_seguidas,
+                'aberturas': self._aberturas,
+                'puladas': self._puladas,
+                'reabre_em_s': round(max(self._reabre_em - time.monotonic(), 0.0), 1) if self._estado == ABERTO else 0.0,
+            }
+
+
+_saudes = {}
+_saudes_lock = threading.Lock()
+
+
+def obter_saude(integracao):
+    """Saúde da integração no processo, criada no primeiro envio."""
+    peso = float((integracao.get('configuracao') or {}).get('peso', 1))
+    chave = (integracao.get('id'), integracao['tipo'])
+    saude = _saudes.get(chave)
+    if saude is None:
+        with _saudes_lock:
+            saude = _saudes.get(chave)
+            if saude is None:
+                nome = integracao.get('nome') or f"{integracao['tipo']}-{integracao.get('id')}"
+                saude = _saudes[chave] = SaudeIntegracao(nome, peso)
+    saude.peso_configurado = peso
+    return saude
+
+
+def ordenar_integracoes(integracoes):
+    """
+    Integrações com o disjuntor fechado (ou prontas para o envio de teste),
+    em ordem sorteada pelo peso de cada uma; as de peso 0 vão para o fim, na
+    ordem original. Com todos os disjuntores abertos a lista sai vazia.
+    """
+    sorteadas = []
+    reservas = []
+    for integracao in integracoes or []:
+        saude = obter_saude(integracao)
+        if not saude.disponivel():
+            continue
+        peso = saude.peso()
+        if peso > 0:
+            # Sorteio ponderado sem reposição (Efraimidis-Spirakis)
+            sorteadas.append((random.random() ** (1.0 / peso), integracao))
+        else:
+            reservas.append(integracao)
+    sorteadas.sort(key=lambda par: par[0], reverse=True)
+    return [integracao for _, integracao in sorteadas] + reservas
+
+
+def estatisticas_saude():
+    """Estado do disjuntor, nota, taxa de erros e latência de cada integração usada pelo processo."""
+    with _saudes_lock:
+        saudes = list(_saudes.values())
+    return [saude.estatisticas() for saude in saudes]
+
+
+def zerar_saude():
+    with _saudes_lock:
+        _saudes.clear()
@@ -0,0 +1,308 @@
+"""
+Sessões SMTP autenticadas reaproveitadas entre mensagens.
+
+Abrir a conexão, negociar STARTTLS e autenticar custa bem mais que enviar
+uma mensagem. Cada integração SMTP (host, porta e usuário) tem um pool de
+sessões já autenticadas: a mensagem usa uma sessão livre e a devolve ao
+pool. Uma sessão é encerrada após SMTP_MAX_MENSAGENS mensagens ou quando
+fica ociosa por mais de SMTP_OCIOSO segundos; sessões paradas há mais de
+SMTP_NOOP_INTERVALO segundos são verificadas com NOOP antes do uso.
+Respostas 421/451 e conexões derrubadas pelo servidor descartam a sessão e
+a mensagem é reenviada uma vez numa sessão nova.
+"""
+import os
+import queue
+import smtplib
+import threading
+import time
+
+# Serviço indisponível / erro local transitório: a sessão não serve mais
+CODIGOS_RECONEXAO = (421, 451)
+
+
+class PoolSMTPEsgotadoError(smtplib.SMTPException):
+    """Lançado quando nenhuma sessão fica livre dentro do tempo limite do pool."""
+
+
+def _conectar_smtp(config, timeout):
+    smtp = smtplib.SMTP(config['host'], int(config['port']), timeout=timeout)
+    try:
+        if config.get('starttls', True):
+            smtp.starttls()
+        if config.get('username'):
+            smtp.login(config['username'], config['password'])
+    except Exception:
+        smtp.close()
+        raise
+    return smtp
+
+
+def _falha_de_conexao(erro):
+    """Indica se o erro deixou a sessão inutilizável e vale reenviar numa nova."""
+    if isinstance(erro, smtplib.SMTPRecipientsRefused):
+        return any(codigo in CODIGOS_RECONEXAO for codigo, _ in erro.recipients.values())
+    if isinstance(erro, smtplib.SMTPResponseException):
+        return erro.smtp_code in CODIGOS_RECONEXAO
+    if isinstance(erro, smtplib.SMTPServerDisconnected):
+        return True
+    # SMTPException herda de OSError; os demais OSError são falhas de socket
+    return isinstance(erro, OSError) and not isinstance(erro, smtplib.SMTPException)
+
+
+class SessaoSMTP:
+    """Conexão SMTP autenticada e seu histórico de uso."""
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.mensagens = 0
+        self.ultimo_uso = time.monotonic()
+
+    def encerrar(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            self.smtp.close()
+
+
+class PoolSMTP:
+    """
+    Pool de sessões SMTP de uma integração, com no máximo `tamanho` sessões
+    abertas ao mesmo tempo.
+    """
+
+    def __init__(self, config, tamanho=4, max_mensagens=100, ocioso=60, intervalo_noop=10,
+                 timeout=30, espera=30, fabrica=_conectar_smtp):
+        self.config = config
+        self.nome = f"{config['host']}:{config['port']}/{config.get('username', '')}"
+        self.tamanho = tamanho
+        self.max_mensagens = max_mensagens
+        self.ocioso = ocioso
+        self.intervalo_noop = intervalo_noop
+        self.timeout = timeout
+        self.espera = espera
+        self._fabrica = fabrica
+        self._iniciar()
+
+    def _iniciar(self):
+        self._pid = os.getpid()
+        self._livres = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(self.tamanho)
+        self._lock = threading.Lock()
+        self._abertas = 0
+        self._em_uso = 0
+        self._conexoes = 0
+        self._mensagens = 0
+        self._reusos = 0
+        self._reconexoes = 0
+        self._encerradas_limite = 0
+        self._encerradas_ociosas = 0
+        self._falhas_noop = 0
+        self._timeouts = 0
+
+    def _verificar_processo(self):
+        # Sessões herdadas num fork (Celery prefork) compartilhariam o socket com o processo pai
+        if self._pid != os.getpid():
+            self._iniciar()
+
+    def obter(self):
+        """Empresta uma sessão livre ou abre uma nova, aguardando até `espera` segundos por uma vaga."""
+        self._verificar_processo()
+
+        if not self._vagas.acquire(timeout=self.espera):
+            with self._lock:
+                self._timeouts += 1
+            raise PoolSMTPEsgotadoError(f"Nenhuma sessão SMTP livre em '{self.nome}' após {self.espera}s")
+
+        try:
+            sessao = self._retirar_livre()
+            if sessao is None:
+                sessao = SessaoSMTP(self._fabrica(self.config, self.timeout))
+                with self._lock:
+                    self._abertas += 1
+                    self._conexoes += 1
+        except Exception:
+            self._vagas.release()
+            raise
+
+        with self._lock:
+            self._em_uso += 1
+        return sessao
+
+    def _retirar_livre(self):
+        while True:
+            try:
+                sessao = self._livres.get_nowait()
+            except queue.Empty:
+                return None
+
+            parada = time.monotonic() - sessao.ultimo_uso
+            if parada >= self.ocioso:
+                # O servidor provavelmente já encerrou a conexão por inatividade
+                self._fechar(sessao)
+                with self._lock:
+                    self._encerradas_ociosas += 1
+                continue
+            if parada < self.intervalo_noop or self._responde_noop(sessao):
+                return sessao
+
+            self._fechar(sessao, educado=False)
+            with self._lock:
+                self._falhas_noop += 1
+
+    def _responde_noop(self, sessao):
+        try:
+            return sessao.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _fechar(self, sessao, educado=True):
+        with self._lock:
+            self._abertas -= 1
+        if educado:
+            sessao.encerrar()
+        else:
+            sessao.smtp.close()
+
+    def devolver(self, sessao):
+        """Devolve a sessão ao pool, encerrando-a se já enviou `max_mensagens` mensagens."""
+        if self._pid != os.getpid():
+            return
+
+        with self._lock:
+            self._em_uso -= 1
+        try:
+            if sessao.mensagens >= self.max_mensagens:
+                self._fechar(sessao)
+                with self._lock:
+                    self._encerradas_limite += 1
+            else:
+                sessao.ultimo_uso = time.monotonic()
+                self._livres.put(sessao)
+        finally:
+            self._vagas.release()
+
+    def descartar(self, sessao):
+        """Fecha uma sessão emprestada em estado inválido, liberando a vaga no pool."""
+        if self._pid != os.getpid():
+            return
+
+        with self._lock:
+            self._em_uso -= 1
+        try:
+            self._fechar(sessao, educado=False)
+        finally:
+            self._vagas.release()
+
+    def enviar(self, msg, remetente=None, destinatarios=None):
+        """
+        Envia `msg` por uma sessão do pool: um email.message.Message, ou os
+        bytes já montados da mensagem com `remetente` e `destinatarios`. Se a
+        sessão cair ou o servidor responder 421/451, a mensagem é reenviada
+        uma vez numa sessão nova; outros erros são propagados.
+        """
+        for tentativa in (1, 2):
+            sessao = self.obter()
+            try:
+                if isinstance(msg, bytes):
+                    # Endereços fora do ASCII exigem SMTPUTF8, como o send_message faz
+                    enderecos_ascii = remetente.isascii() and all(d.isascii() for d in destinatarios)
+                    sessao.smtp.sendmail(remetente, destinatarios, msg,
+                                         () if enderecos_ascii else ('SMTPUTF8', 'BODY=8BITMIME'))
+                else:
+                    sessao.smtp.send_message(msg)
+            except Exception as erro:
+                reconectar = _falha_de_conexao(erro)
+                if reconectar or not isinstance(erro, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                    self.descartar(sessao)
+                else:
+                    # Recusa da mensagem ou do destinatário: a sessão continua válida
+                    self.devolver(sessao)
+                if reconectar and tentativa == 1:
+                    print(f"Sessão SMTP {self.nome} perdida ({erro}); reenviando em nova conexão")
+                    with self._lock:
+                        self._reconexoes += 1
+                    continue
+                raise
+
+            with self._lock:
+                self._mensagens += 1
+                if sessao.mensagens:
+                    self._reusos += 1
+            sessao.mensagens += 1
+            self.devolver(sessao)
+            return
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'nome': self.nome,
+                'tamanho': self.tamanho,
+                'abertas': self._abertas,
+                'em_uso': self._em_uso,
+                'livres': self._livres.qsize(),
+                'conexoes': self._conexoes,
+                'mensagens': self._mensagens,
+                'reusos': self._reusos,
+                'reconexoes': self._reconexoes,
+                'encerradas_limite': self._encerradas_limite,
+                'encerradas_ociosas': self._encerradas_ociosas,
+                'falhas_noop': self._falhas_noop,
+                'timeouts': self._timeouts,
+            }
+
+    def fechar(self):
+        """Encerra todas as sessões livres do pool."""
+        while True:
+            try:
+                sessao = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            self._fechar(sessao)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _chave(config):
+    return (config['host'], int(config['port']), config.get('username'),
+            config.get('password'), config.get('starttls', True), config.get('concorrencia'))
+
+
+def obter_pool_smtp(config):
+    """
+    Retorna o pool de sessões da integração descrita por `config`, criando-o
+    no primeiro envio. O pool comporta ao menos "concorrencia" sessões.
+    Alterar host, porta, credenciais, STARTTLS ou concorrência cria um pool
+    novo; as sessões do anterior expiram por ociosidade.
+    """
+    chave = _chave(config)
+    pool = _pools.get(chave)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(chave)
+            if pool is None:
+                pool = _pools[chave] = PoolSMTP(
+                    dict(config),
+                    tamanho=max(int(os.getenv('SMTP_POOL_TAMANHO', 4)), int(config.get('concorrencia') or 0)),
+                    max_mensagens=int(os.getenv('SMTP_MAX_MENSAGENS', 100)),
+                    ocioso=float(os.getenv('SMTP_OCIOSO', 60)),
+                    intervalo_noop=float(os.getenv('SMTP_NOOP_INTERVALO', 10)),
+                    timeout=float(os.getenv('SMTP_TIMEOUT', 30)),
+                    espera=float(os.getenv('SMTP_POOL_TIMEOUT', 30)),
+                )
+    return pool
+
+
+def estatisticas_smtp():
+    """Estatísticas de cada pool de sessões SMTP do processo."""
+    return [pool.estatisticas() for pool in list(_pools.values())]
+
+
+def fechar_pools_smtp():
+    """Encerra as sessões livres de todos os pools SMTP."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.fechar()
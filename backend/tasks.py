@@ -1,71 +1,72 @@
 from backend.celery_app import celery_app
 from backend.services.email_service import send_email
 from backend.services.agendamento_service import processar_agendamentos
-from backend.config import get_db_connection
+from backend.services import disparo_service
+from backend.repositorios import envios as repo_envios, eventos as repo_eventos
 import json
 from datetime import datetime
 import traceback
 
-def registrar_evento_tracking_sync(envio_id, tipo_evento, ip_address=None, user_agent=None, url=None):
-    """Versão síncrona da função para registrar eventos de tracking"""
+def registrar_evento_tracking_sync(envio_id, tipo_evento, ip_address=None, user_agent=None, url=None, connection=None,
+                                   contato_id=None):
+    """
+    Versão síncrona da função para registrar eventos de tracking.
+    Reutiliza `connection` quando fornecida, senão empresta uma do pool.
+    """
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        
         dados_adicionais = {
             'ip_address': ip_address,
             'user_agent': user_agent
         }
         if url:
             dados_adicionais['url'] = url
+        if contato_id:
+            dados_adicionais['contato_id'] = contato_id
         
-        cursor.execute(
-            """
-            INSERT INTO eventos_tracking 
-            (envio_id, tipo_evento, dados_adicionais, data_evento) 
-            VALUES (%s, %s, %s, NOW())
-            """,
-            (envio_id, tipo_evento, json.dumps(dados_adicionais))
-        )
+        repo_eventos.inserir(envio_id, tipo_evento, dados_adicionais, connection)
         
-        connection.commit()
+        if connection is not None:
+            connection.commit()
         return True
     except Exception as e:
         print(f"Erro ao registrar evento de tracking: {str(e)}")
         return False
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close()
 
 @celery_app.task(bind=True, max_retries=3)
 def enviar_email_task(self, destinatario, assunto, mensagem, template_id, segmento_id, contato_id):
     """Tarefa para enviar um email individual"""
     try:
         success = send_email(destinatario, assunto, mensagem)
-        
-        # Registrar envio no banco
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        
+    except Exception as e:
+        # Em caso de erro no envio, tenta novamente
+        raise self.retry(exc=e, countdown=300)  # 5 minutos
+
+    # O email já foi entregue ao transporte: uma falha ao registrar não repete o envio
+    try:
         if success:
-            cursor.execute(
-                "INSERT INTO envios (contato_id, template_id, segmento_id, status, data_envio) VALUES (%s, %s, %s, 'enviado', NOW())",
-                (contato_id, template_id, segmento_id)
-            )
+            repo_envios.inserir(contato_id, template_id, segmento_id)
         else:
-            cursor.execute(
-                "INSERT INTO envios (contato_id, template_id, segmento_id, status, erro, data_envio) VALUES (%s, %s, %s, 'erro', 'Falha no envio', NOW())",
-                (contato_id, template_id, segmento_id)
-            )
-        
-        connection.commit()
-        return success
+            repo_envios.inserir(contato_id, template_id, segmento_id, status='erro', erro='Falha no envio')
     except Exception as e:
-        # Em caso de erro, tenta novamente
-        self.retry(exc=e, countdown=300)  # 5 minutos
-        raise
+        print(f"Erro ao registrar envio para {destinatario}: {str(e)}")
+    return success
+
+@celery_app.task(bind=True, max_retries=3)
+def enviar_campanha_task(self, job_id):
+    """Tarefa que envia um lote de contatos do job de campanha e enfileira o lote seguinte"""
+    try:
+        continuar = disparo_service.processar_lote(job_id)
+    except Exception as e:
+        print(f"Erro no lote do job de envio {job_id}: {str(e)}")
+        print(traceback.format_exc())
+        if self.request.retries >= self.max_retries:
+            disparo_service.falhar_job(job_id, str(e))
+            raise
+        # O progresso do último lote concluído foi gravado; a nova tentativa continua dele
+        raise self.retry(exc=e, countdown=60)
+    if continuar:
+        enviar_campanha_task.delay(job_id)
+    return continuar
 
 @celery_app.task
 def processar_agendamentos_task():
@@ -81,24 +82,7 @@ def processar_agendamentos_task():
 def registrar_evento_tracking(envio_id, tipo_evento, dados_adicionais=None):
     """Tarefa para registrar eventos de tracking (abertura, clique)"""
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        
-        cursor.execute(
-            """
-            INSERT INTO eventos_tracking 
-            (envio_id, tipo_evento, dados_adicionais, data_evento) 
-            VALUES (%s, %s, %s, NOW())
-            """,
-            (envio_id, tipo_evento, json.dumps(dados_adicionais) if dados_adicionais else None)
-        )
-        
-        connection.commit()
+        repo_eventos.inserir(envio_id, tipo_evento, dados_adicionais)
     except Exception as e:
         print(f"Erro ao registrar evento de tracking: {str(e)}")
-        raise
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'connection' in locals():
-            connection.close() 
\ No newline at end of file
+        raise 
\ No newline at end of file
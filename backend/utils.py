@@ -1,32 +1,73 @@
 import hmac
 import hashlib
-import os
-from backend.config import Config
-import json
-import base64
+import struct
 import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from backend.config import Config
+
+# Tipos de evento codificados no token
+TIPOS_EVENTO = ('abertura', 'clique', 'resposta')
+_CODIGOS_EVENTO = {tipo: codigo for codigo, tipo in enumerate(TIPOS_EVENTO, start=1)}
+
+# envio_id, contato_id (uint32), tipo de evento (uint8) e dia da geração (dias desde 1970, uint16)
+_FORMATO_TOKEN = struct.Struct('>IIBH')
+# Bytes do HMAC-SHA256 mantidos no token
+TAMANHO_ASSINATURA = 8
+_TAMANHO_TOKEN = _FORMATO_TOKEN.size + TAMANHO_ASSINATURA
+
+# HMAC já inicializado com a chave; cada token parte de uma cópia
+_chave = (Config.TRACKING_SECRET or Config.SECRET_KEY).encode()
+_hmac_base = hmac.new(_chave, digestmod=hashlib.sha256)
+# As URLs de redirecionamento dos cliques têm uma chave derivada própria
+_hmac_url = hmac.new(hmac.new(_chave, b'tracking-url', hashlib.sha256).digest(), digestmod=hashlib.sha256)
+
+
+def _assinar(dados, base=_hmac_base):
+    assinatura = base.copy()
+    assinatura.update(dados)
+    return assinatura.digest()[:TAMANHO_ASSINATURA]
+
+
+def gerar_token_tracking(envio_id, contato_id, tipo_evento):
+    """
+    Gera o token de tracking de um evento: ids, tipo e dia em 11 bytes,
+    mais 8 bytes de HMAC, em base64 para URL (26 caracteres, sem '=').
+    """
+    dados = _FORMATO_TOKEN.pack(int(envio_id), int(contato_id or 0), _CODIGOS_EVENTO[tipo_evento],
+                                int(time.time() // 86400))
+    return urlsafe_b64encode(dados + _assinar(dados)).rstrip(b'=').decode()
+
+
+def validar_token_tracking(token):
+    """
+    Confere a assinatura e a idade do token (TRACKING_VALIDADE_DIAS) e
+    retorna {'envio_id', 'contato_id', 'tipo', 'dia'}, ou None se ele for
+    inválido ou tiver expirado.
+    """
+    if len(token) != 26:
+        return None
+    try:
+        bruto = urlsafe_b64decode(token + '==')
+    except (ValueError, TypeError):
+        return None
+    if len(bruto) != _TAMANHO_TOKEN:
+        return None
+    dados = bruto[:_FORMATO_TOKEN.size]
+    if not hmac.compare_digest(bruto[_FORMATO_TOKEN.size:], _assinar(dados)):
+        return None
+    envio_id, contato_id, codigo, dia = _FORMATO_TOKEN.unpack(dados)
+    if not 1 <= codigo <= len(TIPOS_EVENTO):
+        return None
+    if Config.TRACKING_VALIDADE_DIAS and int(time.time() // 86400) - dia > Config.TRACKING_VALIDADE_DIAS:
+        return None
+    return {'envio_id': envio_id, 'contato_id': contato_id or None, 'tipo': TIPOS_EVENTO[codigo - 1], 'dia': dia}
+
+
+def assinar_url(url):
+    """Assinatura da URL de redirecionamento de um clique (11 caracteres, base64 para URL)."""
+    return urlsafe_b64encode(_assinar(url.encode(), _hmac_url)).rstrip(b'=').decode()
+
 
-def gerar_token_tracking(envio_id, tipo_evento, dados_adicionais=None):
-    """Gera um token seguro para tracking de eventos."""
-    dados = {
-        'envio_id': envio_id,
-        'tipo_evento': tipo_evento,
-        'dados_adicionais': dados_adicionais,
-        'timestamp': str(int(time.time()))
-    }
-    
-    # Ordenar dados para garantir consistência
-    dados_ordenados = json.dumps(dados, sort_keys=True)
-    
-    # Gerar assinatura
-    assinatura = hmac.new(
-        Config.WEBHOOK_SECRET.encode(),
-        dados_ordenados.encode(),
-        hashlib.sha256
-    ).hexdigest()
-    
-    # Adicionar assinatura aos dados
-    dados['assinatura'] = assinatura
-    
-    # Codificar em base64
-    return base64.b64encode(json.dumps(dados).encode()).decode() 
\ No newline at end of file
+def validar_url(url, assinatura):
+    """Confere se a URL de redirecionamento foi assinada por assinar_url."""
+    return bool(url and assinatura) and hmac.compare_digest(assinar_url(url).encode(), assinatura.encode())
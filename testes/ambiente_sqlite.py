@@ -0,0 +1,71 @@
+"""
+Bancos isolados para os testes: SQLite em memória, para os que rodam sem
+MySQL, ou um banco MySQL próprio, para os que precisam dele.
+
+    with banco_sqlite():
+        ...
+    with banco_mysql('base_emails_marketing_explain'):
+        ...
+
+Dentro do bloco DB_BACKEND (e DB_NAME) vale só para quem roda nele: o
+pool de conexões, o roteador de réplicas, o banco em memória e os
+registros por id de integração (cache de integrações, saúde, motores e
+limites) começam vazios e, ao final, são descartados e os anteriores
+voltam, junto com as variáveis de ambiente. Nos testes com pytest o
+SQLite é a fixture `banco_sqlite` de testes/conftest.py, uma vez por módulo.
+"""
+import os
+from contextlib import contextmanager
+
+import pytest
+
+from backend.database import dialeto_sqlite, pool, preparadas, replicas
+from backend.services import cache_integracoes, limite_provedor, motor_envio, saude_integracoes
+
+
+def _singletons():
+    """(módulo, atributo, valor inicial) de cada registro do processo que o teste isola."""
+    return [
+        (pool, '_pool', None),
+        (replicas, '_roteador', None),
+        (dialeto_sqlite, '_ancoras', {}),
+        (preparadas, '_contadores', {'preparos': 0, 'reusos': 0, 'falhas': 0}),
+        (cache_integracoes, '_integracoes', None),
+        (cache_integracoes, '_carregadas_em', 0.0),
+        (saude_integracoes, '_saudes', {}),
+        (motor_envio, '_motores', {}),
+        (limite_provedor, '_limites', {}),
+    ]
+
+
+@contextmanager
+def _banco_isolado(variaveis):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        for variavel, valor in variaveis.items():
+            monkeypatch.setenv(variavel, valor)
+        for modulo, atributo, valor in _singletons():
+            monkeypatch.setattr(modulo, atributo, valor)
+        try:
+            yield
+        finally:
+            # Conexões e threads criadas no bloco, antes de os registros anteriores voltarem
+            if pool._pool is not None:
+                pool._pool.fechar()
+            for motor in motor_envio._motores.values():
+                motor.fechar()
+            for ancora in dialeto_sqlite._ancoras.values():
+                ancora.close()
+
+
+def banco_sqlite():
+    # Como antes, um arquivo em DB_SQLITE_PATH ou o Redis ligado explicitamente são respeitados
+    return _banco_isolado({
+        'DB_BACKEND': 'sqlite',
+        'DB_SQLITE_PATH': os.getenv('DB_SQLITE_PATH', ':memory:'),
+        'INTEGRACOES_CACHE_REDIS': os.getenv('INTEGRACOES_CACHE_REDIS', 'False'),
+    })
+
+
+def banco_mysql(nome):
+    """MySQL de DB_HOST/DB_USER, no banco `nome` em vez do DB_NAME da aplicação."""
+    return _banco_isolado({'DB_BACKEND': 'mysql', 'DB_NAME': nome})
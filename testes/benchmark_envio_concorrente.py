@@ -0,0 +1,38 @@
+"""
+Vazão do envio de uma campanha por LoteEnvio com um envio por vez contra
+vários em andamento no motor da integração.
+
+    python testes/benchmark_envio_concorrente.py
+
+Usa SQLite em memória e o servidor SMTP local de testes/servidor_smtp.py,
+que leva BENCH_LATENCIA_MS (padrão 20 ms) para aceitar cada mensagem, como
+um servidor real. Os destinatários se dividem em 10 domínios, para o limite
+por domínio (DOMINIO_CONCORRENCIA) não ser o gargalo. BENCH_CONCORRENCIA define os envios simultâneos (padrão
+20) e BENCH_MENSAGENS quantas mensagens são medidas.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from test_motor_envio import enviar_com_concorrencia
+
+BENCH_LATENCIA_MS = float(os.getenv('BENCH_LATENCIA_MS', 20))
+BENCH_CONCORRENCIA = int(os.getenv('BENCH_CONCORRENCIA', 20))
+BENCH_MENSAGENS = int(os.getenv('BENCH_MENSAGENS', 200))
+
+
+def medir(nome, limite):
+    servidor, resultados, estatisticas, segundos = enviar_com_concorrencia(
+        BENCH_MENSAGENS, limite, BENCH_LATENCIA_MS / 1000
+    )
+    assert servidor.mensagens == BENCH_MENSAGENS
+    vazao = BENCH_MENSAGENS / segundos
+    print(f"{nome:<40} {vazao:>10.0f} msgs/s  pico {estatisticas['pico']} envio(s) simultâneo(s)")
+    return vazao
+
+
+if __name__ == '__main__':
+    antes = medir('um envio por vez', 1)
+    depois = medir(f'{BENCH_CONCORRENCIA} envios simultâneos', BENCH_CONCORRENCIA)
+    print(f"\nGanho de vazão: {depois / antes:.1f}x")
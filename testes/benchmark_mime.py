@@ -0,0 +1,50 @@
+"""
+Montagem das mensagens de uma campanha: a árvore MIMEMultipart/MIMEText
+por destinatário serializada com as_bytes (como send_message fazia) contra
+o modelo da campanha de backend/services/mensagem_mime.py, com e sem a
+parte text/plain.
+
+    python testes/benchmark_mime.py
+
+BENCH_MENSAGENS define quantas mensagens são montadas (padrão 20000).
+"""
+import os
+import sys
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.services.mensagem_mime import ModeloMensagem
+
+BENCH_MENSAGENS = int(os.getenv('BENCH_MENSAGENS', 20000))
+REMETENTE = 'loja@exemplo.com'
+ASSUNTO = 'Promoção de verão: até 50% em toda a loja'
+HTML = ('<html><body><h1>Olá, {nome}!</h1>'
+        + '<p>Confira as ofertas da semana em <a href="https://loja.com/ofertas">nossa loja</a>.</p>' * 20
+        + '</body></html>')
+
+
+def montar_arvore(to_email, html_content):
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = ASSUNTO
+    msg['From'] = REMETENTE
+    msg['To'] = to_email
+    msg.attach(MIMEText(html_content, 'html'))
+    return msg.as_bytes()
+
+
+def medir(nome, montar):
+    inicio = time.perf_counter()
+    tamanho = 0
+    for i in range(BENCH_MENSAGENS):
+        tamanho += len(montar(f'contato{i}@cliente.com', HTML.format(nome=f'Contato {i}')))
+    duracao = time.perf_counter() - inicio
+    print(f"{nome:<28} {BENCH_MENSAGENS / duracao:>8.0f} mensagens/s  {tamanho // BENCH_MENSAGENS:>6} bytes/mensagem")
+
+
+if __name__ == '__main__':
+    medir('MIMEMultipart + as_bytes', montar_arvore)
+    medir('modelo (só HTML)', ModeloMensagem(REMETENTE, ASSUNTO, texto_plano=False).montar)
+    medir('modelo (texto + HTML)', ModeloMensagem(REMETENTE, ASSUNTO).montar)
@@ -0,0 +1,79 @@
+"""
+Latência por chamada das consultas quentes de tracking, envios e métricas,
+executadas como texto (analisadas pelo servidor a cada vez) e como
+instruções preparadas reaproveitadas na conexão.
+
+    python testes/benchmark_preparadas.py
+
+Usa um banco MySQL próprio (BENCH_DB_NAME, padrão
+base_emails_marketing_bench) com as migrações aplicadas. BENCH_REPETICOES
+define quantas execuções são medidas por consulta. Sem MySQL acessível o
+benchmark é ignorado.
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mysql.connector import Error
+
+from ambiente_sqlite import banco_mysql
+from medicao import medir
+from backend.database import conexao_db, executar_preparada, consultar_preparada, estatisticas_preparadas
+from backend.database.migracoes import aplicar_migracoes
+from backend.repositorios import envios as repo_envios, eventos as repo_eventos
+
+# O benchmark grava linhas de teste, nunca no banco da aplicação
+BENCH_DB_NAME = os.getenv('BENCH_DB_NAME', 'base_emails_marketing_bench')
+
+
+def texto(connection, sql, params, ler=False):
+    def executar():
+        cursor = connection.cursor()
+        cursor.execute(sql, params)
+        if ler:
+            cursor.fetchall()
+        else:
+            connection.commit()
+        cursor.close()
+    return executar
+
+
+def preparada(connection, sql, params, ler=False):
+    def executar():
+        if ler:
+            consultar_preparada(connection, sql, params)
+        else:
+            executar_preparada(connection, sql, params)
+            connection.commit()
+    return executar
+
+
+if __name__ == '__main__':
+    with banco_mysql(BENCH_DB_NAME):
+        try:
+            aplicar_migracoes()
+        except Error as e:
+            print(f"MySQL indisponível, benchmark ignorado: {e}")
+            sys.exit(0)
+
+        with conexao_db() as connection:
+            novo_envio = (None, None, None, 'enviado', None)
+            envio_id = executar_preparada(connection, repo_envios.SQL_INSERIR, novo_envio).lastrowid
+            connection.commit()
+
+            consultas = [
+                ('envio existe', repo_envios.SQL_EXISTE, (envio_id,), True),
+                ('insert eventos_tracking', repo_eventos.SQL_INSERIR,
+                 (envio_id, 'abertura', json.dumps({'ip_address': '127.0.0.1', 'user_agent': 'bench'})), False),
+                ('insert envios', repo_envios.SQL_INSERIR, novo_envio, False),
+                ('insert metricas_envio', repo_envios.SQL_INSERIR_METRICA, (envio_id, None, 'entregue', None), False),
+            ]
+
+            for nome, sql, params, ler in consultas:
+                antes = medir(f"{nome} (texto)", texto(connection, sql, params, ler))
+                depois = medir(f"{nome} (preparada)", preparada(connection, sql, params, ler))
+                print(f"{'':<40} p50 {antes['p50']:.3f} ms -> {depois['p50']:.3f} ms\n")
+
+        print(f"Instruções preparadas: {estatisticas_preparadas()}")
@@ -0,0 +1,76 @@
+"""
+Benchmark em processo das rotas e da camada de dados sobre SQLite em memória.
+
+Não precisa de MySQL nem do servidor rodando: a aplicação é criada com
+create_app() e as requisições passam pelo test_client do Flask.
+
+    python testes/benchmark_rotas.py
+
+BENCH_CONTATOS define quantos contatos são semeados e BENCH_REPETICOES
+quantas requisições são medidas por rota. Para comparar com o MySQL, rode
+com DB_BACKEND=mysql e as variáveis DB_* apontando para um banco de testes.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault('DB_BACKEND', 'sqlite')
+os.environ.setdefault('DB_SQLITE_PATH', ':memory:')
+os.environ.setdefault('DB_MIGRAR_NA_INICIALIZACAO', 'True')
+
+from medicao import medir
+
+BENCH_CONTATOS = int(os.getenv('BENCH_CONTATOS', 10000))
+
+
+def semear(total):
+    from backend.database import BufferEscrita
+
+    with BufferEscrita('contatos', ['email', 'nome']) as contatos:
+        for i in range(total):
+            contatos.adicionar(f"bench{i}@exemplo.com", f"Contato {i}")
+    with BufferEscrita('templates', ['nome', 'descricao', 'html_content']) as templates:
+        for i in range(100):
+            templates.adicionar(f"Template {i}", 'Benchmark', f"<p>Olá {{{{nome}}}} {i}</p>")
+
+
+def requisicao(client, url):
+    def executar():
+        resposta = client.get(url)
+        assert resposta.status_code == 200, f"{url}: {resposta.status_code}"
+        # Consome o corpo, como faria o cliente HTTP
+        resposta.get_data()
+    return executar
+
+
+def escrita_em_lote(total):
+    from backend.database import BufferEscrita
+
+    def executar():
+        with BufferEscrita('envios', ['contato_id', 'status']) as envios:
+            for i in range(total):
+                envios.adicionar(1 + i % BENCH_CONTATOS, 'enviado')
+    return executar
+
+
+if __name__ == '__main__':
+    from backend import create_app
+
+    app = create_app()
+    client = app.test_client()
+
+    inicio = time.perf_counter()
+    semear(BENCH_CONTATOS)
+    print(f"{BENCH_CONTATOS} contatos semeados em {time.perf_counter() - inicio:.2f}s "
+          f"(DB_BACKEND={os.environ['DB_BACKEND']})\n")
+
+    medir('GET /api/contatos/?limit=100', requisicao(client, '/api/contatos/?limit=100'))
+    medir('GET /api/contatos/?limit=100&fields=id,email',
+          requisicao(client, '/api/contatos/?limit=100&fields=id,email'))
+    medir(f'GET /api/contatos/{BENCH_CONTATOS // 2}', requisicao(client, f'/api/contatos/{BENCH_CONTATOS // 2}'))
+    medir('GET /api/templates/', requisicao(client, '/api/templates/'))
+
+    resultado = medir('BufferEscrita envios (1000 linhas)', escrita_em_lote(1000), repeticoes=20, aquecimento=1)
+    print(f"{'':<40} {resultado['ops_s'] * 1000:>10.0f} linhas/s")
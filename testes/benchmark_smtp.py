@@ -0,0 +1,44 @@
+"""
+Vazão do envio SMTP abrindo uma conexão por mensagem (conectar, autenticar,
+enviar, QUIT) contra as sessões reaproveitadas do pool.
+
+    python testes/benchmark_smtp.py
+
+Usa o servidor SMTP local de testes/servidor_smtp.py. BENCH_SMTP_LATENCIA_MS
+simula o custo do handshake TLS e da autenticação de um servidor real
+(padrão 20 ms) e BENCH_MENSAGENS define quantas mensagens são medidas.
+"""
+import os
+import smtplib
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from medicao import medir
+from servidor_smtp import ServidorSMTP
+from test_smtp_pool import mensagem
+from backend.services.smtp_pool import PoolSMTP
+
+BENCH_SMTP_LATENCIA_MS = float(os.getenv('BENCH_SMTP_LATENCIA_MS', 20))
+BENCH_MENSAGENS = int(os.getenv('BENCH_MENSAGENS', 200))
+
+
+def conexao_por_mensagem(config):
+    def enviar():
+        server = smtplib.SMTP(config['host'], config['port'])
+        server.login(config['username'], config['password'])
+        server.send_message(mensagem())
+        server.quit()
+    return enviar
+
+
+if __name__ == '__main__':
+    with ServidorSMTP(latencia_login=BENCH_SMTP_LATENCIA_MS / 1000) as servidor:
+        config = servidor.config()
+        antes = medir('conexão por mensagem', conexao_por_mensagem(config), repeticoes=BENCH_MENSAGENS)
+
+        pool = PoolSMTP(config)
+        depois = medir('pool de sessões', lambda: pool.enviar(mensagem()), repeticoes=BENCH_MENSAGENS)
+        print(f"\nGanho de vazão: {depois['ops_s'] / antes['ops_s']:.1f}x")
+        print(f"Pool: {pool.estatisticas()}")
+        pool.fechar()
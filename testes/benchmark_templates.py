@@ -0,0 +1,64 @@
+"""
+Personalização de BENCH_RENDERIZACOES contatos (padrão 100000) com a
+sequência de str.replace por campo, como era feito antes, contra o template
+compilado de backend/services/renderizador.py, compilado uma vez.
+
+    python testes/benchmark_templates.py
+
+O HTML tem cerca de 9 KB e 8 marcadores de 6 campos diferentes.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.services.renderizador import campos_do_contato, compilar
+
+BENCH_RENDERIZACOES = int(os.getenv('BENCH_RENDERIZACOES', 100000))
+
+BLOCO = '<tr><td style="padding: 12px; font-family: Arial">Oferta exclusiva da semana, confira os detalhes.</td></tr>\n'
+HTML = (
+    '<html><body><h1>Olá {{ nome }}!</h1><p>{{ cargo }} na {{ empresa }}</p>'
+    + BLOCO * 40
+    + '<p>{{ nome }}, use o cupom {{ cupom }} até {{ validade }}.</p>'
+    + BLOCO * 40
+    + '<p>Enviado para {{ email }} - {{ empresa }}</p></body></html>'
+)
+DADOS_PADRAO = {'cupom': 'BEMVINDO10', 'validade': '31/12'}
+
+
+def contatos():
+    for i in range(BENCH_RENDERIZACOES):
+        yield {'id': i, 'nome': f'Contato {i}', 'email': f'contato{i}@exemplo.com',
+               'cargo': 'Gerente', 'empresa': f'Empresa {i % 100}'}
+
+
+def com_replace():
+    for contato in contatos():
+        dados = DADOS_PADRAO.copy()
+        dados.update(campos_do_contato(contato))
+        mensagem = HTML
+        for campo, valor in dados.items():
+            if valor is not None:
+                mensagem = mensagem.replace(f"{{{{ {campo} }}}}", str(valor))
+
+
+def compilado():
+    template = compilar(HTML)
+    for contato in contatos():
+        template.renderizar(campos_do_contato(contato), DADOS_PADRAO)
+
+
+def medir(nome, funcao):
+    inicio = time.perf_counter()
+    funcao()
+    segundos = time.perf_counter() - inicio
+    print(f"{nome:<28} {segundos:>7.2f}s  {BENCH_RENDERIZACOES / segundos:>10.0f} renderizações/s")
+    return segundos
+
+
+if __name__ == '__main__':
+    antes = medir('str.replace por campo', com_replace)
+    depois = medir('template compilado', compilado)
+    print(f"\nGanho: {antes / depois:.1f}x ({len(HTML)} bytes de HTML)")
@@ -0,0 +1,81 @@
+"""
+Tamanho, geração e verificação dos tokens de tracking: os dois formatos
+anteriores (JSON em base64 com HMAC em hex, de backend/utils.py, e texto
+separado por ':' com HMAC em hex, de backend/routes/tracking.py) contra o
+token binário atual.
+
+    python testes/benchmark_tokens.py
+
+BENCH_TOKENS define quantos tokens são gerados e verificados (padrão 100000).
+A memória é o pico alocado (tracemalloc) durante uma verificação.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.utils import gerar_token_tracking, validar_token_tracking
+
+BENCH_TOKENS = int(os.getenv('BENCH_TOKENS', 100000))
+CHAVE = b'chave-de-teste'
+
+
+def gerar_json(envio_id, contato_id, tipo):
+    dados = {'envio_id': envio_id, 'tipo_evento': tipo, 'dados_adicionais': contato_id,
+             'timestamp': str(int(time.time()))}
+    dados['assinatura'] = hmac.new(CHAVE, json.dumps(dados, sort_keys=True).encode(), hashlib.sha256).hexdigest()
+    return base64.b64encode(json.dumps(dados).encode()).decode()
+
+
+def validar_json(token):
+    dados = json.loads(base64.b64decode(token))
+    assinatura = dados.pop('assinatura')
+    esperada = hmac.new(CHAVE, json.dumps(dados, sort_keys=True).encode(), hashlib.sha256).hexdigest()
+    return dados if hmac.compare_digest(assinatura, esperada) else None
+
+
+def gerar_texto(envio_id, contato_id, tipo):
+    dados = f"{envio_id}:{contato_id}:{tipo}:{datetime.now().strftime('%Y%m%d')}"
+    assinatura = hmac.new(CHAVE, dados.encode(), hashlib.sha256).hexdigest()
+    return base64.urlsafe_b64encode(f"{dados}:{assinatura}".encode()).decode()
+
+
+def validar_texto(token):
+    dados, assinatura = base64.urlsafe_b64decode(token.encode()).decode().rsplit(':', 1)
+    if not hmac.compare_digest(assinatura, hmac.new(CHAVE, dados.encode(), hashlib.sha256).hexdigest()):
+        return None
+    envio_id, contato_id, tipo, data = dados.split(':')
+    return {'envio_id': int(envio_id), 'contato_id': int(contato_id), 'tipo': tipo, 'data': data}
+
+
+def medir(nome, gerar, validar):
+    inicio = time.perf_counter()
+    tokens = [gerar(1234567, i, 'clique') for i in range(BENCH_TOKENS)]
+    geracao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for token in tokens:
+        assert validar(token)
+    verificacao = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    validar(tokens[-1])
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{nome:<22} {len(tokens[-1]):>4} caracteres  "
+          f"geração {BENCH_TOKENS / geracao:>8.0f}/s  verificação {BENCH_TOKENS / verificacao:>8.0f}/s  "
+          f"{pico:>6} bytes alocados")
+
+
+if __name__ == '__main__':
+    medir('JSON + base64 (utils)', gerar_json, validar_json)
+    medir('texto + hex (rotas)', gerar_texto, validar_texto)
+    medir('binário compacto', gerar_token_tracking, validar_token_tracking)
@@ -0,0 +1,68 @@
+"""
+Injeção de tracking para BENCH_DESTINATARIOS contatos (padrão 20000): as duas
+passadas de regex sobre o HTML inteiro por destinatário, como era feito
+antes, contra o template com os pontos de tracking localizados uma vez
+(TemplateRastreado em backend/services/renderizador.py).
+
+    python testes/benchmark_tracking.py
+
+Mede HTMLs de cerca de 10 KB e 100 KB, ambos com 10 links. Com o template
+pré-processado nenhum regex roda por destinatário: sobram os dois tokens e
+a cópia dos trechos prontos.
+"""
+import os
+import re
+import sys
+import time
+from urllib.parse import quote_plus, urlencode
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.services.renderizador import compilar
+from backend.utils import gerar_token_tracking
+
+BENCH_DESTINATARIOS = int(os.getenv('BENCH_DESTINATARIOS', 20000))
+BASE_URL = 'http://localhost:5000'
+
+BLOCO = '<tr><td style="padding: 12px; font-family: Arial">Oferta exclusiva da semana, confira os detalhes.</td></tr>\n'
+LINKS = ''.join(f'<p><a href="https://loja.exemplo.com/produto/{i}?origem=email">Produto {i}</a></p>' for i in range(10))
+
+
+def html_com(blocos):
+    return f'<html><body><h1>Olá!</h1>{BLOCO * blocos}{LINKS}{BLOCO * blocos}</body></html>'
+
+
+def tracking_por_regex(html_content, envio_id, email_id):
+    """O adicionar_tracking anterior: pixel e links reescritos por regex a cada destinatário."""
+    token_abertura = gerar_token_tracking(envio_id, email_id, 'abertura')
+    pixel = f'<img src="{BASE_URL}/tracking/pixel/{token_abertura}" width="1" height="1" style="display:none;">'
+    html_content = re.sub(r'</body>', f'{pixel}</body>', html_content, flags=re.IGNORECASE)
+
+    def replace_link(match):
+        token_clique = gerar_token_tracking(envio_id, email_id, 'clique')
+        params = urlencode({'url': match.group(1)}, quote_via=quote_plus)
+        return f'href="{BASE_URL}/tracking/click/{token_clique}?{params}"'
+
+    return re.sub(r'href="([^"]+)"', replace_link, html_content)
+
+
+def medir(nome, funcao):
+    inicio = time.perf_counter()
+    funcao()
+    segundos = time.perf_counter() - inicio
+    print(f"{nome:<40} {segundos:>7.2f}s  {BENCH_DESTINATARIOS / segundos:>9.0f} destinatários/s")
+    return segundos
+
+
+if __name__ == '__main__':
+    for blocos in (40, 400):
+        html = html_com(blocos)
+        print(f"HTML de {len(html) // 1024} KB, 10 links")
+        antes = medir('  regex por destinatário', lambda: [
+            tracking_por_regex(html, 1, contato_id) for contato_id in range(1, BENCH_DESTINATARIOS + 1)
+        ])
+        template = compilar(html, BASE_URL)
+        depois = medir('  pontos de tracking pré-localizados', lambda: [
+            template.renderizar({}, None, 1, contato_id) for contato_id in range(1, BENCH_DESTINATARIOS + 1)
+        ])
+        print(f"  Ganho: {antes / depois:.1f}x\n")
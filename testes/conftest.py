@@ -0,0 +1,17 @@
+"""Fixtures compartilhadas pelos testes com pytest."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ambiente_sqlite import banco_sqlite as _banco_sqlite
+
+
+@pytest.fixture(scope='module')
+def banco_sqlite():
+    """Banco SQLite em memória e registros do processo isolados durante o módulo (testes/ambiente_sqlite.py)."""
+    with _banco_sqlite():
+        yield
@@ -0,0 +1,37 @@
+"""Medição de vazão e latência usada pelos benchmarks em testes/."""
+import os
+import statistics
+import time
+
+BENCH_REPETICOES = int(os.getenv('BENCH_REPETICOES', 500))
+
+
+def percentil(amostras, p):
+    ordenadas = sorted(amostras)
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))]
+
+
+def medir(nome, funcao, repeticoes=BENCH_REPETICOES, aquecimento=10):
+    """Executa `funcao` `repeticoes` vezes e imprime vazão e latências em ms."""
+    for _ in range(aquecimento):
+        funcao()
+
+    amostras = []
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        amostras.append((time.perf_counter() - t0) * 1000)
+    total = time.perf_counter() - inicio
+
+    resultado = {
+        'nome': nome,
+        'ops_s': repeticoes / total,
+        'media': statistics.mean(amostras),
+        'p50': percentil(amostras, 50),
+        'p95': percentil(amostras, 95),
+        'p99': percentil(amostras, 99),
+    }
+    print(f"{nome:<40} {resultado['ops_s']:>10.0f} ops/s  "
+          f"p50 {resultado['p50']:.2f} ms  p95 {resultado['p95']:.2f} ms  p99 {resultado['p99']:.2f} ms")
+    return resultado
@@ -0,0 +1,143 @@
+"""
+Servidor SMTP local mínimo usado pelos testes e benchmarks de envio.
+
+Aceita EHLO, AUTH PLAIN, MAIL, RCPT, DATA, RSET, NOOP e QUIT, sem TLS
+(configure a integração com "starttls": false). `latencia_login` simula o
+custo do handshake TLS e da autenticação de um servidor real,
+`latencia_mensagem` o tempo que ele leva para aceitar cada mensagem, e
+`limite_por_conexao` faz o servidor responder 421 e fechar a conexão após
+esse número de mensagens. `adiar` ({'gmail.com': 3}) recusa com 450 os
+primeiros destinatários de cada domínio, como um provedor limitando a taxa.
+Com `guardar=True` o conteúdo de cada mensagem aceita fica em `recebidas`.
+
+    with ServidorSMTP(latencia_login=0.02) as servidor:
+        config = servidor.config()
+"""
+import socketserver
+import threading
+import time
+
+
+class _Sessao(socketserver.StreamRequestHandler):
+    # Respostas de várias linhas saem em writes separados; sem isso o atraso
+    # de ACK do cliente somaria ~40 ms a cada EHLO
+    disable_nagle_algorithm = True
+
+    def responder(self, linha):
+        self.wfile.write(linha.encode() + b'\r\n')
+
+    def handle(self):
+        servidor = self.server
+        servidor.registrar_conexao(self.connection)
+        mensagens = 0
+        self.responder('220 smtp-local ESMTP')
+
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+            comando = linha.decode(errors='replace').strip().upper()
+
+            if comando.startswith(('EHLO', 'HELO')):
+                self.responder('250-smtp-local')
+                self.responder('250 AUTH PLAIN')
+            elif comando.startswith('AUTH'):
+                time.sleep(servidor.latencia_login)
+                self.responder('235 Autenticado')
+            elif comando.startswith('MAIL'):
+                if servidor.limite_por_conexao and mensagens >= servidor.limite_por_conexao:
+                    self.responder('421 Limite de mensagens por conexão')
+                    return
+                self.responder('250 OK')
+            elif comando.startswith('RCPT'):
+                endereco = comando.split('<', 1)[-1].split('>', 1)[0]
+                if servidor.deve_adiar(endereco.rsplit('@', 1)[-1].lower()):
+                    self.responder('450 4.2.1 Muitas mensagens, tente mais tarde')
+                else:
+                    self.responder('250 OK')
+            elif comando == 'DATA':
+                self.responder('354 Termine com <CRLF>.<CRLF>')
+                conteudo = []
+                linha = self.rfile.readline()
+                while linha not in (b'.\r\n', b''):
+                    if servidor.guardar:
+                        conteudo.append(linha[1:] if linha.startswith(b'..') else linha)
+                    linha = self.rfile.readline()
+                time.sleep(servidor.latencia_mensagem)
+                mensagens += 1
+                servidor.registrar_mensagem(b''.join(conteudo))
+                self.responder('250 Aceito')
+            elif comando in ('RSET', 'NOOP'):
+                self.responder('250 OK')
+            elif comando == 'QUIT':
+                self.responder('221 Até logo')
+                return
+            else:
+                self.responder('502 Comando não implementado')
+
+
+class ServidorSMTP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latencia_login=0.0, limite_por_conexao=0, latencia_mensagem=0.0, adiar=None, guardar=False):
+        super().__init__(('127.0.0.1', 0), _Sessao)
+        self.latencia_login = latencia_login
+        self.latencia_mensagem = latencia_mensagem
+        self.adiar = dict(adiar or {})
+        self.adiados = 0
+        self.limite_por_conexao = limite_por_conexao
+        self.conexoes = 0
+        self.mensagens = 0
+        self.guardar = guardar
+        self.recebidas = []
+        self._sockets = []
+        self._lock = threading.Lock()
+
+    def registrar_conexao(self, sock):
+        with self._lock:
+            self.conexoes += 1
+            self._sockets.append(sock)
+
+    def deve_adiar(self, dominio):
+        with self._lock:
+            if self.adiar.get(dominio, 0) > 0:
+                self.adiar[dominio] -= 1
+                self.adiados += 1
+                return True
+            return False
+
+    def registrar_mensagem(self, conteudo=b''):
+        with self._lock:
+            self.mensagens += 1
+            if self.guardar:
+                self.recebidas.append(conteudo)
+
+    def derrubar_conexoes(self):
+        """Fecha do lado do servidor todas as conexões abertas, como num timeout de inatividade."""
+        with self._lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(2)
+            except OSError:
+                pass
+
+    def config(self):
+        """Configuração de integração SMTP apontando para este servidor."""
+        return {
+            'host': '127.0.0.1',
+            'port': self.server_address[1],
+            'username': 'teste@exemplo.com',
+            'password': 'senha',
+            'starttls': False,
+        }
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.derrubar_conexoes()
+        self.server_close()
@@ -0,0 +1,182 @@
+"""
+Testes do transporte HTTP das integrações por API contra um servidor HTTP
+local. Não precisam de rede nem de MySQL (o envio em lote usa SQLite em
+memória):
+
+    python testes/test_api_transporte.py
+"""
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ambiente_sqlite import banco_sqlite
+from backend.database.migracoes import aplicar_migracoes
+from backend.repositorios import integracoes as repo_integracoes
+from backend.services.api_transporte import TransporteAPI, compilar_payload_template
+from backend.services.cache_integracoes import invalidar_integracoes
+from backend.services.email_service import LoteEnvio
+
+pytestmark = pytest.mark.usefixtures('banco_sqlite')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.conexoes += 1
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers['Content-Length']))
+        payload = json.loads(corpo)
+        self.server.recebidas.append((dict(self.headers), payload))
+        resposta = b'{}'
+        if self.server.limitar:
+            self.server.limitar -= 1
+            self.send_response(429)
+            self.send_header('Retry-After', '0.01')
+        else:
+            self.send_response(201)
+            if 'messageVersions' in payload:
+                ids = [f"<{versao['to'][0]['email']}>" for versao in payload['messageVersions']]
+                resposta = json.dumps({'messageIds': ids}).encode()
+        self.send_header('Content-Length', str(len(resposta)))
+        self.end_headers()
+        self.wfile.write(resposta)
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorAPI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, limitar=0):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.conexoes = 0
+        self.recebidas = []
+        self.limitar = limitar
+
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v3/smtp/email"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def test_conexao_reaproveitada_entre_mensagens():
+    with ServidorAPI() as servidor:
+        transporte = TransporteAPI({'url': servidor.url(), 'api_key': 'chave'})
+        for i in range(5):
+            transporte.enviar(f'destino{i}@exemplo.com', 'Assunto', '<p>Olá</p>')
+        estatisticas = transporte.estatisticas()
+        transporte.fechar()
+    assert servidor.conexoes == 1
+    assert estatisticas['requisicoes'] == 5
+    assert estatisticas['reusos'] == 4
+    cabecalhos, payload = servidor.recebidas[0]
+    assert cabecalhos['Authorization'] == 'Bearer chave'
+    assert payload == {'to': 'destino0@exemplo.com', 'subject': 'Assunto', 'html': '<p>Olá</p>'}
+
+
+def test_payload_brevo():
+    with ServidorAPI() as servidor:
+        config = {'url': servidor.url(), 'api_key': 'chave', 'provedor': 'brevo',
+                  'sender': {'email': 'loja@exemplo.com', 'name': 'Loja'}}
+        transporte = TransporteAPI(config)
+        transporte.enviar('maria@exemplo.com', 'Oferta', '<p>"Promoção"</p>')
+        transporte.fechar()
+    cabecalhos, payload = servidor.recebidas[0]
+    assert cabecalhos['api-key'] == 'chave'
+    assert payload == {
+        'sender': {'email': 'loja@exemplo.com', 'name': 'Loja'},
+        'to': [{'email': 'maria@exemplo.com', 'name': 'Maria'}],
+        'subject': 'Oferta',
+        'htmlContent': '<p>"Promoção"</p>',
+    }
+
+
+def test_retry_after_respeitado():
+    with ServidorAPI(limitar=2) as servidor:
+        transporte = TransporteAPI({'url': servidor.url()})
+        transporte.enviar('destino@exemplo.com', 'Assunto', '<p>Olá</p>')
+        estatisticas = transporte.estatisticas()
+        transporte.fechar()
+    assert len(servidor.recebidas) == 3
+    assert estatisticas['repeticoes'] == 2
+
+
+def test_lote_dividido_em_chamadas_de_ate_n_destinatarios():
+    with ServidorAPI() as servidor:
+        transporte = TransporteAPI({'url': servidor.url(), 'provedor': 'brevo', 'lote': 2})
+        itens = [(f'destino{i}@exemplo.com', f'<p>Olá {i}</p>') for i in range(5)]
+        ids = transporte.enviar_lote('Assunto', itens)
+        estatisticas = transporte.estatisticas()
+        transporte.fechar()
+    assert ids == [f'<destino{i}@exemplo.com>' for i in range(5)]
+    assert [len(payload['messageVersions']) for _, payload in servidor.recebidas] == [2, 2, 1]
+    assert servidor.recebidas[2][1]['messageVersions'][0]['htmlContent'] == '<p>Olá 4</p>'
+    assert estatisticas['lotes'] == 3
+    assert estatisticas['destinatarios_em_lote'] == 5
+
+
+def test_lote_envio_entrega_resultado_de_cada_destinatario():
+    aplicar_migracoes()
+    resultados = []
+    with ServidorAPI() as servidor:
+        integracao_id = repo_integracoes.criar('api', {'url': servidor.url(), 'provedor': 'brevo', 'lote': 3})
+        invalidar_integracoes()
+        try:
+            with LoteEnvio('Assunto', lambda dados, sucesso, detalhe: resultados.append((dados, sucesso, detalhe))) as lote:
+                for i in range(7):
+                    lote.adicionar(f'contato{i}@exemplo.com', f'<p>{i}</p>', dados=i)
+        finally:
+            repo_integracoes.remover(integracao_id)
+            invalidar_integracoes()
+    assert len(servidor.recebidas) == 3
+    assert resultados == [(i, True, f'<contato{i}@exemplo.com>') for i in range(7)]
+
+
+def test_payload_template_preenchido_sem_escapar_html():
+    montar = compilar_payload_template(
+        '{"to": [{"email": "%s", "name": "%s"}], "subject": "Olá: %s", "htmlContent": "%s"}'
+    )
+    html = '<a href="https://exemplo.com">\n"link"\\</a>'
+    assert montar('joao@exemplo.com', 'Novidades', html) == {
+        'to': [{'email': 'joao@exemplo.com', 'name': 'Joao'}],
+        'subject': 'Olá: Novidades',
+        'htmlContent': html,
+    }
+
+
+if __name__ == '__main__':
+    testes = [
+        test_conexao_reaproveitada_entre_mensagens,
+        test_payload_brevo,
+        test_retry_after_respeitado,
+        test_lote_dividido_em_chamadas_de_ate_n_destinatarios,
+        test_lote_envio_entrega_resultado_de_cada_destinatario,
+        test_payload_template_preenchido_sem_escapar_html,
+    ]
+    falhas = 0
+    with banco_sqlite():
+        for teste in testes:
+            try:
+                teste()
+                print(f"✓ {teste.__name__}")
+            except AssertionError as e:
+                falhas += 1
+                print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
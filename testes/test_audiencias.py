@@ -0,0 +1,195 @@
+"""
+Testes das audiências de vários segmentos (união e exclusão), sobre SQLite
+em memória e o servidor SMTP local de testes/servidor_smtp.py:
+
+    python testes/test_audiencias.py
+"""
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ambiente_sqlite import banco_sqlite
+from test_disparo_campanhas import IntegracaoSMTP
+from backend.database.migracoes import aplicar_migracoes
+from backend.repositorios import contatos as repo_contatos, jobs as repo_jobs
+from backend.repositorios.base import abrir_cursor
+from backend.services import disparo_service
+from backend.services.agendamento_service import contatos_em_paginas
+from backend.services.audiencias import AudienciaInvalida, audiencia_de, normalizar
+
+pytestmark = pytest.mark.usefixtures('banco_sqlite')
+
+
+def preparar_segmentos():
+    """
+    Três segmentos sobrepostos: A com os contatos 0-5, B com 3-8 e C com 5-6;
+    o contato 4 está inativo. Retorna (template_id, [A, B, C], ids dos contatos).
+    """
+    aplicar_migracoes()
+    with abrir_cursor(commit=True) as cursor:
+        cursor.execute("INSERT INTO templates (nome, html_content) VALUES (%s, %s)", ('Oferta', '<p>Olá {nome}</p>'))
+        template_id = cursor.lastrowid
+        segmentos = []
+        for nome in ('A', 'B', 'C'):
+            cursor.execute("INSERT INTO segmentos (nome) VALUES (%s)", (nome,))
+            segmentos.append(cursor.lastrowid)
+        contatos = []
+        for i in range(9):
+            cursor.execute("INSERT INTO contatos (email, nome, status) VALUES (%s, %s, %s)",
+                           (f'audiencia{segmentos[0]}-{i}@exemplo.com', f'Contato {i}',
+                            'inativo' if i == 4 else 'ativo'))
+            contatos.append(cursor.lastrowid)
+        membros = {segmentos[0]: range(0, 6), segmentos[1]: range(3, 9), segmentos[2]: range(5, 7)}
+        for segmento_id, indices in membros.items():
+            for i in indices:
+                cursor.execute("INSERT INTO contatos_segmentos (contato_id, segmento_id) VALUES (%s, %s)",
+                               (contatos[i], segmento_id))
+    return template_id, segmentos, contatos
+
+
+def test_uniao_e_exclusao_sem_repeticao():
+    _, (a, b, c), contatos = preparar_segmentos()
+    audiencia = {'incluir': [a, b], 'excluir': [c]}
+    esperados = [contatos[i] for i in (0, 1, 2, 3, 7, 8)]
+
+    assert [contato['id'] for contato in repo_contatos.ativos_da_audiencia(audiencia)] == esperados
+    assert repo_contatos.contar_ativos_da_audiencia(audiencia) == 6
+    # Páginas por id de contato, como os lotes dos jobs
+    pagina = repo_contatos.ativos_da_audiencia(audiencia, apos_id=contatos[2], limite=2)
+    assert [contato['id'] for contato in pagina] == [contatos[3], contatos[7]]
+
+    # Os agendamentos percorrem as mesmas páginas até o fim
+    assert [contato['id'] for contato in contatos_em_paginas(audiencia, tamanho=4)] == esperados
+    assert [contato['id'] for contato in contatos_em_paginas(audiencia, tamanho=3)] == esperados
+
+    # Um segmento só segue pela consulta do segmento
+    assert repo_contatos.contar_ativos_da_audiencia({'incluir': [c], 'excluir': []}) == 2
+
+
+def test_normalizacao():
+    assert normalizar({'incluir': [3, 1, 3]}) == {'incluir': [1, 3], 'excluir': []}
+    assert audiencia_de({'segmento_id': 7, 'audiencia': None}) == {'incluir': [7], 'excluir': []}
+    assert audiencia_de({'segmento_id': 1, 'audiencia': '{"incluir": [1, 2], "excluir": [5]}'})['excluir'] == [5]
+    for invalida in ({'incluir': []}, {'excluir': [1]}, {'incluir': ['1']}, {'incluir': [1], 'excluir': 2}, [1]):
+        try:
+            normalizar(invalida)
+            assert False, f'{invalida} deveria ser recusada'
+        except AudienciaInvalida:
+            pass
+
+
+def test_job_envia_para_a_audiencia():
+    template_id, (a, b, c), contatos = preparar_segmentos()
+    audiencia = {'incluir': [a, b], 'excluir': [c]}
+    job_id = disparo_service.criar_job(template_id, a, 'Oferta', total=6, audiencia=audiencia)
+    assert repo_jobs.buscar(job_id)['audiencia'] == audiencia
+
+    with IntegracaoSMTP() as servidor:
+        while disparo_service.processar_lote(job_id, tamanho=4):
+            pass
+
+    assert servidor.mensagens == 6
+    assert repo_jobs.buscar(job_id)['enviados'] == 6
+    with abrir_cursor() as cursor:
+        cursor.execute("SELECT contato_id FROM jobs_destinatarios WHERE job_id = %s ORDER BY contato_id", (job_id,))
+        assert [linha['contato_id'] for linha in cursor.fetchall()] == [contatos[i] for i in (0, 1, 2, 3, 7, 8)]
+
+
+def test_rotas_e_agendamento_com_audiencia():
+    from backend import create_app
+    from backend.services.agendamento_service import processar_agendamentos
+
+    template_id, (a, b, c), contatos = preparar_segmentos()
+    client = create_app().test_client()
+
+    resposta = client.post('/api/emails/enviar', json={
+        'template_id': template_id, 'assunto': 'Oferta', 'audiencia': {'incluir': [a], 'excluir': 'b'}
+    })
+    assert resposta.status_code == 400
+    resposta = client.post('/api/emails/enviar', json={
+        'template_id': template_id, 'assunto': 'Oferta', 'audiencia': {'incluir': [a, 999999]}
+    })
+    assert resposta.status_code == 404 and resposta.get_json()['segmentos'] == [999999]
+
+    resposta = client.post('/api/campanhas/', json={
+        'titulo': 'Verão', 'template_id': template_id, 'audiencia': {'incluir': [a, b], 'excluir': [c]}
+    })
+    assert resposta.status_code == 201, resposta.get_json()
+    campanha_id = resposta.get_json()['id']
+    assert client.put(f'/api/campanhas/{campanha_id}', json={'segmento_id': c}).status_code == 200
+    with abrir_cursor() as cursor:
+        cursor.execute("SELECT segmento_id, audiencia FROM campanhas WHERE id = %s", (campanha_id,))
+        assert cursor.fetchone() == {'segmento_id': c, 'audiencia': None}
+
+    resposta = client.post('/api/agendamentos/', json={
+        'template_id': template_id, 'assunto': 'Oferta', 'audiencia': {'incluir': [b, a], 'excluir': [c]},
+        'data_envio': (datetime.now() + timedelta(days=1)).isoformat()
+    })
+    assert resposta.status_code == 201, resposta.get_json()
+    agendamento_id = resposta.get_json()['id']
+    with abrir_cursor(commit=True) as cursor:
+        cursor.execute("SELECT segmento_id, audiencia FROM agendamentos WHERE id = %s", (agendamento_id,))
+        agendamento = cursor.fetchone()
+        assert agendamento['segmento_id'] == a
+        assert json.loads(agendamento['audiencia']) == {'incluir': [a, b], 'excluir': [c]}
+        cursor.execute("UPDATE agendamentos SET data_envio = %s WHERE id = %s",
+                       (datetime.now() - timedelta(minutes=1), agendamento_id))
+
+    with IntegracaoSMTP() as servidor:
+        processar_agendamentos()
+
+    assert servidor.mensagens == 6
+    with abrir_cursor() as cursor:
+        cursor.execute("SELECT status FROM agendamentos WHERE id = %s", (agendamento_id,))
+        assert cursor.fetchone()['status'] == 'enviado'
+
+
+def test_agendamento_com_segmento_ou_audiencia_tem_os_mesmos_destinatarios():
+    from backend.services.agendamento_service import processar_agendamentos
+
+    template_id, (a, b, c), contatos = preparar_segmentos()
+    with abrir_cursor(commit=True) as cursor:
+        # Critérios que pegariam todos os contatos, inclusive os de fora de B e o inativo
+        cursor.execute("UPDATE segmentos SET criterios = %s WHERE id = %s", (json.dumps({'nome': 'Contato'}), b))
+
+    destinatarios = []
+    for audiencia in (None, json.dumps({'incluir': [b]})):
+        with abrir_cursor(commit=True) as cursor:
+            cursor.execute("DELETE FROM envios WHERE segmento_id = %s", (b,))
+            cursor.execute("INSERT INTO agendamentos (template_id, segmento_id, audiencia, assunto, data_envio) "
+                           "VALUES (%s, %s, %s, %s, %s)",
+                           (template_id, b, audiencia, 'Oferta', datetime.now() - timedelta(minutes=1)))
+        with IntegracaoSMTP():
+            processar_agendamentos()
+        with abrir_cursor() as cursor:
+            cursor.execute("SELECT contato_id FROM envios WHERE segmento_id = %s AND status = 'enviado'", (b,))
+            destinatarios.append(sorted(linha['contato_id'] for linha in cursor.fetchall()))
+
+    # Os contatos ativos associados a B, nas duas formas
+    assert destinatarios[0] == destinatarios[1] == [contatos[i] for i in (3, 5, 6, 7, 8)]
+
+
+if __name__ == '__main__':
+    testes = [
+        test_uniao_e_exclusao_sem_repeticao,
+        test_normalizacao,
+        test_job_envia_para_a_audiencia,
+        test_rotas_e_agendamento_com_audiencia,
+        test_agendamento_com_segmento_ou_audiencia_tem_os_mesmos_destinatarios,
+    ]
+    falhas = 0
+    with banco_sqlite():
+        for teste in testes:
+            try:
+                teste()
+                print(f"✓ {teste.__name__}")
+            except AssertionError as e:
+                falhas += 1
+                print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,123 @@
+"""
+Testes do cache de integrações ativas, sobre SQLite em memória:
+
+    python testes/test_cache_integracoes.py
+
+O teste de invalidação entre processos usa o Redis de REDIS_URL e é
+ignorado quando ele não está acessível.
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ambiente_sqlite import banco_sqlite
+from backend.database.migracoes import aplicar_migracoes
+from backend.repositorios import integracoes as repo_integracoes
+from backend.services import cache_integracoes
+from backend.services.cache_integracoes import (
+    CANAL_INVALIDACAO, estatisticas_cache_integracoes, integracoes_ativas, invalidar_integracoes
+)
+
+pytestmark = pytest.mark.usefixtures('banco_sqlite')
+
+
+def test_integracoes_lidas_do_cache_ate_invalidacao():
+    aplicar_migracoes()
+    invalidar_integracoes()
+    integracao_id = repo_integracoes.criar('smtp', {'host': 'smtp.exemplo.com'})
+    try:
+        antes = estatisticas_cache_integracoes()
+        assert any(i['id'] == integracao_id for i in integracoes_ativas())
+
+        # Alterações feitas direto no banco só aparecem após a invalidação
+        repo_integracoes.atualizar(integracao_id, {'status': 'inativo'})
+        assert any(i['id'] == integracao_id for i in integracoes_ativas())
+        invalidar_integracoes()
+        assert not any(i['id'] == integracao_id for i in integracoes_ativas())
+
+        depois = estatisticas_cache_integracoes()
+        assert depois['acertos'] - antes['acertos'] == 1
+        assert depois['carregamentos'] - antes['carregamentos'] == 2
+    finally:
+        repo_integracoes.remover(integracao_id)
+        invalidar_integracoes()
+
+
+def test_leitura_anterior_a_invalidacao_nao_fica_em_cache():
+    aplicar_migracoes()
+    invalidar_integracoes()
+    listar = cache_integracoes.listar_integracoes
+
+    def listar_durante_invalidacao(**filtros):
+        integracoes = listar(**filtros)
+        invalidar_integracoes()
+        return integracoes
+
+    cache_integracoes.listar_integracoes = listar_durante_invalidacao
+    try:
+        integracoes_ativas()
+    finally:
+        cache_integracoes.listar_integracoes = listar
+    assert not estatisticas_cache_integracoes()['em_cache']
+
+
+def cliente_redis():
+    import redis
+    return redis.Redis.from_url(cache_integracoes.Config.REDIS_URL, socket_connect_timeout=1)
+
+
+def redis_disponivel():
+    try:
+        return cliente_redis().ping()
+    except Exception:
+        return False
+
+
+def test_invalidacao_recebida_pelo_redis():
+    if not redis_disponivel():
+        import pytest
+        pytest.skip("Redis indisponível")
+
+    cliente = cliente_redis()
+    aplicar_migracoes()
+    os.environ['INTEGRACOES_CACHE_REDIS'] = 'True'
+    try:
+        integracoes_ativas()
+        time.sleep(0.5)
+        antes = estatisticas_cache_integracoes()['invalidacoes_remotas']
+        # Outro processo publicando uma alteração
+        cliente.publish(CANAL_INVALIDACAO, 'teste')
+        for _ in range(50):
+            if estatisticas_cache_integracoes()['invalidacoes_remotas'] > antes:
+                break
+            time.sleep(0.05)
+        assert estatisticas_cache_integracoes()['invalidacoes_remotas'] > antes
+        assert not estatisticas_cache_integracoes()['em_cache']
+    finally:
+        os.environ['INTEGRACOES_CACHE_REDIS'] = 'False'
+
+
+if __name__ == '__main__':
+    testes = [
+        test_integracoes_lidas_do_cache_ate_invalidacao,
+        test_leitura_anterior_a_invalidacao_nao_fica_em_cache,
+    ]
+    if redis_disponivel():
+        testes.append(test_invalidacao_recebida_pelo_redis)
+    else:
+        print("Redis indisponível, teste de invalidação entre processos ignorado")
+    falhas = 0
+    with banco_sqlite():
+        for teste in testes:
+            try:
+                teste()
+                print(f"✓ {teste.__name__}")
+            except AssertionError as e:
+                falhas += 1
+                print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
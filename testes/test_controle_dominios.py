@@ -0,0 +1,127 @@
+"""
+Testes dos limites por domínio do destinatário e do reenvio de mensagens
+adiadas, sobre SQLite em memória e o servidor SMTP local de
+testes/servidor_smtp.py:
+
+    python testes/test_controle_dominios.py
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ambiente_sqlite import banco_sqlite
+from servidor_smtp import ServidorSMTP
+from backend.database.migracoes import aplicar_migracoes
+from backend.repositorios import integracoes as repo_integracoes
+from backend.services.cache_integracoes import invalidar_integracoes
+from backend.services.controle_dominios import ControleDominios, obter_controle_dominios
+from backend.services.email_service import LoteEnvio
+
+pytestmark = pytest.mark.usefixtures('banco_sqlite')
+
+
+def enviar_para(destinatarios, **servidor_kwargs):
+    """Envia a `destinatarios` por LoteEnvio. Retorna (servidor, {email: (sucesso, detalhe)})."""
+    aplicar_migracoes()
+    obter_controle_dominios().zerar()
+    resultados = {}
+    with ServidorSMTP(**servidor_kwargs) as servidor:
+        integracao_id = repo_integracoes.criar('smtp', servidor.config())
+        invalidar_integracoes()
+        try:
+            with LoteEnvio('Assunto', lambda email, sucesso, detalhe: resultados.update({email: (sucesso, detalhe)})) as lote:
+                for email in destinatarios:
+                    lote.adicionar(email, '<p>Olá</p>', dados=email)
+        finally:
+            repo_integracoes.remover(integracao_id)
+            invalidar_integracoes()
+    return servidor, resultados
+
+
+def test_adiados_voltam_para_a_fila_do_dominio():
+    os.environ['DOMINIO_ADIAMENTO_BASE'] = '0.05'
+    try:
+        destinatarios = [f'cliente{i}@gmail.com' for i in range(6)] + [f'cliente{i}@outlook.com' for i in range(6)]
+        servidor, resultados = enviar_para(destinatarios, adiar={'gmail.com': 2})
+    finally:
+        del os.environ['DOMINIO_ADIAMENTO_BASE']
+
+    assert servidor.adiados == 2
+    assert servidor.mensagens == 12
+    assert all(sucesso for sucesso, _ in resultados.values()), resultados
+    gmail = next(d for d in obter_controle_dominios().estatisticas() if d['dominio'] == 'gmail.com')
+    assert gmail['adiamentos'] == 2
+    assert gmail['em_andamento'] == 0
+
+
+def test_adiamento_conta_como_falha_apos_as_tentativas():
+    os.environ['DOMINIO_ADIAMENTO_BASE'] = '0.01'
+    os.environ['DOMINIO_TENTATIVAS'] = '2'
+    try:
+        servidor, resultados = enviar_para(['cliente@gmail.com', 'cliente@outlook.com'], adiar={'gmail.com': 10})
+    finally:
+        del os.environ['DOMINIO_ADIAMENTO_BASE']
+        del os.environ['DOMINIO_TENTATIVAS']
+
+    assert servidor.adiados == 2
+    sucesso, detalhe = resultados['cliente@gmail.com']
+    assert not sucesso and detalhe.startswith('Adiado 2 vezes: 450')
+    assert resultados['cliente@outlook.com'] == (True, None)
+
+
+def test_concorrencia_e_taxa_por_dominio():
+    os.environ['DOMINIOS_LIMITES'] = '{"exemplo.com": {"concorrencia": 2}, "lento.com": {"por_segundo": 10}}'
+    try:
+        controle = ControleDominios()
+        assert controle.reservar('exemplo.com') == 0
+        assert controle.reservar('exemplo.com') == 0
+        assert controle.reservar('exemplo.com') > 0
+        controle.liberar('exemplo.com')
+        assert controle.reservar('exemplo.com') == 0
+
+        assert controle.reservar('lento.com') == 0
+        assert 0.05 < controle.reservar('lento.com') <= 0.1
+        time.sleep(0.1)
+        assert controle.reservar('lento.com') == 0
+    finally:
+        del os.environ['DOMINIOS_LIMITES']
+
+
+def test_recuo_dobra_a_cada_adiamento_seguido():
+    os.environ['DOMINIO_ADIAMENTO_BASE'] = '10'
+    try:
+        controle = ControleDominios()
+        for _ in range(3):
+            controle.reservar('gmail.com')
+        controle.liberar('gmail.com', adiado=True)
+        assert 9 < controle.reservar('gmail.com') <= 10
+        controle.liberar('gmail.com', adiado=True)
+        assert 19 < controle.reservar('gmail.com') <= 20
+        controle.liberar('gmail.com')
+        assert controle.estatisticas()[0]['adiamentos'] == 2
+    finally:
+        del os.environ['DOMINIO_ADIAMENTO_BASE']
+
+
+if __name__ == '__main__':
+    testes = [
+        test_adiados_voltam_para_a_fila_do_dominio,
+        test_adiamento_conta_como_falha_apos_as_tentativas,
+        test_concorrencia_e_taxa_por_dominio,
+        test_recuo_dobra_a_cada_adiamento_seguido,
+    ]
+    falhas = 0
+    with banco_sqlite():
+        for teste in testes:
+            try:
+                teste()
+                print(f"✓ {teste.__name__}")
+            except AssertionError as e:
+                falhas += 1
+                print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
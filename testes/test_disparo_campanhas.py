@@ -0,0 +1,230 @@
+"""
+Testes do disparo de campanhas em segundo plano, sobre SQLite em memória e
+o servidor SMTP local de testes/servidor_smtp.py. A tarefa Celery roda no
+próprio processo (task_always_eager), sem broker:
+
+    python testes/test_disparo_campanhas.py
+"""
+import os
+import sys
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ambiente_sqlite import banco_sqlite
+from servidor_smtp import ServidorSMTP
+from backend.database.migracoes import aplicar_migracoes
+from backend.repositorios import integracoes as repo_integracoes, jobs as repo_jobs
+from backend.repositorios.base import abrir_cursor
+from backend.services import disparo_service
+from backend.services.cache_integracoes import invalidar_integracoes
+
+pytestmark = pytest.mark.usefixtures('banco_sqlite')
+
+
+def preparar_campanha(contatos=7):
+    """Template e segmento com `contatos` contatos ativos e um inativo. Retorna (template_id, segmento_id)."""
+    aplicar_migracoes()
+    with abrir_cursor(commit=True) as cursor:
+        cursor.execute("INSERT INTO templates (nome, html_content) VALUES (%s, %s)",
+                       ('Oferta', '<p>Olá {nome}, {desconto} de desconto</p>'))
+        template_id = cursor.lastrowid
+        cursor.execute("INSERT INTO segmentos (nome) VALUES (%s)", ('Campanha',))
+        segmento_id = cursor.lastrowid
+        for i in range(contatos + 1):
+            cursor.execute("INSERT INTO contatos (email, nome, status) VALUES (%s, %s, %s)",
+                           (f'campanha{segmento_id}-{i}@exemplo.com', f'Contato {i}',
+                            'inativo' if i == 0 else 'ativo'))
+            cursor.execute("INSERT INTO contatos_segmentos (contato_id, segmento_id) VALUES (%s, %s)",
+                           (cursor.lastrowid, segmento_id))
+    return template_id, segmento_id
+
+
+class IntegracaoSMTP:
+    """Servidor SMTP local cadastrado como a integração ativa durante o bloco."""
+
+    def __enter__(self):
+        self.servidor = ServidorSMTP().__enter__()
+        self.integracao_id = repo_integracoes.criar('smtp', self.servidor.config())
+        invalidar_integracoes()
+        return self.servidor
+
+    def __exit__(self, *exc):
+        repo_integracoes.remover(self.integracao_id)
+        invalidar_integracoes()
+        self.servidor.__exit__(*exc)
+
+
+def status_envio(envio_id):
+    with abrir_cursor() as cursor:
+        cursor.execute("SELECT status FROM envios WHERE id = %s", (envio_id,))
+        return cursor.fetchone()['status']
+
+
+def status_destinatarios(job_id):
+    with abrir_cursor() as cursor:
+        cursor.execute("SELECT status, COUNT(*) as total FROM jobs_destinatarios WHERE job_id = %s GROUP BY status",
+                       (job_id,))
+        return {linha['status']: linha['total'] for linha in cursor.fetchall()}
+
+
+def test_job_enviado_em_lotes_com_progresso():
+    template_id, segmento_id = preparar_campanha(7)
+    job_id = disparo_service.criar_job(template_id, segmento_id, 'Oferta', {'desconto': '10%'}, total=7)
+    with IntegracaoSMTP() as servidor:
+        assert disparo_service.processar_lote(job_id, tamanho=3)
+        progresso = disparo_service.progresso(repo_jobs.buscar(job_id))
+        assert progresso['status'] == 'processando'
+        assert (progresso['enviados'], progresso['falhas'], progresso['pendentes']) == (3, 0, 4)
+
+        assert disparo_service.processar_lote(job_id, tamanho=3)
+        assert not disparo_service.processar_lote(job_id, tamanho=3)
+        assert not disparo_service.processar_lote(job_id, tamanho=3)
+
+    job = repo_jobs.buscar(job_id)
+    progresso = disparo_service.progresso(job)
+    assert servidor.mensagens == 7
+    assert progresso['status'] == 'concluido'
+    assert (progresso['enviados'], progresso['pendentes'], progresso['percentual']) == (7, 0, 100.0)
+    assert progresso['emails_por_segundo'] is None or progresso['emails_por_segundo'] > 0
+    assert status_envio(job['envio_id']) == 'concluido'
+
+
+def test_cancelamento_interrompe_antes_do_proximo_lote():
+    template_id, segmento_id = preparar_campanha(7)
+    job_id = disparo_service.criar_job(template_id, segmento_id, 'Oferta', total=7)
+    with IntegracaoSMTP() as servidor:
+        assert disparo_service.processar_lote(job_id, tamanho=3)
+        job = disparo_service.cancelar_job(job_id)
+        assert not disparo_service.processar_lote(job_id, tamanho=3)
+
+    assert servidor.mensagens == 3
+    assert job['status'] == 'cancelado'
+    assert repo_jobs.buscar(job_id)['enviados'] == 3
+    assert status_envio(job['envio_id']) == 'cancelado'
+    # Um job finalizado não muda mais de status
+    assert not repo_jobs.finalizar(job_id, 'concluido')
+
+
+def test_lote_repetido_nao_reenvia():
+    template_id, segmento_id = preparar_campanha(7)
+    job_id = disparo_service.criar_job(template_id, segmento_id, 'Oferta', total=7)
+    with IntegracaoSMTP() as servidor:
+        assert disparo_service.processar_lote(job_id, tamanho=3)
+        # Queda depois de enviar o segundo lote e antes de gravar o progresso
+        with mock.patch.object(repo_jobs, 'registrar_progresso', side_effect=RuntimeError('conexão perdida')):
+            try:
+                disparo_service.processar_lote(job_id, tamanho=3)
+                assert False, 'a falha deveria ser propagada'
+            except RuntimeError:
+                pass
+        assert servidor.mensagens == 6
+        # A nova tentativa relê o segundo lote, já reservado, e segue para o terceiro
+        assert disparo_service.processar_lote(job_id, tamanho=3)
+        assert not disparo_service.processar_lote(job_id, tamanho=3)
+
+    assert servidor.mensagens == 7
+    job = repo_jobs.buscar(job_id)
+    assert job['status'] == 'concluido' and job['enviados'] == 4
+    # O lote interrompido conta como incerto: as contagens fecham com o total
+    progresso = disparo_service.progresso(job)
+    assert (progresso['enviados'], progresso['incertos'], progresso['pendentes'], progresso['percentual']) == \
+        (4, 3, 0, 100.0)
+    assert status_destinatarios(job_id) == {'enviado': 4, 'incerto': 3}
+
+
+def test_lote_unico_interrompido_conclui_com_incertos():
+    template_id, segmento_id = preparar_campanha(3)
+    job_id = disparo_service.criar_job(template_id, segmento_id, 'Oferta', total=3)
+    with IntegracaoSMTP() as servidor:
+        with mock.patch.object(repo_jobs, 'registrar_progresso', side_effect=RuntimeError('conexão perdida')):
+            try:
+                disparo_service.processar_lote(job_id, tamanho=10)
+                assert False, 'a falha deveria ser propagada'
+            except RuntimeError:
+                pass
+        assert not disparo_service.processar_lote(job_id, tamanho=10)
+
+    assert servidor.mensagens == 3
+    job = repo_jobs.buscar(job_id)
+    assert (job['status'], job['erro'], job['enviados'], job['incertos']) == ('concluido', None, 0, 3)
+    assert disparo_service.progresso(job)['percentual'] == 100.0
+
+
+def test_job_que_falha_de_vez_marca_reservados_como_incertos():
+    template_id, segmento_id = preparar_campanha(3)
+    job_id = disparo_service.criar_job(template_id, segmento_id, 'Oferta', total=3)
+    repo_jobs.iniciar(job_id)
+    repo_jobs.reservar_destinatarios(job_id, [1, 2])
+    disparo_service.falhar_job(job_id, 'conexão perdida')
+
+    job = repo_jobs.buscar(job_id)
+    assert (job['status'], job['incertos']) == ('erro', 2)
+    assert status_destinatarios(job_id) == {'incerto': 2}
+
+
+def test_reserva_unica_por_contato():
+    template_id, segmento_id = preparar_campanha(1)
+    job_id = disparo_service.criar_job(template_id, segmento_id, 'Oferta', total=1)
+    primeira = repo_jobs.reservar_destinatarios(job_id, [10, 11, 12])
+    segunda = repo_jobs.reservar_destinatarios(job_id, [11, 12, 13])
+    assert (primeira, segunda) == ({10, 11, 12}, {13})
+    assert repo_jobs.reservar_destinatarios(job_id, []) == set()
+
+
+def test_rota_enfileira_e_informa_progresso():
+    from backend import create_app
+    from backend.celery_app import celery_app
+
+    template_id, segmento_id = preparar_campanha(5)
+    client = create_app().test_client()
+    celery_app.conf.task_always_eager = True
+    os.environ['CAMPANHA_LOTE'] = '2'
+    try:
+        with IntegracaoSMTP() as servidor:
+            resposta = client.post('/api/emails/enviar', json={
+                'template_id': template_id, 'segmento_id': segmento_id, 'assunto': 'Oferta'
+            })
+    finally:
+        celery_app.conf.task_always_eager = False
+        del os.environ['CAMPANHA_LOTE']
+
+    assert resposta.status_code == 202, resposta.get_json()
+    corpo = resposta.get_json()
+    assert corpo['total'] == 5
+    assert servidor.mensagens == 5
+
+    progresso = client.get(corpo['progresso']).get_json()
+    assert progresso['status'] == 'concluido'
+    assert progresso['enviados'] == 5
+
+    assert client.post(f"/api/emails/jobs/{corpo['job_id']}/cancelar").status_code == 409
+    assert client.get('/api/emails/jobs/999999').status_code == 404
+    assert client.post('/api/emails/enviar', json={
+        'template_id': template_id, 'segmento_id': 999999, 'assunto': 'Oferta'
+    }).status_code == 404
+
+
+if __name__ == '__main__':
+    testes = [
+        test_job_enviado_em_lotes_com_progresso,
+        test_cancelamento_interrompe_antes_do_proximo_lote,
+        test_lote_repetido_nao_reenvia,
+        test_lote_unico_interrompido_conclui_com_incertos,
+        test_job_que_falha_de_vez_marca_reservados_como_incertos,
+        test_reserva_unica_por_contato,
+        test_rota_enfileira_e_informa_progresso,
+    ]
+    falhas = 0
+    with banco_sqlite():
+        for teste in testes:
+            try:
+                teste()
+                print(f"✓ {teste.__name__}")
+            except AssertionError as e:
+                falhas += 1
+                print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
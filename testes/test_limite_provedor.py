@@ -0,0 +1,139 @@
+"""
+Testes do limite de envios por integração:
+
+    python testes/test_limite_provedor.py
+
+Os testes do balde em memória não precisam de serviços externos. O teste
+do limite compartilhado usa o Redis de REDIS_URL e é ignorado quando ele
+não está acessível.
+"""
+import os
+import sys
+import time
+import uuid
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.services import limite_provedor
+from backend.services.limite_provedor import CotaEsgotada, LimiteProvedor, obter_limite
+
+
+def test_taxa_respeitada_no_balde_local():
+    os.environ['LIMITE_REDIS'] = 'False'
+    try:
+        limite = LimiteProvedor('limite:teste:taxa', por_segundo=20)
+        inicio = time.perf_counter()
+        for _ in range(30):
+            limite.adquirir()
+        segundos = time.perf_counter() - inicio
+    finally:
+        del os.environ['LIMITE_REDIS']
+    # 20 fichas de rajada e mais 10 a 20/s
+    assert 0.4 < segundos < 1.0, segundos
+    assert limite.estatisticas()['esperas'] > 0
+
+
+def test_fichas_pedidas_em_lote():
+    os.environ['LIMITE_REDIS'] = 'False'
+    try:
+        limite = LimiteProvedor('limite:teste:lote', por_segundo=100, lote=10)
+        for _ in range(25):
+            limite.adquirir()
+    finally:
+        del os.environ['LIMITE_REDIS']
+    assert limite.estatisticas()['pedidos_locais'] == 3
+
+
+def test_cota_diaria():
+    os.environ['LIMITE_REDIS'] = 'False'
+    try:
+        limite = LimiteProvedor('limite:teste:cota', por_dia=5, lote=2)
+        limite.adquirir(5)
+        try:
+            limite.adquirir()
+            assert False, "CotaEsgotada não foi levantada"
+        except CotaEsgotada:
+            pass
+    finally:
+        del os.environ['LIMITE_REDIS']
+
+
+def test_cota_diaria_conta_so_fichas_usadas():
+    os.environ['LIMITE_REDIS'] = 'False'
+    try:
+        limite = LimiteProvedor('limite:teste:cota-lenta', por_dia=5, lote=10)
+        # Envios mais espaçados que a validade das fichas: as sobras de cada lote voltam à cota
+        with mock.patch.object(limite_provedor, 'VALIDADE_FICHAS', 0.01):
+            for _ in range(5):
+                limite.adquirir()
+                time.sleep(0.02)
+            try:
+                limite.adquirir()
+                assert False, "CotaEsgotada não foi levantada"
+            except CotaEsgotada:
+                pass
+    finally:
+        del os.environ['LIMITE_REDIS']
+    assert limite.estatisticas()['devolvidas'] > 0
+
+
+def test_integracao_sem_limite_configurado():
+    assert obter_limite({'id': 1, 'tipo': 'smtp', 'configuracao': {'host': 'smtp.exemplo.com'}}) is None
+    limite = obter_limite({'id': 1, 'tipo': 'api', 'configuracao': {'limite_por_segundo': 14}})
+    assert limite.chave == 'limite:integracao:1' and limite.capacidade == 14
+
+
+def redis_disponivel():
+    try:
+        import redis
+        return redis.Redis.from_url(limite_provedor.Config.REDIS_URL, socket_connect_timeout=1).ping()
+    except Exception:
+        return False
+
+
+def test_cota_compartilhada_pelo_redis():
+    if not redis_disponivel():
+        import pytest
+        pytest.skip("Redis indisponível")
+
+    chave = f'limite:teste:{uuid.uuid4().hex}'
+    # Dois processos dividindo a mesma integração
+    primeiro = LimiteProvedor(chave, por_segundo=1000, por_dia=15, lote=10)
+    segundo = LimiteProvedor(chave, por_segundo=1000, por_dia=15, lote=10)
+    try:
+        primeiro.adquirir(10)
+        segundo.adquirir(5)
+        for limite in (primeiro, segundo):
+            try:
+                limite.adquirir()
+                assert False, "CotaEsgotada não foi levantada"
+            except CotaEsgotada:
+                pass
+        assert primeiro.estatisticas()['pedidos_redis'] == 2
+        assert segundo.estatisticas()['pedidos_locais'] == 0
+    finally:
+        limite_provedor._redis.delete(chave, *limite_provedor._redis.keys(f'{chave}:dia:*'))
+
+
+if __name__ == '__main__':
+    testes = [
+        test_taxa_respeitada_no_balde_local,
+        test_fichas_pedidas_em_lote,
+        test_cota_diaria,
+        test_cota_diaria_conta_so_fichas_usadas,
+        test_integracao_sem_limite_configurado,
+    ]
+    if redis_disponivel():
+        testes.append(test_cota_compartilhada_pelo_redis)
+    else:
+        print("Redis indisponível, teste do limite compartilhado ignorado")
+    falhas = 0
+    for teste in testes:
+        try:
+            teste()
+            print(f"✓ {teste.__name__}")
+        except AssertionError as e:
+            falhas += 1
+            print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,91 @@
+"""
+Testes das mensagens montadas pelo modelo da campanha
+(backend/services/mensagem_mime.py), lidas de volta pelo pacote email e
+enviadas ao servidor SMTP local de testes/servidor_smtp.py:
+
+    python testes/test_mensagem_mime.py
+"""
+import os
+import sys
+from email import message_from_bytes, policy
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from servidor_smtp import ServidorSMTP
+from backend.services.email_service import send_via_smtp
+from backend.services.mensagem_mime import ModeloMensagem, html_para_texto
+
+HTML = ('<html><head><style>p { color: red }</style></head><body><h1>Olá, Ana!</h1>'
+        '<p>Promoção &amp; frete grátis.<br>Veja <a href="https://loja.com/ofertas">as ofertas</a></p>'
+        + '<p>' + 'conteúdo longo ' * 40 + '</p></body></html>')
+
+
+def ler(mensagem, limite=80):
+    assert all(linha.endswith(b'\r\n') and len(linha) <= limite for linha in mensagem.splitlines(keepends=True))
+    return message_from_bytes(mensagem, policy=policy.default)
+
+
+def test_cabecalhos_e_partes():
+    modelo = ModeloMensagem('loja@exemplo.com', 'Promoção de verão: até 50% em toda a loja, só neste fim de semana')
+    primeira = ler(modelo.montar('ana@cliente.com', HTML))
+    segunda = ler(modelo.montar('bruno@cliente.com', HTML.replace('Ana', 'Bruno')))
+
+    assert primeira['From'] == 'loja@exemplo.com'
+    assert primeira['To'] == 'ana@cliente.com' and segunda['To'] == 'bruno@cliente.com'
+    assert primeira['Subject'] == 'Promoção de verão: até 50% em toda a loja, só neste fim de semana'
+    assert primeira['Message-ID'] != segunda['Message-ID']
+    assert primeira['Message-ID'].endswith('@exemplo.com>') and primeira['Date']
+
+    assert primeira.get_content_type() == 'multipart/alternative'
+    assert primeira.get_body(('html',)).get_content() == HTML
+    assert 'Olá, Bruno!' in segunda.get_body(('html',)).get_content()
+    texto = primeira.get_body(('plain',)).get_content()
+    assert texto.startswith('Olá, Ana!\nPromoção & frete grátis.\nVeja as ofertas (https://loja.com/ofertas)')
+    assert 'color' not in texto
+
+
+def test_so_html_e_destinatario_longo():
+    modelo = ModeloMensagem('loja@exemplo.com', 'Oferta', texto_plano=False)
+    destinatario = 'nome.muito.comprido.de.um.destinatario.qualquer@subdominio.empresa-exemplo.com.br'
+    # Um endereço não pode ser dobrado: a linha do To passa de 78 colunas, dentro do limite de 998
+    bruta = modelo.montar(destinatario, '<p>Só HTML</p>')
+    assert f'To: {destinatario}\r\n'.encode() in bruta
+    mensagem = ler(bruta, limite=998)
+    assert mensagem.get_content_type() == 'text/html'
+    assert mensagem.get_content() == '<p>Só HTML</p>'
+    assert mensagem['To'] == destinatario
+
+
+def test_html_para_texto():
+    assert html_para_texto('<p>A&nbsp;B</p>\n\n\n<div>C   D</div><script>x()</script>') == 'A\xa0B\n\nC D'
+
+
+def test_envio_pelo_smtp():
+    with ServidorSMTP(guardar=True) as servidor:
+        config = servidor.config()
+        assert send_via_smtp('ana@cliente.com', 'Olá', HTML, config)
+        assert send_via_smtp('bruno@cliente.com', 'Olá', '<p>.linha começando com ponto</p>', config)
+
+    primeira, segunda = (message_from_bytes(conteudo, policy=policy.default) for conteudo in servidor.recebidas)
+    assert primeira['To'] == 'ana@cliente.com'
+    assert primeira.get_body(('html',)).get_content() == HTML
+    assert segunda.get_body(('html',)).get_content() == '<p>.linha começando com ponto</p>'
+
+
+if __name__ == '__main__':
+    testes = [
+        test_cabecalhos_e_partes,
+        test_so_html_e_destinatario_longo,
+        test_html_para_texto,
+        test_envio_pelo_smtp,
+    ]
+    falhas = 0
+    for teste in testes:
+        try:
+            teste()
+            print(f"✓ {teste.__name__}")
+        except AssertionError as e:
+            falhas += 1
+            print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,149 @@
+"""
+Testes do envio concorrente por integração, sobre SQLite em memória e o
+servidor SMTP local de testes/servidor_smtp.py:
+
+    python testes/test_motor_envio.py
+"""
+import os
+import sys
+import time
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ambiente_sqlite import banco_sqlite
+from servidor_smtp import ServidorSMTP
+from backend.database.migracoes import aplicar_migracoes
+from backend.repositorios import integracoes as repo_integracoes
+from backend.services.cache_integracoes import invalidar_integracoes
+from backend.services.email_service import LoteEnvio
+from backend.services.controle_dominios import obter_controle_dominios
+from backend.services.motor_envio import MotorEnvio, concorrencia, fechar_motores, obter_motor
+from backend.services.saude_integracoes import zerar_saude
+
+pytestmark = pytest.mark.usefixtures('banco_sqlite')
+
+
+def enviar_com_concorrencia(quantidade, limite, latencia):
+    """Envia `quantidade` mensagens por LoteEnvio. Retorna (servidor, resultados, estatísticas do motor, segundos)."""
+    aplicar_migracoes()
+    resultados = []
+    with ServidorSMTP(latencia_mensagem=latencia) as servidor:
+        config = dict(servidor.config(), concorrencia=limite)
+        integracao_id = repo_integracoes.criar('smtp', config)
+        invalidar_integracoes()
+        try:
+            inicio = time.perf_counter()
+            with LoteEnvio('Assunto', lambda dados, sucesso, detalhe: resultados.append((dados, sucesso))) as lote:
+                for i in range(quantidade):
+                    # Vários domínios, para o limite por domínio não ser o gargalo
+                    lote.adicionar(f'destino{i}@exemplo{i % 10}.com', f'<p>{i}</p>', dados=i)
+            segundos = time.perf_counter() - inicio
+            estatisticas = lote.motor.estatisticas()
+        finally:
+            repo_integracoes.remover(integracao_id)
+            invalidar_integracoes()
+    return servidor, resultados, estatisticas, segundos
+
+
+def test_envios_simultaneos_limitados_pela_integracao():
+    servidor, resultados, estatisticas, segundos = enviar_com_concorrencia(20, limite=5, latencia=0.05)
+    assert servidor.mensagens == 20
+    assert sorted(resultados) == [(i, True) for i in range(20)]
+    assert estatisticas['concorrencia'] == 5
+    assert 1 < estatisticas['pico'] <= 5
+    # Sequencial levaria 20 x 50 ms
+    assert segundos < 0.6, segundos
+
+
+def test_concorrencia_padrao_pelo_pool_do_tipo():
+    os.environ['SMTP_POOL_TAMANHO'] = '3'
+    try:
+        assert concorrencia({'tipo': 'smtp', 'configuracao': {}}) == 3
+        assert concorrencia({'tipo': 'smtp', 'configuracao': {'concorrencia': 8}}) == 8
+    finally:
+        del os.environ['SMTP_POOL_TAMANHO']
+
+
+def test_motor_nao_excede_o_limite():
+    motor = MotorEnvio('teste', 2)
+    futuros = [motor.submeter(time.sleep, 0.02) for _ in range(6)]
+    for futuro in futuros:
+        futuro.result()
+    estatisticas = motor.estatisticas()
+    motor.fechar()
+    assert estatisticas['pico'] == 2
+    assert estatisticas['tarefas'] == 6
+
+
+def limpar_registros():
+    """Saúde, motores e limites de domínio deixados por outros testes mudariam o sorteio e as contagens."""
+    zerar_saude()
+    fechar_motores()
+    obter_controle_dominios().zerar()
+
+
+def test_cada_integracao_sorteada_mantem_seu_limite():
+    aplicar_migracoes()
+    limpar_registros()
+    resultados = []
+    with ServidorSMTP(latencia_mensagem=0.03) as lento, ServidorSMTP(latencia_mensagem=0.03) as rapido:
+        integracoes = []
+        for servidor, limite, peso in ((lento, 1, 1), (rapido, 3, 2)):
+            config = dict(servidor.config(), concorrencia=limite, peso=peso)
+            integracao_id = repo_integracoes.criar('smtp', config)
+            integracoes.append({'id': integracao_id, 'tipo': 'smtp', 'configuracao': config})
+        invalidar_integracoes()
+        try:
+            with LoteEnvio('Assunto', lambda dados, sucesso, detalhe: resultados.append((dados, sucesso))) as lote:
+                for i in range(40):
+                    lote.adicionar(f'destino{i}@exemplo{i % 10}.com', f'<p>{i}</p>', dados=i)
+            estatisticas = [obter_motor(integracao).estatisticas() for integracao in integracoes]
+        finally:
+            for integracao in integracoes:
+                repo_integracoes.remover(integracao['id'])
+            invalidar_integracoes()
+            limpar_registros()
+
+    assert sorted(resultados) == [(i, True) for i in range(40)]
+    assert lento.mensagens > 0 and rapido.mensagens > 0
+    assert lento.mensagens + rapido.mensagens == 40
+    # Cada envio passa pelo motor da integração que o entregou, dentro do limite dela
+    for servidor, limite, motor in zip((lento, rapido), (1, 3), estatisticas):
+        assert motor['concorrencia'] == limite
+        assert motor['pico'] <= limite, motor
+        assert motor['tarefas'] == servidor.mensagens, (motor, servidor.mensagens)
+
+
+def test_consulta_de_integracoes_falhou():
+    resultados = []
+    invalidar_integracoes()
+    with mock.patch('backend.services.cache_integracoes.listar_integracoes', return_value=None):
+        with LoteEnvio('Assunto', lambda dados, sucesso, detalhe: resultados.append((dados, sucesso))) as lote:
+            for i in range(3):
+                lote.adicionar(f'destino{i}@exemplo.com', f'<p>{i}</p>', dados=i)
+    invalidar_integracoes()
+    assert sorted(resultados) == [(0, False), (1, False), (2, False)]
+
+
+if __name__ == '__main__':
+    testes = [
+        test_envios_simultaneos_limitados_pela_integracao,
+        test_concorrencia_padrao_pelo_pool_do_tipo,
+        test_motor_nao_excede_o_limite,
+        test_cada_integracao_sorteada_mantem_seu_limite,
+        test_consulta_de_integracoes_falhou,
+    ]
+    falhas = 0
+    with banco_sqlite():
+        for teste in testes:
+            try:
+                teste()
+                print(f"✓ {teste.__name__}")
+            except AssertionError as e:
+                falhas += 1
+                print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
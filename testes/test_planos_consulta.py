@@ -0,0 +1,205 @@
+"""
+Regressão de planos de execução das consultas registradas em
+backend/database/consultas.py.
+
+Cria (ou reutiliza) um banco MySQL local próprio para o teste, aplica as
+migrações, popula as tabelas com volumes realistas e roda EXPLAIN em cada
+consulta registrada. Uma consulta quente falha quando faz varredura completa
+ou filesort sobre mais linhas que o limite.
+
+    python testes/test_planos_consulta.py
+
+Variáveis: EXPLAIN_DB_NAME (banco usado, padrão base_emails_marketing_explain),
+EXPLAIN_VOLUME (envios gerados, padrão 200000) e EXPLAIN_LIMITE_LINHAS
+(padrão 10000). Sem MySQL acessível o teste é ignorado.
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import mysql.connector
+import pytest
+from mysql.connector import Error
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ambiente_sqlite import banco_mysql
+from backend.database.pool import _parametros_conexao
+from backend.database.migracoes import aplicar_migracoes
+from backend.database.consultas import consultas_registradas, parametros_exemplo
+
+# O teste nunca toca no banco da aplicação
+EXPLAIN_DB_NAME = os.getenv('EXPLAIN_DB_NAME', 'base_emails_marketing_explain')
+VOLUME = int(os.getenv('EXPLAIN_VOLUME', 200000))
+LIMITE_LINHAS = int(os.getenv('EXPLAIN_LIMITE_LINHAS', 10000))
+LOTE = 5000
+DIAS = 180
+
+
+@pytest.fixture(scope='module', autouse=True)
+def banco_explain():
+    """DB_NAME do banco do teste, com pool próprio, só durante o módulo."""
+    with banco_mysql(EXPLAIN_DB_NAME):
+        yield
+
+
+def conectar():
+    return mysql.connector.connect(**_parametros_conexao())
+
+
+def mysql_disponivel():
+    parametros = _parametros_conexao()
+    parametros.pop('database')
+    try:
+        mysql.connector.connect(**parametros).close()
+        return True
+    except Error:
+        return False
+
+
+def inserir_em_lotes(connection, sql, linhas):
+    cursor = connection.cursor()
+    for inicio in range(0, len(linhas), LOTE):
+        cursor.executemany(sql, linhas[inicio:inicio + LOTE])
+        connection.commit()
+    cursor.close()
+
+
+def popular(connection):
+    """Gera contatos, segmentos, agendamentos, envios, métricas e eventos espalhados em DIAS dias."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM envios")
+    if cursor.fetchone()[0] >= VOLUME:
+        cursor.close()
+        return
+    cursor.close()
+
+    print(f"Populando {os.environ['DB_NAME']} com {VOLUME} envios...")
+    aleatorio = random.Random(42)
+    agora = datetime.now()
+
+    def momento():
+        return agora - timedelta(seconds=aleatorio.randint(0, DIAS * 86400))
+
+    total_contatos = VOLUME // 4
+    total_segmentos = 20
+
+    inserir_em_lotes(connection, "INSERT INTO templates (nome, html_content) VALUES (%s, %s)",
+                     [(f"Template {i}", "<p>Olá {{ nome }}</p>") for i in range(10)])
+    inserir_em_lotes(connection, "INSERT INTO segmentos (nome, criterios) VALUES (%s, %s)",
+                     [(f"Segmento {i}", '{"status": "ativo"}') for i in range(total_segmentos)])
+    inserir_em_lotes(connection, "INSERT INTO contatos (email, nome, status) VALUES (%s, %s, %s)",
+                     [(f"contato{i}@exemplo.com", f"Contato {i}",
+                       'ativo' if aleatorio.random() < 0.9 else 'inativo')
+                      for i in range(total_contatos)])
+    inserir_em_lotes(connection,
+                     "INSERT IGNORE INTO contatos_segmentos (contato_id, segmento_id) VALUES (%s, %s)",
+                     [(i + 1, aleatorio.randint(1, total_segmentos)) for i in range(total_contatos)])
+    inserir_em_lotes(connection,
+                     "INSERT INTO agendamentos (template_id, segmento_id, assunto, data_envio, status) "
+                     "VALUES (%s, %s, %s, %s, %s)",
+                     [(aleatorio.randint(1, 10), aleatorio.randint(1, total_segmentos), "Assunto",
+                       momento(), 'enviado' if aleatorio.random() < 0.98 else 'agendado')
+                      for _ in range(VOLUME // 50)])
+
+    envios = []
+    for _ in range(VOLUME):
+        criado = momento()
+        envios.append((aleatorio.randint(1, total_contatos), aleatorio.randint(1, 10),
+                       aleatorio.randint(1, total_segmentos),
+                       'enviado' if aleatorio.random() < 0.95 else 'erro', criado, criado))
+    inserir_em_lotes(connection,
+                     "INSERT INTO envios (contato_id, template_id, segmento_id, status, data_envio, created_at) "
+                     "VALUES (%s, %s, %s, %s, %s, %s)", envios)
+
+    inserir_em_lotes(connection,
+                     "INSERT INTO metricas_envio (envio_id, contato_id, status, data_evento) VALUES (%s, %s, %s, %s)",
+                     [(aleatorio.randint(1, VOLUME), aleatorio.randint(1, total_contatos),
+                       aleatorio.choice(['entregue', 'aberto', 'clicado']), momento())
+                      for _ in range(VOLUME)])
+    inserir_em_lotes(connection,
+                     "INSERT INTO eventos_tracking (envio_id, tipo_evento, data_evento) VALUES (%s, %s, %s)",
+                     [(aleatorio.randint(1, VOLUME), aleatorio.choice(['abertura', 'clique']), momento())
+                      for _ in range(VOLUME)])
+
+    cursor = connection.cursor()
+    for tabela in ['contatos', 'contatos_segmentos', 'agendamentos', 'envios', 'metricas_envio', 'eventos_tracking']:
+        cursor.execute(f"ANALYZE TABLE {tabela}")
+        cursor.fetchall()
+    cursor.close()
+
+
+def problemas_plano(plano, permitir=()):
+    """Lista os passos do plano que fazem varredura completa ou filesort acima do limite."""
+    problemas = []
+    for passo in plano:
+        linhas = int(passo.get('rows') or 0)
+        extra = passo.get('Extra') or ''
+        if linhas <= LIMITE_LINHAS:
+            continue
+        if passo.get('type') in ('ALL', 'index') and 'varredura' not in permitir:
+            problemas.append(f"varredura completa em {passo['table']} ({linhas} linhas)")
+        if 'Using filesort' in extra and 'filesort' not in permitir:
+            problemas.append(f"filesort em {passo['table']} ({linhas} linhas)")
+    return problemas
+
+
+def verificar_planos(connection):
+    """Roda EXPLAIN em todas as consultas registradas; retorna {nome: problemas} das quentes."""
+    falhas = {}
+    cursor = connection.cursor(dictionary=True)
+    for consulta in consultas_registradas():
+        cursor.execute("EXPLAIN " + consulta.sql, parametros_exemplo(consulta))
+        plano = cursor.fetchall()
+        problemas = problemas_plano(plano, consulta.permitir)
+
+        situacao = 'ok' if not problemas else ('FALHA' if consulta.quente else 'aviso')
+        print(f"[{situacao}] {consulta.nome}")
+        for passo in plano:
+            print(f"    {passo['table']}: type={passo['type']} key={passo['key']} "
+                  f"rows={passo['rows']} extra={passo.get('Extra') or ''}")
+        for problema in problemas:
+            print(f"    -> {problema}")
+
+        if problemas and consulta.quente:
+            falhas[consulta.nome] = problemas
+    cursor.close()
+    return falhas
+
+
+def test_planos_consulta():
+    """Falha se alguma consulta quente regrediu para varredura completa ou filesort."""
+    if not mysql_disponivel():
+        pytest.skip("MySQL indisponível")
+
+    aplicar_migracoes()
+    connection = conectar()
+    try:
+        popular(connection)
+        falhas = verificar_planos(connection)
+    finally:
+        connection.close()
+
+    assert not falhas, f"Consultas com plano regredido: {falhas}"
+
+
+if __name__ == '__main__':
+    with banco_mysql(EXPLAIN_DB_NAME):
+        if not mysql_disponivel():
+            print("MySQL indisponível, teste ignorado")
+            sys.exit(0)
+
+        aplicar_migracoes()
+        connection = conectar()
+        try:
+            popular(connection)
+            falhas = verificar_planos(connection)
+        finally:
+            connection.close()
+
+        if falhas:
+            print(f"\n{len(falhas)} consulta(s) com plano regredido")
+            sys.exit(1)
+        print("\nTodos os planos dentro do limite")
@@ -0,0 +1,106 @@
+"""
+Testes dos templates compilados e do cache por (id, updated_at):
+
+    python testes/test_renderizador.py
+"""
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.services.email_service import adicionar_tracking
+from backend.services.renderizador import (
+    campos_do_contato, compilar, estatisticas_templates, limpar_templates, template_compilado
+)
+from backend.utils import assinar_url
+
+
+def token_previsivel(envio_id, *args):
+    """Token determinístico no lugar do gerado com horário, para comparar o HTML inteiro."""
+    return 'T' + '-'.join(str(arg) for arg in (envio_id,) + args)
+
+
+def test_duas_sintaxes_e_campos_sem_valor():
+    compilado = compilar('<p>Olá {{ nome }}, da {{empresa}}! {desconto} em {produto}. {{ nome }}</p>'
+                         '<style>p { color: red }</style>')
+    assert compilado.variaveis == ['nome', 'empresa', 'desconto', 'produto']
+
+    html = compilado.renderizar({'nome': 'Ana <Silva>', 'empresa': None}, {'desconto': 10, 'empresa': 'ACME'})
+    assert html == ('<p>Olá Ana <Silva>, da ACME! 10 em {produto}. Ana <Silva></p>'
+                    '<style>p { color: red }</style>')
+    # Sem marcadores o HTML sai como veio
+    assert compilar('<p>Fixo</p>').renderizar({'nome': 'Ana'}) == '<p>Fixo</p>'
+
+
+def test_campos_do_contato_tem_precedencia_sobre_o_padrao():
+    contato = {'id': 7, 'email': 'ana@exemplo.com', 'nome': 'Ana', 'cargo': None, 'status': 'ativo'}
+    compilado = compilar('{nome} {cargo} {email} {id} {status}')
+    assert compilado.renderizar(campos_do_contato(contato), {'nome': 'Cliente', 'cargo': 'Gerente'}) == \
+        'Ana Gerente ana@exemplo.com {id} {status}'
+
+
+def test_cache_por_id_e_updated_at():
+    limpar_templates()
+    antes = estatisticas_templates()
+    primeiro = template_compilado(1, '2024-01-01 10:00:00', '<p>{nome}</p>')
+    assert template_compilado(1, '2024-01-01 10:00:00', '<p>{nome}</p>') is primeiro
+    # Alterado no mesmo segundo: o HTML diferente força nova compilação
+    mesmo_segundo = template_compilado(1, '2024-01-01 10:00:00', '<p>Oi {nome}</p>')
+    assert mesmo_segundo is not primeiro
+    assert mesmo_segundo.renderizar({'nome': 'Ana'}) == '<p>Oi Ana</p>'
+    assert template_compilado(1, '2024-01-01 10:05:00', '<p>Oi {nome}</p>') is not mesmo_segundo
+
+    depois = estatisticas_templates()
+    assert depois['acertos'] - antes['acertos'] == 1
+    assert (depois['compilacoes'] - antes['compilacoes'], depois['em_cache']) == (3, 2)
+    limpar_templates()
+
+
+def test_tracking_nos_links_e_antes_do_corpo():
+    html = ('<html><BODY><a href="https://loja.com/oferta">Oferta</a> {nome}'
+            '<a href="https://loja.com/?c={cupom}&e={{ email }}">Cupom</a></BODY></html>')
+    compilado = compilar(html, 'http://rastreio')
+    assert compilado.variaveis == ['nome', 'cupom', 'email']
+
+    with mock.patch('backend.services.renderizador.gerar_token_tracking', token_previsivel):
+        html_contato = compilado.renderizar({'nome': 'Ana', 'email': 'ana@x.com'}, {'cupom': 'A B'}, 7, 42)
+    clique = 'http://rastreio/api/tracking/click/T7-42-clique'
+    assert html_contato == (
+        f'<html><BODY><a href="{clique}?url=https%3A%2F%2Floja.com%2Foferta&h={assinar_url("https://loja.com/oferta")}">'
+        'Oferta</a> Ana'
+        f'<a href="{clique}?url=https%3A%2F%2Floja.com%2F%3Fc%3DA+B%26e%3Dana%40x.com'
+        f'&h={assinar_url("https://loja.com/?c=A B&e=ana@x.com")}">Cupom</a>'
+        '<img src="http://rastreio/api/tracking/pixel/T7-42-abertura" width="1" height="1" style="display:none;">'
+        '</BODY></html>'
+    )
+    # Sem envio e contato não há tracking
+    assert compilado.renderizar({'nome': 'Ana', 'email': 'e'}, {'cupom': 'c'}) == \
+        '<html><BODY><a href="https://loja.com/oferta">Oferta</a> Ana<a href="https://loja.com/?c=c&e=e">Cupom</a></BODY></html>'
+
+
+def test_adicionar_tracking_em_html_avulso():
+    with mock.patch('backend.services.renderizador.gerar_token_tracking', token_previsivel):
+        html = adicionar_tracking('<body><a href="https://x.com">x</a> {campo}</body>', 1, 2, 'http://b')
+    assert html == (f'<body><a href="http://b/api/tracking/click/T1-2-clique?url=https%3A%2F%2Fx.com'
+                    f'&h={assinar_url("https://x.com")}">x</a> {{campo}}'
+                    '<img src="http://b/api/tracking/pixel/T1-2-abertura" width="1" height="1" style="display:none;"></body>')
+
+
+if __name__ == '__main__':
+    testes = [
+        test_duas_sintaxes_e_campos_sem_valor,
+        test_campos_do_contato_tem_precedencia_sobre_o_padrao,
+        test_cache_por_id_e_updated_at,
+        test_tracking_nos_links_e_antes_do_corpo,
+        test_adicionar_tracking_em_html_avulso,
+    ]
+    falhas = 0
+    for teste in testes:
+        try:
+            teste()
+            print(f"✓ {teste.__name__}")
+        except AssertionError as e:
+            falhas += 1
+            print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
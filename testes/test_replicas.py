@@ -0,0 +1,115 @@
+"""
+Roteamento de leituras entre primário e réplica usando duas instâncias
+MySQL locais.
+
+    REPLICA_TESTE=localhost:3307 python testes/test_replicas.py
+
+O primário é o das variáveis DB_HOST/DB_PORT; REPLICA_TESTE aceita o mesmo
+formato de DB_REPLICAS. As instâncias não precisam estar replicando: sem
+status de réplica, a verificação de atraso recusa a instância e a leitura
+cai no primário. Sem as duas instâncias acessíveis o teste é ignorado.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mysql.connector
+from mysql.connector import Error
+
+from backend.database.pool import PoolConexoes, _parametros_conexao
+from backend.database.replicas import Replica, RoteadorLeitura, atraso_replicacao
+
+REPLICA_TESTE = os.getenv('REPLICA_TESTE', 'localhost:3307')
+
+
+def pool_primario():
+    parametros = _parametros_conexao()
+    parametros.pop('database')
+    return PoolConexoes(fabrica=lambda: mysql.connector.connect(**parametros), tamanho=2, nome='primario')
+
+
+def replica(dsn=REPLICA_TESTE):
+    r = Replica(dsn, tamanho=2, timeout=1, pre_ping=True, intervalo_ping=5)
+    # O teste só consulta variáveis do servidor, sem depender do banco da aplicação
+    r.parametros.pop('database')
+    return r
+
+
+def porta(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT @@port")
+    valor = cursor.fetchone()[0]
+    cursor.close()
+    connection.close()
+    return valor
+
+
+def instancias_disponiveis():
+    try:
+        porta(pool_primario().obter())
+        porta(replica().pool.obter())
+        return True
+    except Error:
+        return False
+
+
+def test_leitura_vai_para_replica_sem_verificacao_de_atraso():
+    r = replica()
+    roteador = RoteadorLeitura(pool_primario(), [r], atraso_maximo=-1)
+    assert porta(roteador.obter()) == r.parametros['port']
+    assert r.leituras == 1
+    assert roteador.estatisticas()['leituras_primario'] == 0
+
+
+def test_atraso_acima_do_limite_cai_no_primario():
+    r = replica()
+    conexao = r.pool.obter()
+    atraso = atraso_replicacao(conexao)
+    conexao.close()
+
+    roteador = RoteadorLeitura(pool_primario(), [r], atraso_maximo=0)
+    porta_lida = porta(roteador.obter())
+    if atraso is None or atraso > 0:
+        assert porta_lida == _parametros_conexao()['port']
+        assert roteador.estatisticas()['leituras_primario'] == 1
+        assert r.recusas == 1
+    else:
+        assert porta_lida == r.parametros['port']
+
+
+def test_replica_fora_do_ar_cai_no_primario():
+    r = replica('localhost:1')
+    roteador = RoteadorLeitura(pool_primario(), [r], atraso_maximo=-1, espera_falha=60)
+    assert porta(roteador.obter()) == _parametros_conexao()['port']
+    # Durante a espera a réplica nem é tentada
+    assert porta(roteador.obter()) == _parametros_conexao()['port']
+    assert r.recusas == 1
+    assert roteador.estatisticas()['replicas'][0]['indisponivel']
+
+
+def setup_module(module):
+    if not instancias_disponiveis():
+        import pytest
+        pytest.skip("Primário e réplica MySQL indisponíveis", allow_module_level=True)
+
+
+if __name__ == '__main__':
+    if not instancias_disponiveis():
+        print("Primário e réplica MySQL indisponíveis, teste ignorado")
+        sys.exit(0)
+
+    testes = [
+        test_leitura_vai_para_replica_sem_verificacao_de_atraso,
+        test_atraso_acima_do_limite_cai_no_primario,
+        test_replica_fora_do_ar_cai_no_primario,
+    ]
+    falhas = 0
+    for teste in testes:
+        try:
+            teste()
+            print(f"✓ {teste.__name__}")
+        except AssertionError as e:
+            falhas += 1
+            print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
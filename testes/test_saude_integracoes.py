@@ -0,0 +1,145 @@
+"""
+Testes da saúde das integrações e dos disjuntores, sobre SQLite em memória
+e o servidor SMTP local de testes/servidor_smtp.py:
+
+    python testes/test_saude_integracoes.py
+"""
+import os
+import socket
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ambiente_sqlite import banco_sqlite
+from servidor_smtp import ServidorSMTP
+from backend.database.migracoes import aplicar_migracoes
+from backend.repositorios import integracoes as repo_integracoes
+from backend.services.cache_integracoes import invalidar_integracoes
+from backend.services.email_service import send_email
+from backend.services.saude_integracoes import (
+    ABERTO, FECHADO, MEIO_ABERTO, SaudeIntegracao, estatisticas_saude, obter_saude, ordenar_integracoes,
+    zerar_saude
+)
+
+pytestmark = pytest.mark.usefixtures('banco_sqlite')
+
+
+def porta_fechada():
+    """Porta local sem servidor: a conexão é recusada na hora."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_disjuntor_abre_espera_e_testa():
+    os.environ['CIRCUITO_FALHAS_SEGUIDAS'] = '3'
+    os.environ['CIRCUITO_ESPERA'] = '0.1'
+    try:
+        saude = SaudeIntegracao('smtp-teste')
+    finally:
+        del os.environ['CIRCUITO_FALHAS_SEGUIDAS']
+        del os.environ['CIRCUITO_ESPERA']
+
+    for _ in range(3):
+        assert saude.permitir()
+        saude.registrar(False, 0.01)
+    assert saude.estatisticas()['estado'] == ABERTO
+    assert not saude.permitir()
+
+    time.sleep(0.12)
+    assert saude.estatisticas()['estado'] == MEIO_ABERTO
+    # Só um envio de teste por vez; a falha dele reabre o disjuntor
+    assert saude.permitir()
+    assert not saude.permitir()
+    saude.registrar(False, 0.01)
+    assert saude.estatisticas()['estado'] == ABERTO
+
+    time.sleep(0.12)
+    assert saude.permitir()
+    saude.registrar(True, 0.01)
+    estatisticas = saude.estatisticas()
+    assert estatisticas['estado'] == FECHADO
+    assert (estatisticas['aberturas'], estatisticas['taxa_erros']) == (2, 0.0)
+
+
+def test_taxa_de_erros_abre_o_disjuntor():
+    os.environ['SAUDE_MINIMO'] = '10'
+    try:
+        saude = SaudeIntegracao('api-teste')
+    finally:
+        del os.environ['SAUDE_MINIMO']
+
+    # Falhas intercaladas nunca chegam a 5 seguidas, mas somam metade dos resultados
+    for i in range(9):
+        saude.registrar(i % 2 == 0, 0.01)
+    assert saude.estatisticas()['estado'] == FECHADO
+    saude.registrar(False, 0.01)
+    assert saude.estatisticas()['estado'] == ABERTO
+
+
+def test_sorteio_ponderado_e_reserva():
+    zerar_saude()
+    rapida = {'id': 901, 'tipo': 'api', 'configuracao': {}}
+    lenta = {'id': 902, 'tipo': 'api', 'configuracao': {}}
+    reserva = {'id': 903, 'tipo': 'api', 'configuracao': {'peso': 0}}
+    for _ in range(10):
+        obter_saude(rapida).registrar(True, 0.05)
+        obter_saude(lenta).registrar(True, 3.0)
+
+    peso_rapida, peso_lenta = obter_saude(rapida).peso(), obter_saude(lenta).peso()
+    assert peso_rapida > 3 * peso_lenta
+    # Com duas integrações, a primeira sai na frente com a proporção do seu peso;
+    # a tolerância fica a mais de 8 desvios-padrão para 2000 sorteios
+    primeiras = [ordenar_integracoes([lenta, reserva, rapida])[0]['id'] for _ in range(2000)]
+    esperada = peso_rapida / (peso_rapida + peso_lenta)
+    assert abs(primeiras.count(901) / len(primeiras) - esperada) < 0.08, (primeiras.count(901), esperada)
+    assert primeiras.count(903) == 0
+    assert ordenar_integracoes([reserva, lenta, rapida])[-1] is reserva
+    zerar_saude()
+
+
+def test_envio_pula_integracao_fora_do_ar():
+    aplicar_migracoes()
+    zerar_saude()
+    with ServidorSMTP() as servidor:
+        fora_do_ar = dict(servidor.config(), port=porta_fechada())
+        ids = [repo_integracoes.criar('smtp', fora_do_ar), repo_integracoes.criar('smtp', servidor.config())]
+        invalidar_integracoes()
+        try:
+            resultados = [send_email(f'cliente{i}@exemplo.com', 'Assunto', '<p>Olá</p>') for i in range(40)]
+        finally:
+            for integracao_id in ids:
+                repo_integracoes.remover(integracao_id)
+            invalidar_integracoes()
+
+    assert all(resultados)
+    assert servidor.mensagens == 40
+    saudes = {saude['integracao']: saude for saude in estatisticas_saude()}
+    fora, ativa = saudes[f'smtp-{ids[0]}'], saudes[f'smtp-{ids[1]}']
+    # Cada falha derruba o peso da integração; ela é tentada poucas vezes antes de ser evitada
+    assert 1 <= fora['resultados'] <= 5 and fora['taxa_erros'] == 1.0, fora
+    assert ativa['estado'] == FECHADO and ativa['resultados'] == 40
+    zerar_saude()
+
+
+if __name__ == '__main__':
+    testes = [
+        test_disjuntor_abre_espera_e_testa,
+        test_taxa_de_erros_abre_o_disjuntor,
+        test_sorteio_ponderado_e_reserva,
+        test_envio_pula_integracao_fora_do_ar,
+    ]
+    falhas = 0
+    with banco_sqlite():
+        for teste in testes:
+            try:
+                teste()
+                print(f"✓ {teste.__name__}")
+            except AssertionError as e:
+                falhas += 1
+                print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,103 @@
+"""
+Testes do pool de sessões SMTP contra o servidor SMTP local de
+testes/servidor_smtp.py. Não precisam de rede nem de banco:
+
+    python testes/test_smtp_pool.py
+"""
+import os
+import sys
+import time
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from servidor_smtp import ServidorSMTP
+from backend.services.smtp_pool import PoolSMTP
+
+
+def mensagem(i=0):
+    msg = MIMEText(f'<p>Mensagem {i}</p>', 'html')
+    msg['Subject'] = f'Teste {i}'
+    msg['From'] = 'teste@exemplo.com'
+    msg['To'] = f'destino{i}@exemplo.com'
+    return msg
+
+
+def test_sessao_reaproveitada_entre_mensagens():
+    with ServidorSMTP() as servidor:
+        pool = PoolSMTP(servidor.config())
+        for i in range(5):
+            pool.enviar(mensagem(i))
+        estatisticas = pool.estatisticas()
+        pool.fechar()
+    assert servidor.conexoes == 1
+    assert servidor.mensagens == 5
+    assert estatisticas['reusos'] == 4
+
+
+def test_sessao_encerrada_apos_limite_de_mensagens():
+    with ServidorSMTP() as servidor:
+        pool = PoolSMTP(servidor.config(), max_mensagens=2)
+        for i in range(5):
+            pool.enviar(mensagem(i))
+        estatisticas = pool.estatisticas()
+        pool.fechar()
+    assert servidor.conexoes == 3
+    assert estatisticas['encerradas_limite'] == 2
+
+
+def test_reenvio_em_nova_sessao_apos_421():
+    with ServidorSMTP(limite_por_conexao=2) as servidor:
+        pool = PoolSMTP(servidor.config())
+        for i in range(5):
+            pool.enviar(mensagem(i))
+        estatisticas = pool.estatisticas()
+        pool.fechar()
+    assert servidor.mensagens == 5
+    assert servidor.conexoes == 3
+    assert estatisticas['reconexoes'] == 2
+
+
+def test_sessao_derrubada_detectada_com_noop():
+    with ServidorSMTP() as servidor:
+        pool = PoolSMTP(servidor.config(), intervalo_noop=0)
+        pool.enviar(mensagem(1))
+        servidor.derrubar_conexoes()
+        pool.enviar(mensagem(2))
+        estatisticas = pool.estatisticas()
+        pool.fechar()
+    assert servidor.mensagens == 2
+    assert estatisticas['falhas_noop'] == 1
+    assert estatisticas['reconexoes'] == 0
+
+
+def test_sessao_ociosa_encerrada():
+    with ServidorSMTP() as servidor:
+        pool = PoolSMTP(servidor.config(), ocioso=0.05)
+        pool.enviar(mensagem(1))
+        time.sleep(0.1)
+        pool.enviar(mensagem(2))
+        estatisticas = pool.estatisticas()
+        pool.fechar()
+    assert servidor.conexoes == 2
+    assert estatisticas['encerradas_ociosas'] == 1
+
+
+if __name__ == '__main__':
+    testes = [
+        test_sessao_reaproveitada_entre_mensagens,
+        test_sessao_encerrada_apos_limite_de_mensagens,
+        test_reenvio_em_nova_sessao_apos_421,
+        test_sessao_derrubada_detectada_com_noop,
+        test_sessao_ociosa_encerrada,
+    ]
+    falhas = 0
+    for teste in testes:
+        try:
+            teste()
+            print(f"✓ {teste.__name__}")
+        except AssertionError as e:
+            falhas += 1
+            print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,203 @@
+"""
+Testes do adaptador SQLite da camada de dados. Rodam em memória, sem MySQL
+e sem servidor:
+
+    python testes/test_sqlite.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ambiente_sqlite import banco_sqlite
+from backend.database import BufferEscrita, conexao_db, consultar_em_fluxo
+from backend.database.dialeto_sqlite import traduzir_sql
+from backend.database.instrumentacao import estatisticas_consultas, zerar_estatisticas_consultas
+from backend.database.migracoes import aplicar_migracoes
+from backend.repositorios import envios as repo_envios, segmentos as repo_segmentos
+
+# DB_BACKEND=sqlite só durante o módulo, sem vazar para os demais (testes/conftest.py)
+pytestmark = pytest.mark.usefixtures('banco_sqlite')
+
+
+def test_traducao_marcadores_e_literais():
+    sql = traduzir_sql("SELECT * FROM contatos WHERE email = %s AND nome LIKE '%s%%'")
+    assert sql == "SELECT * FROM contatos WHERE email = ? AND nome LIKE '%s%%'"
+
+
+def test_traducao_ddl():
+    sql = traduzir_sql("""
+        CREATE TABLE t (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            status ENUM('ativo', 'inativo') DEFAULT 'ativo',
+            dados JSON,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+    assert 'INTEGER PRIMARY KEY AUTOINCREMENT' in sql
+    assert "status TEXT DEFAULT 'ativo'" in sql
+    assert 'dados TEXT' in sql
+    assert 'ON UPDATE' not in sql
+
+
+def test_traducao_on_duplicate_key():
+    sql = traduzir_sql(
+        "INSERT INTO t (id, nome) VALUES (%s, %s) ON DUPLICATE KEY UPDATE nome = VALUES(nome)"
+    )
+    assert sql == "INSERT INTO t (id, nome) VALUES (?, ?) ON CONFLICT DO UPDATE SET nome = excluded.nome"
+
+
+def test_traducao_indice_online():
+    sql = traduzir_sql("ALTER TABLE envios ADD INDEX idx_x (status, data_envio), ALGORITHM=INPLACE, LOCK=NONE")
+    assert sql == "CREATE INDEX IF NOT EXISTS idx_x ON envios (status, data_envio)"
+
+
+def test_migracoes_e_escrita_em_lote():
+    aplicar_migracoes()
+    # Reaplicar não faz nada
+    assert aplicar_migracoes() == []
+
+    with BufferEscrita('contatos', ['email', 'nome'], tamanho_lote=50) as contatos:
+        for i in range(120):
+            contatos.adicionar(f"sqlite{i}@exemplo.com", f"Contato {i}")
+    assert contatos.total_gravado == 120
+
+    with conexao_db() as connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT COUNT(*) AS total FROM contatos WHERE email LIKE %s", ('sqlite%',))
+        assert cursor.fetchone()['total'] == 120
+
+        cursor.execute(
+            "INSERT INTO envios (contato_id, status, data_envio) VALUES (%s, %s, NOW())", (1, 'enviado')
+        )
+        envio_id = cursor.lastrowid
+        cursor.execute("SELECT data_envio, HOUR(data_envio) AS hora FROM envios WHERE id = %s", (envio_id,))
+        envio = cursor.fetchone()
+        assert envio['data_envio'].hour == envio['hora']
+        connection.commit()
+        cursor.close()
+
+
+def test_flush_com_falha_mantem_lotes_sem_commit():
+    aplicar_migracoes()
+    with conexao_db() as connection:
+        cursor = connection.cursor()
+        cursor.execute("INSERT INTO contatos (email, nome) VALUES (%s, %s)", ('repetido@exemplo.com', 'Antes'))
+        connection.commit()
+        cursor.close()
+
+    contatos = BufferEscrita('contatos', ['email', 'nome'], tamanho_lote=10)
+    for email in ('falha0@exemplo.com', 'falha1@exemplo.com', 'repetido@exemplo.com', 'falha3@exemplo.com'):
+        contatos.adicionar(email, 'Buffer')
+    # Dois lotes: o primeiro é confirmado e o segundo esbarra no email repetido
+    contatos.tamanho_lote = 2
+    with pytest.raises(Exception):
+        contatos.flush()
+    assert contatos.total_gravado == 2
+    assert len(contatos) == 2
+
+    with conexao_db() as connection:
+        cursor = connection.cursor()
+        cursor.execute("DELETE FROM contatos WHERE email = %s", ('repetido@exemplo.com',))
+        connection.commit()
+        cursor.close()
+    # O próximo flush grava só o lote que ficou, sem repetir o primeiro
+    assert contatos.flush() == 2
+    assert contatos.total_gravado == 4
+    with conexao_db() as connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT COUNT(*) AS total FROM contatos WHERE nome = %s", ('Buffer',))
+        assert cursor.fetchone()['total'] == 4
+        cursor.close()
+
+
+def test_upsert_e_leitura_em_fluxo():
+    aplicar_migracoes()
+    with conexao_db() as connection:
+        cursor = connection.cursor()
+        cursor.execute("""
+            INSERT INTO contatos (email, nome) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE nome = VALUES(nome)
+        """, ('upsert@exemplo.com', 'Primeiro'))
+        cursor.execute("""
+            INSERT INTO contatos (email, nome) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE nome = VALUES(nome)
+        """, ('upsert@exemplo.com', 'Segundo'))
+        connection.commit()
+        cursor.close()
+
+    nomes = [linha['nome'] for linha in consultar_em_fluxo(
+        "SELECT nome FROM contatos WHERE email = %s", ('upsert@exemplo.com',), tamanho_lote=1
+    )]
+    assert nomes == ['Segundo']
+
+
+def test_repositorios_e_consultas_nomeadas():
+    aplicar_migracoes()
+    zerar_estatisticas_consultas()
+    with conexao_db() as connection:
+        cursor = connection.cursor()
+        cursor.execute("INSERT INTO contatos (email, nome, status) VALUES (%s, %s, %s)",
+                       ('repo@exemplo.com', 'Ana Silva', 'ativo'))
+        connection.commit()
+        cursor.close()
+
+    segmento_id = repo_segmentos.criar('Silvas', criterios={'nome': 'silva'})
+    assert repo_segmentos.associar_por_criterios(segmento_id, {'nome': 'silva'}) == 1
+    envio_id = repo_envios.inserir(None, None, segmento_id)
+    assert repo_envios.existe(envio_id)
+    assert repo_segmentos.remover(segmento_id) == 1
+    assert not repo_segmentos.existe(segmento_id)
+
+    estatisticas = {consulta['nome']: consulta for consulta in estatisticas_consultas(limite=None)}
+    assert estatisticas['segmentos.associar_por_criterios']['linhas'] == 1
+    assert estatisticas['envios.existe']['chamadas'] == 1
+
+
+def test_rotas_de_contatos_e_templates_pelos_repositorios():
+    from backend import create_app
+
+    aplicar_migracoes()
+    with conexao_db() as connection:
+        cursor = connection.cursor()
+        cursor.execute("INSERT INTO contatos (email, nome) VALUES (%s, %s)", ('rota@exemplo.com', 'Rota'))
+        contato_id = cursor.lastrowid
+        cursor.execute("INSERT INTO templates (nome, html_content) VALUES (%s, %s)", ('Rota', '<p>Olá</p>'))
+        template_id = cursor.lastrowid
+        connection.commit()
+        cursor.close()
+    client = create_app().test_client()
+
+    assert client.get(f'/api/contatos/{contato_id}').get_json()['email'] == 'rota@exemplo.com'
+    assert client.delete(f'/api/contatos/{contato_id}').status_code == 200
+    assert client.get(f'/api/contatos/{contato_id}').status_code == 404
+    assert client.delete(f'/api/contatos/{contato_id}').status_code == 404
+    assert client.delete(f'/api/templates/{template_id}').status_code == 200
+    assert client.delete(f'/api/templates/{template_id}').status_code == 404
+
+
+if __name__ == '__main__':
+    testes = [
+        test_traducao_marcadores_e_literais,
+        test_traducao_ddl,
+        test_traducao_on_duplicate_key,
+        test_traducao_indice_online,
+        test_migracoes_e_escrita_em_lote,
+        test_flush_com_falha_mantem_lotes_sem_commit,
+        test_upsert_e_leitura_em_fluxo,
+        test_repositorios_e_consultas_nomeadas,
+        test_rotas_de_contatos_e_templates_pelos_repositorios,
+    ]
+    falhas = 0
+    with banco_sqlite():
+        for teste in testes:
+            try:
+                teste()
+                print(f"✓ {teste.__name__}")
+            except AssertionError as e:
+                falhas += 1
+                print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)
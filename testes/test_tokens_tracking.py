@@ -0,0 +1,124 @@
+"""
+Testes dos tokens de tracking e das rotas de pixel e clique, sobre SQLite
+em memória:
+
+    python testes/test_tokens_tracking.py
+"""
+import os
+import sys
+import time
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ambiente_sqlite import banco_sqlite
+from backend.database.migracoes import aplicar_migracoes
+from backend.repositorios import envios as repo_envios
+from backend.repositorios.base import abrir_cursor
+from backend.config import Config
+from backend.utils import assinar_url, gerar_token_tracking, validar_token_tracking, validar_url
+
+pytestmark = pytest.mark.usefixtures('banco_sqlite')
+
+
+def test_token_compacto_ida_e_volta():
+    token = gerar_token_tracking(2_000_000_000, 123456, 'clique')
+    assert len(token) == 26 and '=' not in token
+    dados = validar_token_tracking(token)
+    assert (dados['envio_id'], dados['contato_id'], dados['tipo']) == (2_000_000_000, 123456, 'clique')
+    assert dados['dia'] > 19000
+
+    assert validar_token_tracking(gerar_token_tracking(5, None, 'resposta'))['contato_id'] is None
+
+
+def test_token_adulterado_e_recusado():
+    token = gerar_token_tracking(10, 20, 'abertura')
+    trocado = ('A' if token[3] != 'A' else 'B')
+    assert validar_token_tracking(token[:3] + trocado + token[4:]) is None
+    assert validar_token_tracking(token[:-1]) is None
+    assert validar_token_tracking(token + 'A') is None
+    assert validar_token_tracking('!' * 26) is None
+    assert validar_token_tracking('') is None
+
+
+def test_token_expira_pela_validade():
+    dias = Config.TRACKING_VALIDADE_DIAS
+    with mock.patch('backend.utils.time.time', return_value=time.time() - (dias + 1) * 86400):
+        antigo = gerar_token_tracking(10, 20, 'clique')
+    with mock.patch('backend.utils.time.time', return_value=time.time() - (dias - 1) * 86400):
+        recente = gerar_token_tracking(10, 20, 'clique')
+    assert validar_token_tracking(antigo) is None
+    assert validar_token_tracking(recente)['envio_id'] == 10
+    with mock.patch.object(Config, 'TRACKING_VALIDADE_DIAS', 0):
+        assert validar_token_tracking(antigo)['envio_id'] == 10
+
+
+def test_assinatura_da_url():
+    assinatura = assinar_url('https://loja.com/?a=1')
+    assert len(assinatura) == 11
+    assert validar_url('https://loja.com/?a=1', assinatura)
+    assert not validar_url('https://golpe.com/', assinatura)
+    assert not validar_url('https://loja.com/?a=1', None)
+    assert not validar_url('https://loja.com/?a=1', 'ç' * 11)
+
+
+def test_rotas_de_pixel_e_clique():
+    from backend import create_app
+
+    aplicar_migracoes()
+    envio_id = repo_envios.inserir(None, None, None)
+    client = create_app().test_client()
+
+    resposta = client.get(f"/api/tracking/pixel/{gerar_token_tracking(envio_id, 7, 'abertura')}")
+    assert resposta.status_code == 200 and resposta.mimetype == 'image/gif'
+
+    token_clique = gerar_token_tracking(envio_id, 7, 'clique')
+    assinatura = assinar_url('https://loja.com/?a=1')
+    resposta = client.get(f'/api/tracking/click/{token_clique}?url=https%3A%2F%2Floja.com%2F%3Fa%3D1&h={assinatura}')
+    assert resposta.status_code == 302 and resposta.headers['Location'] == 'https://loja.com/?a=1'
+
+    # Um token válido não redireciona para uma URL que não foi assinada no email
+    assert client.get(f'/api/tracking/click/{token_clique}?url=https%3A%2F%2Fgolpe.com&h={assinatura}').status_code == 404
+    assert client.get(f'/api/tracking/click/{token_clique}?url=https%3A%2F%2Fgolpe.com').status_code == 404
+
+    # O link como sai no email, gerado pelo renderizador
+    from backend.services.renderizador import compilar
+    html = compilar('<a href="https://loja.com/oferta?id=3">x</a>', 'http://b').renderizar({}, None, envio_id, 7)
+    link = html[len('<a href="http://b'):html.index('">')]
+    resposta = client.get(link)
+    assert resposta.status_code == 302 and resposta.headers['Location'] == 'https://loja.com/oferta?id=3'
+
+    # Token de outro tipo de evento ou adulterado não registra nada
+    assert client.get(f'/api/tracking/pixel/{token_clique}').status_code == 404
+    assert client.get(f"/api/tracking/click/{token_clique[:-2]}xx?url=https://x.com&h={assinar_url('https://x.com')}"
+                      ).status_code == 404
+
+    with abrir_cursor() as cursor:
+        cursor.execute("SELECT tipo_evento, dados_adicionais FROM eventos_tracking WHERE envio_id = %s ORDER BY id",
+                       (envio_id,))
+        eventos = cursor.fetchall()
+    assert [evento['tipo_evento'] for evento in eventos] == ['abertura', 'clique', 'clique']
+    assert all('"contato_id": 7' in evento['dados_adicionais'] for evento in eventos)
+
+
+if __name__ == '__main__':
+    testes = [
+        test_token_compacto_ida_e_volta,
+        test_token_adulterado_e_recusado,
+        test_token_expira_pela_validade,
+        test_assinatura_da_url,
+        test_rotas_de_pixel_e_clique,
+    ]
+    falhas = 0
+    with banco_sqlite():
+        for teste in testes:
+            try:
+                teste()
+                print(f"✓ {teste.__name__}")
+            except AssertionError as e:
+                falhas += 1
+                print(f"✗ {teste.__name__}: {e}")
+    sys.exit(1 if falhas else 0)